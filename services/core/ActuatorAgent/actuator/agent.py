@@ -67,6 +67,16 @@ ActuatorAgent Configuration
     "heartbeat_interval"
         How often to send a heartbeat signal to all devices in seconds.
         Defaults to 60.
+    "schedule_journal"
+        Append each schedule change to a journal file in the agent's
+        directory instead of saving every Task after each change.
+        Defaults to true.
+    "schedule_snapshot_records"
+        Number of journaled changes after which all Tasks are saved and the
+        journal is compacted. Defaults to 100.
+    "schedule_snapshot_interval"
+        Minimum time between saves of all Tasks in seconds when the journal
+        is used. Defaults to 300.
         
 
 Sample configuration file
@@ -447,11 +457,12 @@ __docformat__ = 'reStructuredText'
 import collections
 import datetime
 import logging
+import os
 import sys
 
 import gevent
 
-from actuator.scheduler import ScheduleManager
+from actuator.scheduler import ScheduleJournal, ScheduleManager
 
 from tzlocal import get_localzone
 from volttron.platform.agent import utils
@@ -515,11 +526,18 @@ def actuator_agent(config_path, **kwargs):
 
     allow_no_lock_write = bool(config.get('allow_no_lock_write', True))
 
+    schedule_journal = bool(config.get('schedule_journal', True))
+    schedule_snapshot_records = int(config.get('schedule_snapshot_records', 100))
+    schedule_snapshot_interval = float(config.get('schedule_snapshot_interval', 300))
+
     return ActuatorAgent(heartbeat_interval,
                          schedule_publish_interval,
                          preempt_grace_time,
                          driver_vip_identity,
                          allow_no_lock_write,
+                         schedule_journal,
+                         schedule_snapshot_records,
+                         schedule_snapshot_interval,
                          **kwargs)
 
 
@@ -541,11 +559,20 @@ class ActuatorAgent(Agent):
     :param preempt_grace_time: Time in seconds after a schedule is preemted
         before it is actually cancelled. 
     :param driver_vip_identity: VIP identity of the Platform Driver Agent.
+    :param schedule_journal: Journal schedule changes to a file and only
+        save the full schedule state periodically.
+    :param schedule_snapshot_records: Number of journaled changes before the
+        full schedule state is saved again.
+    :param schedule_snapshot_interval: Minimum time in seconds between saves
+        of the full schedule state when journaling.
 
     :type heartbeat_interval: float
     :type schedule_publish_interval: float
     :type preempt_grace_time: float
     :type driver_vip_identity: str
+    :type schedule_journal: bool
+    :type schedule_snapshot_records: int
+    :type schedule_snapshot_interval: float
     """
 
     def __init__(self, heartbeat_interval=60,
@@ -553,6 +580,9 @@ class ActuatorAgent(Agent):
                  preempt_grace_time=60,
                  driver_vip_identity=PLATFORM_DRIVER,
                  allow_no_lock_write=True,
+                 schedule_journal=True,
+                 schedule_snapshot_records=100,
+                 schedule_snapshot_interval=300,
                  **kwargs):
 
         super(ActuatorAgent, self).__init__(**kwargs)
@@ -562,6 +592,7 @@ class ActuatorAgent(Agent):
         self._device_states = {}
 
         self.schedule_state_file = "_schedule_state"
+        self.schedule_journal_file = "schedule_journal.pickle"
         self.heartbeat_greenlet = None
         self.heartbeat_interval = heartbeat_interval
         self._schedule_manager = None
@@ -575,7 +606,10 @@ class ActuatorAgent(Agent):
                               "schedule_publish_interval": schedule_publish_interval,
                               "preempt_grace_time": preempt_grace_time,
                               "driver_vip_identity": driver_vip_identity,
-                               "allow_no_lock_write": allow_no_lock_write}
+                               "allow_no_lock_write": allow_no_lock_write,
+                               "schedule_journal": schedule_journal,
+                               "schedule_snapshot_records": schedule_snapshot_records,
+                               "schedule_snapshot_interval": schedule_snapshot_interval}
 
 
         self.vip.config.set_default("config", self.default_config)
@@ -594,6 +628,9 @@ class ActuatorAgent(Agent):
             heartbeat_interval = float(config["heartbeat_interval"])
             preempt_grace_time = float(config["preempt_grace_time"])
             allow_no_lock_write = bool(config["allow_no_lock_write"])
+            schedule_journal = bool(config["schedule_journal"])
+            schedule_snapshot_records = int(config["schedule_snapshot_records"])
+            schedule_snapshot_interval = float(config["schedule_snapshot_interval"])
         except ValueError as e:
             _log.error("ERROR PROCESSING CONFIGURATION: {}".format(e))
             #TODO: set a health status for the agent
@@ -625,9 +662,12 @@ class ActuatorAgent(Agent):
                 state_string = self.vip.config.get(self.schedule_state_file)
             except KeyError:
                 state_string = None
-            self._setup_schedule(preempt_grace_time, state_string)
+            self._setup_schedule(preempt_grace_time, state_string, schedule_journal,
+                                 schedule_snapshot_records, schedule_snapshot_interval)
         else:
             self._schedule_manager.set_grace_period(preempt_grace_time)
+            self._schedule_manager.snapshot_records = schedule_snapshot_records
+            self._schedule_manager.snapshot_interval = datetime.timedelta(seconds=schedule_snapshot_interval)
 
 
         if not self.subscriptions_setup and self._schedule_manager is not None:
@@ -671,13 +711,34 @@ class ActuatorAgent(Agent):
         self.vip.config.set(self.schedule_state_file, state_file_contents, send_update=False)
 
 
-    def _setup_schedule(self, preempt_grace_time, initial_state=None):
+    def _get_schedule_journal_path(self):
+        if utils.is_secure_mode():
+            # The agent can only write to its agent-data directory in secure mode.
+            return os.path.join(os.getcwd(), os.path.basename(os.getcwd()) + ".agent-data",
+                                self.schedule_journal_file)
+        return self.schedule_journal_file
+
+    def _setup_schedule(self, preempt_grace_time, initial_state=None, schedule_journal=True,
+                        schedule_snapshot_records=100, schedule_snapshot_interval=300):
         now = utils.get_aware_utc_now()
+        journal_path = self._get_schedule_journal_path()
+        # Changes journaled while journaling was on are replayed either way.
         self._schedule_manager = ScheduleManager(
             preempt_grace_time,
             now=now,
             save_state_callback=self._schedule_save_callback,
-            initial_state_string=initial_state)
+            initial_state_string=initial_state,
+            journal=ScheduleJournal(journal_path),
+            snapshot_records=schedule_snapshot_records,
+            snapshot_interval=schedule_snapshot_interval)
+
+        if schedule_journal:
+            _log.debug("Journaling schedule changes to {}".format(journal_path))
+        else:
+            self._schedule_manager.journal = None
+            if os.path.exists(journal_path):
+                self._schedule_manager.save_state(now)
+                os.remove(journal_path)
 
         self._update_device_state_and_schedule(now)
 
@@ -976,7 +1037,8 @@ class ActuatorAgent(Agent):
         """RPC method
 
         Get multiple points on multiple devices. Makes a single
-        RPC call to the platform driver per device.
+        RPC call to the platform driver per device, the calls for all
+        devices are made concurrently.
 
         :param topics: List of topics or list of [device, point] pairs.
         :param \*\*kwargs: Any driver specific parameters
@@ -1004,12 +1066,15 @@ class ActuatorAgent(Agent):
                 e = ValueError("Invalid topic: {}".format(topic))
                 errors[repr(topic)] = repr(e)
 
-        for device, point_names in devices.items():
-            r, e = self.vip.rpc.call(self.driver_vip_identity,
+        # Make the calls for every device before waiting on any so the driver reads the devices concurrently.
+        pending = [self.vip.rpc.call(self.driver_vip_identity,
                                      'get_multiple_points',
                                      device,
                                      point_names,
-                                     **kwargs).get()
+                                     **kwargs)
+                   for device, point_names in devices.items()]
+        for result in pending:
+            r, e = result.get()
             results.update(r)
             errors.update(e)
 
@@ -1020,7 +1085,8 @@ class ActuatorAgent(Agent):
         """RPC method
 
         Set multiple points on multiple devices. Makes a single
-        RPC call to the platform driver per device.
+        RPC call to the platform driver per device, the calls for all
+        devices are made concurrently.
 
         :param requester_id: Ignored, VIP Identity used internally
         :param topics_values: List of (topic, value) tuples
@@ -1053,13 +1119,14 @@ class ActuatorAgent(Agent):
             if not self._check_lock(device, requester_id):
                 raise LockError("caller ({}) does not lock for device {}".format(requester_id, device))
 
-        for device, point_names_values in devices.items():
-            r = self.vip.rpc.call(self.driver_vip_identity,
-                                  'set_multiple_points',
-                                  device,
-                                  point_names_values,
-                                  **kwargs).get()
-            results.update(r)
+        pending = [self.vip.rpc.call(self.driver_vip_identity,
+                                     'set_multiple_points',
+                                     device,
+                                     point_names_values,
+                                     **kwargs)
+                   for device, point_names_values in devices.items()]
+        for result in pending:
+            results.update(result.get())
 
         return results
     
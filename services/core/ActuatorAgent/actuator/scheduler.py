@@ -38,8 +38,11 @@
 
 
 import bisect
+import heapq
+import itertools
 import logging
-from pickle import dumps, loads
+import os
+from pickle import dump, dumps, load, loads
 from collections import defaultdict, namedtuple
 from copy import deepcopy
 from datetime import timedelta
@@ -59,6 +62,13 @@ DeviceState = namedtuple('DeviceState',
 _log = logging.getLogger(__name__)
 
 
+def round_up_to_second(time_stamp):
+    """Round to the next second to fix timer goofyness in agent timers."""
+    if time_stamp.microsecond:
+        time_stamp = time_stamp.replace(microsecond=0) + timedelta(seconds=1)
+    return time_stamp
+
+
 class TimeSlice(object):
     def __init__(self, start=None, end=None):
         if end is None:
@@ -255,7 +265,7 @@ class Schedule(object):
         """Should be called before working with a schedule.
         Updates the state to the schedule to eliminate stuff in the past."""
         now_slice = bisect.bisect_left(self.time_slots, TimeSlice(now))
-        _log.debug("now_slice in make_current {}".format(now_slice))
+        _log.debug("now_slice in make_current %s", now_slice)
         if now_slice > 0:
             del self.time_slots[:now_slice]
 
@@ -271,15 +281,10 @@ class Schedule(object):
         self.make_current(now)
         if not self.time_slots:
             return None
-        _log.debug("in schedule get_next_event_time timeslots {} now {}"
-                   .format(self.time_slots[0], now))
+        _log.debug("in schedule get_next_event_time timeslots %s now %s", self.time_slots[0], now)
         next_time = self.time_slots[0].end if self.time_slots[
             0].contains_include_start(now) else self.time_slots[0].start
-        # Round to the next second to fix timer goofyness in agent timers.
-        if next_time.microsecond:
-            next_time = next_time.replace(microsecond=0) + timedelta(seconds=1)
-
-        return next_time
+        return round_up_to_second(next_time)
 
     def get_current_slot(self, now):
         self.make_current(now)
@@ -323,13 +328,113 @@ class Schedule(object):
         pass
 
 
+class SlotIndex(object):
+    """The time slots of one device across all tasks, sorted by start.
+
+    Slots of different tasks may overlap while a preempted task is in its grace period, so a lookup scans back from
+    the end of the requested slot by the longest slot ever added."""
+    def __init__(self):
+        self.slots = []
+        self.longest = None
+
+    def add(self, time_slot, task_id):
+        bisect.insort(self.slots, (time_slot.start, time_slot.end, task_id))
+        length = time_slot.end - time_slot.start
+        if self.longest is None or length > self.longest:
+            self.longest = length
+
+    def remove(self, time_slot, task_id):
+        entry = (time_slot.start, time_slot.end, task_id)
+        i = bisect.bisect_left(self.slots, entry)
+        if i < len(self.slots) and self.slots[i] == entry:
+            del self.slots[i]
+
+    def get_overlapping_task_ids(self, time_slot):
+        """Returns the ids of tasks with a slot overlapping time_slot."""
+        if not self.slots:
+            return set()
+        first = bisect.bisect_left(self.slots, (time_slot.start - self.longest,))
+        last = bisect.bisect_left(self.slots, (time_slot.end,))
+        return {task_id for start, end, task_id in itertools.islice(self.slots, first, last)
+                if end > time_slot.start and start < time_slot.end}
+
+    def __len__(self):
+        return len(self.slots)
+
+
+class ScheduleJournal(object):
+    """Append only file of the changes made to a ScheduleManager since its last saved state.
+
+    Each record is pickled on its own, so a record torn by a crash while it was appended is dropped when the journal
+    is read back."""
+    def __init__(self, path):
+        self.path = path
+
+    def append(self, record):
+        with open(self.path, 'ab') as f:
+            dump(record, f)
+
+    def read(self):
+        records = []
+        if not os.path.exists(self.path):
+            return records
+
+        with open(self.path, 'rb') as f:
+            end = 0
+            while True:
+                try:
+                    records.append(load(f))
+                    end = f.tell()
+                except EOFError:
+                    break
+                except Exception:
+                    _log.warning('Dropping torn record at the end of the scheduler journal.')
+                    break
+        if end != os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(end)
+        return records
+
+    def truncate(self, sequence):
+        """Drops the records up to and including sequence."""
+        records = [record for record in self.read() if record[0] > sequence]
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            for record in records:
+                dump(record, f)
+        os.replace(temp_path, self.path)
+
+
 class ScheduleManager(object):
-    def __init__(self, grace_time, now=None, save_state_callback=None, initial_state_string=None):
+    """Keeps the tasks of the actuator and the devices they reserve.
+
+    Besides the tasks, the manager indexes the slots of each device so a request is only checked against the tasks
+    it overlaps, and keeps tasks that have not started in a heap ordered by their start so cleaning up only visits
+    tasks that started. Neither is saved with the state, both are rebuilt when the state is loaded.
+
+    Without a journal the full state is saved after every change. With one, each change is appended to the journal
+    and the full state is only saved once snapshot_records changes were journaled and snapshot_interval seconds
+    passed since the last save. Loading replays the journaled changes the saved state does not include."""
+    def __init__(self, grace_time, now=None, save_state_callback=None, initial_state_string=None,
+                 journal=None, snapshot_records=100, snapshot_interval=300):
         self.tasks = {}
         self.running_tasks = set()
         self.preempted_tasks = set()
+        self._device_slots = defaultdict(SlotIndex)
+        self._task_slots = {}
+        self._pending_tasks = []
+        self._started_tasks = set()
+        self._pending_counter = itertools.count()
         self.set_grace_period(grace_time)
         self.save_state_callback = save_state_callback
+        self.journal = journal
+        self.snapshot_records = snapshot_records
+        self.snapshot_interval = timedelta(seconds=snapshot_interval)
+        self._sequence = 0
+        self._saved_sequence = 0
+        self._journaled_records = 0
+        self._last_save = None
+        self._replaying = False
         if now is None:
             now = utils.get_aware_utc_now()
         self.load_state(now, initial_state_string)
@@ -338,15 +443,51 @@ class ScheduleManager(object):
         self.grace_time = timedelta(seconds=seconds)
 
     def load_state(self, now, initial_state_string):
-        if initial_state_string is None:
+        if initial_state_string is not None:
+            try:
+                state = loads(initial_state_string)
+                # States saved before the journal are only the tasks.
+                sequence, tasks = state if isinstance(state, tuple) else (0, state)
+                for task_id, task in tasks.items():
+                    self._add_task(task_id, task)
+                self._sequence = self._saved_sequence = sequence
+                self._cleanup(now)
+            except Exception:
+                self._clear_tasks()
+                _log.error ('Scheduler state file corrupted!')
+
+        if self.journal is not None:
+            self._replay_journal(now)
+
+    def _replay_journal(self, now):
+        try:
+            records = self.journal.read()
+        except Exception:
+            _log.error('Failed to read scheduler journal!')
             return
 
+        self._replaying = True
         try:
-            self.tasks = loads(initial_state_string)
-            self._cleanup(now)
+            for record in records:
+                sequence, action = record[:2]
+                if sequence <= self._sequence:
+                    continue
+                if action == 'request':
+                    agent_id, task_id, requests, priority, grace_seconds, when = record[2:]
+                    grace_time = self.grace_time
+                    self.set_grace_period(grace_seconds)
+                    self.request_slots(agent_id, task_id, requests, priority, when)
+                    self.grace_time = grace_time
+                elif action == 'cancel':
+                    agent_id, task_id, when = record[2:]
+                    self.cancel_task(agent_id, task_id, when)
+                self._sequence = sequence
+                self._journaled_records += 1
         except Exception:
-            self.tasks = {}
-            _log.error ('Scheduler state file corrupted!')
+            _log.error('Scheduler journal corrupted, stopped replaying at record {}!'.format(self._sequence + 1))
+        finally:
+            self._replaying = False
+        self._cleanup(now)
 
     def save_state(self, now):
         if self.save_state_callback is None:
@@ -354,9 +495,43 @@ class ScheduleManager(object):
 
         try:
             self._cleanup(now)
-            self.save_state_callback(dumps(self.tasks))
+            self.save_state_callback(dumps((self._sequence, self.tasks)))
         except Exception:
             _log.error('Failed to save scheduler state!')
+            return
+
+        self._last_save = now
+        self._journaled_records = 0
+        if self.journal is not None:
+            # The state saved before this one is certainly stored by now, keep the records after it until the next
+            # save in case this one is not.
+            try:
+                self.journal.truncate(self._saved_sequence)
+            except Exception:
+                _log.error('Failed to compact scheduler journal!')
+        self._saved_sequence = self._sequence
+
+    def _record_change(self, now, *record):
+        """Journals a change, saving the full state when the journal is due to be compacted."""
+        if self._replaying:
+            return
+
+        self._sequence += 1
+        if self.journal is None or self.save_state_callback is None:
+            self.save_state(now)
+            return
+
+        try:
+            self.journal.append((self._sequence,) + record)
+        except Exception:
+            _log.error('Failed to journal scheduler change, saving full state instead!')
+            self.save_state(now)
+            return
+
+        self._journaled_records += 1
+        if (self._journaled_records >= self.snapshot_records and
+                (self._last_save is None or now - self._last_save >= self.snapshot_interval)):
+            self.save_state(now)
 
     def request_slots(self, agent_id, id_, requests, priority, now=None):
         if now is None:
@@ -401,7 +576,8 @@ class ScheduleManager(object):
         conflicts = defaultdict(dict)
         preempted_tasks = set()
 
-        for task_id, task in self.tasks.items():
+        for task_id in self._get_overlapping_task_ids(new_task):
+            task = self.tasks[task_id]
             conflict_list = new_task.get_conflicts(task)
             agent_id = task.agent_id
             if conflict_list:
@@ -417,13 +593,15 @@ class ScheduleManager(object):
             # By this point we know that any remaining conflicts can be
             # preempted
         # and the request will succeed.
-        self.tasks[id_] = new_task
+        self._add_task(id_, new_task)
 
         for _, task_id in preempted_tasks:
             task = self.tasks[task_id]
             task.preempt(self.grace_time, now)
+            self._started_tasks.add(task_id)
 
-        self.save_state(now)
+        self._record_change(now, 'request', new_task.agent_id, id_, requests, priority,
+                            self.grace_time.total_seconds(), now)
 
         return RequestResult(True, preempted_tasks, '')
 
@@ -436,9 +614,9 @@ class ScheduleManager(object):
         if task.agent_id != agent_id:
             return RequestResult(False, {}, 'AGENT_ID_TASK_ID_MISMATCH')
 
-        del self.tasks[task_id]
+        self._remove_task(task_id)
 
-        self.save_state(now)
+        self._record_change(now, 'cancel', agent_id, task_id, now)
 
         return RequestResult(True, {}, '')
 
@@ -469,14 +647,72 @@ class ScheduleManager(object):
         return running_results
 
     def get_next_event_time(self, now):
-        task_times = (x.get_next_event_time(now) for x in self.tasks.values())
+        self._start_due_tasks(now)
+        task_times = (self.tasks[x].get_next_event_time(now) for x in self._started_tasks)
         events = [x for x in task_times if x is not None]
 
+        # The first event of a task that has not started is the start of its first slot.
+        while self._pending_tasks:
+            start, _, task_id, task = self._pending_tasks[0]
+            if self.tasks.get(task_id) is task and task_id not in self._started_tasks:
+                events.append(round_up_to_second(start))
+                break
+            heapq.heappop(self._pending_tasks)
+
         if events:
             return min(events)
 
         return None
 
+    def _start_due_tasks(self, now):
+        while self._pending_tasks and self._pending_tasks[0][0] <= now:
+            _, _, task_id, task = heapq.heappop(self._pending_tasks)
+            if self.tasks.get(task_id) is task:
+                self._started_tasks.add(task_id)
+
+    def _add_task(self, task_id, task):
+        self.tasks[task_id] = task
+        slots = []
+        for device, schedule in task.devices.items():
+            for time_slot in schedule.time_slots:
+                self._device_slots[device].add(time_slot, task_id)
+                slots.append((device, time_slot))
+        self._task_slots[task_id] = slots
+
+        if task.state == Task.STATE_PRE_RUN:
+            heapq.heappush(self._pending_tasks, (task.time_slice.start, next(self._pending_counter), task_id, task))
+        else:
+            self._started_tasks.add(task_id)
+
+    def _remove_task(self, task_id):
+        """Remove a task and its slots. The heap of tasks that have not started skips removed tasks."""
+        del self.tasks[task_id]
+        self._started_tasks.discard(task_id)
+        for device, time_slot in self._task_slots.pop(task_id):
+            index = self._device_slots[device]
+            index.remove(time_slot, task_id)
+            if not index:
+                del self._device_slots[device]
+
+    def _clear_tasks(self):
+        self.tasks = {}
+        self._device_slots.clear()
+        self._task_slots.clear()
+        self._pending_tasks = []
+        self._started_tasks.clear()
+
+    def _get_overlapping_task_ids(self, new_task):
+        """Returns the ids of tasks with a slot overlapping a slot of new_task on the same device. Slots are only
+        removed from the index with their task, so the slots of a task may have shrunk since."""
+        task_ids = set()
+        for device, schedule in new_task.devices.items():
+            index = self._device_slots.get(device)
+            if index is None:
+                continue
+            for time_slot in schedule.time_slots:
+                task_ids.update(index.get_overlapping_task_ids(time_slot))
+        return task_ids
+
     def _cleanup(self, now):
         """Cleans up self and contained tasks to reflect the current time.
         Should be called:
@@ -490,11 +726,14 @@ class ScheduleManager(object):
         self.running_tasks = set()
         self.preempted_tasks = set()
 
-        for task_id in list(self.tasks.keys()):
+        # Tasks that have not started are not changed by make_current.
+        self._start_due_tasks(now)
+
+        for task_id in list(self._started_tasks):
             task = self.tasks[task_id]
             task.make_current(now)
             if task.state == Task.STATE_FINISHED:
-                del self.tasks[task_id]
+                self._remove_task(task_id)
 
             elif task.state == Task.STATE_RUNNING:
                 self.running_tasks.add(task_id)
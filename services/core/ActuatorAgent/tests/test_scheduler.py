@@ -37,6 +37,8 @@
 # }}}
 
 import os
+import pickle
+import random
 import sys
 from datetime import datetime, timedelta
 from dateutil.parser import parse
@@ -44,7 +46,8 @@ from dateutil.parser import parse
 test_dir = os.path.dirname(os.path.realpath(__file__))
 sys.path.append(test_dir + '/../actuator')
 
-from scheduler import ScheduleManager, DeviceState, PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_LOW_PREEMPT
+from scheduler import (ScheduleManager, ScheduleJournal, DeviceState, SlotIndex, Task, TimeSlice, PRIORITY_HIGH,
+                       PRIORITY_LOW, PRIORITY_LOW_PREEMPT)
 
 test_dir = os.path.dirname(os.path.realpath(__file__))
 sys.path.append(test_dir + '/../actuator')
@@ -377,3 +380,179 @@ def test_conflict_override_success_running_agent2():
     assert data2 == {('Agent1', 'Task1')}
     assert info_string2 == ''
     assert event_time2 == parse('2013-11-27 12:26:00')
+
+
+def test_slot_index_overlapping_task_ids():
+    index = SlotIndex()
+    start = parse('2013-11-27 12:00:00')
+    for i in range(10):
+        index.add(TimeSlice(start + timedelta(minutes=15 * i), start + timedelta(minutes=15 * (i + 1))), 'Task{}'.format(i))
+    index.add(TimeSlice(start, start + timedelta(hours=2)), 'Long')
+
+    assert index.get_overlapping_task_ids(
+        TimeSlice(start + timedelta(minutes=20), start + timedelta(minutes=40))) == {'Task1', 'Task2', 'Long'}
+    assert index.get_overlapping_task_ids(
+        TimeSlice(start + timedelta(minutes=140), start + timedelta(minutes=160))) == {'Task9'}
+    assert index.get_overlapping_task_ids(TimeSlice(start - timedelta(minutes=15), start)) == set()
+
+    index.remove(TimeSlice(start, start + timedelta(hours=2)), 'Long')
+    assert index.get_overlapping_task_ids(
+        TimeSlice(start + timedelta(minutes=20), start + timedelta(minutes=40))) == {'Task1', 'Task2'}
+
+
+def test_request_slots_should_match_checking_every_task():
+    rng = random.Random(7)
+    sch_man = ScheduleManager(60, now=now)
+    devices = ['campus/building/rtu{}'.format(i) for i in range(5)]
+    start = parse('2013-11-27 12:00:00')
+
+    for i in range(300):
+        requests = []
+        for device in rng.sample(devices, rng.randint(1, 2)):
+            slot_start = start + timedelta(minutes=15 * rng.randint(0, 40))
+            requests.append([device, slot_start, slot_start + timedelta(minutes=15 * rng.randint(1, 3))])
+        request_now = now + timedelta(minutes=rng.randint(0, 5) * i // 10)
+        priority = rng.choice([PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_LOW_PREEMPT])
+
+        sch_man._cleanup(request_now)
+        expected_conflicts = set()
+        probe = Task('Agent', priority, requests)
+        for task_id, task in sch_man.tasks.items():
+            if probe.get_conflicts(task):
+                expected_conflicts.add(task_id)
+        assert sch_man._get_overlapping_task_ids(probe) >= expected_conflicts
+
+        result = sch_man.request_slots('Agent{}'.format(i % 3), 'Task{}'.format(i), requests, priority, request_now)
+        if not result.success:
+            assert result.info_string == 'CONFLICTS_WITH_EXISTING_SCHEDULES'
+            assert {task_id for tasks in result.data.values() for task_id in tasks} <= expected_conflicts
+        elif rng.random() < 0.2:
+            assert sch_man.cancel_task('Agent{}'.format(i % 3), 'Task{}'.format(i), request_now).success
+
+    assert set(sch_man._task_slots) == set(sch_man.tasks)
+
+
+def test_cleanup_should_only_visit_started_tasks():
+    sch_man = ScheduleManager(60, now=now)
+    for i in range(10):
+        slot_start = parse('2013-11-27 12:00:00') + timedelta(hours=i)
+        result = sch_man.request_slots('Agent1', 'Task{}'.format(i),
+                                       [['campus/building/rtu1', slot_start, slot_start + timedelta(minutes=30)]],
+                                       PRIORITY_LOW, now)
+        assert result.success
+
+    assert sch_man._started_tasks == set()
+    assert sch_man.get_next_event_time(now) == parse('2013-11-27 12:00:00')
+
+    later = parse('2013-11-27 13:10:00')
+    assert sch_man.get_schedule_state(later) == {'campus/building/rtu1': DeviceState('Agent1', 'Task1', 1200.0)}
+    assert sch_man._started_tasks == {'Task1'}
+    assert sorted(sch_man.tasks) == ['Task{}'.format(i) for i in range(1, 10)]
+    assert sch_man.get_next_event_time(later) == parse('2013-11-27 13:30:00')
+
+    assert sch_man.cancel_task('Agent1', 'Task1', later).success
+    assert sch_man.get_next_event_time(later) == parse('2013-11-27 14:00:00')
+
+
+def test_load_state_should_rebuild_index():
+    saved = []
+    sch_man = ScheduleManager(60, now=now, save_state_callback=saved.append)
+    result = sch_man.request_slots('Agent1', 'Task1',
+                                   [['campus/building/rtu1', parse('2013-11-27 12:00:00'),
+                                     parse('2013-11-27 13:00:00')]], PRIORITY_LOW, now)
+    assert result.success
+
+    loaded = ScheduleManager(60, now=now, initial_state_string=saved[-1])
+    result = loaded.request_slots('Agent2', 'Task2',
+                                  [['campus/building/rtu1', parse('2013-11-27 12:30:00'),
+                                    parse('2013-11-27 13:30:00')]], PRIORITY_LOW, now)
+    assert not result.success
+    assert result.data == {'Agent1': {'Task1': [['campus/building/rtu1', '2013-11-27 12:00:00',
+                                                 '2013-11-27 13:00:00']]}}
+    assert loaded.get_next_event_time(now) == parse('2013-11-27 12:00:00')
+
+
+def rtu_request(device, start, end):
+    return [['campus/building/' + device, parse(start), parse(end)]]
+
+
+def test_journal_should_replay_changes_after_saved_state(tmp_path):
+    saved = []
+    journal = ScheduleJournal(str(tmp_path / 'journal'))
+    sch_man = ScheduleManager(60, now=now, save_state_callback=saved.append, journal=journal, snapshot_records=100)
+    assert sch_man.request_slots('Agent1', 'Task1', rtu_request('rtu1', '2013-11-27 12:00:00', '2013-11-27 13:00:00'),
+                                 PRIORITY_LOW_PREEMPT, now).success
+    assert sch_man.request_slots('Agent2', 'Task2', rtu_request('rtu1', '2013-11-27 12:30:00', '2013-11-27 13:30:00'),
+                                 PRIORITY_HIGH, now).success
+    assert sch_man.request_slots('Agent3', 'Task3', rtu_request('rtu2', '2013-11-27 12:00:00', '2013-11-27 13:00:00'),
+                                 PRIORITY_LOW, now).success
+    assert sch_man.cancel_task('Agent3', 'Task3', now).success
+
+    assert saved == []
+    assert [record[:2] for record in journal.read()] == [(1, 'request'), (2, 'request'), (3, 'request'),
+                                                          (4, 'cancel')]
+
+    loaded = ScheduleManager(60, now=now, journal=ScheduleJournal(str(tmp_path / 'journal')))
+    assert sorted(loaded.tasks) == ['Task2']
+    assert loaded.get_schedule_state(now) == sch_man.get_schedule_state(now)
+
+
+def test_journal_should_bound_saves_and_keep_records_after_previous_save(tmp_path):
+    saved = []
+    journal = ScheduleJournal(str(tmp_path / 'journal'))
+    sch_man = ScheduleManager(60, now=now, save_state_callback=saved.append, journal=journal,
+                              snapshot_records=3, snapshot_interval=600)
+
+    def request(i, when):
+        start = parse('2013-11-27 12:00:00') + timedelta(hours=i)
+        assert sch_man.request_slots('Agent1', 'Task{}'.format(i), [['campus/building/rtu1', start,
+                                                                     start + timedelta(minutes=30)]],
+                                     PRIORITY_LOW, when).success
+
+    for i in range(3):
+        request(i, now)
+    assert len(saved) == 1
+    assert [record[0] for record in journal.read()] == [1, 2, 3]
+
+    # Not saved again before the interval passed.
+    for i in range(3, 7):
+        request(i, now + timedelta(minutes=5))
+    assert len(saved) == 1
+
+    request(7, now + timedelta(minutes=11))
+    assert len(saved) == 2
+    # Records after the first save are kept in case the second one was not stored.
+    assert [record[0] for record in journal.read()] == [4, 5, 6, 7, 8]
+
+    for state in saved:
+        loaded = ScheduleManager(60, now=now, initial_state_string=state, journal=ScheduleJournal(journal.path))
+        assert sorted(loaded.tasks) == ['Task{}'.format(i) for i in range(8)]
+
+
+def test_journal_should_drop_torn_record(tmp_path):
+    path = str(tmp_path / 'journal')
+    sch_man = ScheduleManager(60, now=now, save_state_callback=lambda state: None, journal=ScheduleJournal(path))
+    assert sch_man.request_slots('Agent1', 'Task1', rtu_request('rtu1', '2013-11-27 12:00:00', '2013-11-27 13:00:00'),
+                                 PRIORITY_LOW, now).success
+    size = os.path.getsize(path)
+    assert sch_man.request_slots('Agent1', 'Task2', rtu_request('rtu2', '2013-11-27 12:00:00', '2013-11-27 13:00:00'),
+                                 PRIORITY_LOW, now).success
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 5)
+
+    journal = ScheduleJournal(path)
+    assert [record[0] for record in journal.read()] == [1]
+    assert os.path.getsize(path) == size
+
+    loaded = ScheduleManager(60, now=now, journal=journal)
+    assert sorted(loaded.tasks) == ['Task1']
+
+
+def test_load_state_should_accept_tasks_saved_before_journal(tmp_path):
+    sch_man = ScheduleManager(60, now=now)
+    assert sch_man.request_slots('Agent1', 'Task1', rtu_request('rtu1', '2013-11-27 12:00:00', '2013-11-27 13:00:00'),
+                                 PRIORITY_LOW, now).success
+
+    loaded = ScheduleManager(60, now=now, initial_state_string=pickle.dumps(sch_man.tasks),
+                             journal=ScheduleJournal(str(tmp_path / 'journal')))
+    assert sorted(loaded.tasks) == ['Task1']
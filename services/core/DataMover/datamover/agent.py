@@ -47,6 +47,7 @@ from volttron.platform.agent.base_historian import BaseHistorian, add_timing_dat
 from volttron.platform.agent.known_identities import PLATFORM_HISTORIAN
 from volttron.platform.keystore import KnownHostsStore
 from volttron.platform.messaging import headers as headers_mod
+from volttron.platform.messaging.envelope import pack_batch, validate_compression
 from volttron.platform.messaging.health import STATUS_BAD, Status
 from volttron.platform.vip.agent.utils import build_agent
 
@@ -77,7 +78,7 @@ class DataMover(BaseHistorian):
     """
 
     def __init__(self, destination_vip, destination_serverkey, destination_historian_identity=PLATFORM_HISTORIAN,
-                 remote_identity=None, **kwargs):
+                 remote_identity=None, batch_size=0, batch_compression='zlib', **kwargs):
         """
         :param destination_vip: vip address of the destination volttron 
         instance
@@ -90,6 +91,10 @@ class DataMover(BaseHistorian):
         :param destination_historian_identity: vip identity of the 
         destination historian. default is 'platform.historian'
         :param destination_instance_name: instance name of destination server
+        :param batch_size: if not 0 records are sent to the destination
+        historian in compressed batch envelopes of up to batch_size records
+        :param batch_compression: compression of the batch envelopes, 'zlib',
+        'lz4' or None
         :param kwargs: additional arguments to be passed along to parent class
         """
         kwargs["process_loop_in_greenlet"] = True
@@ -100,6 +105,8 @@ class DataMover(BaseHistorian):
         self.destination_serverkey = destination_serverkey
         self.destination_historian_identity = destination_historian_identity
         self.remote_identity = remote_identity
+        self.batch_size = int(batch_size)
+        self.batch_compression = validate_compression(batch_compression)
         self._target_platform = None
 
         self.local_message_bus = utils.get_messagebus()
@@ -107,7 +114,9 @@ class DataMover(BaseHistorian):
         config = {"destination_vip":self.destination_vip,
                   "destination_serverkey": self.destination_serverkey,
                   "destination_historian_identity": self.destination_historian_identity,
-                  "remote_identity": self.remote_identity
+                  "remote_identity": self.remote_identity,
+                  "batch_size": self.batch_size,
+                  "batch_compression": self.batch_compression
                   }
 
         self.update_default_config(config)
@@ -123,6 +132,8 @@ class DataMover(BaseHistorian):
         self.destination_historian_identity = str(configuration.get('destination_historian_identity',
                                                                     PLATFORM_HISTORIAN))
         self.remote_identity = configuration.get("remote_identity")
+        self.batch_size = int(configuration.get("batch_size", 0))
+        self.batch_compression = validate_compression(configuration.get("batch_compression", "zlib"))
 
     # Redirect the normal capture functions to capture_data.
     def _capture_device_data(self, peer, sender, bus, topic, headers, message):
@@ -199,6 +210,12 @@ class DataMover(BaseHistorian):
                             'headers': headers,
                             'message': message})
 
+        if self.batch_size > 0:
+            to_send = [pack_batch(to_send[i:i + self.batch_size], self.batch_compression)
+                       for i in range(0, len(to_send), self.batch_size)]
+        else:
+            to_send = [to_send]
+
         with gevent.Timeout(30):
             try:
                 _log.debug("Sending to destination historian.")
@@ -208,12 +225,14 @@ class DataMover(BaseHistorian):
                 # then shovel will be used to setup the connection and forwarding
                 # of data. All we need to do is perform normal RPC and specify
                 # destination instance name
-                if self.rmq_to_rmq_comm:
-                    kwargs = {"external_platform": self.destination_instance_name}
-                    self.vip.rpc.call(self.destination_historian_identity, 'insert', to_send, **kwargs).get(timeout=10)
-                else:
-                    self._target_platform.vip.rpc.call(self.destination_historian_identity, 'insert', to_send).get(
-                        timeout=10)
+                for records in to_send:
+                    if self.rmq_to_rmq_comm:
+                        kwargs = {"external_platform": self.destination_instance_name}
+                        self.vip.rpc.call(self.destination_historian_identity, 'insert', records,
+                                          **kwargs).get(timeout=10)
+                    else:
+                        self._target_platform.vip.rpc.call(self.destination_historian_identity, 'insert',
+                                                           records).get(timeout=10)
             except gevent.Timeout:
                 self._last_timeout = self.timestamp()
                 if self._target_platform:
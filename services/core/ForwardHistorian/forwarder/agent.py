@@ -41,6 +41,7 @@ import logging
 import sys
 import time
 import traceback
+from collections import deque
 from urllib.parse import urlparse
 
 import gevent
@@ -49,7 +50,8 @@ from volttron.platform.vip.agent import Agent, compat, Unreachable
 from volttron.platform.agent.base_historian import BaseHistorian, add_timing_data_to_header
 from volttron.platform.agent import utils
 from volttron.platform.keystore import KnownHostsStore
-from volttron.platform.messaging import headers as headers_mod
+from volttron.platform.messaging import headers as headers_mod, topics
+from volttron.platform.messaging.envelope import pack_batch, validate_compression
 from volttron.platform.messaging.health import (STATUS_BAD,
                                                 STATUS_GOOD, Status)
 from volttron.utils.docs import doc_inherit
@@ -109,6 +111,10 @@ def historian(config_path, **kwargs):
                             **kwargs)
 
 
+class _ForwardingStopped(Exception):
+    """Raised when forwarding has to stop for the current batch."""
+
+
 class ForwardHistorian(BaseHistorian):
     """
     This historian forwards data to another instance as if it was published
@@ -121,6 +127,10 @@ class ForwardHistorian(BaseHistorian):
                  required_target_agents=[],
                  cache_only=False,
                  destination_address=None,
+                 publish_window=1,
+                 required_target_agents_check_interval=60,
+                 batch_size=0,
+                 batch_compression='zlib',
                  **kwargs):
         kwargs["process_loop_in_greenlet"] = True
         super(ForwardHistorian, self).__init__(**kwargs)
@@ -137,6 +147,12 @@ class ForwardHistorian(BaseHistorian):
         self.required_target_agents = required_target_agents
         self.cache_only = cache_only
         self.destination_address = destination_address
+        self.publish_window = self._validate_publish_window(publish_window)
+        self.required_target_agents_check_interval = float(required_target_agents_check_interval)
+        # Time of the last successful check of the required target agents.
+        self._required_agents_checked = None
+        self.batch_size = int(batch_size)
+        self.batch_compression = validate_compression(batch_compression)
         config = {
             "custom_topic_list": custom_topic_list,
             "topic_replace_list": self.topic_replace_list,
@@ -144,7 +160,11 @@ class ForwardHistorian(BaseHistorian):
             "destination_vip": self.destination_vip,
             "destination_serverkey": self.destination_serverkey,
             "cache_only": self.cache_only,
-            "destination_address": self.destination_address
+            "destination_address": self.destination_address,
+            "publish_window": self.publish_window,
+            "required_target_agents_check_interval": self.required_target_agents_check_interval,
+            "batch_size": self.batch_size,
+            "batch_compression": self.batch_compression
         }
 
         self.update_default_config(config)
@@ -162,6 +182,12 @@ class ForwardHistorian(BaseHistorian):
         self.topic_replace_list = configuration.get('topic_replace_list', [])
         self.cache_only = configuration.get('cache_only', False)
         self.destination_address = configuration.get('destination_address', None)
+        self.publish_window = self._validate_publish_window(configuration.get('publish_window', 1))
+        self.required_target_agents_check_interval = float(
+            configuration.get('required_target_agents_check_interval', 60))
+        self._required_agents_checked = None
+        self.batch_size = int(configuration.get('batch_size', 0))
+        self.batch_compression = validate_compression(configuration.get('batch_compression', 'zlib'))
         # Reset the replace map.
         self._topic_replace_map = {}
 
@@ -190,6 +216,13 @@ class ForwardHistorian(BaseHistorian):
             except (gevent.Timeout, Exception) as e:
                 _log.error("Failed to unsubscribe from {}: {}".format(prefix, repr(e)))
 
+    @staticmethod
+    def _validate_publish_window(publish_window):
+        publish_window = int(publish_window)
+        if publish_window < 1:
+            raise ValueError("publish_window should be at least 1")
+        return publish_window
+
     # Stop the BaseHistorian from setting the health status
     def _update_status(self, *args, **kwargs):
         pass
@@ -338,95 +371,83 @@ class ForwardHistorian(BaseHistorian):
                 self.destination_vip, self.destination_address))
             return
 
-        for vip_id in self.required_target_agents:
-            try:
-                self._target_platform.vip.ping(vip_id).get()
-            except Unreachable:
-                skip = "Skipping publish: Target platform not running " \
-                       "required agent {}".format(vip_id)
-                _log.warning(skip)
-                self.vip.health.set_status(
-                    STATUS_BAD, skip)
-                return
-            except Exception as e:
-                err = "Unhandled error publishing to target platform."
-                _log.error(err)
-                _log.error(traceback.format_exc())
-                self.vip.health.set_status(
-                    STATUS_BAD, err)
-                return
+        if not self._check_required_target_agents():
+            return
 
-        for x in to_publish_list:
-            topic = x['topic']
-            value = x['value']
-            # payload = jsonapi.loads(value)
-            payload = value
-            headers = payload['headers']
-            headers['X-Forwarded'] = True
-            if 'X-Forwarded-From' in headers:
-                if not isinstance(headers['X-Forwarded-From'], list):
-                    headers['X-Forwarded-From'] = [headers['X-Forwarded-From']]
-                headers['X-Forwarded-From'].append(self.instance_name)
-            else:
-                headers['X-Forwarded-From'] = self.instance_name
+        # Publishes sent to the target platform that are not confirmed yet.
+        pending = deque()
+        batch = []
+        last = len(to_publish_list) - 1
+        try:
+            for i, x in enumerate(to_publish_list):
+                topic = x['topic']
+                value = x['value']
+                # payload = jsonapi.loads(value)
+                payload = value
+                headers = payload['headers']
+                headers['X-Forwarded'] = True
+                if 'X-Forwarded-From' in headers:
+                    if not isinstance(headers['X-Forwarded-From'], list):
+                        headers['X-Forwarded-From'] = [headers['X-Forwarded-From']]
+                    headers['X-Forwarded-From'].append(self.instance_name)
+                else:
+                    headers['X-Forwarded-From'] = self.instance_name
 
-            try:
-                del headers['Origin']
-            except KeyError:
-                pass
-            try:
-                del headers['Destination']
-            except KeyError:
-                pass
-
-            if self.gather_timing_data:
-                add_timing_data_to_header(headers,
-                                          self.core.agent_uuid or self.core.identity,
-                                          "forwarded")
-
-            if timeout_occurred:
-                _log.error(
-                    'A timeout has occurred so breaking out of publishing')
-                break
-            with gevent.Timeout(30):
                 try:
-                    self._target_platform.vip.pubsub.publish(
+                    del headers['Origin']
+                except KeyError:
+                    pass
+                try:
+                    del headers['Destination']
+                except KeyError:
+                    pass
+
+                if self.gather_timing_data:
+                    add_timing_data_to_header(headers,
+                                              self.core.agent_uuid or self.core.identity,
+                                              "forwarded")
+
+                if self.batch_size > 0:
+                    batch.append(x)
+                    if len(batch) < self.batch_size and i < last:
+                        continue
+                    records, batch = batch, []
+                    topic = topics.FORWARDED_BATCH
+                    headers = {headers_mod.DATE: utils.format_timestamp(utils.get_aware_utc_now()),
+                               'X-Forwarded': True,
+                               'X-Forwarded-From': self.instance_name}
+                    message = pack_batch([{'topic': r['topic'],
+                                           'headers': r['value']['headers'],
+                                           'message': r['value']['message']} for r in records],
+                                         self.batch_compression)
+                else:
+                    records = [x]
+                    message = payload['message']
+
+                while len(pending) >= self.publish_window and not timeout_occurred:
+                    timeout_occurred = self._confirm_forward(pending.popleft(), handled_records)
+
+                if timeout_occurred:
+                    _log.error(
+                        'A timeout has occurred so breaking out of publishing')
+                    break
+                try:
+                    result = self._target_platform.vip.pubsub.publish(
                         peer='pubsub',
                         topic=topic,
                         headers=headers,
-                        message=payload['message']).get()
-                except gevent.Timeout:
-                    _log.debug("Timeout occurred email should send!")
-                    timeout_occurred = True
-                    self._last_timeout = self.timestamp()
-                    self._num_failures += 1
-                    # Stop the current platform from attempting to
-                    # connect
-                    self.historian_teardown()
-                    self.vip.health.set_status(
-                        STATUS_BAD, "Timeout occured")
-                except Unreachable:
-                    _log.error("Target not reachable. Wait till it's ready!")
-                except ZMQError as exc:
-                    if exc.errno == ENOTSOCK:
-                        # Stop the current platform from attempting to
-                        # connect
-                        _log.error("Target disconnected. Stopping target platform agent")
-                        self.historian_teardown()
-                        self.vip.health.set_status(
-                            STATUS_BAD, "Target platform disconnected")
+                        message=message)
                 except Exception as e:
-                    err = "Unhandled error publishing to target platfom."
-                    _log.error(err)
-                    _log.error(traceback.format_exc())
-                    self.vip.health.set_status(
-                        STATUS_BAD, err)
-                    # Before returning lets mark any that weren't errors
-                    # as sent.
-                    self.report_handled(handled_records)
-                    return
-                else:
-                    handled_records.append(x)
+                    result = e
+                pending.append((records, result))
+
+            while pending and not timeout_occurred:
+                timeout_occurred = self._confirm_forward(pending.popleft(), handled_records)
+        except _ForwardingStopped:
+            # Before returning lets mark any that weren't errors
+            # as sent.
+            self.report_handled(handled_records)
+            return
 
         _log.debug("handled: {} number of items".format(
             len(to_publish_list)))
@@ -442,6 +463,88 @@ class ForwardHistorian(BaseHistorian):
                 STATUS_GOOD,"published {} items".format(
                     len(to_publish_list)))
 
+    def _check_required_target_agents(self):
+        """
+        Ping the required target agents, at most once every required_target_agents_check_interval seconds
+        while they are all reachable.
+
+        :return: True if publishing can go ahead
+        """
+        if not self.required_target_agents:
+            return True
+        now = self.timestamp()
+        if self._required_agents_checked is not None and \
+                now - self._required_agents_checked < self.required_target_agents_check_interval:
+            return True
+
+        self._required_agents_checked = None
+        for vip_id in self.required_target_agents:
+            try:
+                self._target_platform.vip.ping(vip_id).get()
+            except Unreachable:
+                skip = "Skipping publish: Target platform not running " \
+                       "required agent {}".format(vip_id)
+                _log.warning(skip)
+                self.vip.health.set_status(
+                    STATUS_BAD, skip)
+                return False
+            except Exception as e:
+                err = "Unhandled error publishing to target platform."
+                _log.error(err)
+                _log.error(traceback.format_exc())
+                self.vip.health.set_status(
+                    STATUS_BAD, err)
+                return False
+        self._required_agents_checked = now
+        return True
+
+    def _confirm_forward(self, forward, handled_records):
+        """
+        Wait for a publish sent to the target platform and add its records to handled_records once confirmed.
+
+        :param forward: the records and the result of their publish, or the exception raised sending it.
+        :return: True if a timeout occurred and publishing should stop.
+        :raises _ForwardingStopped: if the target disconnected or an unhandled error occurred.
+        """
+        records, result = forward
+        try:
+            if isinstance(result, Exception):
+                raise result
+            with gevent.Timeout(30):
+                result.get()
+        except gevent.Timeout:
+            _log.debug("Timeout occurred email should send!")
+            self._last_timeout = self.timestamp()
+            self._num_failures += 1
+            # Stop the current platform from attempting to
+            # connect
+            self.historian_teardown()
+            self.vip.health.set_status(
+                STATUS_BAD, "Timeout occured")
+            return True
+        except Unreachable:
+            _log.error("Target not reachable. Wait till it's ready!")
+            self._required_agents_checked = None
+        except ZMQError as exc:
+            if exc.errno == ENOTSOCK:
+                # Stop the current platform from attempting to
+                # connect
+                _log.error("Target disconnected. Stopping target platform agent")
+                self.historian_teardown()
+                self.vip.health.set_status(
+                    STATUS_BAD, "Target platform disconnected")
+                raise _ForwardingStopped()
+        except Exception as e:
+            err = "Unhandled error publishing to target platfom."
+            _log.error(err)
+            _log.error(traceback.format_exc())
+            self.vip.health.set_status(
+                STATUS_BAD, err)
+            raise _ForwardingStopped()
+        else:
+            handled_records.extend(records)
+        return False
+
     @doc_inherit
     def historian_setup(self):
         _log.debug("Setting up to forward to {}".format(self.destination_vip))
@@ -473,6 +576,7 @@ class ForwardHistorian(BaseHistorian):
     @doc_inherit
     def historian_teardown(self):
         # Kill the forwarding agent if it is currently running.
+        self._required_agents_checked = None
         if self._target_platform is not None:
             self._target_platform.core.stop()
             self._target_platform = None
@@ -0,0 +1,142 @@
+from unittest import mock
+
+import gevent
+import pytest
+
+from forwarder.agent import ForwardHistorian
+from volttron.platform.agent.base_historian import BaseHistorianAgent
+from volttron.platform.messaging.envelope import unpack_batch
+from volttron.platform.messaging.health import STATUS_GOOD, Status
+from volttron.platform.vip.agent import Agent, Unreachable
+from volttrontesting.utils.utils import AgentMock
+
+
+class FakePubSub(object):
+    """Target platform pubsub counting the publishes that have not been waited on"""
+
+    def __init__(self, errors=None):
+        self.errors = errors or {}
+        self.topics = []
+        self.messages = []
+        self.pending = 0
+        self.max_pending = 0
+
+    def publish(self, peer, topic, headers=None, message=None):
+        self.topics.append(topic)
+        self.messages.append(message)
+        self.pending += 1
+        self.max_pending = max(self.max_pending, self.pending)
+        return FakeResult(self, topic)
+
+
+class FakeResult(object):
+    def __init__(self, pubsub, topic):
+        self.pubsub = pubsub
+        self.topic = topic
+
+    def get(self):
+        self.pubsub.pending -= 1
+        if self.topic in self.pubsub.errors:
+            raise self.pubsub.errors[self.topic]
+
+
+def records(count):
+    return [{'_id': i, 'topic': 'devices/Building/Device{}/all'.format(i), 'source': 'forwarded',
+             'value': {'headers': {'Date': '2020-01-01T00:00:00+00:00'}, 'message': i}} for i in range(count)]
+
+
+@pytest.fixture
+def forwarder():
+    def create(pubsub, **kwargs):
+        agent = ForwardHistorian(None, None, **kwargs)
+        agent.core.address = "tcp://127.0.0.1:22916"
+        agent.vip.health = mock.Mock()
+        agent.vip.health.get_status_json.return_value = Status.build(STATUS_GOOD).as_json()
+        agent._target_platform = mock.Mock()
+        agent._target_platform.vip.pubsub = pubsub
+        return agent
+
+    # Other test modules replace the Agent base of BaseHistorianAgent, always use a mocked one so the tests don't
+    # depend on the order they run in.
+    bases = BaseHistorianAgent.__bases__
+    BaseHistorianAgent.__bases__ = (AgentMock.imitate(Agent, Agent()),)
+    try:
+        yield create
+    finally:
+        BaseHistorianAgent.__bases__ = bases
+
+
+@pytest.mark.parametrize("publish_window", [1, 3, 10])
+def test_publish_to_historian_should_keep_window_of_publishes(forwarder, publish_window):
+    pubsub = FakePubSub()
+    agent = forwarder(pubsub, publish_window=publish_window)
+
+    agent.publish_to_historian(records(7))
+
+    assert pubsub.topics == [r['topic'] for r in records(7)]
+    assert pubsub.max_pending == min(publish_window, 7)
+    assert agent._successful_published == set(range(7))
+
+
+def test_publish_to_historian_should_only_report_confirmed_records(forwarder):
+    to_publish = records(5)
+    pubsub = FakePubSub(errors={to_publish[1]['topic']: Unreachable(113, "unreachable", "target", "pubsub")})
+    agent = forwarder(pubsub, publish_window=3)
+
+    agent.publish_to_historian(to_publish)
+
+    assert agent._successful_published == {0, 2, 3, 4}
+
+
+def test_publish_to_historian_should_stop_on_timeout(forwarder):
+    to_publish = records(10)
+    pubsub = FakePubSub(errors={to_publish[2]['topic']: gevent.Timeout()})
+    agent = forwarder(pubsub, publish_window=3)
+    target_platform = agent._target_platform
+
+    agent.publish_to_historian(to_publish)
+
+    assert agent._successful_published == {0, 1}
+    assert len(pubsub.topics) == 5
+    assert agent._target_platform is None
+    target_platform.core.stop.assert_called_once()
+    agent.vip.health.send_alert.assert_called_once()
+
+
+def test_publish_to_historian_should_cache_required_agents_check(forwarder):
+    agent = forwarder(FakePubSub(), required_target_agents=["platform.historian"])
+    ping = agent._target_platform.vip.ping
+
+    agent.publish_to_historian(records(2))
+    agent.publish_to_historian(records(2))
+    assert ping.call_count == 1
+
+    agent.required_target_agents_check_interval = 0
+    agent.publish_to_historian(records(2))
+    assert ping.call_count == 2
+
+
+def test_publish_to_historian_should_skip_when_required_agent_unreachable(forwarder):
+    pubsub = FakePubSub()
+    agent = forwarder(pubsub, required_target_agents=["platform.historian"])
+    unreachable = Unreachable(113, "unreachable", "platform.historian", "ping")
+    agent._target_platform.vip.ping.return_value.get.side_effect = unreachable
+
+    agent.publish_to_historian(records(2))
+    agent.publish_to_historian(records(2))
+
+    assert pubsub.topics == []
+    assert agent._target_platform.vip.ping.call_count == 2
+
+
+def test_publish_to_historian_should_send_batch_envelopes(forwarder):
+    pubsub = FakePubSub()
+    agent = forwarder(pubsub, batch_size=4, publish_window=2)
+
+    agent.publish_to_historian(records(10))
+
+    assert pubsub.topics == ["forwarded/batch"] * 3
+    unpacked = [r for envelope in pubsub.messages for r in unpack_batch(envelope)]
+    assert [(r['topic'], r['message']) for r in unpacked] == [(r['topic'], r['value']['message']) for r in records(10)]
+    assert all(r['headers']['X-Forwarded'] for r in unpacked)
+    assert agent._successful_published == set(range(10))
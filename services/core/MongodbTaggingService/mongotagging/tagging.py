@@ -375,6 +375,8 @@ class MongodbTaggingService(BaseTaggingService):
         result['info'] = dict()
         result['error'] = dict()
         execute = False
+        matching_prefixes = self.get_matching_topic_prefixes_by_pattern(
+            list(tags))
         for topic_pattern, topic_tags in tags.items():
             for tag_name, tag_value in topic_tags.items():
                 if tag_name not in self.valid_tags:
@@ -390,7 +392,7 @@ class MongodbTaggingService(BaseTaggingService):
                                  "topic prefix servers as unique identifier for"
                                  "an entity. id value sent({}) will not be "
                                  "stored".format(tag_value))
-            prefixes = self.get_matching_topic_prefixes(topic_pattern)
+            prefixes = matching_prefixes[topic_pattern]
             if not prefixes:
                 result['error'][topic_pattern] = "No matching topic found"
                 continue
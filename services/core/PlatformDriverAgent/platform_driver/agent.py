@@ -38,6 +38,7 @@
 
 import logging
 import sys
+import time
 import gevent
 from collections import defaultdict
 from volttron.platform.vip.agent import Agent, RPC
@@ -51,7 +52,8 @@ import bisect
 import fnmatch
 from volttron.platform import jsonapi
 from .interfaces import DriverInterfaceError
-from .driver_locks import configure_socket_lock, configure_publish_lock
+from .driver_locks import configure_socket_lock, configure_publish_lock, configure_scrape_locks
+from .scrape_schedule import ScrapeDevice, plan_scrape_offsets
 
 utils.setup_logging()
 _log = logging.getLogger(__name__)
@@ -113,9 +115,14 @@ def platform_driver_agent(config_path, **kwargs):
     publish_breadth_first_all = bool(get_config("publish_breadth_first_all", False))
     publish_depth_first = bool(get_config("publish_depth_first", False))
     publish_breadth_first = bool(get_config("publish_breadth_first", False))
+    publish_window = get_config("publish_window", 0)
 
     group_offset_interval = get_config("group_offset_interval", 0.0)
 
+    max_concurrent_scrapes_per_interface = get_config("max_concurrent_scrapes_per_interface", {})
+    max_concurrent_scrapes_per_endpoint = get_config("max_concurrent_scrapes_per_endpoint", 0)
+    scrape_rebalance_interval = get_config("scrape_rebalance_interval", 0.0)
+
     return PlatformDriverAgent(driver_config_list, scalability_test,
                              scalability_test_iterations,
                              driver_scrape_interval,
@@ -127,6 +134,10 @@ def platform_driver_agent(config_path, **kwargs):
                              publish_breadth_first_all,
                              publish_depth_first,
                              publish_breadth_first,
+                             publish_window,
+                             max_concurrent_scrapes_per_interface,
+                             max_concurrent_scrapes_per_endpoint,
+                             scrape_rebalance_interval,
                              heartbeat_autostart=True, **kwargs)
 
 
@@ -142,6 +153,10 @@ class PlatformDriverAgent(Agent):
                  publish_breadth_first_all=False,
                  publish_depth_first=False,
                  publish_breadth_first=False,
+                 publish_window=0,
+                 max_concurrent_scrapes_per_interface=None,
+                 max_concurrent_scrapes_per_endpoint=0,
+                 scrape_rebalance_interval=0.0,
                  **kwargs):
         super(PlatformDriverAgent, self).__init__(**kwargs)
         self.instances = {}
@@ -168,6 +183,10 @@ class PlatformDriverAgent(Agent):
         self.publish_breadth_first_all = bool(publish_breadth_first_all)
         self.publish_depth_first = bool(publish_depth_first)
         self.publish_breadth_first = bool(publish_breadth_first)
+        self.publish_window = self._validate_publish_window(publish_window)
+        self._configure_scrape_limits(max_concurrent_scrapes_per_interface, max_concurrent_scrapes_per_endpoint,
+                                      scrape_rebalance_interval)
+        self._next_scrape_rebalance = None
         self._override_devices = set()
         self._override_patterns = None
         self._override_interval_events = {}
@@ -187,7 +206,11 @@ class PlatformDriverAgent(Agent):
                                "publish_depth_first_all": self.publish_depth_first_all,
                                "publish_breadth_first_all": self.publish_breadth_first_all,
                                "publish_depth_first": self.publish_depth_first,
-                               "publish_breadth_first": self.publish_breadth_first}
+                               "publish_breadth_first": self.publish_breadth_first,
+                               "publish_window": self.publish_window,
+                               "max_concurrent_scrapes_per_interface": self.max_concurrent_scrapes_per_interface,
+                               "max_concurrent_scrapes_per_endpoint": self.max_concurrent_scrapes_per_endpoint,
+                               "scrape_rebalance_interval": self.scrape_rebalance_interval}
 
         self.vip.config.set_default("config", self.default_config)
         self.vip.config.subscribe(self.configure_main, actions=["NEW", "UPDATE"], pattern="config")
@@ -307,8 +330,15 @@ class PlatformDriverAgent(Agent):
             _log.info("Running scalability test. Settings may not be changed without restart.")
             return
 
+        rebalancing = self.scrape_rebalance_interval > 0
+        self._configure_scrape_limits(config["max_concurrent_scrapes_per_interface"],
+                                      config["max_concurrent_scrapes_per_endpoint"],
+                                      config["scrape_rebalance_interval"])
+        self._next_scrape_rebalance = time.monotonic() + self.scrape_rebalance_interval
+
         if (self.driver_scrape_interval != driver_scrape_interval or
-                self.group_offset_interval != group_offset_interval):
+                self.group_offset_interval != group_offset_interval or
+                (rebalancing and not self.scrape_rebalance_interval > 0)):
             self.driver_scrape_interval = driver_scrape_interval
             self.group_offset_interval = group_offset_interval
 
@@ -327,13 +357,101 @@ class PlatformDriverAgent(Agent):
         self.publish_breadth_first_all = bool(config["publish_breadth_first_all"])
         self.publish_depth_first = bool(config["publish_depth_first"])
         self.publish_breadth_first = bool(config["publish_breadth_first"])
+        self.publish_window = self._validate_publish_window(config["publish_window"])
 
         # Update the publish settings on running devices.
         for driver in self.instances.values():
             driver.update_publish_types(self.publish_depth_first_all,
                                         self.publish_breadth_first_all,
                                         self.publish_depth_first,
-                                        self.publish_breadth_first)
+                                        self.publish_breadth_first,
+                                        self.publish_window)
+
+    @staticmethod
+    def _validate_publish_window(publish_window):
+        try:
+            publish_window = int(publish_window)
+        except (TypeError, ValueError):
+            _log.warning("Invalid publish_window, setting to default value.")
+            return 0
+        return max(publish_window, 0)
+
+    def _configure_scrape_limits(self, interface_limits, endpoint_limit, rebalance_interval):
+        """Set the concurrent scrape limits of interface types and remote endpoints and how often scrape offsets
+        are recomputed from measured scrape durations. Invalid values disable the setting."""
+        try:
+            self.max_concurrent_scrapes_per_interface = {str(driver_type): int(limit) for driver_type, limit in
+                                                         (interface_limits or {}).items()}
+        except (AttributeError, TypeError, ValueError):
+            _log.warning("Invalid max_concurrent_scrapes_per_interface, setting to default value.")
+            self.max_concurrent_scrapes_per_interface = {}
+
+        try:
+            self.max_concurrent_scrapes_per_endpoint = int(endpoint_limit)
+        except (TypeError, ValueError):
+            _log.warning("Invalid max_concurrent_scrapes_per_endpoint, setting to default value.")
+            self.max_concurrent_scrapes_per_endpoint = 0
+
+        try:
+            self.scrape_rebalance_interval = float(rebalance_interval)
+        except (TypeError, ValueError):
+            _log.warning("Invalid scrape_rebalance_interval, setting to default value.")
+            self.scrape_rebalance_interval = 0.0
+
+        configure_scrape_locks(self.max_concurrent_scrapes_per_interface, self.max_concurrent_scrapes_per_endpoint)
+
+    def _get_scrape_lane(self, driver):
+        """Returns the lane a device is scraped in and its concurrent scrape limit, (None, 0) when the device is not
+        limited. A per interface limit takes precedence as it spans all endpoints of the interface type."""
+        limit = self.max_concurrent_scrapes_per_interface.get(driver.driver_type, 0)
+        if limit > 0:
+            return ("interface", driver.driver_type), limit
+        if driver.scrape_endpoint is not None and self.max_concurrent_scrapes_per_endpoint > 0:
+            return ("endpoint", driver.scrape_endpoint), self.max_concurrent_scrapes_per_endpoint
+        return None, 0
+
+    def scrape_finished(self, device_path):
+        """Called by a driver after each scrape, rebalances the scrape schedule when it is due."""
+        if self.scrape_rebalance_interval <= 0:
+            return
+        now = time.monotonic()
+        if self._next_scrape_rebalance is None or now < self._next_scrape_rebalance:
+            return
+        self._next_scrape_rebalance = now + self.scrape_rebalance_interval
+        self.rebalance_scrape_schedule()
+
+    def rebalance_scrape_schedule(self):
+        """Redistribute the scrape offsets of devices in a limited lane by their measured scrape durations.
+
+        Devices that have not been scraped yet are expected to take driver_scrape_interval. Devices that are not
+        limited keep the offset of their time slot."""
+        devices = []
+        lane_limits = {}
+        intervals = {}
+        for path, driver in self.instances.items():
+            lane, limit = self._get_scrape_lane(driver)
+            if lane is None:
+                continue
+            lane_limits[lane] = limit
+            intervals[lane] = min(intervals.get(lane, driver.interval), driver.interval)
+            duration = driver.scrape_latency.mean
+            if duration is None:
+                duration = self.driver_scrape_interval
+            devices.append(ScrapeDevice(path, lane, driver.group, driver.time_slot, duration))
+
+        offsets, spans = plan_scrape_offsets(devices, lane_limits, self.group_offset_interval)
+
+        for lane, span in spans.items():
+            if span > intervals[lane]:
+                _log.warning("Scrapes of {} {} take {:.2f} seconds, more than the {} second interval. Raise its "
+                             "concurrent scrape limit or the scrape interval of its devices.".format(lane[0], lane[1],
+                                                                                                    span,
+                                                                                                    intervals[lane]))
+
+        for path, offset in offsets.items():
+            driver = self.instances[path]
+            if abs(driver.time_slot_offset - offset) > 0.001:
+                driver.update_scrape_offset(offset)
 
     def derive_device_topic(self, config_name):
         _, topic = config_name.split('/', 1)
@@ -375,7 +493,8 @@ class PlatformDriverAgent(Agent):
                              self.publish_depth_first_all,
                              self.publish_breadth_first_all,
                              self.publish_depth_first,
-                             self.publish_breadth_first)
+                             self.publish_breadth_first,
+                             self.publish_window)
         gevent.spawn(driver.core.run)
         self.instances[topic] = driver
         self.group_counts[group] += 1
@@ -471,6 +590,28 @@ class PlatformDriverAgent(Agent):
     def scrape_all(self, path):
         return self.instances[path].scrape_all()
 
+    @RPC.export
+    def get_scrape_latency(self, path=None):
+        """RPC method
+
+        Return the scrape duration histogram of each device.
+        :param path: device path, all devices if None
+        :type path: str
+        :returns: Dictionary of device path to histogram. A histogram has the count, mean, max and last scrape
+            duration in seconds, the number of scrapes in each bucket keyed by the upper bound of the bucket, the
+            remote endpoint of the device and the offset of its scrapes in the scrape interval.
+        :rtype: dict
+        """
+        paths = [path] if path is not None else self.instances.keys()
+        latency = {}
+        for device_path in paths:
+            driver = self.instances[device_path]
+            histogram = driver.scrape_latency.as_dict()
+            histogram["endpoint"] = driver.scrape_endpoint
+            histogram["time_slot_offset"] = driver.time_slot_offset
+            latency[device_path] = histogram
+        return latency
+
     @RPC.export
     def get_multiple_points(self, path, point_names, **kwargs):
         return self.instances[path].get_multiple_points(point_names, **kwargs)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+#
+# Copyright 2020, Battelle Memorial Institute.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# This material was prepared as an account of work sponsored by an agency of
+# the United States Government. Neither the United States Government nor the
+# United States Department of Energy, nor Battelle, nor any of their
+# employees, nor any jurisdiction or organization that has cooperated in the
+# development of these materials, makes any warranty, express or
+# implied, or assumes any legal liability or responsibility for the accuracy,
+# completeness, or usefulness or any information, apparatus, product,
+# software, or process disclosed, or represents that its use would not infringe
+# privately owned rights. Reference herein to any specific commercial product,
+# process, or service by trade name, trademark, manufacturer, or otherwise
+# does not necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors expressed
+# herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY operated by
+# BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+import numbers
+
+
+class ChangeFilter(object):
+    """Decides which points of a scrape are published when a device reports by exception.
+
+    A point is published when it moved at least its deadband away from the value last published for it or when it has
+    not been published for max_silence seconds (0 never forces a publish). Values that are not numbers are published
+    whenever they are not equal to the last published value. Every snapshot_interval seconds all points are published.
+
+    The "all" message of the device always carries every point. It is published with the snapshots and, if
+    all_publish_interval is greater than 0, every all_publish_interval seconds between them.
+    """
+
+    def __init__(self, deadband=0.0, point_deadbands=None, max_silence=900.0, snapshot_interval=3600.0,
+                 all_publish_interval=0.0):
+        self.deadband = deadband
+        self.point_deadbands = dict(point_deadbands or {})
+        self.max_silence = max_silence
+        self.snapshot_interval = snapshot_interval
+        self.all_publish_interval = all_publish_interval
+        self.last_values = {}
+        self.last_published = {}
+        self.last_snapshot = None
+        self.last_all_publish = None
+
+    def filter(self, results, now):
+        """Returns the points of results to publish and if they are a full snapshot of the device.
+
+        :param results: Scraped values of each point.
+        :param now: Time of the scrape in seconds, only compared to the times of earlier scrapes.
+        """
+        snapshot = self.last_snapshot is None or now - self.last_snapshot >= self.snapshot_interval
+        if snapshot:
+            self.last_snapshot = now
+            self.last_all_publish = now
+            to_publish = dict(results)
+        else:
+            to_publish = {point: value for point, value in results.items()
+                          if self._should_publish(point, value, now)}
+
+        for point, value in to_publish.items():
+            self.last_values[point] = value
+            self.last_published[point] = now
+        return to_publish, snapshot
+
+    def all_publish_due(self, now):
+        """Returns True if the "all" message is due between snapshots, call after filter for the same scrape."""
+        if self.all_publish_interval > 0 and now - self.last_all_publish >= self.all_publish_interval:
+            self.last_all_publish = now
+            return True
+        return False
+
+    def _should_publish(self, point, value, now):
+        if point not in self.last_values:
+            return True
+        if self.max_silence > 0 and now - self.last_published[point] >= self.max_silence:
+            return True
+        last_value = self.last_values[point]
+        if (isinstance(value, numbers.Number) and isinstance(last_value, numbers.Number) and
+                not isinstance(value, bool)):
+            deadband = self.point_deadbands.get(point, self.deadband)
+            if deadband > 0:
+                return abs(value - last_value) >= deadband
+        return value != last_value
@@ -40,8 +40,11 @@ from volttron.platform.vip.agent import BasicAgent, Core
 from volttron.platform.agent import utils
 import logging
 import random
+import time
 import gevent
 import traceback
+from collections import deque
+from functools import lru_cache
 from volttron.platform.messaging import headers as headers_mod
 from volttron.platform.messaging.topics import (DRIVER_TOPIC_BASE,
                                                 DRIVER_TOPIC_ALL,
@@ -49,13 +52,21 @@ from volttron.platform.messaging.topics import (DRIVER_TOPIC_BASE,
                                                 DEVICES_PATH)
 
 from volttron.platform.vip.agent.errors import VIPError, Again
-from .driver_locks import publish_lock
+from .driver_locks import publish_lock, scrape_lock
+from .scrape_schedule import LatencyHistogram, get_scrape_endpoint
+from .change_filter import ChangeFilter
 import datetime
 
 utils.setup_logging()
 _log = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=64)
+def format_sync_timestamp(sync_time):
+    """Devices scraped in the same interval share their sync timestamp, it is only formatted once for all of them."""
+    return utils.format_timestamp(sync_time)
+
+
 class DriverAgent(BasicAgent):
     def __init__(self, parent, config, time_slot, driver_scrape_interval, device_path,
                  group, group_offset_interval,
@@ -63,6 +74,7 @@ class DriverAgent(BasicAgent):
                  default_publish_breadth_first_all=True,
                  default_publish_depth_first=True,
                  default_publish_breadth_first=True,
+                 default_publish_window=0,
                  **kwargs):
         super(DriverAgent, self).__init__(**kwargs)
         self.heart_beat_value = 0
@@ -72,11 +84,15 @@ class DriverAgent(BasicAgent):
         self.vip = parent.vip
         self.config = config
         self.device_path = device_path
+        self.driver_type = config.get("driver_type")
+        self.scrape_endpoint = get_scrape_endpoint(config)
+        self.scrape_latency = LatencyHistogram()
 
         self.update_publish_types(default_publish_depth_first_all ,
                                  default_publish_breadth_first_all,
                                  default_publish_depth_first,
-                                 default_publish_breadth_first)
+                                 default_publish_breadth_first,
+                                 default_publish_window)
 
 
         try:
@@ -89,28 +105,57 @@ class DriverAgent(BasicAgent):
 
         self.interval = interval
         self.periodic_read_event = None
+        self.change_filter = self.create_change_filter(config)
+        self._point_paths = {}
 
         self.update_scrape_schedule(time_slot, driver_scrape_interval, group, group_offset_interval)
 
     def update_publish_types(self, publish_depth_first_all,
                                    publish_breadth_first_all,
                                    publish_depth_first,
-                                   publish_breadth_first):
-        """Setup which publish types happen for a scrape.
+                                   publish_breadth_first,
+                                   publish_window=0):
+        """Setup which publish types happen for a scrape and how many publishes of a scrape may be waiting
+           for confirmation at once. A publish_window of 0 waits for every publish before sending the next.
            Values passed in are overridden by settings in the specific device configuration."""
         self.publish_depth_first_all = bool(self.config.get("publish_depth_first_all", publish_depth_first_all))
         self.publish_breadth_first_all = bool(self.config.get("publish_breadth_first_all", publish_breadth_first_all))
         self.publish_depth_first = bool(self.config.get("publish_depth_first", publish_depth_first))
         self.publish_breadth_first = bool(self.config.get("publish_breadth_first", publish_breadth_first))
+        try:
+            self.publish_window = max(int(self.config.get("publish_window", publish_window)), 0)
+        except (TypeError, ValueError):
+            _log.warning("Invalid publish_window {}. Defaulting to 0.".format(self.config.get("publish_window")))
+            self.publish_window = 0
 
 
+    @staticmethod
+    def create_change_filter(config):
+        """Returns the ChangeFilter of a device that only publishes changed points, None if it publishes every scrape."""
+        if not config.get("publish_on_change", False):
+            return None
+        try:
+            deadbands = {point: float(deadband) for point, deadband in config.get("change_deadbands", {}).items()}
+            return ChangeFilter(deadband=float(config.get("change_deadband", 0.0)),
+                                point_deadbands=deadbands,
+                                max_silence=float(config.get("max_silence", 900.0)),
+                                snapshot_interval=float(config.get("snapshot_interval", 3600.0)),
+                                all_publish_interval=float(config.get("all_publish_interval", 0.0)))
+        except (AttributeError, TypeError, ValueError):
+            _log.warning("Invalid publish on change settings. Publishing every scrape.")
+            return None
+
     def update_scrape_schedule(self, time_slot, driver_scrape_interval, group, group_offset_interval):
-        self.time_slot_offset = (time_slot * driver_scrape_interval) + (group * group_offset_interval)
         self.time_slot = time_slot
         self.group = group
+        self.update_scrape_offset((time_slot * driver_scrape_interval) + (group * group_offset_interval))
+
+    def update_scrape_offset(self, time_slot_offset):
+        """Move the scrapes of the device to time_slot_offset seconds after the start of each interval."""
+        self.time_slot_offset = time_slot_offset
 
-        _log.debug("{} group: {}, time_slot: {}, offset: {}".format(self.device_path, group,
-                                                                    time_slot, self.time_slot_offset))
+        _log.debug("{} group: {}, time_slot: {}, offset: {}".format(self.device_path, self.group,
+                                                                    self.time_slot, self.time_slot_offset))
 
         if self.time_slot_offset >= self.interval:
             _log.warning(
@@ -129,7 +174,6 @@ class DriverAgent(BasicAgent):
         self.periodic_read_event = self.core.schedule(next_periodic_read, self.periodic_read, next_periodic_read)
 
 
-
     def find_starting_datetime(self, now):
         midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
         seconds_from_midnight = (now - midnight).total_seconds()
@@ -216,6 +260,10 @@ class DriverAgent(BasicAgent):
                                         path=self.device_path,
                                         point='')
 
+        self._point_paths = {}
+        for point in self.meta_data:
+            self.get_paths_for_point(point)
+
         # self.parent.device_startup_callback(self.device_name, self)
 
 
@@ -232,16 +280,17 @@ class DriverAgent(BasicAgent):
         if test_now - next_scrape_time > datetime.timedelta(seconds=self.interval):
             next_scrape_time = self.find_starting_datetime(test_now)
 
-        _log.debug("{} next scrape scheduled: {}".format(self.device_path, next_scrape_time))
+        _log.debug("%s next scrape scheduled: %s", self.device_path, next_scrape_time)
 
         self.periodic_read_event = self.core.schedule(next_scrape_time, self.periodic_read, next_scrape_time)
 
-        _log.debug("scraping device: " + self.device_name)
+        _log.debug("scraping device: %s", self.device_name)
 
         self.parent.scrape_starting(self.device_name)
 
         try:
-            results = self.interface.scrape_all()
+            with scrape_lock(self.driver_type, self.scrape_endpoint):
+                results = self._timed_scrape_all()
             register_names = self.interface.get_register_names_view()
             for point in (register_names - results.keys()):
                 depth_first_topic = self.base_topic(point=point)
@@ -257,7 +306,7 @@ class DriverAgent(BasicAgent):
 
         utcnow = utils.get_aware_utc_now()
         utcnow_string = utils.format_timestamp(utcnow)
-        sync_timestamp = utils.format_timestamp(now - datetime.timedelta(seconds=self.time_slot_offset))
+        sync_timestamp = format_sync_timestamp(now - datetime.timedelta(seconds=self.time_slot_offset))
 
         headers = {
             headers_mod.DATE: utcnow_string,
@@ -265,45 +314,101 @@ class DriverAgent(BasicAgent):
             headers_mod.SYNC_TIMESTAMP: sync_timestamp
         }
 
+        # Only the per point topics are filtered, "all" messages always carry every point of the device.
+        changed = results
+        publish_all = True
+        if self.change_filter is not None:
+            monotonic_now = time.monotonic()
+            changed, snapshot = self.change_filter.filter(results, monotonic_now)
+            publish_all = snapshot or self.change_filter.all_publish_due(monotonic_now)
+
+        publishes = []
         if self.publish_depth_first or self.publish_breadth_first:
-            for point, value in results.items():
+            for point, value in changed.items():
                 depth_first_topic, breadth_first_topic = self.get_paths_for_point(point)
                 message = [value, self.meta_data[point]]
 
                 if self.publish_depth_first:
-                    self._publish_wrapper(depth_first_topic,
-                                          headers=headers,
-                                          message=message)
+                    publishes.append((depth_first_topic, message))
 
                 if self.publish_breadth_first:
-                    self._publish_wrapper(breadth_first_topic,
-                                          headers=headers,
-                                          message=message)
+                    publishes.append((breadth_first_topic, message))
 
         message = [results, self.meta_data]
-        if self.publish_depth_first_all:
-            self._publish_wrapper(self.all_path_depth,
-                                  headers=headers,
-                                  message=message)
+        if self.publish_depth_first_all and publish_all:
+            publishes.append((self.all_path_depth, message))
 
-        if self.publish_breadth_first_all:
-            self._publish_wrapper(self.all_path_breadth,
-                                  headers=headers,
-                                  message=message)
+        if self.publish_breadth_first_all and publish_all:
+            publishes.append((self.all_path_breadth, message))
+
+        self._publish_all(publishes, headers)
 
         self.parent.scrape_ending(self.device_name)
 
+    def _timed_scrape_all(self):
+        """Scrape the device, recording how long the scrape took whether it succeeded or not."""
+        start = time.monotonic()
+        try:
+            return self.interface.scrape_all()
+        finally:
+            self.scrape_latency.record(time.monotonic() - start)
+            self.parent.scrape_finished(self.device_path)
+
+    def _publish_all(self, publishes, headers):
+        """Publish a list of (topic, message) in order.
+
+        Without a publish window every publish is confirmed before the next one is sent. Otherwise the publishes
+        are pipelined, the oldest publish is only waited on once publish_window publishes are unconfirmed. Publishes
+        rejected because pubsub is busy are sent again after the others, backing off without the publish lock.
+        """
+        if self.publish_window < 1:
+            for topic, message in publishes:
+                self._publish_wrapper(topic, headers=headers, message=message)
+            return
+
+        while publishes:
+            delayed = []
+            with publish_lock():
+                pending = deque()
+                for topic, message in publishes:
+                    if len(pending) >= self.publish_window:
+                        self._confirm_publish(pending, delayed)
+                    pending.append((topic, message, self._send_publish(topic, headers, message)))
+                while pending:
+                    self._confirm_publish(pending, delayed)
+            if delayed:
+                gevent.sleep(random.random())
+            publishes = delayed
+
+    def _send_publish(self, topic, headers, message):
+        _log.debug("publishing: %s", topic)
+        return self.vip.pubsub.publish('pubsub', topic, headers=headers, message=message)
+
+    def _confirm_publish(self, pending, delayed):
+        """Wait for the oldest pending publish, adding it to delayed if pubsub is busy."""
+        topic, message, result = pending.popleft()
+        try:
+            result.get(timeout=10.0)
+            _log.debug("finish publishing: %s", topic)
+        except gevent.Timeout:
+            _log.warning("Did not receive confirmation of publish to "+topic)
+        except Again:
+            _log.warning("publish delayed: " + topic + " pubsub is busy")
+            delayed.append((topic, message))
+        except VIPError as ex:
+            _log.warning("driver failed to publish " + topic + ": " + str(ex))
+
     def _publish_wrapper(self, topic, headers, message):
         while True:
             try:
                 with publish_lock():
-                    _log.debug("publishing: " + topic)
+                    _log.debug("publishing: %s", topic)
                     self.vip.pubsub.publish('pubsub',
                                             topic,
                                             headers=headers,
                                             message=message).get(timeout=10.0)
 
-                    _log.debug("finish publishing: " + topic)
+                    _log.debug("finish publishing: %s", topic)
             except gevent.Timeout:
                 _log.warning("Did not receive confirmation of publish to "+topic)
                 break
@@ -327,6 +432,13 @@ class DriverAgent(BasicAgent):
         self.set_point(self.heart_beat_point, self.heart_beat_value)
 
     def get_paths_for_point(self, point):
+        """Returns the depth first and breadth first topics of a point. Topics are built once and cached, the cache is
+        rebuilt when the device is set up again."""
+        try:
+            return self._point_paths[point]
+        except KeyError:
+            pass
+
         depth_first = self.base_topic(point=point)
 
         parts = depth_first.split('/')
@@ -335,6 +447,7 @@ class DriverAgent(BasicAgent):
         breadth_first_parts = [DRIVER_TOPIC_BASE] + breadth_first_parts
         breadth_first = '/'.join(breadth_first_parts)
 
+        self._point_paths[point] = depth_first, breadth_first
         return depth_first, breadth_first
 
     def get_point(self, point_name, **kwargs):
@@ -347,14 +460,17 @@ class DriverAgent(BasicAgent):
         return self.interface.scrape_all()
 
     def get_multiple_points(self, point_names, **kwargs):
-        return self.interface.get_multiple_points(self.device_name,
-                                                  point_names,
-                                                  **kwargs)
+        # Requests for many devices arrive together, hold them to the same limits as scrapes.
+        with scrape_lock(self.driver_type, self.scrape_endpoint):
+            return self.interface.get_multiple_points(self.device_name,
+                                                      point_names,
+                                                      **kwargs)
 
     def set_multiple_points(self, point_names_values, **kwargs):
-        return self.interface.set_multiple_points(self.device_name,
-                                                  point_names_values,
-                                                  **kwargs)
+        with scrape_lock(self.driver_type, self.scrape_endpoint):
+            return self.interface.set_multiple_points(self.device_name,
+                                                      point_names_values,
+                                                      **kwargs)
 
     def revert_point(self, point_name, **kwargs):
         self.interface.revert_point(point_name, **kwargs)
@@ -374,6 +490,7 @@ class DriverAgent(BasicAgent):
             headers_mod.DATE: utcnow_string,
             headers_mod.TIMESTAMP: utcnow_string,
         }
+        publishes = []
         for point, value in point_values.items():
             results = {point_name: value}
             meta = {point_name: self.meta_data[point_name]}
@@ -384,21 +501,15 @@ class DriverAgent(BasicAgent):
                 point_name)
 
             if self.publish_depth_first:
-                self._publish_wrapper(depth_first_topic,
-                                      headers=headers,
-                                      message=individual_point_message)
+                publishes.append((depth_first_topic, individual_point_message))
             #
             if self.publish_breadth_first:
-                self._publish_wrapper(breadth_first_topic,
-                                      headers=headers,
-                                      message=individual_point_message)
+                publishes.append((breadth_first_topic, individual_point_message))
 
             if self.publish_depth_first_all:
-                self._publish_wrapper(self.all_path_depth,
-                                      headers=headers,
-                                      message=all_message)
+                publishes.append((self.all_path_depth, all_message))
 
             if self.publish_breadth_first_all:
-                self._publish_wrapper(self.all_path_breadth,
-                                      headers=headers,
-                                      message=all_message)
+                publishes.append((self.all_path_breadth, all_message))
+
+        self._publish_all(publishes, headers)
@@ -82,3 +82,33 @@ def publish_lock():
         yield 
     finally:
         _publish_lock.release()
+
+
+_scrape_interface_limits = {}
+_scrape_endpoint_limit = 0
+_scrape_locks = {}
+
+def configure_scrape_locks(interface_limits=None, endpoint_limit=0):
+    """Limit the concurrent scrapes of each interface type and of each remote endpoint. Unlike the other locks this
+    may be configured again, scrapes holding a previous lock finish with it."""
+    global _scrape_interface_limits, _scrape_endpoint_limit
+    _scrape_interface_limits = dict(interface_limits or {})
+    _scrape_endpoint_limit = endpoint_limit
+    _scrape_locks.clear()
+
+def _get_scrape_lock(key, max_connections):
+    lock = _scrape_locks.get(key)
+    if lock is None:
+        lock = DummySemaphore() if max_connections < 1 else BoundedSemaphore(max_connections)
+        _scrape_locks[key] = lock
+    return lock
+
+@contextmanager
+def scrape_lock(driver_type, endpoint=None):
+    interface_lock = _get_scrape_lock(("interface", driver_type), _scrape_interface_limits.get(driver_type, 0))
+    if endpoint is None:
+        endpoint_lock = DummySemaphore()
+    else:
+        endpoint_lock = _get_scrape_lock(("endpoint", endpoint), _scrape_endpoint_limit)
+    with interface_lock, endpoint_lock:
+        yield
@@ -40,6 +40,8 @@
 import logging
 from datetime import datetime, timedelta
 
+import gevent
+
 from platform_driver.driver_exceptions import DriverConfigError
 from platform_driver.interfaces import BaseInterface, BaseRegister
 from volttron.platform.vip.agent import errors
@@ -131,7 +133,67 @@ class Interface(BaseInterface):
                                    register.instance_number, property_name, register_index).get(timeout=self.timeout)
         return result
 
+    def get_multiple_points(self, path, point_names, get_priority_array=False, **kwargs):
+        """Read the points with ReadPropertyMultiple requests through the proxy instead of one read per point."""
+        if get_priority_array:
+            return super(Interface, self).get_multiple_points(path, point_names, get_priority_array=True, **kwargs)
+
+        results = {}
+        errors = {}
+        point_map = {}
+        for point_name in point_names:
+            try:
+                register = self.get_register_by_name(point_name)
+            except Exception as e:
+                errors[path + '/' + point_name] = repr(e)
+                continue
+            point_map[point_name] = [register.object_type,
+                                     register.instance_number,
+                                     register.property,
+                                     register.index]
+
+        if not point_map:
+            return results, errors
+
+        try:
+            values = self._read_properties(point_map)
+        except (Exception, gevent.Timeout) as e:
+            for point_name in point_map:
+                errors[path + '/' + point_name] = repr(e)
+            return results, errors
+
+        for point_name in point_map:
+            return_key = path + '/' + point_name
+            if point_name in values:
+                results[return_key] = values[point_name]
+            else:
+                errors[return_key] = repr(IOError("Failed to read point: " + point_name))
+
+        return results, errors
+
     def set_point(self, point_name, value, priority=None):
+        return self._write_property(point_name, value, priority).get(timeout=self.timeout)
+
+    def set_multiple_points(self, path, point_names_values, priority=None, **kwargs):
+        """Send every write to the proxy before waiting on any of them so the writes are not made one round trip
+        at a time."""
+        results = {}
+        pending = []
+        for point_name, value in point_names_values:
+            try:
+                pending.append((point_name, self._write_property(point_name, value, priority)))
+            except Exception as e:
+                results[path + '/' + point_name] = repr(e)
+
+        for point_name, result in pending:
+            try:
+                result.get(timeout=self.timeout)
+            except (Exception, gevent.Timeout) as e:
+                results[path + '/' + point_name] = repr(e)
+
+        return results
+
+    def _write_property(self, point_name, value, priority=None):
         # TODO: support writing from an array.
         register = self.get_register_by_name(point_name)
         if register.read_only:
@@ -147,8 +209,7 @@ class Interface(BaseInterface):
                 register.property,
                 priority if priority is not None else register.priority,
                 register.index]
-        result = self.vip.rpc.call(self.proxy_address, 'write_property', *args).get(timeout=self.timeout)
-        return result
+        return self.vip.rpc.call(self.proxy_address, 'write_property', *args)
 
     def scrape_all(self):
         # TODO: support reading from an array.
@@ -162,6 +223,9 @@ class Interface(BaseInterface):
                                               register.property,
                                               register.index]
 
+        return self._read_properties(point_map)
+
+    def _read_properties(self, point_map):
         while True:
             try:
                 result = self.vip.rpc.call(self.proxy_address, 'read_properties',
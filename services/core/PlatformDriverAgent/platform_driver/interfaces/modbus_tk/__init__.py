@@ -42,6 +42,7 @@ from platform_driver.interfaces import BaseRegister, BaseInterface, BasicRevert
 from platform_driver.interfaces.modbus_tk import helpers
 from platform_driver.interfaces.modbus_tk.maps import Map
 
+import collections
 import logging
 import struct
 import re
@@ -367,6 +368,72 @@ class Interface(BasicRevert, BaseInterface):
         """
         return self.get_register_by_name(point_name).set_state(self.modbus_client, value)
 
+    def get_multiple_points(self, path, point_names, **kwargs):
+        """
+            Read each block of contiguous registers holding a requested point once and return the values of the points
+
+        :param path: device path
+        :param point_names: register point names
+
+        :type path: str
+        :type point_names: [str]
+        """
+        results = {}
+        errors = {}
+        requests = collections.OrderedDict()
+        for point_name in point_names:
+            try:
+                register = self.get_register_by_name(point_name)
+            except Exception as e:
+                errors[path + '/' + point_name] = repr(e)
+                continue
+            request = self.modbus_client.get_request(self.modbus_client.field_by_name(register.name))
+            requests.setdefault(request, []).append((point_name, register))
+
+        for request, registers in requests.items():
+            try:
+                if request is not None:
+                    self.modbus_client.read_request(request)
+                for point_name, register in registers:
+                    results[path + '/' + point_name] = register.get_state(self.modbus_client)
+            except Exception as e:
+                for point_name, register in registers:
+                    errors[path + '/' + point_name] = repr(e)
+
+        return results, errors
+
+    def set_multiple_points(self, path, point_names_values, **kwargs):
+        """
+            Set the values of the points with one write of the client, which writes contiguous registers together
+
+        :param path: device path
+        :param point_names_values: register point names and the values to set
+
+        :type path: str
+        :type point_names_values: [(str, k)] where k is the register type
+        """
+        results = {}
+        written = []
+        for point_name, value in point_names_values:
+            try:
+                setattr(self.modbus_client, self.get_register_by_name(point_name).name, value)
+                written.append(point_name)
+            except Exception as e:
+                results[path + '/' + point_name] = repr(e)
+
+        if written:
+            try:
+                self.modbus_client.write_all()
+            except Exception as e:
+                self.modbus_client.clear_pending_writes()
+                for point_name in written:
+                    results[path + '/' + point_name] = repr(e)
+            else:
+                for point_name in written:
+                    self._tracker.mark_dirty_point(point_name)
+
+        return results
+
     def _scrape_all(self):
         """Get a dictionary mapping point name to values of all defined registers
         """
@@ -750,6 +750,9 @@ class Client (object):
         self._pending_writes.clear()
         self._data.clear()
 
+    def clear_pending_writes(self):
+        self._pending_writes.clear()
+
     def fetch_field(self, field):
         """
             Make a modbus request for the block containing field.
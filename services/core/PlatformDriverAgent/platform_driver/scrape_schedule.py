@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+#
+# Copyright 2020, Battelle Memorial Institute.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# This material was prepared as an account of work sponsored by an agency of
+# the United States Government. Neither the United States Government nor the
+# United States Department of Energy, nor Battelle, nor any of their
+# employees, nor any jurisdiction or organization that has cooperated in the
+# development of these materials, makes any warranty, express or
+# implied, or assumes any legal liability or responsibility for the accuracy,
+# completeness, or usefulness or any information, apparatus, product,
+# software, or process disclosed, or represents that its use would not infringe
+# privately owned rights. Reference herein to any specific commercial product,
+# process, or service by trade name, trademark, manufacturer, or otherwise
+# does not necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors expressed
+# herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY operated by
+# BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+import heapq
+from collections import namedtuple
+
+# Upper bounds in seconds of the scrape duration histogram buckets
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+ScrapeDevice = namedtuple("ScrapeDevice", ["path", "lane", "group", "time_slot", "duration"])
+
+
+def get_scrape_endpoint(config):
+    """Returns the remote endpoint a device is scraped through, None if it is unknown.
+
+    BACnet devices share their proxy, other devices share the address (and port) they are reached at, so every device
+    on one Modbus gateway or serial line has the same endpoint. The device configuration may name the endpoint with
+    "scrape_endpoint"."""
+    endpoint = config.get("scrape_endpoint")
+    if endpoint:
+        return str(endpoint)
+
+    driver_config = config.get("driver_config") or {}
+    if config.get("driver_type") == "bacnet":
+        return driver_config.get("proxy_address", "platform.bacnet_proxy")
+
+    address = driver_config.get("device_address")
+    if address is None:
+        return None
+    port = driver_config.get("port")
+    return "{}:{}".format(address, port) if port else str(address)
+
+
+class LatencyHistogram(object):
+    """Counts scrape durations in fixed buckets."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = None
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def record(self, duration):
+        for i, bound in enumerate(self.buckets):
+            if duration <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.last = duration
+
+    def as_dict(self):
+        """Returns the histogram as a JSON serializable dictionary. Bucket keys are the upper bound of each bucket."""
+        buckets = {str(bound): count for bound, count in zip(self.buckets, self.counts)}
+        buckets["+Inf"] = self.counts[-1]
+        return {"count": self.count,
+                "mean": self.mean,
+                "max": self.max,
+                "last": self.last,
+                "buckets": buckets}
+
+
+def plan_scrape_offsets(devices, lane_limits, group_offset_interval=0.0):
+    """Spread the scrapes of devices sharing a lane so no more than the lane's limit run at once.
+
+    Devices are placed in (group, time_slot) order on the lane's concurrent scrape channel that frees up first. A device
+    starts no earlier than its group offset and keeps its channel busy for its expected scrape duration.
+
+    :param devices: ScrapeDevice for each device, duration is the expected scrape duration in seconds.
+    :param lane_limits: Maximum concurrent scrapes of each lane.
+    :param group_offset_interval: Interval between the start of device groups.
+    :returns: Offset in seconds of each device path and the time each lane needs for all its scrapes.
+    """
+    lanes = {}
+    for device in sorted(devices, key=lambda d: (d.group, d.time_slot)):
+        lanes.setdefault(device.lane, []).append(device)
+
+    offsets = {}
+    spans = {}
+    for lane, lane_devices in lanes.items():
+        channels = [0.0] * max(lane_limits.get(lane, 1), 1)
+        for device in lane_devices:
+            free = heapq.heappop(channels)
+            offset = max(free, device.group * group_offset_interval)
+            offsets[device.path] = offset
+            heapq.heappush(channels, offset + device.duration)
+        spans[lane] = max(channels)
+    return offsets, spans
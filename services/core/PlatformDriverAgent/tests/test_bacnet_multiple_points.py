@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+#
+# Copyright 2020, Battelle Memorial Institute.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# This material was prepared as an account of work sponsored by an agency of
+# the United States Government. Neither the United States Government nor the
+# United States Department of Energy, nor Battelle, nor any of their
+# employees, nor any jurisdiction or organization that has cooperated in the
+# development of these materials, makes any warranty, express or
+# implied, or assumes any legal liability or responsibility for the accuracy,
+# completeness, or usefulness or any information, apparatus, product,
+# software, or process disclosed, or represents that its use would not infringe
+# privately owned rights. Reference herein to any specific commercial product,
+# process, or service by trade name, trademark, manufacturer, or otherwise
+# does not necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors expressed
+# herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY operated by
+# BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+from unittest import mock
+
+import gevent
+import pytest
+
+from platform_driver.interfaces.bacnet import Interface
+
+registry_config = [
+    {"Volttron Point Name": "ZoneTemperature", "BACnet Object Type": "analogInput", "Property": "presentValue",
+     "Writable": "FALSE", "Index": "1", "Units": "degreesFahrenheit"},
+    {"Volttron Point Name": "CoolingSetpoint", "BACnet Object Type": "analogValue", "Property": "presentValue",
+     "Writable": "TRUE", "Index": "2", "Units": "degreesFahrenheit", "Write Priority": "10"},
+    {"Volttron Point Name": "HeatingSetpoint", "BACnet Object Type": "analogValue", "Property": "presentValue",
+     "Writable": "TRUE", "Index": "3", "Units": "degreesFahrenheit"},
+]
+
+
+class Result(object):
+    def __init__(self, value=None, error=None):
+        self.value = value
+        self.error = error
+
+    def get(self, timeout=None):
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+@pytest.fixture
+def interface():
+    interface = Interface(vip=mock.MagicMock(), core=mock.MagicMock())
+    interface.configure({"device_address": "10.0.0.1", "device_id": 500}, registry_config)
+    interface.vip.rpc.call.reset_mock()
+    return interface
+
+
+@pytest.mark.driver_unit
+def test_get_multiple_points_should_read_with_one_request(interface):
+    interface.vip.rpc.call.return_value = Result({"ZoneTemperature": 72.5, "CoolingSetpoint": 75.0})
+
+    results, errors = interface.get_multiple_points("device", ["ZoneTemperature", "CoolingSetpoint",
+                                                               "HeatingSetpoint", "Missing"])
+
+    interface.vip.rpc.call.assert_called_once_with(
+        "platform.bacnet_proxy", "read_properties", "10.0.0.1",
+        {"ZoneTemperature": ["analogInput", 1, "presentValue", None],
+         "CoolingSetpoint": ["analogValue", 2, "presentValue", None],
+         "HeatingSetpoint": ["analogValue", 3, "presentValue", None]}, 24, True)
+    assert results == {"device/ZoneTemperature": 72.5, "device/CoolingSetpoint": 75.0}
+    assert sorted(errors) == ["device/HeatingSetpoint", "device/Missing"]
+
+
+@pytest.mark.driver_unit
+def test_get_multiple_points_should_report_failed_request_for_every_point(interface):
+    interface.vip.rpc.call.return_value = Result(error=gevent.Timeout())
+
+    results, errors = interface.get_multiple_points("device", ["ZoneTemperature", "CoolingSetpoint"])
+
+    assert results == {}
+    assert sorted(errors) == ["device/CoolingSetpoint", "device/ZoneTemperature"]
+
+
+@pytest.mark.driver_unit
+def test_set_multiple_points_should_send_writes_before_waiting(interface):
+    sent = []
+    waited = []
+
+    def call(peer, method, *args):
+        sent.append(args)
+        result = mock.Mock()
+        result.get.side_effect = lambda timeout=None: waited.append(len(sent)) or args[1]
+        if args[3] == 3:
+            result.get.side_effect = gevent.Timeout()
+        return result
+
+    interface.vip.rpc.call.side_effect = call
+
+    results = interface.set_multiple_points("device", [("CoolingSetpoint", 76.0), ("ZoneTemperature", 70.0),
+                                                       ("HeatingSetpoint", 68.0)])
+
+    assert sent == [("10.0.0.1", 76.0, "analogValue", 2, "presentValue", 10, None),
+                    ("10.0.0.1", 68.0, "analogValue", 3, "presentValue", None, None)]
+    assert waited == [2]
+    assert sorted(results) == ["device/HeatingSetpoint", "device/ZoneTemperature"]
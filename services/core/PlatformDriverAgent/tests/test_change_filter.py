@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+#
+# Copyright 2020, Battelle Memorial Institute.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# This material was prepared as an account of work sponsored by an agency of
+# the United States Government. Neither the United States Government nor the
+# United States Department of Energy, nor Battelle, nor any of their
+# employees, nor any jurisdiction or organization that has cooperated in the
+# development of these materials, makes any warranty, express or
+# implied, or assumes any legal liability or responsibility for the accuracy,
+# completeness, or usefulness or any information, apparatus, product,
+# software, or process disclosed, or represents that its use would not infringe
+# privately owned rights. Reference herein to any specific commercial product,
+# process, or service by trade name, trademark, manufacturer, or otherwise
+# does not necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors expressed
+# herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY operated by
+# BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+import pytest
+
+from platform_driver.change_filter import ChangeFilter
+
+
+@pytest.mark.driver_unit
+def test_filter_should_publish_snapshot_then_changes():
+    change_filter = ChangeFilter(deadband=0.5, point_deadbands={"Damper": 5}, max_silence=0, snapshot_interval=100)
+
+    assert change_filter.filter({"Temp": 70.0, "Damper": 50, "Mode": "cool", "Occupied": True}, 0) == \
+        ({"Temp": 70.0, "Damper": 50, "Mode": "cool", "Occupied": True}, True)
+    assert change_filter.filter({"Temp": 70.4, "Damper": 54, "Mode": "cool", "Occupied": True}, 10) == ({}, False)
+    assert change_filter.filter({"Temp": 70.5, "Damper": 55, "Mode": "heat", "Occupied": False}, 20) == \
+        ({"Temp": 70.5, "Damper": 55, "Mode": "heat", "Occupied": False}, False)
+    # compared to the value last published, not the last scraped
+    assert change_filter.filter({"Temp": 70.8, "Damper": 55, "Mode": "heat", "Occupied": False}, 30) == ({}, False)
+    assert change_filter.filter({"Temp": 71.0, "Damper": 55, "Mode": "heat", "Occupied": False}, 40) == \
+        ({"Temp": 71.0}, False)
+
+
+@pytest.mark.driver_unit
+def test_filter_should_publish_silent_points_and_new_points():
+    change_filter = ChangeFilter(max_silence=30, snapshot_interval=100)
+
+    change_filter.filter({"Temp": 70.0, "Fan": 1}, 0)
+    assert change_filter.filter({"Temp": 70.0, "Fan": 0}, 20) == ({"Fan": 0}, False)
+    assert change_filter.filter({"Temp": 70.0, "Fan": 0, "Alarm": 0}, 30) == ({"Temp": 70.0, "Alarm": 0}, False)
+    assert change_filter.filter({"Temp": 70.0, "Fan": 0, "Alarm": 0}, 50) == ({"Fan": 0}, False)
+    assert change_filter.filter({"Temp": 70.0, "Fan": 0, "Alarm": 0}, 100) == \
+        ({"Temp": 70.0, "Fan": 0, "Alarm": 0}, True)
+
+
+@pytest.mark.driver_unit
+def test_all_publish_should_be_due_with_snapshots_and_at_interval():
+    change_filter = ChangeFilter(snapshot_interval=100, all_publish_interval=30)
+
+    due = []
+    for now in (0, 20, 30, 50, 60, 100, 120, 130):
+        change_filter.filter({"Temp": 70.0}, now)
+        due.append(now == change_filter.last_snapshot or change_filter.all_publish_due(now))
+    assert due == [True, False, True, False, True, True, False, True]
+
+    change_filter = ChangeFilter(snapshot_interval=100)
+    change_filter.filter({"Temp": 70.0}, 0)
+    assert not change_filter.all_publish_due(99)
@@ -39,7 +39,7 @@
 import logging
 import contextlib
 from datetime import datetime, date, time
-from mock import create_autospec
+from mock import create_autospec, patch
 
 import pytest
 import pytz
@@ -52,6 +52,7 @@ from volttrontesting.utils.utils import AgentMock
 from volttron.platform.vip.agent import Agent
 from volttron.platform.messaging.utils import Topic
 from volttron.platform.vip.agent.core import ScheduledEvent
+from volttron.platform.vip.agent.errors import Again
 
 
 agent._log = logging.getLogger("test_logger")
@@ -75,6 +76,16 @@ def test_update_publish_types_should_only_set_depth_first_to_true():
         assert not driver_agent.publish_breadth_first
 
 
+@pytest.mark.driver_unit
+@pytest.mark.parametrize("publish_window, expected", [(None, 0), ("many", 0), (-2, 0), ("3", 3)])
+def test_update_publish_types_should_validate_publish_window(publish_window, expected):
+    with get_driver_agent() as driver_agent:
+        driver_agent.config["publish_window"] = publish_window
+        driver_agent.update_publish_types(False, False, True, False, publish_window=5)
+
+        assert driver_agent.publish_window == expected
+
+
 @pytest.mark.driver_unit
 @pytest.mark.parametrize("time_slot, driver_scrape_interval, group, group_offset_interval, "
                          "expected_time_slot_offset, expected_group",
@@ -174,6 +185,18 @@ def test_setup_device_should_succeed():
         assert driver_agent.meta_data == expected_meta_data
 
 
+@pytest.mark.driver_unit
+def test_setup_device_should_cache_point_topics():
+    with get_driver_agent() as driver_agent:
+        driver_agent.setup_device()
+
+        assert driver_agent._point_paths == {
+            "PowerState": ("devices/path/to/my/device/PowerState", "devices/PowerState/device/my/to/path")}
+
+        driver_agent.base_topic = MockedBaseTopic()
+        assert driver_agent.get_paths_for_point("PowerState") == driver_agent._point_paths["PowerState"]
+
+
 @pytest.mark.driver_unit
 def test_periodic_read_should_succeed():
     now = pytz.UTC.localize(datetime.utcnow())
@@ -189,6 +212,92 @@ def test_periodic_read_should_succeed():
         assert isinstance(driver_agent.periodic_read_event, ScheduledEvent)
 
 
+@pytest.mark.driver_unit
+def test_periodic_read_should_record_scrape_latency():
+    now = pytz.UTC.localize(datetime.utcnow())
+
+    with get_driver_agent(has_core_schedule=True, meta_data={"foo": "bar"},
+                          has_base_topic=True, mock_publish_wrapper=True,
+                          interface_scrape_all={"foo": "bar"}) as driver_agent:
+        driver_agent.periodic_read(now)
+        driver_agent.interface.scrape_all.side_effect = Exception()
+        driver_agent.periodic_read(now)
+
+        assert driver_agent.scrape_latency.count == 2
+        assert driver_agent.parent.scrape_finished.call_count == 2
+        driver_agent.parent.scrape_finished.assert_called_with("path/to/my/device")
+
+
+@pytest.mark.driver_unit
+def test_periodic_read_should_only_publish_changed_points():
+    now = pytz.UTC.localize(datetime.utcnow())
+    scrapes = [{"foo": 1, "bar": 2}, {"foo": 1, "bar": 2}, {"foo": 1, "bar": 3}]
+
+    with get_driver_agent(has_core_schedule=True, meta_data={"foo": "foo_meta", "bar": "bar_meta"},
+                          has_base_topic=True, mock_publish_wrapper=True) as driver_agent:
+        driver_agent.publish_depth_first_all = True
+        driver_agent.all_path_depth = "all"
+        driver_agent.change_filter = DriverAgent.create_change_filter({"publish_on_change": True})
+        driver_agent.interface.scrape_all.side_effect = scrapes
+        for _ in scrapes:
+            driver_agent.periodic_read(now)
+
+        published = [(call[0][0], call[1]["message"]) for call in driver_agent._publish_wrapper.call_args_list]
+        # "all" is only published with the snapshot
+        assert published == [("foo", [1, "foo_meta"]),
+                             ("bar", [2, "bar_meta"]),
+                             ("all", [{"foo": 1, "bar": 2}, {"foo": "foo_meta", "bar": "bar_meta"}]),
+                             ("bar", [3, "bar_meta"])]
+        assert driver_agent.parent.scrape_ending.call_count == 3
+
+
+@pytest.mark.driver_unit
+def test_periodic_read_should_publish_full_all_message_at_all_publish_interval():
+    now = pytz.UTC.localize(datetime.utcnow())
+    scrapes = [{"foo": 1, "bar": 2}, {"foo": 1, "bar": 3}, {"foo": 1, "bar": 3}]
+
+    with get_driver_agent(has_core_schedule=True, meta_data={"foo": "foo_meta", "bar": "bar_meta"},
+                          has_base_topic=True, mock_publish_wrapper=True) as driver_agent:
+        driver_agent.publish_depth_first = False
+        driver_agent.publish_depth_first_all = True
+        driver_agent.all_path_depth = "all"
+        driver_agent.change_filter = DriverAgent.create_change_filter({"publish_on_change": True,
+                                                                       "all_publish_interval": 120})
+        driver_agent.interface.scrape_all.side_effect = scrapes
+        with patch("platform_driver.driver.time.monotonic") as monotonic:
+            for seconds in (0, 60, 120):
+                monotonic.return_value = seconds
+                driver_agent.periodic_read(now)
+
+        published = [(call[0][0], call[1]["message"]) for call in driver_agent._publish_wrapper.call_args_list]
+        assert published == [("all", [{"foo": 1, "bar": 2}, {"foo": "foo_meta", "bar": "bar_meta"}]),
+                             ("all", [{"foo": 1, "bar": 3}, {"foo": "foo_meta", "bar": "bar_meta"}])]
+
+
+@pytest.mark.driver_unit
+def test_create_change_filter():
+    assert DriverAgent.create_change_filter({}) is None
+    assert DriverAgent.create_change_filter({"publish_on_change": True, "change_deadband": "foo"}) is None
+
+    change_filter = DriverAgent.create_change_filter({"publish_on_change": True, "change_deadband": 0.5,
+                                                      "change_deadbands": {"foo": 2}, "max_silence": 60,
+                                                      "snapshot_interval": 600, "all_publish_interval": 300})
+    assert (change_filter.deadband, change_filter.point_deadbands, change_filter.max_silence,
+            change_filter.snapshot_interval, change_filter.all_publish_interval) == (0.5, {"foo": 2.0}, 60.0, 600.0,
+                                                                                     300.0)
+
+
+@pytest.mark.driver_unit
+def test_update_scrape_offset_should_reschedule_periodic_read():
+    with get_driver_agent(has_periodic_read_event=True, has_core_schedule=True) as driver_agent:
+        event = driver_agent.periodic_read_event
+        driver_agent.update_scrape_offset(75)
+
+        assert driver_agent.time_slot_offset == 15
+        event.cancel.assert_called_once()
+        assert driver_agent.periodic_read_event is not event
+
+
 @pytest.mark.driver_unit
 @pytest.mark.parametrize("scrape_all_response", [{}, Exception()])
 def test_periodic_read_should_return_none_on_scrape_response(scrape_all_response):
@@ -306,6 +415,90 @@ def test_publish_cov_value_should_succeed_when_publish_depth_first_is_true():
         driver_agent._publish_wrapper.assert_called_once()
 
 
+@pytest.mark.driver_unit
+def test_periodic_read_should_pipeline_publishes_within_window():
+    now = pytz.UTC.localize(datetime.utcnow())
+    results = {f"point{i}": i for i in range(5)}
+
+    with get_driver_agent(has_core_schedule=True, meta_data={point: {} for point in results},
+                          has_base_topic=True, interface_scrape_all=results) as driver_agent:
+        driver_agent.publish_window = 2
+        pubsub = MockedPubSub()
+        driver_agent.vip = pubsub
+
+        with patch("platform_driver.driver.publish_lock", contextlib.nullcontext):
+            driver_agent.periodic_read(now)
+
+        assert pubsub.topics == list(results)
+        assert pubsub.max_pending == 2
+        assert pubsub.pending == 0
+        driver_agent.parent.scrape_ending.assert_called_once()
+
+
+@pytest.mark.driver_unit
+def test_publish_all_should_resend_busy_publish():
+    with get_driver_agent() as driver_agent:
+        driver_agent.publish_window = 3
+        pubsub = MockedPubSub(busy_topics={"b"})
+        driver_agent.vip = pubsub
+
+        lock = MockedPublishLock()
+        with patch("platform_driver.driver.publish_lock", lock), \
+                patch("platform_driver.driver.gevent.sleep", side_effect=lock.sleep):
+            driver_agent._publish_all([("a", 1), ("b", 2), ("c", 3)], headers={})
+
+        assert pubsub.topics == ["a", "b", "c", "b"]
+        assert pubsub.pending == 0
+        # backed off once, without holding the publish lock
+        assert lock.sleeps == [False]
+
+
+class MockedPublishLock:
+    """Stands in for publish_lock, recording if it was held while sleeping."""
+    def __init__(self):
+        self.held = False
+        self.sleeps = []
+
+    @contextlib.contextmanager
+    def __call__(self):
+        self.held = True
+        try:
+            yield
+        finally:
+            self.held = False
+
+    def sleep(self, seconds):
+        self.sleeps.append(self.held)
+
+
+class MockedPubSub:
+    """Stands in for vip.pubsub, counting the publishes that have not been waited on."""
+    def __init__(self, busy_topics=()):
+        self.pubsub = self
+        self.busy_topics = set(busy_topics)
+        self.topics = []
+        self.pending = 0
+        self.max_pending = 0
+
+    def publish(self, peer, topic, headers=None, message=None):
+        self.topics.append(topic)
+        self.pending += 1
+        self.max_pending = max(self.max_pending, self.pending)
+        return MockedAsyncResult(self, topic)
+
+
+class MockedAsyncResult:
+    def __init__(self, pubsub, topic):
+        self.pubsub = pubsub
+        self.topic = topic
+
+    def get(self, timeout=None):
+        self.pubsub.pending -= 1
+        if self.topic in self.pubsub.busy_topics:
+            self.pubsub.busy_topics.remove(self.topic)
+            raise Again(11, "busy", "pubsub", "pubsub")
+
+
 class MockedParent:
     def scrape_starting(self, device_name):
         pass
@@ -313,6 +506,9 @@ class MockedParent:
     def scrape_ending(self, device_name):
         pass
 
+    def scrape_finished(self, device_path):
+        pass
+
 
 class MockedBaseTopic:
     def __call__(self, point):
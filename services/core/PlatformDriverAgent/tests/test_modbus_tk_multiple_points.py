@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+#
+# Copyright 2020, Battelle Memorial Institute.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# This material was prepared as an account of work sponsored by an agency of
+# the United States Government. Neither the United States Government nor the
+# United States Department of Energy, nor Battelle, nor any of their
+# employees, nor any jurisdiction or organization that has cooperated in the
+# development of these materials, makes any warranty, express or
+# implied, or assumes any legal liability or responsibility for the accuracy,
+# completeness, or usefulness or any information, apparatus, product,
+# software, or process disclosed, or represents that its use would not infringe
+# privately owned rights. Reference herein to any specific commercial product,
+# process, or service by trade name, trademark, manufacturer, or otherwise
+# does not necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors expressed
+# herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY operated by
+# BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+from unittest import mock
+
+import pytest
+
+pytest.importorskip("modbus_tk")
+
+from platform_driver.interfaces.modbus_tk import Interface, ModbusTKRegister
+
+
+def get_field(name):
+    field = mock.Mock(type=">H", writable=True, units="degreesFahrenheit")
+    field.name = name
+    return field
+
+
+@pytest.fixture
+def interface():
+    interface = Interface(vip=mock.MagicMock(), core=mock.MagicMock())
+    fields = {name: get_field(name) for name in ("zone_temperature", "cooling_setpoint", "humidity")}
+    # zone_temperature and cooling_setpoint are contiguous registers read by the same request
+    requests = {fields["zone_temperature"]: "block_0", fields["cooling_setpoint"]: "block_0",
+                fields["humidity"]: "block_10"}
+    interface.modbus_client = mock.Mock(zone_temperature=72, cooling_setpoint=75, humidity=40)
+    interface.modbus_client.field_by_name.side_effect = fields.get
+    interface.modbus_client.get_request.side_effect = requests.get
+    for point_name, name in (("ZoneTemperature", "zone_temperature"), ("CoolingSetpoint", "cooling_setpoint"),
+                             ("Humidity", "humidity")):
+        interface.insert_register(ModbusTKRegister(point_name, None, fields[name]))
+    return interface
+
+
+@pytest.mark.driver_unit
+def test_get_multiple_points_should_read_each_register_block_once(interface):
+    results, errors = interface.get_multiple_points("device", ["ZoneTemperature", "CoolingSetpoint", "Humidity",
+                                                               "Missing"])
+
+    assert interface.modbus_client.read_request.call_args_list == [mock.call("block_0"), mock.call("block_10")]
+    assert results == {"device/ZoneTemperature": 72, "device/CoolingSetpoint": 75, "device/Humidity": 40}
+    assert list(errors) == ["device/Missing"]
+
+
+@pytest.mark.driver_unit
+def test_get_multiple_points_should_report_failed_block_for_its_points(interface):
+    interface.modbus_client.read_request.side_effect = \
+        lambda request: request == "block_0" and interface.modbus_client.fail()
+    interface.modbus_client.fail.side_effect = IOError("timed out")
+
+    results, errors = interface.get_multiple_points("device", ["ZoneTemperature", "CoolingSetpoint", "Humidity"])
+
+    assert results == {"device/Humidity": 40}
+    assert errors == {"device/ZoneTemperature": repr(IOError("timed out")),
+                      "device/CoolingSetpoint": repr(IOError("timed out"))}
+
+
+@pytest.mark.driver_unit
+def test_set_multiple_points_should_write_once_and_mark_points_dirty(interface):
+    results = interface.set_multiple_points("device", [("CoolingSetpoint", 76), ("Humidity", 45), ("Missing", 1)])
+
+    interface.modbus_client.write_all.assert_called_once_with()
+    assert (interface.modbus_client.cooling_setpoint, interface.modbus_client.humidity) == (76, 45)
+    assert list(results) == ["device/Missing"]
+    assert interface._tracker.dirty_points == {"CoolingSetpoint", "Humidity"}
+
+
+@pytest.mark.driver_unit
+def test_set_multiple_points_should_clear_pending_writes_when_write_fails(interface):
+    interface.modbus_client.write_all.side_effect = IOError("timed out")
+
+    results = interface.set_multiple_points("device", [("CoolingSetpoint", 76), ("Humidity", 45)])
+
+    interface.modbus_client.clear_pending_writes.assert_called_once_with()
+    assert results == {"device/CoolingSetpoint": repr(IOError("timed out")),
+                       "device/Humidity": repr(IOError("timed out"))}
+    assert interface._tracker.dirty_points == set()
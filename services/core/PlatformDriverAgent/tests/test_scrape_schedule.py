@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+#
+# Copyright 2020, Battelle Memorial Institute.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# This material was prepared as an account of work sponsored by an agency of
+# the United States Government. Neither the United States Government nor the
+# United States Department of Energy, nor Battelle, nor any of their
+# employees, nor any jurisdiction or organization that has cooperated in the
+# development of these materials, makes any warranty, express or
+# implied, or assumes any legal liability or responsibility for the accuracy,
+# completeness, or usefulness or any information, apparatus, product,
+# software, or process disclosed, or represents that its use would not infringe
+# privately owned rights. Reference herein to any specific commercial product,
+# process, or service by trade name, trademark, manufacturer, or otherwise
+# does not necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors expressed
+# herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY operated by
+# BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+import gevent
+import pytest
+
+from platform_driver import driver_locks
+from platform_driver.scrape_schedule import (LatencyHistogram, ScrapeDevice, get_scrape_endpoint,
+                                             plan_scrape_offsets)
+
+
+@pytest.mark.driver_unit
+@pytest.mark.parametrize("config, expected_endpoint",
+                         [({"driver_type": "bacnet", "driver_config": {"device_address": "10.0.0.1"}},
+                           "platform.bacnet_proxy"),
+                          ({"driver_type": "bacnet", "driver_config": {"proxy_address": "bacnet_proxy_2"}},
+                           "bacnet_proxy_2"),
+                          ({"driver_type": "modbus", "driver_config": {"device_address": "10.0.0.2", "port": 502}},
+                           "10.0.0.2:502"),
+                          ({"driver_type": "modbus_tk", "driver_config": {"device_address": "/dev/ttyUSB0"}},
+                           "/dev/ttyUSB0"),
+                          ({"driver_type": "modbus", "driver_config": {"device_address": "10.0.0.2"},
+                            "scrape_endpoint": "gateway1"}, "gateway1"),
+                          ({"driver_type": "fakedriver", "driver_config": {}}, None)])
+def test_get_scrape_endpoint(config, expected_endpoint):
+    assert get_scrape_endpoint(config) == expected_endpoint
+
+
+@pytest.mark.driver_unit
+def test_latency_histogram_should_count_durations_in_buckets():
+    histogram = LatencyHistogram(buckets=(0.1, 1.0))
+
+    for duration in (0.05, 0.1, 0.5, 2.0):
+        histogram.record(duration)
+
+    assert histogram.as_dict() == {"count": 4, "mean": 0.6625, "max": 2.0, "last": 2.0,
+                                   "buckets": {"0.1": 2, "1.0": 1, "+Inf": 1}}
+    assert LatencyHistogram().as_dict()["mean"] is None
+
+
+@pytest.mark.driver_unit
+def test_plan_scrape_offsets_should_fill_concurrent_channels():
+    devices = [ScrapeDevice("a", "proxy", 0, 0, 2.0),
+               ScrapeDevice("b", "proxy", 0, 1, 1.0),
+               ScrapeDevice("c", "proxy", 0, 2, 1.0),
+               ScrapeDevice("d", "proxy", 0, 3, 1.0),
+               ScrapeDevice("e", "gateway", 0, 4, 5.0),
+               ScrapeDevice("f", "gateway", 0, 5, 5.0)]
+
+    offsets, spans = plan_scrape_offsets(devices, {"proxy": 2, "gateway": 1})
+
+    assert offsets == {"a": 0.0, "b": 0.0, "c": 1.0, "d": 2.0, "e": 0.0, "f": 5.0}
+    assert spans == {"proxy": 3.0, "gateway": 10.0}
+
+
+@pytest.mark.driver_unit
+def test_plan_scrape_offsets_should_keep_group_offsets():
+    devices = [ScrapeDevice("b", "lane", 1, 0, 1.0),
+               ScrapeDevice("a", "lane", 0, 0, 1.0),
+               ScrapeDevice("c", "lane", 0, 1, 1.0)]
+
+    offsets, spans = plan_scrape_offsets(devices, {"lane": 1}, group_offset_interval=10.0)
+
+    assert offsets == {"a": 0.0, "c": 1.0, "b": 10.0}
+    assert spans == {"lane": 11.0}
+
+
+@pytest.mark.driver_unit
+def test_scrape_lock_should_limit_concurrent_scrapes():
+    driver_locks.configure_scrape_locks({"bacnet": 2}, endpoint_limit=1)
+    running = []
+    max_running = {}
+
+    def scrape(driver_type, endpoint):
+        with driver_locks.scrape_lock(driver_type, endpoint):
+            running.append(endpoint)
+            max_running[driver_type] = max(max_running.get(driver_type, 0), len(running))
+            gevent.sleep(0.01)
+            running.remove(endpoint)
+
+    try:
+        gevent.joinall([gevent.spawn(scrape, "bacnet", "proxy{}".format(i)) for i in range(4)])
+        assert max_running["bacnet"] == 2
+
+        gevent.joinall([gevent.spawn(scrape, "modbus", "gateway") for _ in range(3)])
+        assert max_running["modbus"] == 1
+
+        gevent.joinall([gevent.spawn(scrape, "fakedriver", None) for _ in range(3)])
+        assert max_running["fakedriver"] == 3
+    finally:
+        driver_locks.configure_scrape_locks()
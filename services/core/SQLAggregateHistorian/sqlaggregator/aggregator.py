@@ -40,6 +40,7 @@
 
 import logging
 import sys
+import threading
 
 from volttron.platform.agent import utils
 from volttron.platform.agent.base_aggregate_historian import AggregateHistorian
@@ -54,6 +55,7 @@ class SQLAggregateHistorian(AggregateHistorian):
     Agent to aggregate data in historian based on a specific time period.
     This aggregate historian aggregates data collected by SQLHistorian.
     """
+    PARALLEL_COLLECTION_SUPPORT = True
 
     def __init__(self, config_path, **kwargs):
         """
@@ -66,6 +68,9 @@ class SQLAggregateHistorian(AggregateHistorian):
         self.dbfuncts_class = None
         self.tables_def = None
         self.table_names = None
+        self._create_dbfuncts = None
+        # dbfuncts of the collection worker threads, one connection each
+        self._worker_state = threading.local()
         super(SQLAggregateHistorian, self).__init__(config_path, **kwargs)
 
     def configure(self, config_name, action, config):
@@ -83,7 +88,10 @@ class SQLAggregateHistorian(AggregateHistorian):
         self.tables_def, self.table_names = self.parse_table_def(tables_def)
 
         class_name = sqlutils.get_dbfuncts_class(database_type)
-        self.dbfuncts_class = class_name(connection['params'], self.table_names)
+        table_names = self.table_names
+        self._create_dbfuncts = lambda: class_name(connection['params'],
+                                                   table_names)
+        self.dbfuncts_class = self._create_dbfuncts()
         self.dbfuncts_class.setup_aggregate_historian_tables()
         super(SQLAggregateHistorian, self).configure(
             config_name, action, config)
@@ -123,8 +131,36 @@ class SQLAggregateHistorian(AggregateHistorian):
         self.dbfuncts_class.insert_agg_meta(agg_id, topic_meta)
         self.dbfuncts_class.commit()
 
+    @property
+    def query_dbfuncts(self):
+        """
+        dbfuncts for aggregate queries. Collection worker threads get a
+        database connection of their own.
+        """
+        if threading.current_thread() is threading.main_thread():
+            return self.dbfuncts_class
+        dbfuncts = getattr(self._worker_state, 'dbfuncts', None)
+        if dbfuncts is None:
+            dbfuncts = self._create_dbfuncts()
+            self._worker_state.dbfuncts = dbfuncts
+        return dbfuncts
+
+    def collection_worker_stopping(self):
+        # sqlite connections can only be closed by the thread that opened them
+        dbfuncts = getattr(self._worker_state, 'dbfuncts', None)
+        if dbfuncts is not None:
+            del self._worker_state.dbfuncts
+            dbfuncts.close()
+
     def collect_aggregate(self, topic_ids, agg_type, start_time, end_time):
-        return self.dbfuncts_class.collect_aggregate(
+        return self.query_dbfuncts.collect_aggregate(
+            topic_ids,
+            agg_type,
+            start_time,
+            end_time)
+
+    def collect_aggregates(self, topic_ids, agg_type, start_time, end_time):
+        return self.query_dbfuncts.collect_aggregates(
             topic_ids,
             agg_type,
             start_time,
@@ -139,6 +175,10 @@ class SQLAggregateHistorian(AggregateHistorian):
                                              value,
                                              topic_ids)
 
+    def insert_aggregates(self, agg_type, period, end_time, rows):
+        self.dbfuncts_class.insert_aggregates(agg_type, period, end_time,
+                                              rows)
+
 
 def main(argv=sys.argv):
     """Main method called by the eggsecutable."""
@@ -0,0 +1,75 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from pytz import UTC
+
+from services.core.SQLAggregateHistorian.sqlaggregator.aggregator import SQLAggregateHistorian
+from volttron.platform.dbutils.sqlitefuncts import SqlLiteFuncts
+
+TABLE_NAMES = {
+    "data_table": "data",
+    "topics_table": "topics",
+    "meta_table": "meta",
+    "agg_topics_table": "aggregate_topics",
+    "agg_meta_table": "aggregate_meta",
+}
+
+
+class _ClosedSqlLiteFuncts(SqlLiteFuncts):
+    """SqlLiteFuncts recording the thread it was opened in and closed from"""
+
+    def __init__(self, connect_params, table_names):
+        super(_ClosedSqlLiteFuncts, self).__init__(connect_params, table_names)
+        self.opened_in = threading.current_thread()
+        self.closed_in = None
+
+    def close(self):
+        super(_ClosedSqlLiteFuncts, self).close()
+        self.closed_in = threading.current_thread()
+
+
+@pytest.fixture()
+def sql_aggregator(tmp_path):
+    connect_params = {"database": str(tmp_path / "historian.sqlite")}
+    dbfuncts = SqlLiteFuncts(dict(connect_params), TABLE_NAMES)
+    dbfuncts.setup_historian_tables()
+    dbfuncts.setup_aggregate_historian_tables()
+    dbfuncts.insert_data(datetime(2016, 3, 1, 0, 10, tzinfo=UTC), 1, 10.0)
+    dbfuncts.insert_data(datetime(2016, 3, 1, 0, 20, tzinfo=UTC), 2, 20.0)
+    dbfuncts.commit()
+
+    # the agent is created without a platform, only the parts the collection
+    # pool needs are set up
+    aggregator = SQLAggregateHistorian.__new__(SQLAggregateHistorian)
+    aggregator._worker_state = threading.local()
+    aggregator.created = []
+
+    def create_dbfuncts():
+        worker_dbfuncts = _ClosedSqlLiteFuncts(dict(connect_params), TABLE_NAMES)
+        aggregator.created.append(worker_dbfuncts)
+        return worker_dbfuncts
+
+    aggregator._create_dbfuncts = create_dbfuncts
+    aggregator.dbfuncts_class = dbfuncts
+    aggregator.collection_workers = 3
+    aggregator._collection_pool = None
+    yield aggregator
+    dbfuncts.close()
+
+
+def test_stop_collection_pool_should_close_connections_on_their_worker_threads(sql_aggregator):
+    end = datetime(2016, 3, 1, 1, 0, tzinfo=UTC)
+    start = end - timedelta(hours=1)
+    pool = sql_aggregator._get_collection_pool()
+
+    pending = [pool.spawn(sql_aggregator.collect_aggregates, [1, 2], "avg", start, end) for _ in range(3)]
+
+    assert [result.get() for result in pending] == [{1: (10.0, 1), 2: (20.0, 1)}] * 3
+    assert sql_aggregator.created
+    sql_aggregator._stop_collection_pool()
+
+    assert sql_aggregator._collection_pool is None
+    for worker_dbfuncts in sql_aggregator.created:
+        assert worker_dbfuncts.opened_in is not threading.main_thread()
+        assert worker_dbfuncts.closed_in is worker_dbfuncts.opened_in
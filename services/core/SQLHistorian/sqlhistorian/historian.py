@@ -103,6 +103,10 @@ class SQLHistorian(BaseHistorian):
      - :py:mod:`volttron.platform.dbutils.sqlitefuncts`
     """
 
+    # Every publish worker gets its own connection in historian_worker_setup. Topics are split between workers so
+    # the topic and metadata caches are never updated for the same topic from two threads.
+    PARALLEL_PUBLISH_SUPPORT = True
+
     def __init__(self, connection, tables_def=None, **kwargs):
         """Initialise the historian.
 
@@ -137,6 +141,8 @@ class SQLHistorian(BaseHistorian):
         self.topic_id_map = {}
         self.topic_name_map = {}
         self.topic_meta = {}
+        # topic name, as published, to topic id for the topics already checked against the topics table
+        self._published_topic_ids = {}
         self.agg_topic_id_map = {}
         database_type = self.connection['type']
         self.db_functs_class = sqlutils.get_dbfuncts_class(database_type)
@@ -150,9 +156,21 @@ class SQLHistorian(BaseHistorian):
         self.main_thread_dbutils = self.db_functs_class(self.connection['params'], self.table_names)
         # One utils class instance( hence one db connection) for background thread
         # this gets initialized in the bg_thread within historian_setup
+        # publish workers use their own instance, see historian_worker_setup. The
+        # workers are not used if it fails in one of them, so they never fall back
+        # to the instance of the background thread.
+        self._worker_dbutils = threading.local()
         self.bg_thread_dbutils = None
         super(SQLHistorian, self).__init__(**kwargs)
 
+    @property
+    def bg_thread_dbutils(self):
+        return getattr(self._worker_dbutils, 'dbutils', self._bg_thread_dbutils)
+
+    @bg_thread_dbutils.setter
+    def bg_thread_dbutils(self, dbutils):
+        self._bg_thread_dbutils = dbutils
+
     def manage_db_size(self, history_limit_timestamp, storage_limit_gb):
         """
         Optional function to manage database size.
@@ -170,52 +188,35 @@ class SQLHistorian(BaseHistorian):
             with self.bg_thread_dbutils.bulk_insert() as insert_data, \
                 self.bg_thread_dbutils.bulk_insert_meta() as insert_meta:
 
+                published_topic_ids = self._published_topic_ids
+                topic_meta = self.topic_meta
+                separate_meta_table = self.bg_thread_dbutils.topics_table != self.bg_thread_dbutils.meta_table
                 for x in to_publish_list:
-                    ts = x['timestamp']
                     topic = x['topic']
-                    value = x['value']
                     meta = x['meta']
 
-                    # look at the topics that are stored in the database already to see if this topic has a value
-                    lowercase_name = topic.lower()
-                    topic_id = self.topic_id_map.get(lowercase_name, None)
-                    db_topic_name = self.topic_name_map.get(lowercase_name,
-                                                            None)
-                    old_meta = self.topic_meta.get(topic_id, {})
-                    update_topic_meta = True
+                    topic_id = published_topic_ids.get(topic)
+                    meta_written = False
                     if topic_id is None:
-                        # send metadata data too. If topics table contains metadata column too it will get inserted
-                        topic_id = self.bg_thread_dbutils.insert_topic(topic, metadata=meta)
-                        # user lower case topic name when storing in map for case insensitive comparison
-                        self.topic_name_map[lowercase_name] = topic
-                        self.topic_id_map[lowercase_name] = topic_id
-                        update_topic_meta = False
-                    elif db_topic_name != topic:
-                        if old_meta != meta:
-                            _log.debug(f"META HAS CHANGED TOO. old:{old_meta} new:{meta}")
-                            # pass metadata if metadata is stored in topics table metadata will get updated too
-                            # if not will get ignored
-                            self.bg_thread_dbutils.update_topic(topic, topic_id, metadata=meta)
-                            update_topic_meta = False
-                        else:
-                            self.bg_thread_dbutils.update_topic(topic, topic_id)
-                        self.topic_name_map[lowercase_name] = topic
-
-                    if old_meta != meta:
-                        if self.bg_thread_dbutils.topics_table != self.bg_thread_dbutils.meta_table:
-                            # there is a separate metadata table. do bulk insert
-                            _log.debug("meta in separate table")
-                            insert_meta(topic_id, meta)
-                        elif update_topic_meta:
-                            _log.debug(" meta in same table. no topic change only meta changed")
-                            # topic name and metadata are in same table, and metadata has not got into db during insert
-                            # or update of topic so update meta alone in topics table
-                            self.bg_thread_dbutils.update_meta(metadata=meta, topic_id=topic_id)
+                        topic_id, meta_written = self._get_topic_id(topic, meta)
 
+                    # The cache hands out the same meta dict until the metadata of a topic changes
+                    old_meta = topic_meta.get(topic_id, {})
+                    if meta is not old_meta:
+                        if old_meta != meta:
+                            if separate_meta_table:
+                                # there is a separate metadata table. do bulk insert
+                                _log.debug("meta in separate table")
+                                insert_meta(topic_id, meta)
+                            elif not meta_written:
+                                _log.debug(" meta in same table. no topic change only meta changed")
+                                # topic name and metadata are in same table, and metadata has not got into db during
+                                # insert or update of topic so update meta alone in topics table
+                                self.bg_thread_dbutils.update_meta(metadata=meta, topic_id=topic_id)
                         # either way update cache
-                        self.topic_meta[topic_id] = meta
+                        topic_meta[topic_id] = meta
 
-                    if insert_data(ts, topic_id, value):
+                    if insert_data(x['timestamp'], topic_id, x['value']):
                         published += 1
 
             if published:
@@ -243,6 +244,41 @@ class SQLHistorian(BaseHistorian):
             # Raise to the platform so it is logged properly.
             raise
 
+    def _get_topic_id(self, topic, meta):
+        """
+        Look up the id of a topic, inserting the topic or updating the case of its name in the topics table when
+        needed.
+
+        :return: topic id and True if meta was written along with the topic
+        """
+        # look at the topics that are stored in the database already to see if this topic has a value
+        lowercase_name = topic.lower()
+        topic_id = self.topic_id_map.get(lowercase_name, None)
+        db_topic_name = self.topic_name_map.get(lowercase_name, None)
+        meta_written = False
+        if topic_id is None:
+            # send metadata data too. If topics table contains metadata column too it will get inserted
+            topic_id = self.bg_thread_dbutils.insert_topic(topic, metadata=meta)
+            # user lower case topic name when storing in map for case insensitive comparison
+            self.topic_name_map[lowercase_name] = topic
+            self.topic_id_map[lowercase_name] = topic_id
+            meta_written = True
+        elif db_topic_name != topic:
+            old_meta = self.topic_meta.get(topic_id, {})
+            if old_meta != meta:
+                _log.debug(f"META HAS CHANGED TOO. old:{old_meta} new:{meta}")
+                # pass metadata if metadata is stored in topics table metadata will get updated too
+                # if not will get ignored
+                self.bg_thread_dbutils.update_topic(topic, topic_id, metadata=meta)
+                meta_written = True
+            else:
+                self.bg_thread_dbutils.update_topic(topic, topic_id)
+            self.topic_name_map[lowercase_name] = topic
+            # the old spelling has to be renamed again if it is published again
+            self._published_topic_ids.pop(db_topic_name, None)
+        self._published_topic_ids[topic] = topic_id
+        return topic_id, meta_written
+
     @doc_inherit
     def query_topic_list(self):
 
@@ -277,6 +313,17 @@ class SQLHistorian(BaseHistorian):
     @doc_inherit
     def query_historian(self, topic, start=None, end=None, agg_type=None, agg_period=None, skip=0, count=None,
                         order="FIRST_TO_LAST"):
+        return self._query(topic, start, end, agg_type, agg_period, skip, count, order)
+
+    @doc_inherit
+    def query_historian_columnar(self, topic, start=None, end=None, agg_type=None, agg_period=None, skip=0,
+                                 count=None, order="FIRST_TO_LAST"):
+        if not self.db_functs_class.COLUMNAR_QUERY_SUPPORT:
+            return super(SQLHistorian, self).query_historian_columnar(topic, start, end, agg_type, agg_period,
+                                                                      skip, count, order)
+        return self._query(topic, start, end, agg_type, agg_period, skip, count, order, columnar=True)
+
+    def _query(self, topic, start, end, agg_type, agg_period, skip, count, order, columnar=False):
         _log.debug("query_historian Thread is: {}".format(threading.currentThread().getName()))
         results = dict()
         topics_list = []
@@ -313,8 +360,9 @@ class SQLHistorian(BaseHistorian):
 
         _log.debug("Querying db reader with topic_ids {} ".format(topic_ids))
 
+        kwargs = {'columnar': True} if columnar else {}
         values = self.main_thread_dbutils.query(topic_ids, id_name_map, start=start, end=end, agg_type=agg_type,
-                                                agg_period=agg_period, skip=skip, count=count, order=order)
+                                                agg_period=agg_period, skip=skip, count=count, order=order, **kwargs)
         meta_tid = None
         if len(values) > 0:
             # If there are results add metadata if it is a query on a single topic
@@ -331,7 +379,7 @@ class SQLHistorian(BaseHistorian):
                     # this is a query on raw data, get metadata for topic from topic_meta map
                     meta_tid = topic_ids[0]
 
-            if values:
+            if values and (not columnar or multi_topic_query or values['timestamps']):
                 metadata = self.topic_meta.get(meta_tid, {})
                 results = {'values': values, 'metadata': metadata}
             else:
@@ -348,6 +396,7 @@ class SQLHistorian(BaseHistorian):
             self.bg_thread_dbutils.setup_historian_tables()
 
         topic_id_map, topic_name_map = self.bg_thread_dbutils.get_topic_map()
+        self._published_topic_ids = {}
         self.topic_id_map.update(topic_id_map)
         self.topic_name_map.update(topic_name_map)
         self.agg_topic_id_map = self.bg_thread_dbutils.get_agg_topic_map()
@@ -356,6 +405,21 @@ class SQLHistorian(BaseHistorian):
         _log.debug(f"###DEBUG Loaded topics and metadata on start. Len of  topics {len(self.topic_id_map)} "
                    f"Len of metadata: {len(self.topic_meta)}")
 
+    @doc_inherit
+    def historian_worker_setup(self):
+        _log.info("historian_worker_setup on Thread: {}".format(threading.current_thread().name))
+        dbutils = self.db_functs_class(self.connection['params'], self.table_names)
+        # setup_historian_tables of the processing thread found out where metadata is stored
+        dbutils.meta_table = self._bg_thread_dbutils.meta_table
+        self._worker_dbutils.dbutils = dbutils
+
+    @doc_inherit
+    def historian_worker_teardown(self):
+        dbutils = getattr(self._worker_dbutils, 'dbutils', None)
+        if dbutils is not None:
+            del self._worker_dbutils.dbutils
+            dbutils.close()
+
 
 def main(argv=sys.argv):
     """
@@ -1,11 +1,14 @@
 import os
 from shutil import rmtree
 import subprocess
+from unittest import mock
 
 import pytest
 from gevent import sleep
-from datetime import timedelta
+from datetime import datetime, timedelta
+from pytz import UTC
 from services.core.SQLHistorian.sqlhistorian import historian
+from volttron.platform.agent.base_historian import PublishWorkers, rows_to_columns, unpack_columns
 
 CACHE_NAME = "backup.sqlite"
 HISTORIAN_DB = "./data/historian.sqlite"
@@ -62,6 +65,106 @@ def test_historian_should_filter_duplicates(sql_historian):
     assert f"1|duplicate_topic" in query_db("""select * from topics""", HISTORIAN_DB)
 
 
+def test_historian_query_columnar(sql_historian):
+    for num in range(3):
+        sql_historian._capture_record_data(
+            peer=None,
+            sender=None,
+            bus=None,
+            topic="columnar_topic",
+            headers={
+                "Date": f"2020-11-17 21:2{num}:10.189393+00:00",
+                "TimeStamp": f"2020-11-17 21:2{num}:10.189393+00:00",
+            },
+            message=num + 0.5,
+        )
+    sql_historian._retry_period = 1
+    sql_historian._max_time_publishing = timedelta(float(1))
+    sql_historian.start_process_thread()
+    sleep(3)
+
+    rows = sql_historian.query("columnar_topic")
+    columns = sql_historian.query("columnar_topic", format="columnar")
+    packed = sql_historian.query("columnar_topic", format="columnar_packed")
+
+    assert [value for _, value in rows["values"]] == [0.5, 1.5, 2.5]
+    assert columns["values"] == rows_to_columns(rows["values"])
+    assert columns["metadata"] == rows["metadata"]
+    assert isinstance(packed["values"]["values"], str)
+    assert unpack_columns(packed["values"]) == columns["values"]
+    assert sql_historian.query("no_such_topic", format="columnar") == {}
+
+
+def test_publish_to_historian_should_only_write_changed_meta(sql_historian):
+    sql_historian.historian_setup()
+    dbutils = sql_historian.bg_thread_dbutils
+    dbutils.update_meta = update_meta = mock.Mock(wraps=dbutils.update_meta)
+    dbutils.update_topic = update_topic = mock.Mock(wraps=dbutils.update_topic)
+    meta = {"units": "F", "type": "float"}
+
+    def records(topic, meta, second):
+        timestamp = datetime(2020, 6, 1, 12, 30, second, tzinfo=UTC)
+        return [{"timestamp": timestamp, "source": "scrape", "topic": topic, "value": second, "meta": meta}]
+
+    sql_historian.publish_to_historian(records("Campus/Point", meta, 1) + records("Campus/Point", meta, 2))
+    # equal meta in a new dict and then the same dict again
+    sql_historian.publish_to_historian(records("Campus/Point", dict(meta), 3))
+    sql_historian.publish_to_historian(records("Campus/Point", dict(meta), 4))
+    assert update_meta.call_count == 0
+
+    changed = {"units": "C", "type": "float"}
+    sql_historian.publish_to_historian(records("Campus/Point", changed, 5) + records("Campus/Point", changed, 6))
+    assert update_meta.call_count == 1
+
+    sql_historian.publish_to_historian(records("campus/point", changed, 7))
+    sql_historian.publish_to_historian(records("Campus/Point", changed, 8))
+    assert update_topic.call_count == 2
+
+    assert query_db("""select topic_id, topic_name, metadata from topics""", HISTORIAN_DB) == \
+        '1|Campus/Point|{"units": "C", "type": "float"}\n'
+    assert query_db("""select count(*) from data""", HISTORIAN_DB) == "8\n"
+
+
+def test_publish_workers_should_use_their_own_connection(sql_historian):
+    sql_historian.historian_setup()
+    main_dbutils = sql_historian.bg_thread_dbutils
+    timestamp = datetime(2020, 6, 1, 12, 30, tzinfo=UTC)
+    to_publish = [{"_id": i, "timestamp": timestamp + timedelta(seconds=i), "source": "scrape",
+                   "topic": f"Campus/Point{i % 5}", "value": i, "meta": {"units": "F"}} for i in range(50)]
+
+    publish_workers = PublishWorkers(sql_historian, 2)
+    try:
+        assert publish_workers.publish(to_publish) == (set(range(50)), 0)
+    finally:
+        publish_workers.stop()
+
+    assert sql_historian.bg_thread_dbutils is main_dbutils
+    assert query_db("""select count(*) from topics""", HISTORIAN_DB) == "5\n"
+    assert query_db("""select count(*) from data""", HISTORIAN_DB) == "50\n"
+
+
+def test_publish_workers_should_not_start_when_a_connection_fails(sql_historian):
+    sql_historian.historian_setup()
+    db_functs_class = sql_historian.db_functs_class
+    connections = []
+
+    def connect(*args):
+        if connections:
+            raise RuntimeError("too many connections")
+        dbutils = db_functs_class(*args)
+        dbutils.close = mock.Mock(wraps=dbutils.close)
+        connections.append(dbutils)
+        return dbutils
+
+    with mock.patch.object(sql_historian, "db_functs_class", side_effect=connect):
+        with pytest.raises(RuntimeError):
+            PublishWorkers(sql_historian, 2)
+
+    # the worker that connected closed its connection again
+    assert len(connections) == 1
+    connections[0].close.assert_called_once_with()
+
+
 @pytest.fixture()
 def sql_historian():
     config = {"connection": {"type": "sqlite", "params": {"database": HISTORIAN_DB}}}
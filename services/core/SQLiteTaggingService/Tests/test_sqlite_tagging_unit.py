@@ -0,0 +1,73 @@
+from unittest import mock
+
+import pytest
+
+from sqlite.tagging import SQLiteTaggingService
+
+
+@pytest.fixture
+def tagging(tmp_path):
+    agent = SQLiteTaggingService({'type': 'sqlite', 'params': {'database': str(tmp_path / 'tags.sqlite')}},
+                                 query_cache_size=2, identity='test.tagging')
+    agent.vip.health = mock.Mock()
+    agent.setup()
+    agent.load_valid_tags()
+    agent.load_tag_refs()
+    # every pattern is an existing topic prefix
+    agent.get_matching_topic_prefixes_by_pattern = lambda patterns: {p: [p] for p in patterns}
+    agent.insert_topic_tags({'campus1/building1/AHU1': {'equip': True, 'ahu': True, 'dis': 'AHU_1 North'},
+                             'campus1/building1/AHU2': {'equip': True, 'ahu': True, 'dis': 'AHU2'},
+                             'campus1/building1/VAV1': {'equip': True, 'vav': True, 'dis': 'VAV 1'}})
+    yield agent
+    agent.sqlite_utils.close()
+
+
+def test_setup_should_create_tag_value_index(tagging):
+    indexes = tagging.sqlite_utils.select("SELECT name FROM sqlite_master WHERE type='index' AND tbl_name=?",
+                                          ('topic_tags',), fetch_all=True)
+
+    assert ('idx_topic_tags_tag_value',) in indexes
+
+
+@pytest.mark.parametrize("condition, expected", [
+    ("dis LIKE '^ahu'", ['campus1/building1/AHU1', 'campus1/building1/AHU2']),
+    ("dis LIKE '^AHU_1 North$'", ['campus1/building1/AHU1']),
+    ("dis LIKE 'AHU.1'", ['campus1/building1/AHU1']),
+    ("equip AND NOT dis LIKE 'ahu'", ['campus1/building1/VAV1']),
+])
+def test_get_topics_by_tags_should_match_patterns(tagging, condition, expected):
+    assert tagging.get_topics_by_tags(condition=condition) == expected
+
+
+def test_query_topics_by_tags_should_cache_queries_and_results(tagging):
+    ast = ('AND', ('=', 'equip', True), ('LIKE', 'dis', '^AHU'))
+
+    with mock.patch.object(tagging.sqlite_utils, 'get_tagging_query_from_ast',
+                           wraps=tagging.sqlite_utils.get_tagging_query_from_ast) as build_query, \
+            mock.patch.object(tagging.sqlite_utils, 'select', wraps=tagging.sqlite_utils.select) as select:
+        first = tagging.query_topics_by_tags(ast)
+        first.append('changed by caller')
+        assert tagging.query_topics_by_tags(ast) == ['campus1/building1/AHU1', 'campus1/building1/AHU2']
+        assert tagging.query_topics_by_tags(ast, order='LAST_TO_FIRST') == ['campus1/building1/AHU2',
+                                                                            'campus1/building1/AHU1']
+
+    assert build_query.call_count == 1
+    assert select.call_count == 2
+
+
+def test_insert_topic_tags_should_invalidate_results(tagging):
+    ast = ('=', 'ahu', True)
+    assert tagging.query_topics_by_tags(ast) == ['campus1/building1/AHU1', 'campus1/building1/AHU2']
+
+    tagging.insert_topic_tags({'campus1/building1/AHU3': {'equip': True, 'ahu': True}})
+
+    assert tagging.query_topics_by_tags(ast) == ['campus1/building1/AHU1', 'campus1/building1/AHU2',
+                                                 'campus1/building1/AHU3']
+
+
+def test_query_cache_should_be_bounded(tagging):
+    for tag in ('ahu', 'vav', 'equip'):
+        tagging.query_topics_by_tags(('=', tag, True))
+
+    assert list(tagging._query_cache) == [('=', 'vav', True), ('=', 'equip', True)]
+    assert len(tagging._result_cache) == 2
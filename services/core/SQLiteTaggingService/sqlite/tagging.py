@@ -99,12 +99,16 @@ def tagging_service(config_path, **kwargs):
 class SQLiteTaggingService(BaseTaggingService):
     """This is a tagging service agent that writes data to a SQLite database.
     """
-    def __init__(self, connection, table_prefix=None, **kwargs):
+    def __init__(self, connection, table_prefix=None, query_cache_size=128,
+                 **kwargs):
         """Initialise the tagging service.
 
         :param connection: dictionary object containing the database 
         connection details
         :param table_prefix: optional prefix to be used for all tag tables
+        :param query_cache_size: number of tag queries for which the
+                                 generated sql and the query results are
+                                 cached. 0 disables caching
         :param kwargs: additional keyword arguments. (optional identity and
                        topic_replace_list used by parent classes)
         """
@@ -125,6 +129,11 @@ class SQLiteTaggingService(BaseTaggingService):
             self.category_tags_table = table_prefix + "_" + \
                                        self.category_tags_table
         self.sqlite_utils = SqlLiteFuncts(self.connection['params'], None)
+        self.query_cache_size = query_cache_size
+        # ast -> sql query and (ast, skip, count, order) -> topic prefixes.
+        # Results are dropped whenever topic tags are inserted
+        self._query_cache = OrderedDict()
+        self._result_cache = OrderedDict()
 
     @doc_inherit
     def setup(self):
@@ -169,6 +178,7 @@ class SQLiteTaggingService(BaseTaggingService):
                           "have been loaded".format(table_name))
             else:
                 self._init_topic_tags()
+            self._init_topic_tags_indexes()
 
             table_name = self.categories_table
             if self.categories_table in table_names:
@@ -323,6 +333,16 @@ class SQLiteTaggingService(BaseTaggingService):
             self.topic_tags_table + "(tag ASC);")
         self.sqlite_utils.commit()
 
+    def _init_topic_tags_indexes(self):
+        # Tag queries select topic_prefix by tag and value. The primary key
+        # already indexes topic_prefix, this covers the tag and value lookups
+        # of databases created before it was added too
+        self.sqlite_utils.execute_stmt(
+            "CREATE INDEX IF NOT EXISTS idx_{table}_tag_value ON "
+            "{table} (tag, value, topic_prefix);".format(
+                table=self.topic_tags_table))
+        self.sqlite_utils.commit()
+
     @doc_inherit
     def query_categories(self, include_description=False, skip=0, count=None,
                        order="FIRST_TO_LAST"):
@@ -494,6 +514,8 @@ class SQLiteTaggingService(BaseTaggingService):
         result['info'] = dict()
         result['error'] = dict()
         _log.debug("IN INSERT tags {}".format(tags))
+        matching_prefixes = self.get_matching_topic_prefixes_by_pattern(
+            list(tags))
         for topic_pattern, topic_tags in list(tags.items()):
             for tag_name, tag_value in list(topic_tags.items()):
                 if tag_name not in self.valid_tags:
@@ -512,7 +534,7 @@ class SQLiteTaggingService(BaseTaggingService):
                 #                          self.valid_tags[tag_name])
 
             _log.debug("topic pattern is {}".format(topic_pattern))
-            prefixes = self.get_matching_topic_prefixes(topic_pattern)
+            prefixes = matching_prefixes[topic_pattern]
             if not prefixes:
                 result['error'][topic_pattern] = "No matching topic found"
                 continue
@@ -538,13 +560,23 @@ class SQLiteTaggingService(BaseTaggingService):
                     "VALUES (?, ?, ?);".format(self.topic_tags_table),
                 to_db)
             self.sqlite_utils.commit()
+            self._result_cache.clear()
         return result
 
     @doc_inherit
     def query_topics_by_tags(self, ast, skip=0, count=None, order=None):
 
-        query = self.sqlite_utils.get_tagging_query_from_ast(
-            self.topic_tags_table, ast, self.tag_refs)
+        result_key = (ast, skip, count, order)
+        result = self._get_cached(self._result_cache, result_key)
+        if result is not None:
+            _log.debug("#Cached query result: {}".format(result))
+            return list(result)
+
+        query = self._get_cached(self._query_cache, ast)
+        if query is None:
+            query = self.sqlite_utils.get_tagging_query_from_ast(
+                self.topic_tags_table, ast, self.tag_refs)
+            self._set_cached(self._query_cache, ast, query)
         order_by = ' \nORDER BY topic_prefix ASC'
         if order == 'LAST_TO_FIRST':
             order_by = ' \nORDER BY topic_prefix DESC'
@@ -579,8 +611,29 @@ class SQLiteTaggingService(BaseTaggingService):
         if conn:
             conn.close()
         _log.debug("#Query result: {}".format(result))
+        self._set_cached(self._result_cache, result_key, list(result))
         return result
 
+    def _get_cached(self, cache, key):
+        try:
+            value = cache.pop(key)
+        except (KeyError, TypeError):
+            # TypeError for asts with unhashable values
+            return None
+        # move to the end, most recently used
+        cache[key] = value
+        return value
+
+    def _set_cached(self, cache, key, value):
+        if self.query_cache_size <= 0:
+            return
+        try:
+            cache[key] = value
+        except TypeError:
+            return
+        while len(cache) > self.query_cache_size:
+            cache.popitem(last=False)
+
 
 def main(argv=sys.argv):
     """ Main entry point for the agent.
@@ -40,20 +40,118 @@
 
 import copy
 import logging
+import threading
+import time
 from datetime import datetime, timedelta
 
 import pytz
 from abc import abstractmethod
+from gevent.threadpool import ThreadPool
 
 from volttron.platform.agent import utils
 from volttron.platform.agent.known_identities import (PLATFORM_HISTORIAN)
-from volttron.platform.vip.agent import Agent
+from volttron.platform.messaging.health import STATUS_BAD, STATUS_GOOD
+from volttron.platform.vip.agent import Agent, Core
 from volttron.platform.vip.agent.subsystems import RPC
 
 _log = logging.getLogger(__name__)
 __version__ = '1.0'
 
 
+DECOMPOSABLE_AGGREGATIONS = ('avg', 'count', 'max', 'min', 'sum')
+
+
+def combine_aggregates(agg_type, parts):
+    """
+    Combine aggregates computed over disjoint sets of records into the
+    aggregate over all of them.
+
+    :param agg_type: one of :py:data:`DECOMPOSABLE_AGGREGATIONS`
+    :param parts: list of (aggregated value, count) tuples
+    :return: a tuple of (aggregated value, count)
+    """
+    agg_type = agg_type.lower()
+    parts = [(value, count) for value, count in parts if count]
+    count = sum(c for _, c in parts)
+    if not count:
+        return (0 if agg_type == 'count' else None), 0
+    if agg_type == 'avg':
+        return sum(v * c for v, c in parts) / count, count
+    if agg_type in ('count', 'sum'):
+        return sum(v for v, _ in parts), count
+    if agg_type == 'min':
+        return min(v for v, _ in parts), count
+    return max(v for v, _ in parts), count
+
+
+class PartialAggregates(object):
+    """
+    Aggregates already computed for earlier time slices, kept so that the
+    aggregate of a longer time slice can be derived from the slices that tile
+    it (for example an hourly average from four 15 minute averages) instead
+    of re-reading the raw data. Only aggregation types that can be combined
+    from their parts are kept.
+    """
+
+    def __init__(self):
+        # (frozenset(topic_ids), agg_type) -> {start_time: {end_time: (value, count)}}
+        self._partials = {}
+
+    def clear(self):
+        self._partials.clear()
+
+    def add(self, topic_ids, agg_type, start_time, end_time, value, count):
+        agg_type = agg_type.lower()
+        if agg_type not in DECOMPOSABLE_AGGREGATIONS:
+            return
+        partials = self._partials.setdefault((frozenset(topic_ids), agg_type), {})
+        partials.setdefault(start_time, {})[end_time] = (value, count)
+
+    def derive(self, topic_ids, agg_type, start_time, end_time):
+        """
+        Combine the kept aggregates of shorter time slices that exactly tile
+        [start_time, end_time).
+
+        :return: a tuple of (aggregated value, count) or None if the time slice
+                 cannot be derived from kept aggregates
+        """
+        agg_type = agg_type.lower()
+        if agg_type not in DECOMPOSABLE_AGGREGATIONS:
+            return None
+        partials = self._partials.get((frozenset(topic_ids), agg_type))
+        if not partials:
+            return None
+
+        parts = []
+        current = start_time
+        while current < end_time:
+            # An aggregate kept for this very time slice is never reused, it
+            # is recomputed so that data that arrived late gets counted.
+            ends = [end for end in partials.get(current, ())
+                    if end <= end_time and (current, end) != (start_time, end_time)]
+            if not ends:
+                return None
+            end = max(ends)
+            parts.append(partials[current][end])
+            current = end
+        return combine_aggregates(agg_type, parts)
+
+    def prune(self, before):
+        """
+        Forget the aggregates of time slices that ended before the given time.
+        """
+        for key in list(self._partials):
+            partials = self._partials[key]
+            for start_time in list(partials):
+                ends = partials[start_time]
+                for end_time in [end for end in ends if end < before]:
+                    del ends[end_time]
+                if not ends:
+                    del partials[start_time]
+            if not partials:
+                del self._partials[key]
+
+
 class AggregateHistorian(Agent):
     """
     Base agent to aggregate data in historian based on a specific time period.
@@ -68,7 +166,17 @@ class AggregateHistorian(Agent):
     - :py:meth:`insert_aggregate() <AggregateHistorian.insert_aggregate>`
     - :py:meth:`get_aggregation_list() <AggregateHistorian.get_aggregation_list>`
 
+    Subclasses can override
+    :py:meth:`collect_aggregates() <AggregateHistorian.collect_aggregates>` and
+    :py:meth:`insert_aggregates() <AggregateHistorian.insert_aggregates>` to
+    collect and store the aggregates of many topics with one query, and set
+    PARALLEL_COLLECTION_SUPPORT if collect_aggregate and collect_aggregates
+    can be called from several threads at once.
+
     """
+    # True if collect_aggregate/collect_aggregates are safe to call from the
+    # native threads of the collection worker pool
+    PARALLEL_COLLECTION_SUPPORT = False
 
     def __init__(self, config_path, **kwargs):
         """
@@ -83,6 +191,13 @@ class AggregateHistorian(Agent):
         config = utils.load_config(config_path)
         self.topic_id_map = None
         self.aggregate_topic_id_map = None
+        self.incremental_aggregation = False
+        self._pattern_topic_ids = {}
+        self._partial_aggregates = PartialAggregates()
+        self._partial_retention = timedelta(0)
+        self.collection_workers = 1
+        self._collection_pool = None
+        self._collection_stats = {}
 
         self.vip.config.set_default("config", config)
         self.vip.config.subscribe(self.configure, actions=["NEW", "UPDATE"],
@@ -117,6 +232,14 @@ class AggregateHistorian(Agent):
 
         self.topic_id_map, name_map = self.get_topic_map()
         self.agg_topic_id_map = self.get_agg_topic_map()
+        self._pattern_topic_ids = {}
+        self._partial_aggregates.clear()
+        self.incremental_aggregation = bool(
+            config.get('incremental_aggregation', False))
+        self._stop_collection_pool()
+        self._collection_stats = {}
+        self.collection_workers = self._validate_collection_workers(
+            config.get('collection_workers', 1))
         _log.debug("In start of aggregate historian. "
                    "After loading topic and aggregate topic maps")
 
@@ -125,6 +248,16 @@ class AggregateHistorian(Agent):
                 datetime.utcnow()))
             return
 
+        # Keep partial aggregates long enough to derive the longest
+        # configured aggregation period from them
+        periods = [AggregateHistorian.normalize_aggregation_time_period(
+            agg_group['aggregation_period'])
+            for agg_group in config['aggregations']]
+        now = datetime.utcnow().replace(tzinfo=pytz.utc)
+        self._partial_retention = max(
+            now - AggregateHistorian.compute_aggregation_time_slice(
+                now, period, False)[0] for period in periods)
+
         for agg_group in config['aggregations']:
             # 1. Validate and normalize aggregation period and
             # initialize use_calendar_periods flag
@@ -155,6 +288,18 @@ class AggregateHistorian(Agent):
         _log.debug("End of onstart method - current time{}".format(
             datetime.utcnow()))
 
+    @Core.receiver("onstop")
+    def _stop_collection(self, sender, **kwargs):
+        self._stop_collection_pool()
+
+    @staticmethod
+    def _validate_collection_workers(collection_workers):
+        collection_workers = int(collection_workers)
+        if collection_workers < 1:
+            raise ValueError("collection_workers should be an integer greater "
+                             "than 0. Got {}".format(collection_workers))
+        return collection_workers
+
     @staticmethod
     def parse_table_def(tables_def):
         default_table_def = {"table_prefix": "",
@@ -220,11 +365,8 @@ class AggregateHistorian(Agent):
             else:
                 # Find if the topic_name patterns result in any topics
                 # at all. If it does log them as info
-                topic_map = self.vip.rpc.call(
-                    PLATFORM_HISTORIAN,
-                    "get_topics_by_pattern",
-                    topic_pattern=topic_pattern).get()
-                if topic_map is None or len(topic_map) == 0:
+                topic_map = self._get_topics_by_pattern(topic_pattern)
+                if not topic_map:
                     raise ValueError(
                         "Please provide a valid topic_name or "
                         "topic_name_pattern for aggregation_period {}. "
@@ -310,10 +452,16 @@ class AggregateHistorian(Agent):
         This method in turn calls the platform historian's
         - :py:method:`get_topics_by_pattern()` <BaseHistorian.get_topics_by_pattern>
 
+        only when new topics appeared since a pattern was last resolved,
         and the following methods implemented by child classes:
 
+        - :py:meth:`collect_aggregates() <AggregateHistorian.collect_aggregates>`
         - :py:meth:`collect_aggregate() <AggregateHistorian.collect_aggregate>`
-        - :py:meth:`insert_aggregate() <AggregateHistorian.insert_aggregate>`
+        - :py:meth:`insert_aggregates() <AggregateHistorian.insert_aggregates>`
+
+        Points are collected together, see
+        :py:meth:`_collect_aggregates`, and the timing of every run is
+        reported in the agent's health status context.
 
         :param collection_time:  time of aggregation collection
         :param param agg_time_period: time agg_time_period for which data
@@ -338,6 +486,7 @@ class AggregateHistorian(Agent):
             "{} use_calendar={}".format(agg_time_period, use_calendar_periods))
         _log.debug("points passed as arg  {} ".format(points))
 
+        collection_started = time.monotonic()
         start_time, end_time = \
             AggregateHistorian.compute_aggregation_time_slice(
                 collection_time, agg_time_period, use_calendar_periods)
@@ -346,6 +495,12 @@ class AggregateHistorian(Agent):
                 "After  compute agg_time_period = {} start_time {} end_time "
                 "{} ".format(agg_time_period, start_time, end_time))
             schedule_next = True
+            if any(data.get('topic_name_pattern') for data in points):
+                self._refresh_topic_map()
+            if self.incremental_aggregation:
+                self._partial_aggregates.prune(
+                    end_time - self._partial_retention)
+            collected = []
             for data in points:
                 _log.debug("data in loop {}".format(data))
                 topic_ids = data.get('topic_ids', None)
@@ -366,31 +521,35 @@ class AggregateHistorian(Agent):
                                     data['aggregation_type'].lower(),
                                     agg_time_period))
                     schedule_next = False
-                    break  # break out of for loop and move to finally block
+                    break  # stop collecting for the points that follow
 
                 if topic_pattern:
                     # Find topic ids that match the pattern at runtime
-                    topic_map = self.vip.rpc.call(
-                        PLATFORM_HISTORIAN,
-                        "get_topics_by_pattern",
-                        topic_pattern=topic_pattern).get()
+                    topic_map = self._get_topics_by_pattern(topic_pattern)
                     _log.debug("Found topics for pattern {}".format(topic_map))
                     if topic_map:
                         topic_ids = list(topic_map.values())
                         _log.debug("topic ids loaded {} ".format(topic_ids))
                     else:
                         _log.warning("Skipping recording of aggregate data for {topic} "
-                                     "between {start_time} and {end_time} as ".format(
+                                     "between {start_time} and {end_time} as no topics "
+                                     "match the pattern".format(
                                         topic=topic_pattern,
                                         start_time=start_time,
                                         end_time=end_time))
-                        return
-
-                agg_value, count = self.collect_aggregate(
-                    topic_ids,
-                    data['aggregation_type'],
-                    start_time,
-                    end_time)
+                        continue
+                collected.append((data, aggregate_topic_id, topic_ids))
+
+            results, query_count = self._collect_aggregates(
+                [(data['aggregation_type'], topic_ids)
+                 for data, _, topic_ids in collected],
+                start_time, end_time)
+
+            # aggregates of one type and period go to the same table
+            to_insert = {}
+            for (data, aggregate_topic_id, topic_ids), (agg_value, count) in \
+                    zip(collected, results):
+                topic_pattern = data.get('topic_name_pattern', None)
                 if count == 0:
                     _log.warning("No records found for topic {topic} between {start_time} and {end_time}".format(
                         topic=topic_pattern if topic_pattern else
@@ -405,15 +564,21 @@ class AggregateHistorian(Agent):
                                     end_time=end_time,
                                     count=data.get('min_count', 0)))
                 else:
-                    _log.debug("data is {} aggg_time_period is {}".format(data, agg_time_period))
-                    _log.debug(" topic id map {}".format(self.agg_topic_id_map))
-                    self.insert_aggregate(aggregate_topic_id,
-                                          data['aggregation_type'],
-                                          agg_time_period,
-                                          end_time,
-                                          agg_value,
-                                          topic_ids)
-
+                    to_insert.setdefault(data['aggregation_type'], []).append(
+                        (aggregate_topic_id, agg_value, topic_ids))
+            for agg_type, rows in to_insert.items():
+                _log.debug("Inserting {} {} aggregates for aggregation "
+                           "period {}".format(len(rows), agg_type,
+                                              agg_time_period))
+                self.insert_aggregates(agg_type, agg_time_period, end_time,
+                                       rows)
+
+            self._report_collection(agg_time_period, end_time, len(collected),
+                                    query_count,
+                                    time.monotonic() - collection_started)
+        except Exception as e:
+            self._report_collection_failure(agg_time_period, end_time, e)
+            raise
         finally:
             if schedule_next:
                 collection_time = AggregateHistorian.compute_next_collection_time(
@@ -428,6 +593,186 @@ class AggregateHistorian(Agent):
                                            points)
                 _log.debug("After Scheduling next collection.{}".format(event))
 
+    def _refresh_topic_map(self):
+        """
+        Reload the topic map and forget resolved topic name patterns if
+        topics were added or renamed since the last load.
+        """
+        topic_id_map, _ = self.get_topic_map()
+        if topic_id_map != self.topic_id_map:
+            _log.debug("Topics changed, resolving topic name patterns again")
+            self.topic_id_map = topic_id_map
+            self._pattern_topic_ids = {}
+
+    def _get_topics_by_pattern(self, topic_pattern):
+        """
+        Resolve a topic name pattern through the platform historian. Results
+        are cached until :py:meth:`_refresh_topic_map` sees new topics.
+
+        :return: dictionary of {topic_name: topic_id}
+        """
+        topic_map = self._pattern_topic_ids.get(topic_pattern)
+        if topic_map is None:
+            topic_map = self.vip.rpc.call(
+                PLATFORM_HISTORIAN,
+                "get_topics_by_pattern",
+                topic_pattern=topic_pattern).get() or {}
+            self._pattern_topic_ids[topic_pattern] = topic_map
+        return topic_map
+
+    def _collect_aggregates(self, aggregations, start_time, end_time):
+        """
+        Compute the aggregates of a time slice for several points with as few
+        queries as possible.
+
+        When incremental_aggregation is enabled an aggregate is first derived
+        from the kept aggregates of shorter time slices. The rest are grouped
+        by aggregation type and collected with one
+        :py:meth:`collect_aggregates() <AggregateHistorian.collect_aggregates>`
+        query per type. Aggregates across several topics are combined from the
+        per topic results when the aggregation type allows it and collected
+        with :py:meth:`collect_aggregate() <AggregateHistorian.collect_aggregate>`
+        otherwise. Queries run on the collection worker pool when
+        collection_workers is greater than 1.
+
+        :param aggregations: list of (agg_type, topic_ids) tuples
+        :param start_time: start time of the time slice (inclusive)
+        :param end_time: end time of the time slice (exclusive)
+        :return: a tuple of (list of (aggregated value, count) in the order of
+                 aggregations, number of queries run)
+        """
+        results = [None] * len(aggregations)
+        grouped = {}
+        single = []
+        for index, (agg_type, topic_ids) in enumerate(aggregations):
+            if self.incremental_aggregation:
+                results[index] = self._partial_aggregates.derive(
+                    topic_ids, agg_type, start_time, end_time)
+                if results[index] is not None:
+                    continue
+            if len(topic_ids) == 1 or \
+                    agg_type.lower() in DECOMPOSABLE_AGGREGATIONS:
+                grouped.setdefault(agg_type, []).append(index)
+            else:
+                single.append(index)
+
+        queries = []
+        for agg_type, indexes in grouped.items():
+            topic_ids = sorted({topic_id for index in indexes
+                                for topic_id in aggregations[index][1]})
+            queries.append((self.collect_aggregates,
+                            (topic_ids, agg_type, start_time, end_time)))
+        for index in single:
+            agg_type, topic_ids = aggregations[index]
+            queries.append((self.collect_aggregate,
+                            (topic_ids, agg_type, start_time, end_time)))
+
+        pool = self._get_collection_pool()
+        if pool is None:
+            query_results = [query(*args) for query, args in queries]
+        else:
+            pending = [pool.spawn(query, *args) for query, args in queries]
+            query_results = [result.get() for result in pending]
+
+        for (agg_type, indexes), by_topic in zip(grouped.items(),
+                                                 query_results):
+            for index in indexes:
+                topic_ids = aggregations[index][1]
+                if len(topic_ids) == 1:
+                    empty = (0 if agg_type.lower() == 'count' else None, 0)
+                    results[index] = by_topic.get(topic_ids[0], empty)
+                else:
+                    results[index] = combine_aggregates(
+                        agg_type, [by_topic[topic_id] for topic_id in topic_ids
+                                   if topic_id in by_topic])
+        for index, result in zip(single, query_results[len(grouped):]):
+            results[index] = result
+
+        if self.incremental_aggregation:
+            for (agg_type, topic_ids), (value, count) in zip(aggregations,
+                                                             results):
+                self._partial_aggregates.add(topic_ids, agg_type, start_time,
+                                             end_time, value, count)
+        return results, len(queries)
+
+    def _get_collection_pool(self):
+        """
+        :return: the thread pool queries run on, None if they run in the
+                 calling greenlet
+        """
+        if self.collection_workers < 2:
+            return None
+        if not self.PARALLEL_COLLECTION_SUPPORT:
+            _log.warning("collection_workers is set to {} but {} does not "
+                         "support parallel collection. Queries will run "
+                         "one at a time".format(self.collection_workers,
+                                                self.__class__.__name__))
+            self.collection_workers = 1
+            return None
+        if self._collection_pool is None:
+            self._collection_pool = ThreadPool(self.collection_workers)
+        return self._collection_pool
+
+    def _stop_collection_pool(self):
+        pool, self._collection_pool = self._collection_pool, None
+        if pool is None:
+            return
+        # Run collection_worker_stopping once on every worker thread. The
+        # barrier keeps a thread that is done from picking up a second call.
+        barrier = threading.Barrier(pool.maxsize)
+
+        def stop_worker():
+            try:
+                self.collection_worker_stopping()
+            finally:
+                barrier.wait()
+
+        pending = [pool.spawn(stop_worker) for _ in range(pool.maxsize)]
+        for result in pending:
+            try:
+                result.get()
+            except Exception as e:
+                _log.error("Error stopping collection worker: {}".format(e))
+        pool.kill()
+
+    def _report_collection(self, agg_time_period, end_time, point_count,
+                           query_count, duration):
+        """
+        Record the timing of the latest collection of the aggregation period
+        in the agent's health status context.
+        """
+        self._collection_stats[agg_time_period] = {
+            'end_time': utils.format_timestamp(end_time),
+            'points': point_count,
+            'queries': query_count,
+            'seconds': round(duration, 3)}
+        _log.debug("Collected {} aggregates for aggregation period {} with {} "
+                   "queries in {:.3f} seconds".format(point_count,
+                                                      agg_time_period,
+                                                      query_count, duration))
+        self._set_collection_status()
+
+    def _report_collection_failure(self, agg_time_period, end_time, error):
+        """
+        Record the failure of the latest collection of the aggregation period
+        and set the agent's health status to bad.
+        """
+        self._collection_stats[agg_time_period] = {
+            'end_time': utils.format_timestamp(end_time),
+            'error': repr(error)}
+        _log.error("Collection of aggregates for aggregation period {} "
+                   "failed: {!r}".format(agg_time_period, error))
+        self._set_collection_status()
+
+    def _set_collection_status(self):
+        # The status stays bad until the latest collection of every
+        # aggregation period succeeded.
+        failed = any('error' in stats
+                     for stats in self._collection_stats.values())
+        self.vip.health.set_status(
+            STATUS_BAD if failed else STATUS_GOOD,
+            {'aggregation_periods': dict(self._collection_stats)})
+
     @abstractmethod
     def get_topic_map(self):
         """
@@ -524,6 +869,49 @@ class AggregateHistorian(Agent):
         """
         pass
 
+    def collect_aggregates(self, topic_ids, agg_type, start_time, end_time):
+        """
+        Collect the aggregate of every topic separately. Subclasses should
+        override this to query all topics at once, the default calls
+        :py:meth:`collect_aggregate() <AggregateHistorian.collect_aggregate>`
+        once per topic.
+
+        :param topic_ids: list of topic ids
+        :param agg_type: type of aggregation
+        :param start_time: start time for query (inclusive)
+        :param end_time:  end time for query (exclusive)
+        :return: dictionary of {topic_id: (aggregated value, count)}. Topics
+                 without records in the time range may be left out
+        """
+        return {topic_id: self.collect_aggregate([topic_id], agg_type,
+                                                 start_time, end_time)
+                for topic_id in topic_ids}
+
+    def insert_aggregates(self, agg_type, agg_time_period, end_time, rows):
+        """
+        Insert the aggregates collected for several aggregate topics for the
+        same time period. Subclasses should override this to write all rows
+        at once, the default calls
+        :py:meth:`insert_aggregate() <AggregateHistorian.insert_aggregate>`
+        once per row.
+
+        :param agg_type: type of aggregation
+        :param agg_time_period: The time period of aggregation
+        :param end_time: end time used for query records that got aggregated
+        :param rows: list of (agg_topic_id, value, topic_ids) tuples
+        """
+        for agg_topic_id, value, topic_ids in rows:
+            self.insert_aggregate(agg_topic_id, agg_type, agg_time_period,
+                                  end_time, value, topic_ids)
+
+    def collection_worker_stopping(self):
+        """
+        Called on each collection worker thread before the worker pool is
+        stopped so that subclasses can release resources, such as database
+        connections, they opened in that thread.
+        """
+        pass
+
     def is_supported_aggregation(self, agg_type):
         """
         Checks if the given aggregation is supported by the historian's
@@ -194,6 +194,10 @@ Querying Data
 
 - When an request is made to query data the
   :py:meth:`BaseQueryHistorianAgent.query_historian` method is called.
+- Large results can be read in bounded chunks with the `query_open`,
+  `query_next` and `query_close` RPC calls (see :py:func:`query_chunks`).
+  They page through the data by calling
+  :py:meth:`BaseQueryHistorianAgent.query_historian` with a bounded count.
 - When a request is made for the list of topics in the store
   :py:meth:`BaseQueryHistorianAgent.query_topic_list` will be called.
 - When a request is made to get the metadata of a topic
@@ -215,27 +219,34 @@ the same date over again.
 
 
 
+import base64
 import logging
 import sqlite3
+import sys
 import threading
+import uuid
 import weakref
 from queue import Queue, Empty
 from abc import abstractmethod
+from array import array
 from collections import defaultdict
 from datetime import datetime, timedelta
 from threading import Thread
 
 import gevent
 from gevent import get_hub
+from gevent.monkey import get_original
 from functools import wraps
 
 import pytz
 import re
 from dateutil.parser import parse
 from volttron.platform.agent.base_aggregate_historian import AggregateHistorian
+from volttron.platform.agent.known_identities import PLATFORM_HISTORIAN
 from volttron.platform.agent.utils import process_timestamp, \
-    fix_sqlite3_datetime, get_aware_utc_now, parse_timestamp_string
+    fix_sqlite3_datetime, get_aware_utc_now, parse_timestamp_string, get_utc_microseconds_from_epoch
 from volttron.platform.messaging import topics, headers as headers_mod
+from volttron.platform.messaging.envelope import is_batch, unpack_batch
 from volttron.platform.vip.agent import *
 from volttron.platform.vip.agent import compat
 from volttron.platform.vip.agent.subsystems.query import Query
@@ -312,6 +323,22 @@ STATUS_KEY_PUBLISHING = "publishing"
 STATUS_KEY_CACHE_FULL = "cache_full"
 STATUS_KEY_TIME_ERROR = "records_with_invalid_timestamp"
 STATUS_KEY_CACHE_ONLY = "cache_only_enabled"
+STATUS_KEY_FAILED_PUBLISH_WORKERS = "failed_publish_workers"
+
+# Journal modes supported for the backup cache. WAL trades the durability of
+# the last few transactions on power loss for much higher insert throughput.
+BACKUP_JOURNAL_MODES = ("DELETE", "WAL")
+
+# Default number of (timestamp, value) rows returned by query_next
+DEFAULT_QUERY_CHUNK_SIZE = 1000
+# Seconds an unused query cursor is kept before it is discarded
+QUERY_CURSOR_TIMEOUT = 300
+
+# Result formats of the query RPC call
+QUERY_FORMAT_ROWS = "rows"
+QUERY_FORMAT_COLUMNAR = "columnar"
+QUERY_FORMAT_COLUMNAR_PACKED = "columnar_packed"
+QUERY_FORMATS = (QUERY_FORMAT_ROWS, QUERY_FORMAT_COLUMNAR, QUERY_FORMAT_COLUMNAR_PACKED)
 
 
 class BaseHistorianAgent(Agent):
@@ -341,14 +368,23 @@ class BaseHistorianAgent(Agent):
     before publishing it to the historian.  This allows recovery for
     unexpected happenings before the successful writing of data to the
     historian.
+
+    Historians that set PARALLEL_PUBLISH_SUPPORT can be configured with more
+    than one publish worker. Records read from the cache are then split by
+    topic between worker threads calling publish_to_historian concurrently.
     """
 
+    # True if publish_to_historian can be called from several threads at once,
+    # each thread having called historian_worker_setup first.
+    PARALLEL_PUBLISH_SUPPORT = False
+
     def __init__(self,
                  retry_period=300.0,
                  submit_size_limit=1000,
                  max_time_publishing=30.0,
                  backup_storage_limit_gb=None,
                  backup_storage_report=0.9,
+                 backup_journal_mode="DELETE",
                  topic_replace_list=[],
                  gather_timing_data=False,
                  readonly=False,
@@ -367,6 +403,7 @@ class BaseHistorianAgent(Agent):
                  time_tolerance=None,
                  time_tolerance_topics=None,
                  cache_only_enabled=False,
+                 publish_workers=1,
                  **kwargs):
 
         super(BaseHistorianAgent, self).__init__(**kwargs)
@@ -385,15 +422,23 @@ class BaseHistorianAgent(Agent):
 
         self._backup_storage_limit_gb = backup_storage_limit_gb
         self._backup_storage_report = backup_storage_report
+        self._backup_journal_mode = self._validate_journal_mode(backup_journal_mode)
         self._retry_period = float(retry_period)
         self._submit_size_limit = int(submit_size_limit)
         self._max_time_publishing = float(max_time_publishing)
         self._history_limit_days = history_limit_days
         self._storage_limit_gb = storage_limit_gb
         self._successful_published = set()
+        # Holds the records reported as handled in publish worker threads
+        self._publish_worker_state = threading.local()
+        self._publish_workers = self._validate_publish_workers(publish_workers)
         # Remove the need to reset subscriptions to eliminate possible data
         # loss at config change.
         self._current_subscriptions = set()
+        # (prefix, capture callback) of the captured topics, records of batch envelopes are routed through them.
+        self._capture_prefixes = self._get_capture_prefixes(
+            self._get_capture_subscriptions(capture_device_data, capture_log_data, capture_analysis_data,
+                                            capture_record_data, []))
         self._topic_replace_map = {}
         self._event_queue = gevent.queue.Queue() if self._process_loop_in_greenlet else Queue()
         self._readonly = bool(readonly)
@@ -435,6 +480,7 @@ class BaseHistorianAgent(Agent):
                                 "max_time_publishing": self._max_time_publishing,
                                 "backup_storage_limit_gb": self._backup_storage_limit_gb,
                                 "backup_storage_report": self._backup_storage_report,
+                                "backup_journal_mode": self._backup_journal_mode,
                                 "topic_replace_list": self._topic_replace_list,
                                 "gather_timing_data": self.gather_timing_data,
                                 "readonly": self._readonly,
@@ -450,7 +496,8 @@ class BaseHistorianAgent(Agent):
                                 "all_platforms": self._all_platforms,
                                 "time_tolerance": self._time_tolerance,
                                 "time_tolerance_topics": self._time_tolerance_topics,
-                                "cache_only_enabled": self._cache_only_enabled
+                                "cache_only_enabled": self._cache_only_enabled,
+                                "publish_workers": self._publish_workers
                                }
 
         self.vip.config.set_default("config", self._default_config)
@@ -530,6 +577,9 @@ class BaseHistorianAgent(Agent):
             else:
                 backup_storage_report = 0.9
 
+            backup_journal_mode = self._validate_journal_mode(config.get("backup_journal_mode", "DELETE"))
+            publish_workers = self._validate_publish_workers(config.get("publish_workers", 1))
+
             retry_period = float(config.get("retry_period", 300.0))
 
             storage_limit_gb = config.get("storage_limit_gb")
@@ -586,6 +636,8 @@ class BaseHistorianAgent(Agent):
         self.gather_timing_data = gather_timing_data
         self._backup_storage_limit_gb = backup_storage_limit_gb
         self._backup_storage_report = backup_storage_report
+        self._backup_journal_mode = backup_journal_mode
+        self._publish_workers = publish_workers
         self._retry_period = retry_period
         self._submit_size_limit = submit_size_limit
         self._max_time_publishing = timedelta(seconds=max_time_publishing)
@@ -632,13 +684,12 @@ class BaseHistorianAgent(Agent):
                                     capture_analysis_data,
                                     capture_record_data,
                                     custom_topics_list):
-        subscriptions = [
-            (capture_device_data, topics.DRIVER_TOPIC_BASE, self._capture_device_data),
-            (capture_log_data, topics.LOGGER_BASE, self._capture_log_data),
-            (capture_analysis_data, topics.ANALYSIS_TOPIC_BASE, self._capture_analysis_data),
-            (capture_record_data, topics.RECORD_BASE, self._capture_record_data)
-        ]
-        subscriptions.extend(custom_topics_list)
+        subscriptions = self._get_capture_subscriptions(capture_device_data, capture_log_data,
+                                                        capture_analysis_data, capture_record_data,
+                                                        custom_topics_list)
+        self._capture_prefixes = self._get_capture_prefixes(subscriptions)
+        # batch envelopes published by ForwardHistorians of other platforms
+        subscriptions.append((not self.no_insert, topics.FORWARDED_BATCH, self._capture_batch_envelope))
         for should_sub, prefix, cb in subscriptions:
             if should_sub and not self._readonly:
                 if prefix not in self._current_subscriptions:
@@ -662,6 +713,26 @@ class BaseHistorianAgent(Agent):
                     except (gevent.Timeout, Exception) as e:
                         _log.error("Failed to unsubscribe from {}: {}".format(prefix, repr(e)))
 
+    def _get_capture_subscriptions(self, capture_device_data,
+                                         capture_log_data,
+                                         capture_analysis_data,
+                                         capture_record_data,
+                                         custom_topics_list):
+        subscriptions = [
+            (capture_device_data, topics.DRIVER_TOPIC_BASE, self._capture_device_data),
+            (capture_log_data, topics.LOGGER_BASE, self._capture_log_data),
+            (capture_analysis_data, topics.ANALYSIS_TOPIC_BASE, self._capture_analysis_data),
+            (capture_record_data, topics.RECORD_BASE, self._capture_record_data)
+        ]
+        subscriptions.extend(custom_topics_list)
+        return subscriptions
+
+    @staticmethod
+    def _get_capture_prefixes(subscriptions):
+        """Return (prefix, callback) of the enabled subscriptions, longest prefix first."""
+        return sorted(((prefix, cb) for should_sub, prefix, cb in subscriptions if should_sub),
+                      key=lambda prefix_cb: len(prefix_cb[0]), reverse=True)
+
     def configure(self, configuration):
         """Optional, may be implemented by a concrete implementation to add support for the configuration store.
         Values should be stored in this function only.
@@ -675,8 +746,11 @@ class BaseHistorianAgent(Agent):
     def insert(self, records):
         """RPC method to allow remote inserts to the local cache
 
-        :param records: List of items to be added to the local event queue
-        :type records: list of dictionaries
+        :param records: List of items to be added to the local event queue,
+                        or a batch envelope of them (see
+                        :py:mod:`volttron.platform.messaging.envelope`).
+                        Both are inserted the same way.
+        :type records: list of dictionaries or dict
         """
 
         # This is for Forward Historians which do not support data mover inserts.
@@ -684,8 +758,38 @@ class BaseHistorianAgent(Agent):
             raise RuntimeError("Insert not supported by this historian.")
 
         rpc_peer = self.vip.rpc.context.vip_message.peer
-        _log.debug("insert called by {} with {} records".format(rpc_peer, len(records)))
+        if is_batch(records):
+            records = unpack_batch(records)
+            _log.debug("insert called by {} with a batch of {} records".format(rpc_peer, len(records)))
+        else:
+            _log.debug("insert called by {} with {} records".format(rpc_peer, len(records)))
+        self._insert_records(records)
+
+    def _capture_batch_envelope(self, peer, sender, bus, topic, headers, message):
+        if not is_batch(message):
+            _log.error("Invalid batch envelope published by {} on {}".format(sender, topic))
+            return
+        try:
+            records = unpack_batch(message)
+        except Exception as e:
+            _log.error("Invalid batch envelope published by {} on {}: {}".format(sender, topic, e))
+            return
+        self._capture_batch_records(records, peer, sender, bus)
 
+    def _capture_batch_records(self, records, peer, sender, bus):
+        """Capture the records of a batch envelope published on forwarded/batch the historian would have captured if
+        they had been published one by one, records of topics that are not captured are dropped."""
+        for r in records:
+            record_topic = r['topic']
+            for prefix, capture_func in self._capture_prefixes:
+                if record_topic.startswith(prefix):
+                    capture_func(peer=peer, sender=sender, bus=bus,
+                                 topic=record_topic, headers=r['headers'], message=r['message'])
+                    break
+            else:
+                _log.debug("Dropping batched record of topic {} that is not captured".format(record_topic))
+
+    def _insert_records(self, records):
         for r in records:
             topic = r['topic']
             headers = r['headers']
@@ -1056,6 +1160,20 @@ class BaseHistorianAgent(Agent):
                                'meta': {},
                                'headers': headers})
 
+    @staticmethod
+    def _validate_publish_workers(publish_workers):
+        publish_workers = int(publish_workers)
+        if publish_workers < 1:
+            raise ValueError("publish_workers should be at least 1")
+        return publish_workers
+
+    @staticmethod
+    def _validate_journal_mode(journal_mode):
+        journal_mode = str(journal_mode).upper()
+        if journal_mode not in BACKUP_JOURNAL_MODES:
+            raise ValueError(f"backup_journal_mode should be one of {BACKUP_JOURNAL_MODES}")
+        return journal_mode
+
     @staticmethod
     def _get_status_from_context(context):
         status = STATUS_GOOD
@@ -1119,7 +1237,11 @@ class BaseHistorianAgent(Agent):
             return
 
         backupdb = BackupDatabase(self, self._backup_storage_limit_gb,
-                                  self._backup_storage_report)
+                                  self._backup_storage_report,
+                                  journal_mode=self._backup_journal_mode)
+        worker_count = self._publish_worker_count()
+        publish_workers = None
+        submit_size_limit = self._submit_size_limit * worker_count
         self._update_status({STATUS_KEY_CACHE_COUNT: backupdb.get_backlog_count()})
 
         # now that everything is setup we need to make sure that the topics
@@ -1182,16 +1304,21 @@ class BaseHistorianAgent(Agent):
                 # if setup failed earlier, try again.
                 self._historian_setup()
 
+            if not self._setup_failed and worker_count > 1 and publish_workers is None:
+                publish_workers = self._start_publish_workers(worker_count)
+                if publish_workers is None:
+                    # try again after the retry period
+                    wait_for_input = True
+
             # if setup was successful proceed to publish loop
-            if not self._setup_failed:
+            if not self._setup_failed and (worker_count == 1 or publish_workers):
                 wait_for_input = True
                 start_time = datetime.utcnow()
 
                 while True:
                     # use local variable that will be written only one time during this loop
                     cache_only_enabled = self.is_cache_only_enabled()
-                    to_publish_list = backupdb.get_outstanding_to_publish(
-                        self._submit_size_limit)
+                    to_publish_list = backupdb.get_outstanding_to_publish(submit_size_limit)
 
                     # Check to see if we are caught up.
                     if not to_publish_list:
@@ -1212,8 +1339,13 @@ class BaseHistorianAgent(Agent):
                         last_time_stamp = last_element["timestamp"]
                         history_limit_timestamp = last_time_stamp - self._history_limit_days
 
+                    failed_workers = 0
                     try:
-                        if not cache_only_enabled:
+                        if cache_only_enabled:
+                            pass
+                        elif publish_workers:
+                            self._successful_published, failed_workers = publish_workers.publish(to_publish_list)
+                        else:
                             self.publish_to_historian(to_publish_list)
                         self.manage_db_size(history_limit_timestamp, self._storage_limit_gb)
                     except:
@@ -1224,7 +1356,10 @@ class BaseHistorianAgent(Agent):
                     # them from the database and we are probably having connection problems.
                     # Update the status and send alert accordingly.
                     if not self._successful_published and not cache_only_enabled:
-                        self._send_alert({STATUS_KEY_PUBLISHING: False}, "historian_not_publishing")
+                        state = {STATUS_KEY_PUBLISHING: False}
+                        if publish_workers:
+                            state[STATUS_KEY_FAILED_PUBLISH_WORKERS] = failed_workers
+                        self._send_alert(state, "historian_not_publishing")
                         break
 
                     # _successful_published is set when publish_to_historian is called to the concrete
@@ -1232,14 +1367,21 @@ class BaseHistorianAgent(Agent):
                     # the _successful_published will be set().  Therefore we don't need to wrap
                     # this call with check of cache_only_enabled
                     backupdb.remove_successfully_published(
-                            self._successful_published, self._submit_size_limit)
+                            self._successful_published, submit_size_limit)
 
                     backlog_count = backupdb.get_backlog_count()
                     old_backlog_state = self._current_status_context[STATUS_KEY_BACKLOGGED]
-                    self._update_status({STATUS_KEY_PUBLISHING: True,
-                                         STATUS_KEY_BACKLOGGED: old_backlog_state and backlog_count > 0,
-                                         STATUS_KEY_CACHE_COUNT: backlog_count,
-                                         STATUS_KEY_CACHE_ONLY: cache_only_enabled})
+                    state = {STATUS_KEY_PUBLISHING: not failed_workers,
+                             STATUS_KEY_BACKLOGGED: old_backlog_state and backlog_count > 0,
+                             STATUS_KEY_CACHE_COUNT: backlog_count,
+                             STATUS_KEY_CACHE_ONLY: cache_only_enabled}
+                    if publish_workers:
+                        state[STATUS_KEY_FAILED_PUBLISH_WORKERS] = failed_workers
+                    if failed_workers:
+                        # the records of the other workers are published, but not all of the batch
+                        self._send_alert(state, "historian_partially_publishing")
+                    else:
+                        self._update_status(state)
 
                     if None in self._successful_published:
                         current_published_count += len(to_publish_list)
@@ -1265,6 +1407,8 @@ class BaseHistorianAgent(Agent):
             if self._stop_process_loop:
                 break
 
+        if publish_workers:
+            publish_workers.stop()
         backupdb.close()
 
         try:
@@ -1275,6 +1419,23 @@ class BaseHistorianAgent(Agent):
         _log.debug("Process loop stopped.")
         self._stop_process_loop = False
 
+    def _start_publish_workers(self, worker_count):
+        # started once the historian is set up so workers can rely on what historian_setup loaded
+        _log.info(f"Starting {worker_count} publish workers")
+        try:
+            return PublishWorkers(self, worker_count)
+        except Exception:
+            _log.exception("Failed to start publish workers!")
+            self._send_alert({STATUS_KEY_PUBLISHING: False}, "historian_not_publishing")
+            return None
+
+    def _publish_worker_count(self):
+        if self._publish_workers > 1 and (not self.PARALLEL_PUBLISH_SUPPORT or self._process_loop_in_greenlet):
+            _log.warning(f"{type(self).__name__} does not support parallel publishing, "
+                         f"ignoring publish_workers={self._publish_workers}")
+            return 1
+        return self._publish_workers
+
     def _historian_setup(self):
         try:
             _log.info("Trying to setup historian")
@@ -1298,11 +1459,13 @@ class BaseHistorianAgent(Agent):
         :param record: Record or list of records to remove from cache.
         :type record: dict or list
         """
+        successful_published = getattr(self._publish_worker_state, "successful_published",
+                                       self._successful_published)
         if isinstance(record, list):
             for x in record:
-                self._successful_published.add(x['_id'])
+                successful_published.add(x['_id'])
         else:
-            self._successful_published.add(record['_id'])
+            successful_published.add(record['_id'])
 
     def report_all_handled(self):
         """
@@ -1311,7 +1474,7 @@ class BaseHistorianAgent(Agent):
         :py:meth:`BaseHistorianAgent.publish_to_historian`
         have been successfully published and should be removed from the cache.
         """
-        self._successful_published.add(None)
+        getattr(self._publish_worker_state, "successful_published", self._successful_published).add(None)
 
     @abstractmethod
     def publish_to_historian(self, to_publish_list):
@@ -1351,6 +1514,11 @@ class BaseHistorianAgent(Agent):
         the way the cache
         treats meta data.
 
+        Records of the same topic share one `meta` dictionary, which is only
+        replaced when the meta data of the topic changes. Historians can use
+        `meta is previous_meta` to skip comparing unchanged meta data and
+        must not modify it.
+
         Once one or more records are published either
         :py:meth:`BaseHistorianAgent.report_all_handled` or
         :py:meth:`BaseHistorianAgent.report_handled` must be called to
@@ -1371,6 +1539,19 @@ class BaseHistorianAgent(Agent):
         arrives from the config store.
         """
 
+    def historian_worker_setup(self):
+        """
+        Optional setup routine, run in every publish worker thread before it
+        calls publish_to_historian. Only used by historians that set
+        PARALLEL_PUBLISH_SUPPORT, to open the connections of the worker.
+        """
+
+    def historian_worker_teardown(self):
+        """
+        Optional teardown routine, run in every publish worker thread when
+        the workers are stopped with the processing loop.
+        """
+
 #TODO: Finish this.
 # from collections import deque
 #
@@ -1442,9 +1623,12 @@ class BackupDatabase:
     Historian implementors do not need to use this class. It is for internal
     use only.
     """
+    # Conservative estimate of the bytes a cached record adds to the database
+    # on top of its value, headers and source, including the ts index entry.
+    _RECORD_OVERHEAD_BYTES = 128
 
     def __init__(self, owner, backup_storage_limit_gb, backup_storage_report,
-                 check_same_thread=True):
+                 check_same_thread=True, journal_mode="DELETE"):
         # The topic cache is only meant as a local lookup and should not be
         # accessed via the implemented historians.
         self._backup_cache = {}
@@ -1452,10 +1636,17 @@ class BackupDatabase:
         self._record_count = 0
         self.time_error_records = False
         self._meta_data = defaultdict(dict)
+        # Copies of _meta_data handed out with the cached records, replaced
+        # when the metadata of the topic changes.
+        self._meta_snapshots = {}
         self._owner = weakref.ref(owner)
         self._backup_storage_limit_gb = backup_storage_limit_gb
         self._backup_storage_report = backup_storage_report
+        self._journal_mode = journal_mode
         self._connection = None
+        # Upper bound of the database size in pages, only refreshed from the
+        # page_count pragma when it crosses the report threshold.
+        self._estimated_pages = 0
         self._setupdb(check_same_thread)
         self._dupe_ids = []
         self._unique_ids = []
@@ -1471,6 +1662,11 @@ class BackupDatabase:
         #_log.debug("Backing up unpublished values.")
         c = self._connection.cursor()
         self.time_error_records = False # will update at the end of the method
+        outstanding = []
+        time_errors = []
+        # all the points of a device publish share one headers dict, only serialize it once
+        header_strings = {}
+        added_bytes = 0
         for item in new_publish_list:
             if item is None:
                 continue
@@ -1485,139 +1681,79 @@ class BackupDatabase:
             if topic_id is None:
                 c.execute('''INSERT INTO topics values (?,?)''',
                           (None, topic))
-                c.execute('''SELECT last_insert_rowid()''')
-                row = c.fetchone()
-                topic_id = row[0]
+                topic_id = c.lastrowid
                 self._backup_cache[topic_id] = topic
                 self._backup_cache[topic] = topic_id
 
             meta_dict = self._meta_data[(source, topic_id)]
-            for name, value in meta.items():
-                current_meta_value = meta_dict.get(name)
-                if current_meta_value != value:
-                    c.execute('''INSERT OR REPLACE INTO metadata
-                                 values(?, ?, ?, ?)''',
-                              (source, topic_id, name, value))
-                    meta_dict[name] = value
-
+            # metadata rarely changes, compare all of it at once before looking for the changed items
+            if meta and not meta.items() <= meta_dict.items():
+                for name, value in meta.items():
+                    current_meta_value = meta_dict.get(name)
+                    if current_meta_value != value:
+                        c.execute('''INSERT OR REPLACE INTO metadata
+                                     values(?, ?, ?, ?)''',
+                                  (source, topic_id, name, value))
+                        meta_dict[name] = value
+                self._meta_snapshots.pop((source, topic_id), None)
+
+            header_string = header_strings.get(id(headers))
+            if header_string is None:
+                header_string = header_strings[id(headers)] = dumps(headers)
             # Check outside loop so that we do the check inside loop only if necessary
-            if time_tolerance_check:
+            if time_tolerance_check and headers.get("time_error"):
                 for timestamp, value in readings:
                     if timestamp is None:
-                        timestamp = get_aware_utc_now()
-                    elif headers["time_error"]:
+                        outstanding.append((get_aware_utc_now(), source, topic_id, dumps(value), header_string))
+                    else:
                         _log.warning(f"Found data with timestamp {timestamp} that is out of configured tolerance ")
-                        c.execute(
-                            '''INSERT INTO time_error
-                            values(NULL, ?, ?, ?, ?, ?)''',
-                            (timestamp, source, topic_id, dumps(value), dumps(headers)))
-                        self.time_error_records = True
-                        continue  # continue to the next record. don't record in outstanding
-                    try:
-                        c.execute(
-                            '''INSERT INTO outstanding
-                            values(NULL, ?, ?, ?, ?, ?)''',
-                            (timestamp, source, topic_id, dumps(value), dumps(headers)))
-                        self._record_count += 1
-                    except sqlite3.IntegrityError as e:
-                        # In the case where we are upgrading an existing installed historian the
-                        # unique constraint may still exist on the outstanding database.
-                        # Ignore this case.
-                        _log.warning(f"sqlite3.Integrity error -- {e}")
-                        pass
+                        # don't record in outstanding
+                        time_errors.append((timestamp, source, topic_id, dumps(value), header_string))
             else:
                 for timestamp, value in readings:
                     if timestamp is None:
                         timestamp = get_aware_utc_now()
-                    try:
-                        c.execute(
-                            '''INSERT INTO outstanding
-                            values(NULL, ?, ?, ?, ?, ?)''',
-                            (timestamp, source, topic_id, dumps(value), dumps(headers)))
-                        self._record_count += 1
-                    except sqlite3.IntegrityError as e:
-                        # In the case where we are upgrading an existing installed historian the
-                        # unique constraint may still exist on the outstanding database.
-                        # Ignore this case.
-                        _log.warning(f"sqlite3.Integrity error -- {e}")
-                        pass
+                    outstanding.append((timestamp, source, topic_id, dumps(value), header_string))
+
+        if time_errors:
+            c.executemany('''INSERT INTO time_error
+                             values(NULL, ?, ?, ?, ?, ?)''', time_errors)
+            self.time_error_records = True
+
+        if outstanding:
+            # In the case where we are upgrading an existing installed historian the
+            # unique constraint may still exist on the outstanding database.
+            # Those records are skipped.
+            c.executemany('''INSERT OR IGNORE INTO outstanding
+                             values(NULL, ?, ?, ?, ?, ?)''', outstanding)
+            if c.rowcount < len(outstanding):
+                _log.warning(f"Skipped {len(outstanding) - c.rowcount} records violating a constraint "
+                             f"of the outstanding table")
+            self._record_count += c.rowcount
 
         cache_full = False
         if self._backup_storage_limit_gb is not None:
-            try:
-                def page_count():
-                    c.execute("PRAGMA page_count")
-                    return c.fetchone()[0]
-
-                def free_count():
-                    c.execute("PRAGMA freelist_count")
-                    return c.fetchone()[0]
-
-                p = page_count()
-                f = free_count()
-
-                # check if we are over the alert threshold.
-                if page_count() >= self.max_pages - int(self.max_pages * (1.0 - self._backup_storage_report)):
-                    cache_full = True
-
-                # Now check if we are above the limit, if so start deleting in batches of 100
-                # page count doesnt update even after deleting all records
-                # and record count becomes zero. If we have deleted all record
-                # exit.
-                # _log.debug(f"record count before check is {self._record_count} page count is {p}"
-                #            f" free count is {f}")
-                # max_pages  gets updated based on inserts but freelist_count doesn't
-                # enter delete loop based on page_count
-                min_free_pages = p - self.max_pages
-                error_record_count = 0
-                get_error_count_from_db = True
-                while p > self.max_pages:
-                    cache_full = True
-                    if time_tolerance_check and get_error_count_from_db:
-                        # if time_tolerance_check is enabled and this the first time
-                        # we get into this loop, get the count from db
-                        c.execute("SELECT count(ts) from time_error")
-                        error_record_count = c.fetchone()[0]
-                        get_error_count_from_db = False # after this we will reduce count as we delete
-                    if error_record_count > 0:
-                        # if time_error table has records, try deleting those first before outstanding table
-                        _log.info("cache size exceeded limit Deleting data from time_error")
-                        c.execute(
-                            '''DELETE FROM time_error
-                            WHERE ROWID IN
-                            (SELECT ROWID FROM time_error
-                            ORDER BY ROWID ASC LIMIT 100)''')
-                        error_record_count -= c.rowcount
-                    else:
-                        # error record count is 0, sp set time_error_records to False
-                        self.time_error_records = False
-                        _log.info("cache size exceeded limit Deleting data from outstanding")
-                        c.execute(
-                            '''DELETE FROM outstanding
-                            WHERE ROWID IN
-                            (SELECT ROWID FROM outstanding
-                            ORDER BY ROWID ASC LIMIT 100)''')
-                        if self._record_count < c.rowcount:
-                            self._record_count = 0
-                        else:
-                            self._record_count -= c.rowcount
-                    p = page_count()  # page count doesn't reflect delete without commit
-                    f = free_count()  # freelist count does. So using that to break from loop
-                    if f >= min_free_pages:
-                        break
-                    _log.debug(f" Cleaning cache since we are over the limit. "
-                               f"After delete of 100 records from cache"
-                               f" record count is {self._record_count} time_error record count is {error_record_count} "
-                               f"page count is {p} freelist count is{f}")
-
-            except Exception:
-                _log.exception(f"Exception when checking page count and deleting")
+            for record in outstanding:
+                added_bytes += len(record[1]) + len(record[3]) + len(record[4])
+            for record in time_errors:
+                added_bytes += len(record[1]) + len(record[3]) + len(record[4])
+            added_bytes += (len(outstanding) + len(time_errors)) * self._RECORD_OVERHEAD_BYTES
+            self._estimated_pages += added_bytes / self._page_size
+            # Only look at the real size of the database when the estimate says
+            # we may be over the alert threshold.
+            if self._estimated_pages >= self._report_pages:
+                cache_full = self._enforce_storage_limit(c, time_tolerance_check)
 
         try:
             self._connection.commit()
         except Exception:
             _log.exception(f"Exception in committing after back db storage")
 
+        if cache_full:
+            # deletes are only reflected in page_count after the commit
+            c.execute("PRAGMA page_count")
+            self._estimated_pages = c.fetchone()[0]
+
         if time_tolerance_check and not self.time_error_records:
             # No time error records in this batch. Check if there are records from earlier inserts
             # that admin hasn't dealt with yet.
@@ -1626,6 +1762,99 @@ class BackupDatabase:
                 self.time_error_records = True
         return cache_full
 
+    def _enforce_storage_limit(self, c, time_tolerance_check):
+        """
+        Check the size of the cache against the configured limit and delete
+        the oldest records while it is over the limit.
+
+        :returns: True if the cache is over the alert threshold
+        """
+        cache_full = False
+        try:
+            def page_count():
+                c.execute("PRAGMA page_count")
+                return c.fetchone()[0]
+
+            def free_count():
+                c.execute("PRAGMA freelist_count")
+                return c.fetchone()[0]
+
+            p = page_count()
+            f = free_count()
+            self._estimated_pages = p
+
+            # check if we are over the alert threshold.
+            if p >= self._report_pages:
+                cache_full = True
+
+            # Now check if we are above the limit, if so start deleting in batches of 100
+            # page count doesnt update even after deleting all records
+            # and record count becomes zero. If we have deleted all record
+            # exit.
+            # _log.debug(f"record count before check is {self._record_count} page count is {p}"
+            #            f" free count is {f}")
+            # max_pages  gets updated based on inserts but freelist_count doesn't
+            # enter delete loop based on page_count
+            min_free_pages = p - self.max_pages
+            error_record_count = 0
+            get_error_count_from_db = True
+            while p > self.max_pages:
+                cache_full = True
+                if time_tolerance_check and get_error_count_from_db:
+                    # if time_tolerance_check is enabled and this the first time
+                    # we get into this loop, get the count from db
+                    c.execute("SELECT count(ts) from time_error")
+                    error_record_count = c.fetchone()[0]
+                    get_error_count_from_db = False # after this we will reduce count as we delete
+                if error_record_count > 0:
+                    # if time_error table has records, try deleting those first before outstanding table
+                    _log.info("cache size exceeded limit Deleting data from time_error")
+                    c.execute(
+                        '''DELETE FROM time_error
+                        WHERE ROWID IN
+                        (SELECT ROWID FROM time_error
+                        ORDER BY ROWID ASC LIMIT 100)''')
+                    error_record_count -= c.rowcount
+                else:
+                    # error record count is 0, sp set time_error_records to False
+                    self.time_error_records = False
+                    _log.info("cache size exceeded limit Deleting data from outstanding")
+                    c.execute(
+                        '''DELETE FROM outstanding
+                        WHERE ROWID IN
+                        (SELECT ROWID FROM outstanding
+                        ORDER BY ROWID ASC LIMIT 100)''')
+                    if self._record_count < c.rowcount:
+                        self._record_count = 0
+                    else:
+                        self._record_count -= c.rowcount
+                p = page_count()  # page count doesn't reflect delete without commit
+                f = free_count()  # freelist count does. So using that to break from loop
+                if f >= min_free_pages:
+                    break
+                _log.debug(f" Cleaning cache since we are over the limit. "
+                           f"After delete of 100 records from cache"
+                           f" record count is {self._record_count} time_error record count is {error_record_count} "
+                           f"page count is {p} freelist count is{f}")
+
+        except Exception:
+            _log.exception(f"Exception when checking page count and deleting")
+        return cache_full
+
+    @staticmethod
+    def _id_ranges(ids):
+        """
+        Group ids into (first, last) ranges of consecutive integers so they can
+        be deleted with one range statement each.
+        """
+        ranges = []
+        for _id in sorted(ids):
+            if ranges and _id == ranges[-1][1] + 1:
+                ranges[-1][1] = _id
+            elif not ranges or _id != ranges[-1][1]:
+                ranges.append([_id, _id])
+        return ranges
+
     def remove_successfully_published(self, successful_publishes,
                                       submit_size):
         """
@@ -1645,21 +1874,17 @@ class BackupDatabase:
         c = self._connection.cursor()
         try:
             if None in successful_publishes:
-                c.executemany('''DELETE FROM outstanding
-                                          WHERE id = ?''',
-                              ((_id,) for _id in self._unique_ids))
-                if self._record_count < c.rowcount:
-                    self._record_count = 0
-                else:
-                    self._record_count -= len(self._unique_ids)
+                ids = self._unique_ids
+            else:
+                ids = successful_publishes
+            # records are read in ts order so published ids are mostly consecutive
+            c.executemany('''DELETE FROM outstanding
+                             WHERE id BETWEEN ? AND ?''',
+                          self._id_ranges(ids))
+            if self._record_count < c.rowcount:
+                self._record_count = 0
             else:
-                temp = list(successful_publishes)
-                temp.sort()
-                c.executemany('''DELETE FROM outstanding
-                                WHERE id = ?''',
-                              ((_id,) for _id in
-                               successful_publishes))
-                self._record_count -= len(temp)
+                self._record_count -= c.rowcount
         finally:
             # if we don't clear these attributes on every publish, we could possibly delete a non-existing record on the next publish
             self._unique_ids.clear()
@@ -1672,6 +1897,10 @@ class BackupDatabase:
         Retrieve up to `size_limit` records from the cache. Guarantees a unique list of records,
         where unique is defined as (topic, timestamp).
 
+        Records of a topic share the same 'meta' dict until the metadata of
+        the topic changes, so an unchanged 'meta' is the same object from one
+        call to the next. It must not be modified.
+
         :param size_limit: Max number of records to retrieve.
         :type size_limit: int
         :returns: List of records for publication.
@@ -1689,7 +1918,9 @@ class BackupDatabase:
             topic_id = row[3]
             value = loads(row[4])
             headers = {} if row[5] is None else loads(row[5])
-            meta = self._meta_data[(source, topic_id)].copy()
+            meta = self._meta_snapshots.get((source, topic_id))
+            if meta is None:
+                meta = self._meta_snapshots[(source, topic_id)] = self._meta_data[(source, topic_id)].copy()
             topic = self._backup_cache[topic_id]
 
             # check for duplicates before appending row to results
@@ -1751,9 +1982,12 @@ class BackupDatabase:
 
         if self._backup_storage_limit_gb is not None:
             c.execute('''PRAGMA page_size''')
-            page_size = c.fetchone()[0]
+            self._page_size = c.fetchone()[0]
             max_storage_bytes = self._backup_storage_limit_gb * 1024 ** 3
-            self.max_pages = max_storage_bytes / page_size
+            self.max_pages = max_storage_bytes / self._page_size
+            self._report_pages = self.max_pages - int(self.max_pages * (1.0 - self._backup_storage_report))
+            c.execute("PRAGMA page_count")
+            self._estimated_pages = c.fetchone()[0]
             _log.debug(f"Max pages is {self.max_pages}")
 
         c.execute("SELECT name FROM sqlite_master WHERE type='table' "
@@ -1855,10 +2089,18 @@ class BackupDatabase:
                 self._backup_cache[row[0]] = row[1]
                 self._backup_cache[row[1]] = row[0]
 
-        c.close()
-
         self._connection.commit()
 
+        # Set last, auto_vacuum can no longer be enabled once the database is in WAL mode.
+        c.execute(f"PRAGMA journal_mode = {self._journal_mode}")
+        _log.debug(f"Backup DB journal mode is {c.fetchone()[0]}")
+        if self._journal_mode == "WAL":
+            # Commits in WAL mode only sync the log at checkpoints, an
+            # application crash still loses no committed record.
+            c.execute("PRAGMA synchronous = NORMAL")
+
+        c.close()
+
 
 # Code reimplemented from https://github.com/gilesbrown/gsqlite3
 def _using_threadpool(method):
@@ -1883,6 +2125,105 @@ for method in [BackupDatabase.get_outstanding_to_publish,
     setattr(AsyncBackupDatabase, method.__name__, _using_threadpool(method))
 
 
+# grequests monkey patches the queue module, publish workers block on a queue between native threads.
+_ThreadQueue = get_original('queue', 'Queue')
+
+
+class PublishWorkers(object):
+    """Threads calling publish_to_historian of a historian concurrently.
+
+    Records are split by topic so all records of a topic in a batch are
+    published by a single worker in their order. publish blocks until all
+    workers are done with their part, so the next batch, whose parts may go
+    to other workers, is only published after it. It returns the ids of the
+    records that were reported as handled and the number of parts that
+    failed.
+
+    Every worker has to set up with historian_worker_setup before the pool
+    is used, if one of them fails the whole pool is stopped and a
+    RuntimeError is raised.
+    """
+
+    def __init__(self, historian, count):
+        self.historian = historian
+        self.count = count
+        self._tasks = _ThreadQueue()
+        self._ready = _ThreadQueue()
+        self._threads = [Thread(target=self._run, name="publish-worker-{}".format(i), daemon=True)
+                         for i in range(count)]
+        for thread in self._threads:
+            thread.start()
+
+        errors = [error for error in (self._ready.get() for _ in self._threads) if error is not None]
+        if errors:
+            self.stop()
+            raise RuntimeError("Setup of {} of {} publish workers failed".format(len(errors), count)) from errors[0]
+
+    def partition(self, to_publish_list):
+        partitions = [[] for _ in range(self.count)]
+        for record in to_publish_list:
+            partitions[hash(record['topic'].lower()) % self.count].append(record)
+        return [p for p in partitions if p]
+
+    def publish(self, to_publish_list):
+        results = _ThreadQueue()
+        partitions = self.partition(to_publish_list)
+        for records in partitions:
+            self._tasks.put((records, results))
+
+        handled = set()
+        failed = 0
+        for _ in partitions:
+            records, successful_published, error = results.get()
+            if None in successful_published:
+                handled.update(x['_id'] for x in records)
+            else:
+                handled.update(successful_published)
+            if error or not successful_published:
+                failed += 1
+        return handled, failed
+
+    def stop(self):
+        for _ in self._threads:
+            self._tasks.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _run(self):
+        historian = self.historian
+        try:
+            historian.historian_worker_setup()
+        except Exception as e:
+            _log.exception("An exception occurred during publish worker setup.")
+            self._ready.put(e)
+        else:
+            self._ready.put(None)
+            self._publish_tasks()
+
+        try:
+            historian.historian_worker_teardown()
+        except Exception:
+            _log.exception("An exception occurred during publish worker teardown.")
+
+    def _publish_tasks(self):
+        historian = self.historian
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                break
+            records, results = task
+            historian._publish_worker_state.successful_published = successful_published = set()
+            error = False
+            try:
+                historian.publish_to_historian(records)
+            except Exception:
+                _log.exception("An unhandled exception occurred while publishing.")
+                error = True
+            finally:
+                del historian._publish_worker_state.successful_published
+                results.put((records, successful_published, error))
+
+
 class BaseQueryHistorianAgent(Agent):
     """This is the base agent for historian Agents that support querying of
     their data stores.
@@ -1899,10 +2240,11 @@ class BaseQueryHistorianAgent(Agent):
                 for d in os.listdir(os.getcwd()):
                     if d.endswith(".agent-data"):
                         agent_data_dir = os.path.join(os.getcwd(), d)
-                time_parser = yacc.yacc(write_tables=0,
+                time_parser = yacc.yacc(write_tables=0, debug=False,
                                         outputdir=agent_data_dir)
             else:
-                time_parser = yacc.yacc(write_tables=0)
+                time_parser = yacc.yacc(write_tables=0, debug=False)
+        self._query_cursors = {}
         super(BaseQueryHistorianAgent, self).__init__(**kwargs)
 
     @RPC.export
@@ -2025,7 +2367,8 @@ class BaseQueryHistorianAgent(Agent):
 
     @RPC.export
     def query(self, topic=None, start=None, end=None, agg_type=None,
-              agg_period=None, skip=0, count=None, order="FIRST_TO_LAST"):
+              agg_period=None, skip=0, count=None, order="FIRST_TO_LAST",
+              format=QUERY_FORMAT_ROWS):
         """RPC call to query an Historian for time series data.
 
         :param topic: Topic or topics to query for.
@@ -2044,9 +2387,11 @@ class BaseQueryHistorianAgent(Agent):
                          aggregation ( for example, sum, avg)
         :param agg_period: If this is a query for aggregate data, the time
                            period of aggregation
+        :param format: "rows" (the default), "columnar" or "columnar_packed".
         :type skip: int
         :type count: int
         :type order: str
+        :type format: str
 
         :return: Results of the query
         :rtype: dict
@@ -2073,8 +2418,132 @@ class BaseQueryHistorianAgent(Agent):
         specify one hour ago.
         "now -1d -1h -20m" would specify 25 hours and 20 minutes ago.
 
+        With format="columnar" the (timestamp, value) list of every topic is
+        replaced by parallel lists and the timestamps are integer
+        microseconds since the epoch (UTC):
+
+        .. code-block:: python
+
+            {
+                "values": {"timestamps": [<epoch microseconds1>, ...],
+                           "values": [value1, ...]},
+                "metadata": {...}
+            }
+
+        format="columnar_packed" returns the same columns packed with
+        :py:func:`pack_columns`. Use :py:func:`unpack_columns` or, with numpy,
+        ``numpy.frombuffer(base64.b64decode(column), "<i8")`` to read them.
+
+        """
+        if format not in QUERY_FORMATS:
+            raise ValueError("Invalid query format {}. Valid formats are {}".format(format, QUERY_FORMATS))
+
+        start, end, agg_period = self._parse_query_arguments(topic, start, end, agg_type, agg_period)
+
+        if format == QUERY_FORMAT_ROWS:
+            results = self.query_historian(topic, start, end, agg_type,
+                                           agg_period, skip, count, order)
+        else:
+            results = self.query_historian_columnar(topic, start, end, agg_type,
+                                                    agg_period, skip, count, order)
+            values = results.get("values")
+            if format == QUERY_FORMAT_COLUMNAR_PACKED and values:
+                if isinstance(values.get("timestamps"), list):
+                    results["values"] = pack_columns(values)
+                else:
+                    results["values"] = {name: pack_columns(columns) for name, columns in values.items()}
+        metadata = results.get("metadata", None)
+        values = results.get("values", None)
+        if values and metadata is None:
+            results['metadata'] = {}
+
+        return results
+
+    @RPC.export
+    def query_open(self, topic=None, start=None, end=None, agg_type=None,
+                   agg_period=None, skip=0, count=None, order="FIRST_TO_LAST",
+                   chunk_size=DEFAULT_QUERY_CHUNK_SIZE):
+        """RPC call to open a cursor on the result of a query.
+
+        Takes the same arguments as :py:meth:`query` plus the number of rows
+        returned by each :py:meth:`query_next` call. The cursor is discarded
+        once the last chunk has been read, when :py:meth:`query_close` is
+        called or after QUERY_CURSOR_TIMEOUT seconds without use.
+
+        :param chunk_size: Maximum number of (timestamp, value) rows in a
+                           chunk, across all topics.
+        :type chunk_size: int
+        :return: Continuation token to pass to query_next/query_close
+        :rtype: str
+        """
+        start, end, agg_period = self._parse_query_arguments(topic, start, end, agg_type, agg_period)
+        if not isinstance(chunk_size, int) or chunk_size < 1:
+            raise ValueError("chunk_size must be a positive integer")
+
+        self._expire_query_cursors()
+        token = str(uuid.uuid4())
+        self._query_cursors[token] = QueryCursor(self.query_historian, topic, start, end, agg_type, agg_period,
+                                                 skip, count, order, chunk_size)
+        return token
+
+    @RPC.export
+    def query_next(self, cursor):
+        """RPC call to read the next chunk of a query opened with
+        :py:meth:`query_open`.
+
+        :param cursor: token returned by query_open
+        :type cursor: str
+        :return: next chunk of the result
+
+        Return values will have the following form:
+
+        .. code-block:: python
+
+            {
+                "values": {topic_name: [(<timestamp string1>, value1), ...],
+                           ...},
+                "metadata": {topic_name: {"key1": value1, ...}, ...},
+                "done": False
+            }
+
+        A topic with more rows than fit in a chunk continues in the next
+        chunk. The metadata of a topic is sent with its first rows. "done"
+        is True for the last chunk, after which the cursor is closed.
+        """
+        self._expire_query_cursors()
+        try:
+            query_cursor = self._query_cursors[cursor]
+        except KeyError:
+            raise ValueError("Unknown or expired query cursor {}".format(cursor))
+        result = query_cursor.next_chunk()
+        if result['done']:
+            del self._query_cursors[cursor]
+        return result
+
+    @RPC.export
+    def query_close(self, cursor):
+        """RPC call to discard a query cursor before all of it was read.
+
+        :param cursor: token returned by query_open
+        :type cursor: str
+        :return: True if the cursor was open
+        :rtype: bool
+        """
+        return self._query_cursors.pop(cursor, None) is not None
+
+    def _expire_query_cursors(self):
+        oldest = get_aware_utc_now() - timedelta(seconds=QUERY_CURSOR_TIMEOUT)
+        for token in [t for t, c in self._query_cursors.items() if c.last_used < oldest]:
+            _log.debug("Discarding unused query cursor {}".format(token))
+            del self._query_cursors[token]
+
+    def _parse_query_arguments(self, topic, start, end, agg_type, agg_period):
         """
+        Validate the arguments of a query and convert start and end to
+        aware datetimes.
 
+        :return: start, end, normalized agg_period
+        """
         if topic is None:
             raise TypeError('"Topic" required')
 
@@ -2110,13 +2579,27 @@ class BaseQueryHistorianAgent(Agent):
         if start:
             _log.debug("start={}".format(start))
 
+        return start, end, agg_period
+
+    def query_historian_columnar(self, topic, start=None, end=None, agg_type=None,
+                                 agg_period=None, skip=0, count=None,
+                                 order="FIRST_TO_LAST"):
+        """
+        Same as :py:meth:`query_historian` but the (timestamp, value) list of
+        each topic is returned as {"timestamps": [...], "values": [...]} with
+        timestamps in microseconds since the epoch.
+
+        The default implementation converts the result of
+        :py:meth:`query_historian`. Historians that can read the timestamps
+        from their data store without formatting them should override it.
+        """
         results = self.query_historian(topic, start, end, agg_type,
                                        agg_period, skip, count, order)
-        metadata = results.get("metadata", None)
-        values = results.get("values", None)
-        if values and metadata is None:
-            results['metadata'] = {}
-
+        values = results.get("values")
+        if isinstance(values, dict):
+            results["values"] = {name: rows_to_columns(rows) for name, rows in values.items()}
+        elif values is not None:
+            results["values"] = rows_to_columns(values)
         return results
 
     @abstractmethod
@@ -2188,6 +2671,194 @@ class BaseQueryHistorianAgent(Agent):
         """
 
 
+class QueryCursor(object):
+    """
+    Reads the result of a query in chunks of at most chunk_size rows.
+
+    Every chunk is read with bounded calls to query_historian, one topic at
+    a time. The next call resumes after the timestamp of the last row
+    returned (keyset pagination on the time index of the data store), so no
+    database cursor or transaction stays open between two chunks.
+    """
+
+    def __init__(self, query_historian, topic, start, end, agg_type, agg_period, skip, count, order,
+                 chunk_size=DEFAULT_QUERY_CHUNK_SIZE):
+        self._query_historian = query_historian
+        self._topics = [topic] if isinstance(topic, str) else list(topic)
+        self._start = start
+        self._end = end
+        self._agg_type = agg_type
+        self._agg_period = agg_period
+        self._skip = skip or 0
+        self._count = count if count is not None and count >= 0 else None
+        self._order = order
+        self._chunk_size = chunk_size
+        self._index = -1
+        self._next_topic()
+        self.last_used = get_aware_utc_now()
+
+    def _next_topic(self):
+        self._index += 1
+        self._page_start = self._start
+        self._page_end = self._end
+        self._page_skip = self._skip
+        self._remaining = self._count
+        self._first_page = True
+
+    @property
+    def done(self):
+        return self._index >= len(self._topics)
+
+    def next_chunk(self):
+        self.last_used = get_aware_utc_now()
+        values = {}
+        metadata = {}
+        rows = 0
+        while not self.done and rows < self._chunk_size:
+            topic = self._topics[self._index]
+            limit = self._chunk_size - rows
+            if self._remaining is not None:
+                limit = min(limit, self._remaining)
+            if limit <= 0:
+                self._next_topic()
+                continue
+
+            result = self._query_historian(topic, self._page_start, self._page_end, self._agg_type,
+                                           self._agg_period, self._page_skip, limit, self._order)
+            page = result.get('values') or []
+            if isinstance(page, dict):
+                page = page.get(topic, [])
+            if self._first_page:
+                metadata[topic] = result.get('metadata') or {}
+                self._first_page = False
+            if page:
+                values.setdefault(topic, []).extend(page)
+                rows += len(page)
+            if self._remaining is not None:
+                self._remaining -= len(page)
+
+            if len(page) < limit or self._remaining == 0 or (self._start and self._start == self._end):
+                self._next_topic()
+            else:
+                self._resume_after(page)
+
+        return {'values': values, 'metadata': metadata, 'done': self.done}
+
+    def _resume_after(self, page):
+        last_ts = page[-1][0]
+        ties = 0
+        for ts, _ in reversed(page):
+            if ts != last_ts:
+                break
+            ties += 1
+        if ties == len(page):
+            # every row shares one timestamp, stay on the same bounds
+            self._page_skip += ties
+            return
+        # rows sharing the last timestamp were already returned and must be skipped
+        last = parse_timestamp_string(last_ts)
+        if last.tzinfo is None:
+            last = last.replace(tzinfo=pytz.UTC)
+        if self._order == "LAST_TO_FIRST":
+            # end is exclusive
+            self._page_end = last + timedelta(microseconds=1)
+        else:
+            self._page_start = last
+        self._page_skip = ties
+
+
+def rows_to_columns(rows):
+    """
+    Convert a list of (timestamp string, value) rows to the columnar format.
+
+    :param rows: rows as returned by query_historian
+    :return: {"timestamps": [epoch microseconds, ...], "values": [...]}
+    """
+    timestamps = []
+    values = []
+    for ts, value in rows:
+        timestamps.append(get_utc_microseconds_from_epoch(parse_timestamp_string(ts)))
+        values.append(value)
+    return {"timestamps": timestamps, "values": values}
+
+
+def _to_base64(column):
+    if sys.byteorder == "big":
+        column.byteswap()
+    return base64.b64encode(column.tobytes()).decode("ascii")
+
+
+def _from_base64(typecode, data):
+    column = array(typecode)
+    column.frombytes(base64.b64decode(data))
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column.tolist()
+
+
+def pack_columns(columns):
+    """
+    Pack the columns of a columnar query result into base64 strings.
+    Timestamps become little endian int64 and values little endian float64.
+    Values that are not all int or float are left as a list.
+
+    :param columns: {"timestamps": [...], "values": [...]}
+    :return: {"timestamps": <base64 str>, "values": <base64 str or list>}
+    """
+    packed = {"timestamps": _to_base64(array("q", columns["timestamps"]))}
+    values = columns["values"]
+    if all(type(value) in (int, float) for value in values):
+        try:
+            packed["values"] = _to_base64(array("d", values))
+        except OverflowError:
+            packed["values"] = values
+    else:
+        packed["values"] = values
+    return packed
+
+
+def unpack_columns(columns):
+    """
+    Inverse of :py:func:`pack_columns`.
+
+    :param columns: {"timestamps": <base64 str>, "values": <base64 str or list>}
+    :return: {"timestamps": [epoch microseconds, ...], "values": [...]}
+    """
+    values = columns["values"]
+    if isinstance(values, str):
+        values = _from_base64("d", values)
+    return {"timestamps": _from_base64("q", columns["timestamps"]), "values": values}
+
+
+def query_chunks(agent, topic, start=None, end=None, agg_type=None, agg_period=None, skip=0, count=None,
+                 order="FIRST_TO_LAST", chunk_size=DEFAULT_QUERY_CHUNK_SIZE, peer=PLATFORM_HISTORIAN, timeout=30):
+    """
+    Generator that queries a historian through query_open/query_next and
+    yields the result chunk by chunk, so a large query never has to fit in a
+    single RPC response.
+
+    :param agent: agent used to make the RPC calls
+    :param peer: identity of the historian
+    :param timeout: timeout of each RPC call in seconds
+    :return: generator of {"values": {...}, "metadata": {...}} chunks as
+             returned by :py:meth:`BaseQueryHistorianAgent.query_next`
+    """
+    call = agent.vip.rpc.call
+    cursor = call(peer, 'query_open', topic=topic, start=start, end=end, agg_type=agg_type,
+                  agg_period=agg_period, skip=skip, count=count, order=order,
+                  chunk_size=chunk_size).get(timeout=timeout)
+    done = False
+    try:
+        while not done:
+            chunk = call(peer, 'query_next', cursor).get(timeout=timeout)
+            done = chunk.pop('done')
+            if chunk['values'] or chunk['metadata']:
+                yield chunk
+    finally:
+        if not done:
+            call(peer, 'query_close', cursor).get(timeout=timeout)
+
+
 class BaseHistorian(BaseHistorianAgent, BaseQueryHistorianAgent):
     def __init__(self, **kwargs):
         _log.debug('Constructor of BaseHistorian thread: {}'.format(
@@ -71,10 +71,13 @@ condition for querying topics based on tags. Please see documentation of
 import logging
 import os
 import re
+import time
 
 from abc import abstractmethod
 
 from volttron.platform.agent.known_identities import (PLATFORM_HISTORIAN)
+from volttron.platform.agent.topic_index import TopicPrefixIndex
+from volttron.platform.messaging import topics
 from volttron.platform.vip.agent import Agent, Core, RPC
 from volttron.platform.vip.agent.errors import Unreachable
 
@@ -88,13 +91,20 @@ class BaseTaggingService(Agent):
     the tag details
     """
 
-    def __init__(self, historian_vip_identity=None, **kwargs):
+    def __init__(self, historian_vip_identity=None, use_topic_index=True,
+                 topic_index_refresh_interval=300, capture_device_topics=False,
+                 **kwargs):
         super(BaseTaggingService, self).__init__(**kwargs)
         self.valid_tags = dict()
         self.tag_refs = dict()
         self.historian_vip_identity = historian_vip_identity
         if historian_vip_identity is None:
             self.historian_vip_identity = PLATFORM_HISTORIAN
+        self.use_topic_index = use_topic_index
+        self.topic_index_refresh_interval = topic_index_refresh_interval
+        self.capture_device_topics = capture_device_topics
+        self._topic_index = TopicPrefixIndex()
+        self._topic_index_loaded = None
         current_dir = os.path.dirname(os.path.abspath(__file__))
         self.resource_sub_dir = os.path.join(current_dir, "../../..",
                                              "volttron_data/tagging_resources")
@@ -125,6 +135,15 @@ class BaseTaggingService(Agent):
         self.load_valid_tags()
         self.load_tag_refs()
 
+        # The pubsub only subscribes by prefix, so this receives every
+        # device publish and not only the "all" topics. Off by default, the
+        # index is then kept current by its periodic and reload on miss
+        # refresh.
+        if self.use_topic_index and self.capture_device_topics:
+            self.vip.pubsub.subscribe(peer='pubsub',
+                                      prefix=topics.DRIVER_TOPIC_BASE,
+                                      callback=self._capture_device_topics)
+
     @abstractmethod
     def setup(self):
         """
@@ -518,8 +537,9 @@ class BaseTaggingService(Agent):
         Add tags to multiple topics.
         Calls method :py:meth:`BaseTaggingService.insert_topic_tags`.
         Implementing methods could use
-        :py:meth:`BaseTaggingService.get_matching_topic_prefixes` to get the
-        list of topic prefix or topic names for a given topic pattern.
+        :py:meth:`BaseTaggingService.get_matching_topic_prefixes_by_pattern`
+        to get the list of topic prefix or topic names for all the given topic
+        patterns at once.
 
         :param tags: dictionary object or file containing the topic and the 
          tag details. Dictionary object or the file content should be of the
@@ -566,13 +586,9 @@ class BaseTaggingService(Agent):
 
     def get_matching_topic_prefixes(self, topic_pattern):
         """
-        Queries the configured/platform historian to get the list of topics
-        that match the given topic pattern. So use of this api require's
-        the configured historian (or platform.historian if specific historian id
-        is not specified) to be running. This api makes RPC calls to
-        platform.historian's :py:meth:`BaseHistorian.get_topic_list` to get
-        the list of topics. This is used to find topic/topic prefix matching
-        any given input topic pattern.
+        Get the list of topics that match the given topic pattern. Calls
+        :py:meth:`BaseTaggingService.get_matching_topic_prefixes_by_pattern`
+        with the single pattern.
 
         Pattern matching done here is not true string pattern matching.
         Matches are applied to different topic_prefix.
@@ -585,6 +601,107 @@ class BaseTaggingService(Agent):
         :type topic_pattern: str
         :return: list of topic prefixes.
         """
+        return self.get_matching_topic_prefixes_by_pattern(
+            [topic_pattern])[topic_pattern]
+
+    def get_matching_topic_prefixes_by_pattern(self, topic_patterns):
+        """
+        Get the topic prefixes matching each of the given topic patterns.
+        Use of this api require's the configured historian (or
+        platform.historian if specific historian id is not specified) to be
+        running.
+
+        Unless use_topic_index is turned off, the patterns are matched against
+        a local index of the historian's topics. The index is loaded with
+        :py:meth:`BaseHistorian.get_topic_list` on first use, reloaded every
+        topic_index_refresh_interval seconds and when a pattern matches no
+        topic. If capture_device_topics is turned on, topics of device
+        publishes are also added as they are published.
+        Otherwise each pattern is sent to the historian's
+        :py:meth:`BaseHistorian.get_topics_by_pattern`.
+
+        :param topic_patterns: patterns to match against
+        :type topic_patterns: list
+        :return: dictionary of pattern to set of topic prefixes
+        :rtype: dict
+        """
+        if not self.use_topic_index:
+            return {topic_pattern: self._query_matching_topic_prefixes(
+                topic_pattern) for topic_pattern in topic_patterns}
+
+        loaded = False
+        if self._topic_index_loaded is None or \
+                time.monotonic() - self._topic_index_loaded >= \
+                self.topic_index_refresh_interval:
+            self._load_topic_index()
+            loaded = True
+
+        # replace * with .* so regex would match correctly
+        matches = {topic_pattern: self._topic_index.match_prefixes(
+            topic_pattern.replace("*", ".*"))
+            for topic_pattern in topic_patterns}
+
+        unmatched = [topic_pattern for topic_pattern, prefixes in
+                     matches.items() if not prefixes]
+        if unmatched and not loaded:
+            # The topics may have been stored after the index was loaded.
+            self._load_topic_index()
+            for topic_pattern in unmatched:
+                matches[topic_pattern] = self._topic_index.match_prefixes(
+                    topic_pattern.replace("*", ".*"))
+
+        _log.debug("topic prefixes {}".format(matches))
+        return matches
+
+    def _load_topic_index(self):
+        try:
+            _log.debug("Loading topic index from {}".format(
+                self.historian_vip_identity))
+            topic_list = self.vip.rpc.call(self.historian_vip_identity,
+                                           "get_topic_list").get(timeout=30)
+        except Unreachable:
+            _log.error("add_topic_tags and add_tags "
+                       "operations need plaform.historian to be running."
+                       "Topics and topic patterns sent are matched against "
+                       "list of valid topics queried"
+                       " from {}".format(self.historian_vip_identity))
+            if self._topic_index_loaded is None:
+                raise
+            return
+        except Exception as e:
+            _log.error("Unknown exception while loading the list of topics "
+                       "from {}. Exception:{}".format(
+                self.historian_vip_identity, e.args))
+            if self._topic_index_loaded is None:
+                raise
+            return
+
+        self._topic_index.clear()
+        self._topic_index.update(topic_list)
+        self._topic_index_loaded = time.monotonic()
+
+    def _capture_device_topics(self, peer, sender, bus, topic, headers,
+                               message):
+        """Add the point topics of device publishes to the topic index
+        the way the historian names them."""
+        if self._topic_index_loaded is None or not topic.endswith("/all"):
+            return
+        device = topic[len(topics.DRIVER_TOPIC_BASE) + 1:-len("/all")]
+        if isinstance(message, list) and message and \
+                isinstance(message[0], dict):
+            for point in message[0]:
+                self._topic_index.add(device + "/" + point)
+
+    def _query_matching_topic_prefixes(self, topic_pattern):
+        """
+        Queries the configured/platform historian to get the list of topics
+        that match the given topic pattern. This api makes RPC calls to
+        platform.historian's :py:meth:`BaseHistorian.get_topics_by_pattern`.
+
+        :param topic_pattern: pattern to match again
+        :type topic_pattern: str
+        :return: set of topic prefixes.
+        """
         # replace * with .* so regex would match correctly
         topic_pattern = topic_pattern.replace("*", ".*")
         topic_prefixes = set()
@@ -1025,13 +1142,20 @@ def pretty_print(tup):
     return "( {} {} {})".format(left, tup[0], right)
 
 
+_query_parser = None
+_query_lexer = None
+
+
 def parse_query(query, tags, refs):
-    global valid_tags, tag_refs
+    global valid_tags, tag_refs, _query_parser, _query_lexer
     valid_tags = tags
     tag_refs = refs
-    query_parser = yacc.yacc()
-    lexer = lex.lex()
-    ast = query_parser.parse(query)
+    # Building the parser generates its tables, only do it once. The tables
+    # are not written to the package directory, which may not be writable.
+    if _query_parser is None:
+        _query_parser = yacc.yacc(write_tables=False, debug=False)
+        _query_lexer = lex.lex()
+    ast = _query_parser.parse(query, lexer=_query_lexer)
     return ast
 
 
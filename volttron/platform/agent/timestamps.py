@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+#
+# Copyright 2020, Battelle Memorial Institute.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# This material was prepared as an account of work sponsored by an agency of
+# the United States Government. Neither the United States Government nor the
+# United States Department of Energy, nor Battelle, nor any of their
+# employees, nor any jurisdiction or organization that has cooperated in the
+# development of these materials, makes any warranty, express or
+# implied, or assumes any legal liability or responsibility for the accuracy,
+# completeness, or usefulness or any information, apparatus, product,
+# software, or process disclosed, or represents that its use would not infringe
+# privately owned rights. Reference herein to any specific commercial product,
+# process, or service by trade name, trademark, manufacturer, or otherwise
+# does not necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors expressed
+# herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY operated by
+# BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+"""Fast formatting and parsing of VOLTTRON timestamps.
+
+Timestamps are written as YYYY-MM-DDTHH:MM:SS.mmmmmm with a +HH:MM offset for aware datetimes. Both layouts are
+formatted and parsed without strftime and strptime, other strings fall back to dateutil. The batch variants convert a
+whole sequence at once and only convert repeated values once, as the records of a scrape or of a historian batch
+commonly share their timestamp.
+"""
+
+import re
+from datetime import datetime
+
+import pytz
+from dateutil.parser import parse
+from dateutil.tz import tzoffset
+
+_NAIVE_LENGTH = 26
+_AWARE_LENGTH = 32
+_MAX_CACHED_OFFSETS = 1024
+_offsets = {"+00:00": pytz.UTC}
+_naive_layout = re.compile(r"(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})\.(\d{6})$")
+
+
+def _format_timestamp_strftime(time_stamp):
+    time_str = time_stamp.strftime("%Y-%m-%dT%H:%M:%S.%f")
+
+    if time_stamp.tzinfo is not None:
+        sign = '+'
+        td = time_stamp.tzinfo.utcoffset(time_stamp)
+        if td.days < 0:
+            sign = '-'
+            td = -td
+
+        seconds = td.seconds
+        minutes, seconds = divmod(seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        time_str += "{sign}{HH:02}:{MM:02}".format(sign=sign,
+                                                   HH=hours,
+                                                   MM=minutes)
+
+    return time_str
+
+
+def format_timestamp(time_stamp):
+    """Create a consistent datetime string representation based on
+    ISO 8601 format.
+
+    YYYY-MM-DDTHH:MM:SS.mmmmmm for unaware datetime objects.
+    YYYY-MM-DDTHH:MM:SS.mmmmmm+HH:MM for aware datetime objects
+
+    :param time_stamp: value to convert
+    :type time_stamp: datetime
+    :returns: datetime in string format
+    :rtype: str
+    """
+    # isoformat writes the same layout except for offsets with seconds, which are truncated here, and years before
+    # 1000, which strftime does not pad.
+    if time_stamp.year >= 1000:
+        offset = time_stamp.utcoffset()
+        if offset is None or not (offset.seconds % 60 or offset.microseconds):
+            return time_stamp.isoformat(timespec='microseconds')
+    return _format_timestamp_strftime(time_stamp)
+
+
+def _parse_naive_layout(time_stamp_str):
+    match = _naive_layout.match(time_stamp_str)
+    if match is None:
+        raise ValueError("{} does not match YYYY-MM-DDTHH:MM:SS.mmmmmm".format(time_stamp_str))
+    return datetime(*map(int, match.groups()))
+
+
+def _parse_naive(time_stamp_str):
+    if time_stamp_str[10] != 'T':
+        raise ValueError("{} does not match YYYY-MM-DDTHH:MM:SS.mmmmmm".format(time_stamp_str))
+    return datetime.fromisoformat(time_stamp_str)
+
+
+if not hasattr(datetime, 'fromisoformat'):
+    # Python 3.6
+    _parse_naive = _parse_naive_layout
+
+
+def _get_offset(time_zone_str):
+    try:
+        return _offsets[time_zone_str]
+    except KeyError:
+        pass
+
+    if (time_zone_str[0] not in "+-" or time_zone_str[3] != ":" or not time_zone_str[1:3].isdigit() or
+            not time_zone_str[4:6].isdigit()):
+        raise ValueError("{} is not a +HH:MM offset".format(time_zone_str))
+
+    seconds_offset = int(time_zone_str[1:3]) * 3600 + int(time_zone_str[4:6]) * 60
+    if time_zone_str[0] == "-":
+        seconds_offset = -seconds_offset
+
+    offset = tzoffset("", seconds_offset)
+    if len(_offsets) < _MAX_CACHED_OFFSETS:
+        _offsets[time_zone_str] = offset
+    return offset
+
+
+def parse_timestamp_string(time_stamp_str):
+    """
+    Create a datetime object from the supplied date/time string.
+    Uses dateutil.parse with no extra parameters.
+
+    For performance reasons we try
+    YYYY-MM-DDTHH:MM:SS.mmmmmm
+    or
+    YYYY-MM-DDTHH:MM:SS.mmmmmm+HH:MM
+    based on the string length before falling back to dateutil.parse.
+
+    @param time_stamp_str:
+    @return: value to convert
+    """
+    length = len(time_stamp_str)
+    if length == _NAIVE_LENGTH:
+        try:
+            return _parse_naive(time_stamp_str)
+        except ValueError:
+            pass
+
+    elif length == _AWARE_LENGTH:
+        try:
+            time_stamp = _parse_naive(time_stamp_str[:_NAIVE_LENGTH])
+            return time_stamp.replace(tzinfo=_get_offset(time_stamp_str[_NAIVE_LENGTH:]))
+        except ValueError:
+            pass
+
+    return parse(time_stamp_str)
+
+
+def format_timestamps(time_stamps):
+    """Format a sequence of datetimes with :py:func:`format_timestamp`.
+
+    :param time_stamps: datetimes to convert
+    :returns: list of datetime strings in the order of time_stamps
+    :rtype: list
+    """
+    formatted = {}
+    results = []
+    for time_stamp in time_stamps:
+        # Hashing aware datetimes is about as slow as formatting them, records of one scrape share the same object.
+        # Keeping the datetime in the cache keeps its id from being reused.
+        try:
+            time_str = formatted[id(time_stamp)][1]
+        except KeyError:
+            time_str = format_timestamp(time_stamp)
+            formatted[id(time_stamp)] = time_stamp, time_str
+        results.append(time_str)
+    return results
+
+
+def parse_timestamp_strings(time_stamp_strs):
+    """Parse a sequence of date/time strings with :py:func:`parse_timestamp_string`.
+
+    :param time_stamp_strs: strings to convert
+    :returns: list of datetimes in the order of time_stamp_strs
+    :rtype: list
+    """
+    parsed = {}
+    results = []
+    for time_stamp_str in time_stamp_strs:
+        try:
+            time_stamp = parsed[time_stamp_str]
+        except KeyError:
+            time_stamp = parsed[time_stamp_str] = parse_timestamp_string(time_stamp_str)
+        results.append(time_stamp)
+    return results
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+#
+# Copyright 2020, Battelle Memorial Institute.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# This material was prepared as an account of work sponsored by an agency of
+# the United States Government. Neither the United States Government nor the
+# United States Department of Energy, nor Battelle, nor any of their
+# employees, nor any jurisdiction or organization that has cooperated in the
+# development of these materials, makes any warranty, express or
+# implied, or assumes any legal liability or responsibility for the accuracy,
+# completeness, or usefulness or any information, apparatus, product,
+# software, or process disclosed, or represents that its use would not infringe
+# privately owned rights. Reference herein to any specific commercial product,
+# process, or service by trade name, trademark, manufacturer, or otherwise
+# does not necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors expressed
+# herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY operated by
+# BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+"""Index of topic names for resolving the topic patterns of the tagging service.
+
+Topics are kept in a tree of their '/' separated parts. A pattern is matched the way
+:py:meth:`BaseTaggingService.get_matching_topic_prefixes` matched the topics returned by the historian: the topics are
+cut to as many parts as the pattern has and the pattern must match the whole prefix. Leading parts of the pattern
+without regular expression characters walk down the tree, parts that are only literals and '.*' wildcards are
+matched against the parts of one level. Any other pattern is matched against every prefix below its literal parts.
+"""
+
+import re
+
+_REGEX_CHARS = frozenset('.^$*+?{}[]\\|()')
+_TOPIC = None
+
+
+def _is_literal(part):
+    return not _REGEX_CHARS.intersection(part)
+
+
+def _is_wildcard(part):
+    return _is_literal(part.replace('.*', ''))
+
+
+class TopicPrefixIndex(object):
+    """Set of topic names that finds the topic prefixes matching a topic pattern without a scan of every topic."""
+
+    def __init__(self, topics=()):
+        self._topics = set()
+        self._root = {}
+        self.update(topics)
+
+    def add(self, topic):
+        """Adds a topic, returns True if it was not in the index."""
+        if topic in self._topics:
+            return False
+        self._topics.add(topic)
+        node = self._root
+        for part in topic.split('/'):
+            node = node.setdefault(part, {})
+        node[_TOPIC] = True
+        return True
+
+    def update(self, topics):
+        for topic in topics:
+            self.add(topic)
+
+    def clear(self):
+        self._topics.clear()
+        self._root.clear()
+
+    def __contains__(self, topic):
+        return topic in self._topics
+
+    def __len__(self):
+        return len(self._topics)
+
+    def match_prefixes(self, topic_pattern):
+        """Returns the set of topic prefixes matching a regular expression with '/' separated parts."""
+        pattern_parts = topic_pattern.split('/')
+        node = self._root
+        depth = 0
+        while depth < len(pattern_parts) and _is_literal(pattern_parts[depth]):
+            node = node.get(pattern_parts[depth])
+            if node is None:
+                return set()
+            depth += 1
+        prefix = pattern_parts[:depth]
+
+        if depth == len(pattern_parts):
+            return {topic_pattern}
+
+        if all(_is_wildcard(part) for part in pattern_parts[depth:]):
+            # The prefix of a matching topic has a part for each part of the pattern, so the '/' of the pattern are
+            # matched by the '/' of the topic and every part is matched on its own.
+            nodes = [('/'.join(prefix), node)]
+            for part in pattern_parts[depth:]:
+                part_regex = re.compile(part + '$')
+                nodes = [(path + '/' + name if depth else name, child)
+                         for path, parent in nodes
+                         for name, child in parent.items()
+                         if name is not _TOPIC and part_regex.match(name)]
+                depth += 1
+            return {path for path, _ in nodes}
+
+        regex = re.compile(topic_pattern + '$')
+        return {path for path in self._iter_prefixes(node, prefix, len(pattern_parts)) if regex.match(path)}
+
+    def _iter_prefixes(self, node, prefix, depth):
+        """Yields the prefixes below node cut to depth parts, topics with fewer parts are yielded whole."""
+        if len(prefix) == depth:
+            yield '/'.join(prefix)
+            return
+        if _TOPIC in node:
+            yield '/'.join(prefix)
+        for name, child in node.items():
+            if name is not _TOPIC:
+                yield from self._iter_prefixes(child, prefix + [name], depth)
@@ -55,7 +55,7 @@ except ImportError:
     HAS_SYSLOG = False
 import traceback
 from configparser import ConfigParser
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import gevent
 import psutil
@@ -70,6 +70,7 @@ from watchdog_gevent import Observer
 
 from volttron.platform import get_home, get_address
 from volttron.platform import jsonapi
+from volttron.platform.agent.timestamps import format_timestamp, parse_timestamp_string
 from volttron.utils import VolttronHomeFileReloader, AbsolutePathFileReloader
 from volttron.utils.prompt import prompt_response
 
@@ -547,83 +548,6 @@ def setup_logging(level=logging.DEBUG, console=False):
     root.setLevel(level)
 
 
-def format_timestamp(time_stamp):
-    """Create a consistent datetime string representation based on
-    ISO 8601 format.
-    
-    YYYY-MM-DDTHH:MM:SS.mmmmmm for unaware datetime objects.
-    YYYY-MM-DDTHH:MM:SS.mmmmmm+HH:MM for aware datetime objects
-    
-    :param time_stamp: value to convert
-    :type time_stamp: datetime
-    :returns: datetime in string format
-    :rtype: str
-    """
-
-    time_str = time_stamp.strftime("%Y-%m-%dT%H:%M:%S.%f")
-
-    if time_stamp.tzinfo is not None:
-        sign = '+'
-        td = time_stamp.tzinfo.utcoffset(time_stamp)
-        if td.days < 0:
-            sign = '-'
-            td = -td
-
-        seconds = td.seconds
-        minutes, seconds = divmod(seconds, 60)
-        hours, minutes = divmod(minutes, 60)
-        time_str += "{sign}{HH:02}:{MM:02}".format(sign=sign,
-                                                   HH=hours,
-                                                   MM=minutes)
-
-    return time_str
-
-
-def parse_timestamp_string(time_stamp_str):
-    """
-    Create a datetime object from the supplied date/time string.
-    Uses dateutil.parse with no extra parameters.
-
-    For performance reasons we try
-    YYYY-MM-DDTHH:MM:SS.mmmmmm
-    or
-    YYYY-MM-DDTHH:MM:SS.mmmmmm+HH:MM
-    based on the string length before falling back to dateutil.parse.
-
-    @param time_stamp_str:
-    @return: value to convert
-    """
-
-    if len(time_stamp_str) == 26:
-        try:
-            return datetime.strptime(time_stamp_str, "%Y-%m-%dT%H:%M:%S.%f")
-        except ValueError:
-            pass
-
-    elif len(time_stamp_str) == 32:
-        try:
-            base_time_stamp_str = time_stamp_str[:26]
-            time_zone_str = time_stamp_str[26:]
-            time_stamp = datetime.strptime(base_time_stamp_str, "%Y-%m-%dT%H:%M:%S.%f")
-            # Handle most common case.
-            if time_zone_str == "+00:00":
-                return time_stamp.replace(tzinfo=pytz.UTC)
-
-            hours_offset = int(time_zone_str[1:3])
-            minutes_offset = int(time_zone_str[4:6])
-
-            seconds_offset = hours_offset * 3600 + minutes_offset * 60
-            if time_zone_str[0] == "-":
-                seconds_offset = -seconds_offset
-
-            return time_stamp.replace(tzinfo=tzoffset("", seconds_offset))
-
-        except ValueError:
-            pass
-
-    return parse(time_stamp_str)
-
-
 def get_aware_utc_now():
     """Create a timezone aware UTC datetime object from the system time.
     
@@ -660,6 +584,23 @@ def get_utc_seconds_from_epoch(timestamp=None):
     return seconds_from_epoch
 
 
+_EPOCH = datetime(1970, 1, 1)
+_ONE_MICROSECOND = timedelta(microseconds=1)
+
+
+def get_utc_microseconds_from_epoch(timestamp):
+    """
+    convert a given time stamp to integer microseconds from epoch. Unlike
+    get_utc_seconds_from_epoch a naive datetime is considered to already be
+    in UTC, which is how the historians store time stamps.
+    @param timestamp: datetime object
+    @return: microseconds from epoch
+    """
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(pytz.UTC).replace(tzinfo=None)
+    return (timestamp - _EPOCH) // _ONE_MICROSECOND
+
+
 def process_timestamp(timestamp_string, topic=''):
     """
     Convert timestamp string timezone aware utc timestamp
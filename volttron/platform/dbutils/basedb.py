@@ -83,6 +83,9 @@ class DbDriver(object):
     - :py:class:`volttron.platform.dbutils.mysqlfuncts.MySqlFuncts`
     - :py:class:`volttron.platform.dbutils.sqlitefuncts.SqlLiteFuncts`
     """
+    # True if query() accepts columnar=True and returns timestamps as epoch microseconds
+    COLUMNAR_QUERY_SUPPORT = False
+
     def __init__(self, dbapimodule, **kwargs):
         thread_name = threading.currentThread().getName()
         if callable(dbapimodule):
@@ -472,6 +475,25 @@ class DbDriver(object):
                 self.commit()
             return cursor.rowcount
 
+    @staticmethod
+    def decode_values(value_strings):
+        """
+        Decode a list of json encoded values (the value_string column of the data table) with a single json parse
+        instead of one parse per row
+        :param value_strings: list of json strings
+        :return: list of decoded values in the same order
+        """
+        if not value_strings:
+            return []
+        try:
+            decoded = jsonapi.loads('[' + ','.join(value_strings) + ']')
+            if len(decoded) == len(value_strings):
+                return decoded
+        except ValueError:
+            pass
+        # A malformed row, decode one at a time so the error points at that row
+        return [jsonapi.loads(value) for value in value_strings]
+
     @abstractmethod
     def query(self, topic_ids, id_name_map, start=None, end=None, agg_type=None, agg_period=None, skip=0, count=None,
               order="FIRST_TO_LAST"):
@@ -503,6 +525,15 @@ class DbDriver(object):
                         (timestamp2:,value2),
                         ...],
             ...}
+
+        Drivers that set COLUMNAR_QUERY_SUPPORT also accept columnar=True, in which case every topic maps to
+        parallel lists instead, with timestamps as integer microseconds since the epoch:
+        .. code-block:: python
+
+            {
+            topic_name: {"timestamps": [epoch_us1, epoch_us2, ...],
+                         "values": [value1, value2, ...]},
+            ...}
         """
         pass
 
@@ -546,6 +577,36 @@ class DbDriver(object):
                           (ts, agg_topic_id, data, str(topic_ids)), commit=True)
         return True
 
+    def insert_aggregates(self, agg_type, period, ts, rows):
+        """
+        Insert the aggregates of several topics collected for the same time period with a single executemany. Data
+        is inserted into <agg_type>_<period> table
+        :param agg_type: type of aggregation
+        :param period: time period of aggregation
+        :param ts: end time of aggregation period (not inclusive)
+        :param rows: list of (agg_topic_id, data, topic_ids) tuples
+        :return: True if execution was successful, raises exception in case of connection failures
+        """
+        table_name = agg_type + '_' + period
+        _log.debug("Inserting {} aggregates for {} into table {}".format(len(rows), ts, table_name))
+        self.execute_many(self.insert_aggregate_stmt(table_name),
+                          [(ts, agg_topic_id, data, str(topic_ids)) for agg_topic_id, data, topic_ids in rows],
+                          commit=True)
+        return True
+
+    def collect_aggregates(self, topic_ids, agg_type, start=None, end=None):
+        """
+        Collect the aggregate of every topic separately. Drivers should override this with a single query grouped by
+        topic id, this implementation runs one collect_aggregate query per topic
+        :param topic_ids: list of topic ids
+        :param agg_type: type of aggregation
+        :param start: start time for query (inclusive)
+        :param end:  end time for query (exclusive)
+        :return: dictionary of {topic_id: (aggregated value, count of records)}. Topics without records in the time
+        range may be left out
+        """
+        return {topic_id: self.collect_aggregate([topic_id], agg_type, start, end) for topic_id in topic_ids}
+
     @abstractmethod
     def collect_aggregate(self, topic_ids, agg_type, start=None, end=None):
         """
@@ -39,6 +39,8 @@ import ast
 import contextlib
 import logging
 from collections import defaultdict
+from itertools import groupby
+from operator import itemgetter
 
 import pytz
 import re
@@ -59,6 +61,8 @@ For method details please refer to base class
 :py:class:`volttron.platform.dbutils.basedb.DbDriver`
 """
 class MySqlFuncts(DbDriver):
+    COLUMNAR_QUERY_SUPPORT = True
+
     def __init__(self, connect_params, table_names):
         # kwargs['dbapimodule'] = 'mysql.connector'
         self.MICROSECOND_SUPPORT = None
@@ -188,7 +192,7 @@ class MySqlFuncts(DbDriver):
 
     def query(self, topic_ids, id_name_map, start=None, end=None, skip=0,
               agg_type=None, agg_period=None, count=None,
-              order="FIRST_TO_LAST"):
+              order="FIRST_TO_LAST", columnar=False):
 
         table_name = self.data_table
         value_col = 'value_string'
@@ -196,17 +200,11 @@ class MySqlFuncts(DbDriver):
             table_name = agg_type + "_" + agg_period
             value_col = 'agg_value'
 
-        query = '''SELECT topic_id, ts, ''' + value_col + ''' FROM ''' + table_name + '''
-                {where}
-                {order_by}
-                {limit}
-                {offset}'''
-
         if self.MICROSECOND_SUPPORT is None:
             self.init_microsecond_support()
 
-        where_clauses = ["WHERE topic_id = %s"]
-        args = [topic_ids[0]]
+        where_clauses = ["WHERE topic_id IN ({topic_ids})"]
+        args = []
 
         if start is not None:
             if start.tzinfo != pytz.UTC:
@@ -235,51 +233,63 @@ class MySqlFuncts(DbDriver):
 
         where_statement = ' AND '.join(where_clauses)
 
-        order_by = 'ORDER BY ts ASC'
-        if order == 'LAST_TO_FIRST':
-            order_by = ' ORDER BY topic_id DESC, ts DESC'
+        ts_order = 'DESC' if order == 'LAST_TO_FIRST' else 'ASC'
 
         # can't have an offset without a limit
         # -1 = no limit and allows the user to
         # provide just an offset
         if count is None:
             count = 100
-
-        limit_statement = 'LIMIT %s'
-        args.append(int(count))
-
-        offset_statement = ''
-        if skip > 0:
-            offset_statement = 'OFFSET %s'
-            args.append(skip)
+        count = int(count)
+        if skip is None or skip < 0:
+            skip = 0
+
+        if count < 0 and skip == 0:
+            # No paging, a plain ordered scan of all the requested topics.
+            query = ('SELECT topic_id, ts, ' + value_col + ' FROM ' + table_name + ' ' + where_statement +
+                     ' ORDER BY topic_id ASC, ts ' + ts_order)
+            query = query.format(topic_ids=', '.join(['%s'] * len(topic_ids)))
+            args = list(topic_ids) + args
+        else:
+            # skip and count apply to each topic. Page every topic with its own subquery so it is answered from the
+            # (topic_id, ts) index, numbering the rows of all the topics instead reads every row of every topic. The
+            # subqueries are sent as one UNION ALL statement.
+            subquery = ('(SELECT topic_id, ts, ' + value_col + ' FROM ' + table_name + ' ' +
+                        where_statement.format(topic_ids='%s') + ' ORDER BY ts ' + ts_order + ' LIMIT %s' +
+                        (' OFFSET %s' if skip > 0 else '') + ')')
+            # MySQL has no LIMIT -1, the largest BIGINT UNSIGNED is its documented "all rows" limit
+            paging = [count if count >= 0 else 18446744073709551615] + ([skip] if skip > 0 else [])
+            query = ' UNION ALL '.join([subquery] * len(topic_ids)) + ' ORDER BY topic_id ASC, ts ' + ts_order
+            args = [arg for topic_id in topic_ids for arg in [topic_id] + args + paging]
 
         _log.debug("About to do real_query")
         values = defaultdict(list)
         for topic_id in topic_ids:
-            args[0] = topic_id
-            values[id_name_map[topic_id]] = []
-            real_query = query.format(where=where_statement,
-                                      limit=limit_statement,
-                                      offset=offset_statement,
-                                      order_by=order_by)
-            _log.debug("Real Query: " + real_query)
-            _log.debug("args: " + str(args))
-
-            cursor = self.select(real_query, args, fetch_all=False)
-            if cursor:
-                if value_col == 'agg_value':
-                    for _id, ts, value in cursor:
-                        values[id_name_map[topic_id]].append(
-                            (utils.format_timestamp(ts.replace(tzinfo=pytz.UTC)),
-                             value))
-                else:
-                    for _id, ts, value in cursor:
-                        values[id_name_map[topic_id]].append(
-                            (utils.format_timestamp(ts.replace(tzinfo=pytz.UTC)),
-                             jsonapi.loads(value)))
+            values[id_name_map[topic_id]] = {'timestamps': [], 'values': []} if columnar else []
+        if not topic_ids:
+            return values
+        decode = value_col == 'value_string'
+        _log.debug("Real Query: " + query)
+        _log.debug("args: " + str(args))
 
-            if cursor is not None:
-                cursor.close()
+        cursor = self.select(query, args, fetch_all=False)
+        if cursor is None:
+            return values
+        try:
+            for topic_id, rows in groupby(cursor, key=itemgetter(0)):
+                rows = list(rows)
+                data = [row[2] for row in rows]
+                if decode:
+                    data = self.decode_values(data)
+                if columnar:
+                    columns = values[id_name_map[topic_id]]
+                    columns['timestamps'].extend(utils.get_utc_microseconds_from_epoch(row[1]) for row in rows)
+                    columns['values'].extend(data)
+                else:
+                    values[id_name_map[topic_id]].extend(
+                        zip((utils.format_timestamp(row[1].replace(tzinfo=pytz.UTC)) for row in rows), data))
+        finally:
+            cursor.close()
         return values
 
     @contextlib.contextmanager
@@ -506,12 +516,27 @@ ON DUPLICATE KEY UPDATE value_string=VALUES(value_string);
                ''' values(%s, %s, %s, %s)'''
 
     def collect_aggregate(self, topic_ids, agg_type, start=None, end=None):
+        rows = self._select_aggregate(topic_ids, agg_type, start, end)
+        if rows:
+            return rows[0][0], rows[0][1]
+        else:
+            return 0, 0
+
+    def collect_aggregates(self, topic_ids, agg_type, start=None, end=None):
+        rows = self._select_aggregate(topic_ids, agg_type, start, end,
+                                      group_by_topic=True)
+        return {row[0]: (row[1], row[2]) for row in rows}
+
+    def _select_aggregate(self, topic_ids, agg_type, start, end,
+                          group_by_topic=False):
         if isinstance(agg_type, str):
             if agg_type.upper() not in ['AVG', 'MIN', 'MAX', 'COUNT', 'SUM']:
                 raise ValueError(
                     "Invalid aggregation type {}".format(agg_type))
-        query = '''SELECT ''' \
-                + agg_type + '''(value_string), count(value_string) FROM ''' \
+        select = agg_type + '''(value_string), count(value_string)'''
+        if group_by_topic:
+            select = '''topic_id, ''' + select
+        query = '''SELECT ''' + select + ''' FROM ''' \
                 + self.data_table + ''' {where}'''
         where_clauses = ["WHERE topic_id = %s"]
         args = [topic_ids[0]]
@@ -544,13 +569,11 @@ ON DUPLICATE KEY UPDATE value_string=VALUES(value_string);
                 args.append(end_str[:end_str.rfind('.')])
 
         where_statement = ' AND '.join(where_clauses)
+        if group_by_topic:
+            where_statement += " GROUP BY topic_id"
 
         real_query = query.format(where=where_statement)
         _log.debug("Real Query: " + real_query)
         _log.debug("args: " + str(args))
 
-        rows = self.select(real_query, args)
-        if rows:
-            return rows[0][0], rows[0][1]
-        else:
-            return 0, 0
+        return self.select(real_query, args)
@@ -20,6 +20,8 @@ import ast
 import contextlib
 import logging
 import copy
+from itertools import groupby
+from operator import itemgetter
 
 import pytz
 import psycopg2
@@ -44,6 +46,8 @@ For method details please refer to base class
 :py:class:`volttron.platform.dbutils.basedb.DbDriver`
 """
 class PostgreSqlFuncts(DbDriver):
+    COLUMNAR_QUERY_SUPPORT = True
+
     def __init__(self, connect_params, table_names):
         if table_names:
             self.data_table = table_names['data_table']
@@ -211,7 +215,7 @@ class PostgreSqlFuncts(DbDriver):
 
     def query(self, topic_ids, id_name_map, start=None, end=None, skip=0,
               agg_type=None, agg_period=None, count=None,
-              order='FIRST_TO_LAST'):
+              order='FIRST_TO_LAST', columnar=False):
         if agg_type and agg_period:
             table_name = agg_type + '_' + agg_period
             value_col = 'agg_value'
@@ -219,43 +223,63 @@ class PostgreSqlFuncts(DbDriver):
             table_name = self.data_table
             value_col = 'value_string'
 
-        topic_id = Literal(0)
-        query = [SQL(
-            '''SELECT to_char(ts, 'YYYY-MM-DD"T"HH24:MI:SS.USOF:00'), ''' + value_col + ' \n'
-            'FROM {}\n'
-            'WHERE topic_id = {}'
-        ).format(Identifier(table_name), topic_id)]
+        where = []
         if start and start.tzinfo != pytz.UTC:
             start = start.astimezone(pytz.UTC)
         if end and end.tzinfo != pytz.UTC:
             end = end.astimezone(pytz.UTC)
         if start and start == end:
-            query.append(SQL(' AND ts = {}').format(Literal(start)))
+            where.append(SQL(' AND ts = {}').format(Literal(start)))
         else:
             if start:
-                query.append(SQL(' AND ts >= {}').format(Literal(start)))
+                where.append(SQL(' AND ts >= {}').format(Literal(start)))
             if end:
-                query.append(SQL(' AND ts < {}').format(Literal(end)))
-        query.append(SQL('ORDER BY ts {}'.format(
-            'DESC' if order == 'LAST_TO_FIRST' else 'ASC')))
-        if skip or count:
-            query.append(SQL('LIMIT {} OFFSET {}').format(
-                Literal(None if not count or count < 0 else count),
-                Literal(None if not skip or skip < 0 else skip)))
-        query = SQL('\n').join(query)
-        values = {}
-        if value_col == 'agg_value':
-            for topic_id._wrapped in topic_ids:
-                name = id_name_map[topic_id.wrapped]
-                with self.select(query, fetch_all=False) as cursor:
-                    values[name] = [(ts, value)
-                                    for ts, value in cursor]
+                where.append(SQL(' AND ts < {}').format(Literal(end)))
+        ts_order = SQL('DESC' if order == 'LAST_TO_FIRST' else 'ASC')
+        if columnar:
+            # whole seconds and microseconds are extracted separately to stay exact
+            timestamp = SQL('(EXTRACT(EPOCH FROM date_trunc(\'second\', ts))::bigint * 1000000 + '
+                            'mod(EXTRACT(MICROSECONDS FROM ts)::bigint, 1000000))')
+        else:
+            timestamp = SQL('''to_char(ts, 'YYYY-MM-DD"T"HH24:MI:SS.USOF:00')''')
+        limit = count if count and count > 0 else None
+        skip = skip if skip and skip > 0 else 0
+        if limit is None and not skip:
+            query = SQL(
+                'SELECT topic_id, {}, {}\n'
+                'FROM {}\n'
+                'WHERE topic_id = ANY({}){}\n'
+                'ORDER BY topic_id, ts {}'
+            ).format(timestamp, Identifier(value_col), Identifier(table_name), Literal(list(topic_ids)),
+                     SQL('').join(where), ts_order)
         else:
-            for topic_id._wrapped in topic_ids:
-                name = id_name_map[topic_id.wrapped]
-                with self.select(query, fetch_all=False) as cursor:
-                    values[name] = [(ts, jsonapi.loads(value))
-                                    for ts, value in cursor]
+            # skip and count apply to each topic. Page every topic in a lateral subquery so it is answered from the
+            # (topic_id, ts) index, numbering the rows of all the topics instead reads every row of every topic.
+            query = SQL(
+                'SELECT ids.topic_id, {}, paged.value\n'
+                'FROM unnest({}::integer[]) AS ids(topic_id)\n'
+                'CROSS JOIN LATERAL (\n'
+                'SELECT ts, {} AS value\n'
+                'FROM {}\n'
+                'WHERE topic_id = ids.topic_id{}\n'
+                'ORDER BY ts {}{} OFFSET {}) AS paged\n'
+                'ORDER BY ids.topic_id, ts {}'
+            ).format(timestamp, Literal(list(topic_ids)), Identifier(value_col), Identifier(table_name),
+                     SQL('').join(where), ts_order,
+                     SQL(' LIMIT {}').format(Literal(limit)) if limit else SQL(''), Literal(skip), ts_order)
+        values = {id_name_map[topic_id]: {'timestamps': [], 'values': []} if columnar else []
+                  for topic_id in topic_ids}
+        decode = value_col == 'value_string'
+        with self.select(query, fetch_all=False) as cursor:
+            for topic_id, rows in groupby(cursor, key=itemgetter(0)):
+                rows = list(rows)
+                data = [row[2] for row in rows]
+                if decode:
+                    data = self.decode_values(data)
+                if columnar:
+                    values[id_name_map[topic_id]] = {'timestamps': [row[1] for row in rows], 'values': data}
+                else:
+                    values[id_name_map[topic_id]] = list(zip((row[1] for row in rows), data))
         return values
 
     def insert_topic(self, topic, **kwargs):
@@ -413,12 +437,25 @@ class PostgreSqlFuncts(DbDriver):
             Identifier(table_name))
 
     def collect_aggregate(self, topic_ids, agg_type, start=None, end=None):
+        rows = self._select_aggregate(topic_ids, agg_type, start, end)
+        return rows[0] if rows else (0, 0)
+
+    def collect_aggregates(self, topic_ids, agg_type, start=None, end=None):
+        rows = self._select_aggregate(topic_ids, agg_type, start, end,
+                                      group_by_topic=True)
+        return {topic_id: (value, count) for topic_id, value, count in rows}
+
+    def _select_aggregate(self, topic_ids, agg_type, start, end,
+                          group_by_topic=False):
         if (isinstance(agg_type, str) and
                 agg_type.upper() not in self.get_aggregation_list()):
             raise ValueError('Invalid aggregation type {}'.format(agg_type))
+        select = SQL('{}(CAST(value_string as float)), COUNT(value_string)'.format(
+            agg_type.upper()))
+        if group_by_topic:
+            select = SQL('topic_id, {}').format(select)
         query = [
-            SQL('SELECT {}(CAST(value_string as float)), COUNT(value_string)'.format(
-                agg_type.upper())),
+            SQL('SELECT {}').format(select),
             SQL('FROM {}').format(Identifier(self.data_table)),
             SQL('WHERE topic_id in ({})').format(
                 SQL(', ').join(Literal(tid) for tid in topic_ids)),
@@ -427,5 +464,6 @@ class PostgreSqlFuncts(DbDriver):
             query.append(SQL(' AND ts >= {}').format(Literal(start)))
         if end is not None:
             query.append(SQL(' AND ts < {}').format(Literal(end)))
-        rows = self.select(SQL('\n').join(query))
-        return rows[0] if rows else (0, 0)
+        if group_by_topic:
+            query.append(SQL('GROUP BY topic_id'))
+        return self.select(SQL('\n').join(query))
@@ -44,7 +44,7 @@ import pytz
 import threading
 import os
 import re
-from .basedb import DbDriver
+from .basedb import DbDriver, closing
 from collections import defaultdict
 from datetime import datetime
 from math import ceil
@@ -60,6 +60,11 @@ _log = logging.getLogger(__name__)
 fix_sqlite3_datetime()
 
 
+# A regular expression of literals that can be matched with LIKE: optional ^, literal characters, optional .* and $
+_LIKE_REWRITABLE_REGEX = re.compile(r"(\^?)([^.^$*+?{}\[\]\\|()'\"]*)(\.\*)?(\$?)$")
+_LIKE_SPECIAL_CHARS = re.compile(r"[%_^]")
+
+
 class SqlLiteFuncts(DbDriver):
     """
     Implementation of SQLite3 database operation for
@@ -68,6 +73,10 @@ class SqlLiteFuncts(DbDriver):
     For method details please refer to base class
     :py:class:`volttron.platform.dbutils.basedb.DbDriver`
     """
+    # Number of topic ids bound in one query, SQLITE_MAX_VARIABLE_NUMBER is 999 before sqlite 3.32
+    MAX_TOPICS_PER_QUERY = 500
+    COLUMNAR_QUERY_SUPPORT = True
+
     def __init__(self, connect_params, table_names):
         database = connect_params['database']
         thread_name = threading.currentThread().getName()
@@ -176,7 +185,7 @@ class SqlLiteFuncts(DbDriver):
         self.commit()
 
     def query(self, topic_ids, id_name_map, start=None, end=None, agg_type=None, agg_period=None, skip=0, count=None,
-              order="FIRST_TO_LAST"):
+              order="FIRST_TO_LAST", columnar=False):
         """
         This function should return the results of a query in the form:
 
@@ -195,6 +204,7 @@ class SqlLiteFuncts(DbDriver):
         @param skip:
         @param count:
         @param order:
+        @param columnar: return {"timestamps": [epoch_us, ...], "values": [...]} for every topic
         """
         table_name = self.data_table
         value_col = 'value_string'
@@ -202,15 +212,8 @@ class SqlLiteFuncts(DbDriver):
             table_name = agg_type + "_" + agg_period
             value_col = 'agg_value'
 
-        query = '''SELECT topic_id, ts, ''' + value_col + '''
-                   FROM ''' + table_name + '''
-                   {where}
-                   {order_by}
-                   {limit}
-                   {offset}'''
-
-        where_clauses = ["WHERE topic_id = ?"]
-        args = [topic_ids[0]]
+        where_clauses = ["topic_id IN ({topic_ids})"]
+        args = []
 
         # base historian converts naive timestamps to UTC, but if the start and end had explicit timezone info then they
         # need to get converted to UTC since sqlite3 only store naive timestamp
@@ -230,51 +233,82 @@ class SqlLiteFuncts(DbDriver):
                 where_clauses.append("ts < ?")
                 args.append(end)
 
-        where_statement = ' AND '.join(where_clauses)
+        where_statement = 'WHERE ' + ' AND '.join(where_clauses)
 
-        order_by = 'ORDER BY topic_id ASC, ts ASC'
-        if order == 'LAST_TO_FIRST':
-            order_by = ' ORDER BY topic_id DESC, ts DESC'
+        ts_order = 'DESC' if order == 'LAST_TO_FIRST' else 'ASC'
 
-        # can't have an offset without a limit
         # -1 = no limit and allows the user to provide just an offset
-        if count is None:
+        if count is None or count < 0:
             count = -1
-
-        limit_statement = 'LIMIT ?'
-        args.append(count)
-
-        offset_statement = ''
-        if skip > 0:
-            offset_statement = 'OFFSET ?'
-            args.append(skip)
-
-        real_query = query.format(where=where_statement,
-                                  limit=limit_statement,
-                                  offset=offset_statement,
-                                  order_by=order_by)
-        _log.debug("Real Query: " + real_query)
-        _log.debug("args: " + str(args))
+        if skip is None or skip < 0:
+            skip = 0
+
+        if count < 0 and skip == 0:
+            # No paging, a plain ordered scan of all the requested topics.
+            query = ('SELECT topic_id, ts, ' + value_col + ' FROM ' + table_name + ' ' + where_statement +
+                     ' ORDER BY topic_id ASC, ts ' + ts_order)
+            batch_size = self.MAX_TOPICS_PER_QUERY
+        else:
+            # skip and count apply to each topic. Page every topic with its own statement so it is answered from the
+            # (topic_id, ts) index, numbering the rows of all the topics instead reads every row of every topic.
+            query = ('SELECT topic_id, ts, ' + value_col + ' FROM ' + table_name + ' ' + where_statement +
+                     ' ORDER BY ts ' + ts_order + ' LIMIT ? OFFSET ?')
+            args.extend([count, skip])
+            batch_size = 1
 
         values = defaultdict(list)
-        start_t = datetime.utcnow()
         for topic_id in topic_ids:
-            args[0] = topic_id
-            values[id_name_map[topic_id]] = []
-            cursor = self.select(real_query, args, fetch_all=False)
+            values[id_name_map[topic_id]] = {'timestamps': [], 'values': []} if columnar else []
+
+        start_t = datetime.utcnow()
+        for i in range(0, len(topic_ids), batch_size):
+            batch = list(topic_ids[i:i + batch_size])
+            real_query = query.format(topic_ids=', '.join('?' * len(batch)))
+            _log.debug("Real Query: " + real_query)
+            _log.debug("args: " + str(batch + args))
+            cursor = self.select(real_query, batch + args, fetch_all=False)
             if cursor:
-                if value_col == 'agg_value':
-                    for _id, ts, value in cursor:
-                        values[id_name_map[topic_id]].append((utils.format_timestamp(ts), value))
-                    cursor.close()
-                else:
-                    for _id, ts, value in cursor:
-                        values[id_name_map[topic_id]].append((utils.format_timestamp(ts), jsonapi.loads(value)))
-                    cursor.close()
+                with closing(cursor):
+                    self._collect_rows(cursor, id_name_map, values, value_col == 'value_string', columnar)
 
         _log.debug("Time taken to load results from db:{}".format(datetime.utcnow()-start_t))
         return values
 
+    @staticmethod
+    def _collect_rows(cursor, id_name_map, values, decode, columnar=False):
+        """
+        Stream (topic_id, ts, value) rows ordered by topic_id into values, formatting the timestamps and, if
+        decode is True, decoding the json values of each topic in bulk. If columnar is True the timestamps are
+        converted to epoch microseconds and appended to the topic's "timestamps" and "values" lists.
+        """
+        current_id = None
+        timestamps = raw = None
+        convert_ts = utils.get_utc_microseconds_from_epoch if columnar else utils.format_timestamp
+
+        def flush():
+            if decode:
+                decoded = DbDriver.decode_values(raw)
+            else:
+                decoded = raw
+            if columnar:
+                columns = values[id_name_map[current_id]]
+                columns['timestamps'].extend(timestamps)
+                columns['values'].extend(decoded)
+            else:
+                values[id_name_map[current_id]].extend(zip(timestamps, decoded))
+
+        for topic_id, ts, value in cursor:
+            if topic_id != current_id:
+                if current_id is not None:
+                    flush()
+                current_id = topic_id
+                timestamps = []
+                raw = []
+            timestamps.append(convert_ts(ts))
+            raw.append(value)
+        if current_id is not None:
+            flush()
+
     def manage_db_size(self, history_limit_timestamp, storage_limit_gb):
         """
         Manage database size.
@@ -507,11 +541,34 @@ class SqlLiteFuncts(DbDriver):
         @return: aggregate value, count of number of records over which
         aggregation was computed
         """
+        results = self._select_aggregate(topic_ids, agg_type, start, end)
+        if results:
+            _log.debug("results got {}, {}".format(results[0][0], results[0][1]))
+            return results[0][0], results[0][1]
+        else:
+            return 0, 0
+
+    def collect_aggregates(self, topic_ids, agg_type, start=None, end=None):
+        """
+        Collect the aggregate of every topic separately with a single query grouped by topic id
+        @param topic_ids: list of topic ids
+        @param agg_type: type of aggregation
+        @param start: start time
+        @param end: end time
+        @return: dictionary of {topic_id: (aggregate value, count)}. Topics without records in the time range are
+        left out
+        """
+        results = self._select_aggregate(topic_ids, agg_type, start, end, group_by_topic=True)
+        return {row[0]: (row[1], row[2]) for row in results}
+
+    def _select_aggregate(self, topic_ids, agg_type, start, end, group_by_topic=False):
         if isinstance(agg_type, str):
             if agg_type.upper() not in ['AVG', 'MIN', 'MAX', 'COUNT', 'SUM']:
                 raise ValueError("Invalid aggregation type {}".format(agg_type))
-        query = '''SELECT ''' + agg_type + '''(value_string), count(value_string) FROM ''' + \
-                self.data_table + ''' {where}'''
+        select = agg_type + '''(value_string), count(value_string)'''
+        if group_by_topic:
+            select = '''topic_id, ''' + select
+        query = '''SELECT ''' + select + ''' FROM ''' + self.data_table + ''' {where}'''
 
         where_clauses = ["WHERE topic_id = ?"]
         args = [topic_ids[0]]
@@ -543,17 +600,14 @@ class SqlLiteFuncts(DbDriver):
                 args.append(end)
 
         where_statement = ' AND '.join(where_clauses)
+        if group_by_topic:
+            where_statement += " GROUP BY topic_id"
 
         real_query = query.format(where=where_statement)
         _log.debug("Real Query: " + real_query)
         _log.debug("args: " + str(args))
 
-        results = self.select(real_query, args)
-        if results:
-            _log.debug("results got {}, {}".format(results[0][0], results[0][1]))
-            return results[0][0], results[0][1]
-        else:
-            return 0, 0
+        return self.select(real_query, args)
 
     @staticmethod
     def get_tagging_query_from_ast(topic_tags_table, tup, tag_refs):
@@ -694,7 +748,14 @@ class SqlLiteFuncts(DbDriver):
         if lower_tup0 in reserved_words:
             operator = reserved_words[lower_tup0]
 
-        if operator == 'NOT':
+        like_pattern = None
+        if operator == 'REGEXP' and isinstance(tup[2], str):
+            like_pattern = SqlLiteFuncts._get_like_pattern(tup[2])
+
+        if like_pattern is not None:
+            query = "{prefix} tag={tag} AND value LIKE {value} ESCAPE '^'".format(
+                prefix=prefix, tag=left, value=repr(like_pattern))
+        elif operator == 'NOT':
             query = SqlLiteFuncts._negate_condition(right, topic_tags_table)
         elif operator == 'INTERSECT' or operator == 'UNION':
             if root:
@@ -708,6 +769,26 @@ class SqlLiteFuncts(DbDriver):
 
         return query
 
+    @staticmethod
+    def _get_like_pattern(regex):
+        """
+        Get the LIKE pattern matching the same values as a regular expression made of ASCII literals, optionally
+        anchored with ^ and $ or ending with .*, so the query does not need the REGEXP function. LIKE is case
+        insensitive for ASCII like the REGEXP function. Returns None for any other regular expression.
+        """
+        match = _LIKE_REWRITABLE_REGEX.match(regex)
+        if match is None:
+            return None
+        start, literal, wildcard, end = match.groups()
+        if not all(ord(c) < 128 for c in literal) or not (literal or wildcard):
+            return None
+        literal = _LIKE_SPECIAL_CHARS.sub(r'^\g<0>', literal)
+        if not start:
+            literal = '%' + literal
+        if wildcard or not end:
+            literal += '%'
+        return literal
+
     @staticmethod
     def _negate_condition(condition, table_name):
         """
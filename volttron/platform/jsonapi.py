@@ -36,15 +36,187 @@
 # under Contract DE-AC05-76RL01830
 # }}}
 
-from json import dump, dumps, load, loads
+"""
+JSON encoding and decoding used throughout the platform.
 
+By default the standard library :mod:`json` module is used.  A faster C
+accelerated codec can be selected with :func:`set_backend`, or for a whole
+platform (the agents inherit the environment of the platform) through the
+``json-backend`` option of the platform config file or the
+``VOLTTRON_JSON_BACKEND`` environment variable.  Valid backends are:
 
-__all__ = ('dump', 'dumpb', 'dumps', 'load', 'loadb', 'loads')
+``json``
+    The standard library (default).
+``orjson``
+    `orjson <https://github.com/ijl/orjson>`_ if it is importable, otherwise
+    the standard library is used.
+``auto``
+    The fastest importable backend.
+
+The accelerated backend only handles calls it can answer exactly like the
+standard library: calls with keyword arguments it does not understand, data
+it refuses to encode or text it refuses to decode are handed to the standard
+library.  Encoded text is always pure ASCII (non-ASCII strings are escaped as
+with ``ensure_ascii=True``) so frames stay compatible with peers using the
+standard library.  Encoded text is compact (no spaces after separators).
+orjson encodes ``NaN``/``Infinity`` floats as ``null``, data containing them
+is encoded by the standard library so they are kept.
+"""
+
+import json
+import logging
+import math
+import os
+from json import dump, load
+
+__all__ = ('dump', 'dumpb', 'dumps', 'load', 'loadb', 'loads', 'get_backend', 'set_backend')
+
+BACKEND_ENV = 'VOLTTRON_JSON_BACKEND'
+BACKENDS = ('json', 'orjson', 'auto')
+
+_log = logging.getLogger(__name__)
+
+
+class _JsonCodec(object):
+    name = 'json'
+
+    def dumps(self, data, **kwargs):
+        return json.dumps(data, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return json.loads(s, **kwargs)
+
+    def dumpb(self, data, **kwargs):
+        return json.dumps(data, **kwargs).encode('utf-8')
+
+    def loadb(self, s, **kwargs):
+        return json.loads(s.decode('utf-8'), **kwargs)
+
+
+def _has_non_finite(data):
+    """Return True if data contains a NaN or infinite float."""
+    if isinstance(data, float):
+        return not math.isfinite(data)
+    if isinstance(data, dict):
+        return any(_has_non_finite(k) or _has_non_finite(v) for k, v in data.items())
+    if isinstance(data, (list, tuple)):
+        return any(_has_non_finite(v) for v in data)
+    return False
+
+
+class _OrjsonCodec(_JsonCodec):
+    name = 'orjson'
+
+    def __init__(self, orjson):
+        self._dumps = orjson.dumps
+        self._loads = orjson.loads
+        # Give datetimes to ``default`` (TypeError without one) like json does.
+        self._options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        self._sort_keys = orjson.OPT_SORT_KEYS
+
+    def _encode(self, data, kwargs):
+        options = self._options
+        default = None
+        if kwargs:
+            if not kwargs.keys() <= {'default', 'sort_keys'}:
+                return None
+            default = kwargs.get('default')
+            if kwargs.get('sort_keys'):
+                options |= self._sort_keys
+        try:
+            encoded = self._dumps(data, default=default, option=options)
+        except TypeError:
+            return None
+        # Non-ASCII output has to be escaped the way json does it.
+        if not encoded.isascii():
+            return None
+        # orjson writes non-finite floats as null. Only look for them when
+        # there is a null, values returned by default can't be looked at.
+        if b'null' in encoded and (default is not None or _has_non_finite(data)):
+            return None
+        return encoded
+
+    def dumps(self, data, **kwargs):
+        encoded = self._encode(data, kwargs)
+        if encoded is None:
+            return json.dumps(data, **kwargs)
+        return encoded.decode('ascii')
+
+    def dumpb(self, data, **kwargs):
+        encoded = self._encode(data, kwargs)
+        if encoded is None:
+            return json.dumps(data, **kwargs).encode('utf-8')
+        return encoded
+
+    def loads(self, s, **kwargs):
+        if not kwargs:
+            try:
+                return self._loads(s)
+            except ValueError:
+                pass
+        return json.loads(s, **kwargs)
+
+    def loadb(self, s, **kwargs):
+        if not kwargs:
+            try:
+                return self._loads(s)
+            except ValueError:
+                pass
+        return json.loads(s.decode('utf-8'), **kwargs)
+
+
+_codec = _JsonCodec()
+
+
+def set_backend(name=None):
+    """
+    Select the codec used by dumps/loads/dumpb/loadb.
+
+    :param name: one of BACKENDS, defaults to the VOLTTRON_JSON_BACKEND
+                 environment variable or 'json'
+    :type name: str
+    :returns: name of the backend actually in use
+    :rtype: str
+    """
+    global _codec
+    if name is None:
+        name = os.environ.get(BACKEND_ENV) or 'json'
+    name = name.lower()
+    if name not in BACKENDS:
+        raise ValueError("Invalid json backend {}, valid backends are {}".format(name, BACKENDS))
+
+    codec = _JsonCodec()
+    if name in ('orjson', 'auto'):
+        try:
+            import orjson
+        except ImportError:
+            if name == 'orjson':
+                _log.warning("orjson json backend requested but orjson is not installed, using json")
+        else:
+            codec = _OrjsonCodec(orjson)
+    _codec = codec
+    return _codec.name
+
+
+def get_backend():
+    """Return the name of the codec used by dumps/loads/dumpb/loadb."""
+    return _codec.name
+
+
+def dumps(data, **kwargs):
+    return _codec.dumps(data, **kwargs)
+
+
+def loads(s, **kwargs):
+    return _codec.loads(s, **kwargs)
 
 
 def dumpb(data, **kwargs):
-    return dumps(data, **kwargs).encode('utf-8')
+    return _codec.dumpb(data, **kwargs)
 
 
 def loadb(s, **kwargs):
-    return loads(s.decode('utf-8'), **kwargs)
+    return _codec.loadb(s, **kwargs)
+
+
+set_backend()
@@ -371,7 +371,8 @@ class Router(BaseRouter):
 
         self.pubsub = PubSubService(self.socket,
                                     self._protected_topics,
-                                    self._ext_routing)
+                                    self._ext_routing,
+                                    tracker=self._tracker)
         self.ext_rpc = ExternalRPCService(self.socket,
                                           self._ext_routing)
         self._poller.register(sock, zmq.POLLIN)
@@ -687,6 +688,10 @@ def start_volttron_process(opts):
 
     os.environ['MESSAGEBUS'] = opts.message_bus
     os.environ['SECURE_AGENT_USERS'] = opts.secure_agent_users
+    if opts.json_backend:
+        # Agents inherit the environment and select the same backend.
+        os.environ[jsonapi.BACKEND_ENV] = opts.json_backend
+        _log.info("Using json backend: {}".format(jsonapi.set_backend(opts.json_backend)))
     if opts.instance_name is None:
         if len(opts.vip_address) > 0:
             opts.instance_name = opts.vip_address[0]
@@ -1281,6 +1286,11 @@ def main(argv=sys.argv):
     parser.add_argument(
         '--message-bus', action='store', default='zmq', dest='message_bus',
         help='set message to be used. valid values are zmq and rmq')
+    parser.add_argument(
+        '--json-backend', action='store', default=None, dest='json_backend',
+        choices=jsonapi.BACKENDS,
+        help='json codec used by the platform and its agents. valid values are json (default), '
+             'orjson and auto (orjson if installed)')
     agents.add_argument(
         '--volttron-central-rmq-address', default=None,
         help='The AMQP address of a volttron central install instance')
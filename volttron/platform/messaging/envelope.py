@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+#
+# Copyright 2020, Battelle Memorial Institute.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# This material was prepared as an account of work sponsored by an agency of
+# the United States Government. Neither the United States Government nor the
+# United States Department of Energy, nor Battelle, nor any of their
+# employees, nor any jurisdiction or organization that has cooperated in the
+# development of these materials, makes any warranty, express or
+# implied, or assumes any legal liability or responsibility for the accuracy,
+# completeness, or usefulness or any information, apparatus, product,
+# software, or process disclosed, or represents that its use would not infringe
+# privately owned rights. Reference herein to any specific commercial product,
+# process, or service by trade name, trademark, manufacturer, or otherwise
+# does not necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors expressed
+# herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY operated by
+# BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+"""
+Compressed batch envelopes for forwarding records between platforms.
+
+A batch envelope carries many ``{'topic', 'headers', 'message'}`` records in
+one message.  Topics and headers are stored once in string tables and the
+records refer to them by index, the whole body is then compressed.  The
+envelope itself is a JSON serializable dictionary so it can be sent as a
+publish message or as an RPC argument::
+
+    {'envelope': 'batch', 'version': 1, 'compression': 'zlib',
+     'count': 3, 'data': '<base64 of the compressed body>'}
+
+``zlib`` compression is always available, ``lz4`` needs the lz4 package.
+"""
+
+import base64
+import copy
+import zlib
+
+from volttron.platform import jsonapi
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+ENVELOPE_TYPE = 'batch'
+ENVELOPE_VERSION = 1
+
+_COMPRESSORS = {
+    None: (lambda data: data, lambda data: data),
+    'zlib': (zlib.compress, zlib.decompress),
+}
+if lz4 is not None:
+    _COMPRESSORS['lz4'] = (lz4.frame.compress, lz4.frame.decompress)
+
+COMPRESSIONS = tuple(c for c in _COMPRESSORS if c is not None)
+
+
+def validate_compression(compression):
+    """Return compression if this platform can use it, raise ValueError otherwise."""
+    if compression not in _COMPRESSORS:
+        raise ValueError("Unsupported batch compression {}, use one of {} or None".format(compression,
+                                                                                         COMPRESSIONS))
+    return compression
+
+
+def is_batch(message):
+    """True if message is a batch envelope."""
+    return isinstance(message, dict) and message.get('envelope') == ENVELOPE_TYPE
+
+
+def pack_batch(records, compression='zlib'):
+    """
+    Pack records in a batch envelope.
+
+    :param records: list of dictionaries with 'topic', 'headers' and 'message' keys
+    :param compression: 'zlib', 'lz4' or None
+    :return: the envelope
+    """
+    compress, _ = _COMPRESSORS[validate_compression(compression)]
+    topic_index = {}
+    header_index = {}
+    headers_table = []
+    rows = []
+    for record in records:
+        topic = record['topic']
+        t = topic_index.setdefault(topic, len(topic_index))
+        headers = record['headers']
+        key = jsonapi.dumps(headers, sort_keys=True)
+        h = header_index.get(key)
+        if h is None:
+            h = header_index[key] = len(headers_table)
+            headers_table.append(headers)
+        rows.append([t, h, record['message']])
+
+    body = jsonapi.dumpb({'topics': list(topic_index), 'headers': headers_table, 'records': rows})
+    return {'envelope': ENVELOPE_TYPE,
+            'version': ENVELOPE_VERSION,
+            'compression': compression,
+            'count': len(rows),
+            'data': base64.b64encode(compress(body)).decode('ascii')}
+
+
+def unpack_batch(envelope):
+    """
+    Unpack the records of a batch envelope.
+
+    :return: list of dictionaries with 'topic', 'headers' and 'message' keys
+    """
+    if envelope.get('version') != ENVELOPE_VERSION:
+        raise ValueError("Unsupported batch envelope version {}".format(envelope.get('version')))
+    _, decompress = _COMPRESSORS[validate_compression(envelope.get('compression'))]
+    body = jsonapi.loadb(decompress(base64.b64decode(envelope['data'])))
+    topic_table = body['topics']
+    headers_table = body['headers']
+    # every record gets its own headers, historians add to them while caching
+    return [{'topic': topic_table[t], 'headers': copy.deepcopy(headers_table[h]), 'message': message}
+            for t, h, message in body['records']]
+
+
+def publish_batch(pubsub, envelope, peer='pubsub'):
+    """
+    Publish the records of a batch envelope as normal publishes, for agents relaying envelopes to the local bus.
+
+    :param pubsub: the pubsub subsystem of the publishing agent
+    :return: list of the results of the publishes
+    """
+    return [pubsub.publish(peer, record['topic'], headers=record['headers'], message=record['message'])
+            for record in unpack_batch(envelope)]
@@ -93,6 +93,9 @@ PLATFORM_VCP_DEVICES = _('platforms/{platform_uuid}/devices/{topic}')
 RECORD_BASE = _('record')
 RECORD = _('record/{subtopic}')
 
+# Batch envelopes of records forwarded from another platform
+FORWARDED_BATCH = _('forwarded/batch')
+
 MARKET_BASE = _('market/{subtopic}')
 MARKET_RESERVE = _(MARKET_BASE.replace('{subtopic}', 'reserve'))
 MARKET_BID = _(MARKET_BASE.replace('{subtopic}', 'bid'))
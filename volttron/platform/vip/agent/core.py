@@ -139,10 +139,16 @@ class ScheduledEvent(object):
         self.kwargs = kwargs or {}
         self.canceled = False
         self.finished = False
+        # Set by the core while the event waits in its schedule
+        self._on_cancel = None
 
     def cancel(self):
         '''Mark the timer as canceled to avoid a callback.'''
+        if self.canceled:
+            return
         self.canceled = True
+        if self._on_cancel is not None and not self.finished:
+            self._on_cancel()
 
     def __call__(self):
         if not self.canceled:
@@ -165,6 +171,9 @@ def findsignal(obj, owner, name):
 class BasicCore(object):
     delay_onstart_signal = False
     delay_running_event_set = False
+    # Canceled events are dropped from the schedule when they reach the top
+    # of the heap, or all at once when they make up more than half of it
+    schedule_compaction_minimum = 64
 
     def __init__(self, owner):
         self.greenlet = None
@@ -174,6 +183,11 @@ class BasicCore(object):
         self._stop_event = None
         self._schedule_event = None
         self._schedule = []
+        self._schedule_canceled = 0
+        self._schedule_stats = {'fired': 0, 'canceled': 0, 'compactions': 0,
+                                'latency_total': 0.0, 'latency_max': 0.0}
+        # Greenlets of fired callbacks, killed when the scheduler stops
+        self._scheduled_greenlets = weakref.WeakSet()
         self.onsetup = Signal()
         self.onstart = Signal()
         self.onstop = Signal()
@@ -257,10 +271,14 @@ class BasicCore(object):
                 greenlet = gevent.spawn(func, *args, **kwargs)
                 self.spawned_greenlets.add(greenlet)
 
+        def kill_scheduled_greenlets():
+            for glt in list(self._scheduled_greenlets):
+                glt.kill(block=False)
+
         def schedule_loop():
             heap = self._schedule
             event = self._schedule_event
-            cur = gevent.getcurrent()
+            stats = self._schedule_stats
             now = time.time()
             while True:
                 if heap:
@@ -272,9 +290,19 @@ class BasicCore(object):
                     event.clear()
                 now = time.time()
                 while heap and now >= heap[0][0]:
-                    _, _, callback = heapq.heappop(heap)
-                    greenlet = gevent.spawn(callback)
-                    cur.link(lambda glt: greenlet.kill())
+                    deadline, _, callback, scheduled = heapq.heappop(heap)
+                    if scheduled.canceled:
+                        scheduled.finished = True
+                        stats['canceled'] += 1
+                        self._schedule_canceled = max(0, self._schedule_canceled - 1)
+                        continue
+                    # Out of the schedule, canceling it while it runs is not a pending cancel
+                    scheduled._on_cancel = None
+                    latency = now - deadline
+                    stats['fired'] += 1
+                    stats['latency_total'] += latency
+                    stats['latency_max'] = max(stats['latency_max'], latency)
+                    self._scheduled_greenlets.add(gevent.spawn(callback))
 
         self._stop_event = stop = gevent.event.Event()
         self._async = gevent.get_hub().loop.async_()
@@ -289,6 +317,7 @@ class BasicCore(object):
         if loop:
             self.spawned_greenlets.add(loop)
         scheduler = gevent.Greenlet(schedule_loop)
+        scheduler.link(lambda glt: kill_scheduled_greenlets())
         if loop:
             loop.link(lambda glt: scheduler.kill())
         self.onstart.connect(lambda *_, **__: scheduler.start())
@@ -434,12 +463,56 @@ class BasicCore(object):
         self.tie_breaker += 1
         return self.tie_breaker
 
-    def _schedule_callback(self, deadline, callback):
+    def _schedule_callback(self, deadline, callback, event=None):
         deadline = utils.get_utc_seconds_from_epoch(deadline)
-        heapq.heappush(self._schedule, (deadline, self.get_tie_breaker(), callback))
+        if event is None:
+            event = callback
+        event._on_cancel = self._schedule_event_canceled
+        heapq.heappush(self._schedule, (deadline, self.get_tie_breaker(), callback, event))
         if self._schedule_event:
             self._schedule_event.set()
 
+    def _schedule_event_canceled(self):
+        self._schedule_canceled += 1
+        if (self._schedule_canceled >= self.schedule_compaction_minimum and
+                self._schedule_canceled * 2 > len(self._schedule)):
+            self._compact_schedule()
+
+    def _compact_schedule(self):
+        '''Drop canceled events from the schedule.'''
+        heap = self._schedule
+        remaining = []
+        for entry in heap:
+            if entry[3].canceled:
+                entry[3].finished = True
+            else:
+                remaining.append(entry)
+        self._schedule_stats['canceled'] += len(heap) - len(remaining)
+        self._schedule_stats['compactions'] += 1
+        heapq.heapify(remaining)
+        # The schedule loop holds on to this list, update it in place
+        heap[:] = remaining
+        self._schedule_canceled = 0
+
+    def get_schedule_stats(self):
+        '''Return the state of the scheduler.
+
+        queue_depth is the number of events waiting in the schedule,
+        canceled_pending how many of them were canceled and not dropped
+        yet. Latencies are the delay in seconds between the deadline of a
+        fired event and when its callback was spawned.
+        '''
+        stats = self._schedule_stats
+        fired = stats['fired']
+        return {'queue_depth': len(self._schedule),
+                'canceled_pending': self._schedule_canceled,
+                'running': len(self._scheduled_greenlets),
+                'fired': fired,
+                'canceled': stats['canceled'],
+                'compactions': stats['compactions'],
+                'latency_avg': stats['latency_total'] / fired if fired else 0.0,
+                'latency_max': stats['latency_max']}
+
     def _schedule_iter(self, it, event):
         def wrapper():
             if event.canceled:
@@ -451,7 +524,7 @@ class BasicCore(object):
                 event.function(*event.args, **event.kwargs)
                 event.finished = True
             else:
-                self._schedule_callback(deadline, wrapper)
+                self._schedule_callback(deadline, wrapper, event)
                 event.function(*event.args, **event.kwargs)
 
         try:
@@ -459,7 +532,7 @@ class BasicCore(object):
         except StopIteration:
             event.finished = True
         else:
-            self._schedule_callback(deadline, wrapper)
+            self._schedule_callback(deadline, wrapper, event)
 
     @schedule.classmethod
     def schedule(cls, deadline, *args, **kwargs):  # pylint: disable=no-self-argument
@@ -50,6 +50,7 @@ import gevent
 from zmq import green as zmq
 from zmq import SNDMORE
 from volttron.platform import jsonapi
+from volttron.utils.prefix_trie import PrefixTrie
 from volttron.utils.frame_serialization import serialize_frames
 from .base import SubsystemBase
 from ..decorators import annotate, annotations, dualmethod, spawn
@@ -100,6 +101,9 @@ class PubSub(SubsystemBase):
             return defaultdict(set)
 
         self._my_subscriptions = defaultdict(platform_subscriptions)
+        # (platform, bus) -> PrefixTrie of prefix -> callbacks, the same sets
+        # as in self._my_subscriptions
+        self._subscription_index = defaultdict(PrefixTrie)
         self.protected_topics = ProtectedPubSubTopics()
         core.register('pubsub', self._handle_subsystem, self._handle_error)
         self.vip_socket = None
@@ -135,8 +139,8 @@ class PubSub(SubsystemBase):
         self.synchronize()
 
     def _process_callback(self, sender, bus, topic, headers, message):
-        """Handle incoming subscription pushes from PubSubService. It iterates over all subscriptions to find the
-        subscription matching the topic and bus. It then calls the corresponding callback on finding a match.
+        """Handle incoming subscription pushes from PubSubService. It looks up the subscriptions matching the topic
+        and bus in the subscription index and calls the corresponding callbacks.
         param sender: identity of the publisher
         type sender: str
         param bus: bus
@@ -151,16 +155,13 @@ class PubSub(SubsystemBase):
         peer = 'pubsub'
 
         handled = 0
-        for platform in self._my_subscriptions:
-            # _log.debug("SYNC: process callback subscriptions: {}".format(self._my_subscriptions[platform][bus]))
-            buses = self._my_subscriptions[platform]
-            if bus in buses:
-                subscriptions = buses[bus]
-                for prefix, callbacks in subscriptions.items():
-                    if topic.startswith(prefix):
-                        handled += 1
-                        for callback in callbacks:
-                            callback(peer, sender, bus, topic, headers, message)
+        for platform in list(self._my_subscriptions):
+            index = self._subscription_index.get((platform, bus))
+            if index:
+                for callbacks in index.matches(topic):
+                    handled += 1
+                    for callback in callbacks:
+                        callback(peer, sender, bus, topic, headers, message)
         if not handled:
             # No callbacks for topic; synchronize with sender
             self.synchronize()
@@ -289,11 +290,10 @@ class PubSub(SubsystemBase):
         if not callable(callback):
             raise ValueError('callback %r is not callable' % (callback,))
         try:
-            if not all_platforms:
-                self._my_subscriptions['internal'][bus][prefix].add(callback)
-            else:
-                self._my_subscriptions['all'][bus][prefix].add(callback)
-                # _log.debug("SYNC: add subscriptions: {}".format(self._my_subscriptions['internal'][bus][prefix]))
+            platform = 'all' if all_platforms else 'internal'
+            callbacks = self._my_subscriptions[platform][bus][prefix]
+            callbacks.add(callback)
+            self._subscription_index[(platform, bus)][prefix] = callbacks
         except KeyError:
             _log.error("PUBSUB something went wrong in add subscriptions")
 
@@ -387,6 +387,7 @@ class PubSub(SubsystemBase):
                             remove.append(topic)
                     for topic in remove:
                         del subscriptions[topic]
+                        self._unindex_subscription(platform, bus, topic)
                     if not subscriptions:
                         del bus_subscriptions[bus]
                     if not bus_subscriptions:
@@ -406,6 +407,7 @@ class PubSub(SubsystemBase):
                             del subscriptions[prefix]
                         except KeyError:
                             return []
+                        self._unindex_subscription(platform, bus, prefix)
                     else:
                         try:
                             callbacks = subscriptions[prefix]
@@ -423,6 +425,7 @@ class PubSub(SubsystemBase):
                                 _log.debug(f"subscriptions: {subscriptions}")
                             except KeyError:
                                 return []
+                            self._unindex_subscription(platform, bus, prefix)
                     topics = [prefix]
                     if not subscriptions:
                         del bus_subscriptions[bus]
@@ -431,6 +434,13 @@ class PubSub(SubsystemBase):
         _log.debug(f"AFTER: {self._my_subscriptions}")
         return topics
 
+    def _unindex_subscription(self, platform, bus, prefix):
+        index = self._subscription_index.get((platform, bus))
+        if index is not None:
+            index.pop(prefix, None)
+            if not index:
+                del self._subscription_index[(platform, bus)]
+
     def unsubscribe(self, peer, prefix, callback, bus='', all_platforms=False):
         """Unsubscribe and remove callback(s).
 
@@ -51,6 +51,7 @@ from collections import defaultdict
 # Create a context common to the green and non-green zmq modules.
 from volttron.platform.agent.utils import get_platform_instance_name
 from volttron.utils.frame_serialization import serialize_frames
+from volttron.utils.prefix_trie import PrefixTrie
 
 green.Context._instance = green.Context.shadow(zmq.Context.instance().underlying)
 from volttron.platform import get_home
@@ -70,6 +71,7 @@ _log = logging.getLogger(__name__)
 class PubSubService(object):
     def __init__(self, socket, protected_topics, routing_service, *args, **kwargs):
         self._logger = logging.getLogger(__name__)
+        self._tracker = kwargs.pop('tracker', None)
 
         def platform_subscriptions():
             return defaultdict(subscriptions)
@@ -78,6 +80,9 @@ class PubSubService(object):
             return defaultdict(set)
 
         self._peer_subscriptions = defaultdict(platform_subscriptions)
+        # Prefix index per (platform, bus) sharing the subscriber sets held in
+        # self._peer_subscriptions, so publishes are matched in O(len(topic)).
+        self._subscription_index = defaultdict(PrefixTrie)
         self._vip_sock = socket
         self._user_capabilities = {}
         self._protected_topics = ProtectedPubSubTopics()
@@ -99,7 +104,27 @@ class PubSubService(object):
         :param prefix subscription prefix (peer is subscribing to all topics matching the prefix)
         :type str
         """
-        self._peer_subscriptions[platform][bus][prefix].add(peer)
+        subscribers = self._peer_subscriptions[platform][bus][prefix]
+        subscribers.add(peer)
+        self._subscription_index[(platform, bus)][prefix] = subscribers
+
+    def _remove_peer_subscription(self, platform, bus, prefix):
+        """
+        Remove the prefix (and all its subscribers) from the subscriptions of the specified platform and bus.
+        :param platform 'all' or 'internal'
+        :type str
+        :param bus bus.
+        :type str
+        :param prefix subscription prefix
+        :type str
+        :returns: the set of subscribers that were registered for the prefix
+        :rtype: set
+        """
+        subscribers = self._peer_subscriptions[platform][bus].pop(prefix, set())
+        index = self._subscription_index.get((platform, bus))
+        if index is not None:
+            index.pop(prefix, None)
+        return subscribers
 
     def peer_drop(self, peer, **kwargs):
         """
@@ -156,8 +181,8 @@ class PubSubService(object):
                     else:
                         subscribers.add(peer)
         for platform, bus, prefix in remove:
-            subscriptions = self._peer_subscriptions[platform][bus]
-            assert not subscriptions.pop(prefix)
+            subscribers = self._remove_peer_subscription(platform, bus, prefix)
+            assert not subscribers
 
         for platform, bus, prefix in items:
             self._add_peer_subscription(peer, bus, prefix, platform)
@@ -268,13 +293,15 @@ class PubSubService(object):
                         if not subscribers:
                             remove.append(topic)
                     for topic in remove:
-                        del subscriptions[topic]
+                        self._remove_peer_subscription(platform, bus, topic)
                 else:
                     for prefix in prefix if isinstance(prefix, list) else [prefix]:
-                        subscribers = subscriptions[prefix]
+                        subscribers = subscriptions.get(prefix)
+                        if subscribers is None:
+                            continue
                         subscribers.discard(peer)
                         if not subscribers:
-                            del subscriptions[prefix]
+                            self._remove_peer_subscription(platform, bus, prefix)
 
                 if platform == 'all' and self._ext_router is not None:
                     # Send updated subscription list to all connected platforms
@@ -423,34 +450,26 @@ class PubSubService(object):
             self._logger.error("JSON decode error. Invalid character")
             return 0
 
-        all_subscriptions = dict()
-        subscriptions = dict()
-        subs = dict()
-        # Get subscriptions for all platforms
-        try:
-            all_subscriptions = self._peer_subscriptions['all'][bus]
-        except KeyError:
-            pass
-        try:
-            subscriptions = self._peer_subscriptions['internal'][bus]
-        except KeyError:
-            pass
-
-        subs.update(all_subscriptions)
-        subs.update(subscriptions)
         subscribers = set()
-        # Check for local subscribers
-        for prefix, subscription in subs.items():
-            if subscription and topic.startswith(prefix):
-                subscribers |= subscription
+        # Check for local subscribers. Subscriptions for all platforms are
+        # local subscriptions as well.
+        for platform in ('all', 'internal'):
+            index = self._subscription_index.get((platform, bus))
+            if index:
+                for subscription in index.matches(topic):
+                    subscribers |= subscription
 
         if subscribers:
             # self._logger.debug("PUBSUBSERVICE: found subscribers: {}".format(subscribers))
+            # Serialize the payload once and reuse the frames (zero copy) for
+            # every subscriber, only the routing frame differs per recipient.
+            payload = serialize_frames(frames[1:])
+            if self._tracker is not None:
+                self._tracker.hit_fanout(len(subscribers), sum(len(frame) for frame in payload))
             for subscriber in subscribers:
-                frames[0] = subscriber
                 try:
                     # Send the message to the subscriber
-                    for sub in self._send(frames, publisher):
+                    for sub in self._send([subscriber] + payload, publisher):
                         # Drop the subscriber if unreachable
                         self.peer_drop(sub)
                 except ZMQError:
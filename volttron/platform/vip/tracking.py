@@ -87,6 +87,7 @@ class Tracker(object):
             'unroutable': {'error': {}, 'peer': {}},
             'incoming': {'peer': {}, 'user': {}, 'subsystem': {}},
             'outgoing': {'peer': {}, 'user': {}, 'subsystem': {}},
+            'fanout': {'messages': 0, 'deliveries': 0, 'bytes_saved': 0},
         }
 
     def hit(self, topic, frames, extra):
@@ -108,6 +109,16 @@ class Tracker(object):
                 increment(stat['subsystem'], subsystem)
             increment(stat['peer'], pick(frames, 0))
 
+    def hit_fanout(self, deliveries, payload_size):
+        '''Count a publish whose serialized payload of payload_size bytes
+        was shared by deliveries recipients instead of being re-serialized
+        for each of them.'''
+        if self.enabled:
+            stat = self.stats['fanout']
+            stat['messages'] += 1
+            stat['deliveries'] += deliveries
+            stat['bytes_saved'] += payload_size * (deliveries - 1)
+
     def enable(self):
         '''Enable tracking.'''
         if not self.enabled:
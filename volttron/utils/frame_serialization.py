@@ -89,7 +89,7 @@ def serialize_frames(data: List[Any]) -> List[Frame]:
     for x in data:
         try:
             if isinstance(x, list) or isinstance(x, dict):
-                frames.append(Frame(jsonapi.dumps(x).encode(ENCODE_FORMAT)))
+                frames.append(Frame(jsonapi.dumpb(x)))
             elif isinstance(x, Frame):
                 frames.append(x)
             elif isinstance(x, bytes):
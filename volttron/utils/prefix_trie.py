@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+#
+# Copyright 2020, Battelle Memorial Institute.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# This material was prepared as an account of work sponsored by an agency of
+# the United States Government. Neither the United States Government nor the
+# United States Department of Energy, nor Battelle, nor any of their
+# employees, nor any jurisdiction or organization that has cooperated in the
+# development of these materials, makes any warranty, express or
+# implied, or assumes any legal liability or responsibility for the accuracy,
+# completeness, or usefulness or any information, apparatus, product,
+# software, or process disclosed, or represents that its use would not infringe
+# privately owned rights. Reference herein to any specific commercial product,
+# process, or service by trade name, trademark, manufacturer, or otherwise
+# does not necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors expressed
+# herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY operated by
+# BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+
+"""
+A character level trie keyed by string prefixes.
+
+Pubsub subscriptions are plain string prefixes: a subscription to
+``devices/campus`` matches both ``devices/campus/building/all`` and
+``devices/campus2/all``.  Scanning every subscribed prefix with
+``topic.startswith(prefix)`` costs O(number of subscriptions) per message.
+The :class:`PrefixTrie` answers the same question by walking the topic one
+character at a time, so a lookup costs O(len(topic)) no matter how many
+prefixes are stored.
+"""
+
+__all__ = ['PrefixTrie']
+
+_EMPTY = object()
+
+
+class _Node(object):
+    __slots__ = ('children', 'value')
+
+    def __init__(self):
+        self.children = {}
+        self.value = _EMPTY
+
+
+class PrefixTrie(object):
+    """
+    Mapping of prefix -> value that can efficiently find every stored prefix
+    a topic starts with.
+
+    Supports the basic mapping operations (``trie[prefix] = value``,
+    ``trie[prefix]``, ``del trie[prefix]``, ``in``, ``len``) plus
+    :meth:`matches` and :meth:`iter_matches`.
+    """
+
+    __slots__ = ('_root', '_size')
+
+    def __init__(self):
+        self._root = _Node()
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, prefix):
+        node = self._find(prefix)
+        return node is not None and node.value is not _EMPTY
+
+    def __getitem__(self, prefix):
+        node = self._find(prefix)
+        if node is None or node.value is _EMPTY:
+            raise KeyError(prefix)
+        return node.value
+
+    def __setitem__(self, prefix, value):
+        node = self._root
+        for ch in prefix:
+            child = node.children.get(ch)
+            if child is None:
+                child = node.children[ch] = _Node()
+            node = child
+        if node.value is _EMPTY:
+            self._size += 1
+        node.value = value
+
+    def __delitem__(self, prefix):
+        path = []
+        node = self._root
+        for ch in prefix:
+            path.append((node, ch))
+            node = node.children.get(ch)
+            if node is None:
+                raise KeyError(prefix)
+        if node.value is _EMPTY:
+            raise KeyError(prefix)
+        node.value = _EMPTY
+        self._size -= 1
+        # Prune the branch back to the last node that is still in use.
+        while path and not node.children and node.value is _EMPTY:
+            parent, ch = path.pop()
+            del parent.children[ch]
+            node = parent
+
+    def get(self, prefix, default=None):
+        node = self._find(prefix)
+        if node is None or node.value is _EMPTY:
+            return default
+        return node.value
+
+    def pop(self, prefix, *default):
+        try:
+            value = self[prefix]
+        except KeyError:
+            if default:
+                return default[0]
+            raise
+        del self[prefix]
+        return value
+
+    def matches(self, topic):
+        """
+        Return the values of every stored prefix that topic starts with,
+        shortest prefix first.
+
+        :param topic: topic to match against the stored prefixes
+        :type topic: str
+        :returns: list of values
+        :rtype: list
+        """
+        node = self._root
+        found = []
+        if node.value is not _EMPTY:
+            found.append(node.value)
+        for ch in topic:
+            node = node.children.get(ch)
+            if node is None:
+                break
+            if node.value is not _EMPTY:
+                found.append(node.value)
+        return found
+
+    def iter_matches(self, topic):
+        """
+        Yield ``(prefix, value)`` for every stored prefix that topic starts
+        with, shortest prefix first.
+        """
+        node = self._root
+        if node.value is not _EMPTY:
+            yield '', node.value
+        for index, ch in enumerate(topic):
+            node = node.children.get(ch)
+            if node is None:
+                return
+            if node.value is not _EMPTY:
+                yield topic[:index + 1], node.value
+
+    def _find(self, prefix):
+        node = self._root
+        for ch in prefix:
+            node = node.children.get(ch)
+            if node is None:
+                return None
+        return node
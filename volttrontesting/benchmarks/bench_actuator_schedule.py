@@ -0,0 +1,71 @@
+"""
+Book 15 minute slots across many devices with the Actuator's ScheduleManager
+the way a demand response campaign pre-books them, then try a round of
+conflicting low priority requests and preempting high priority requests.
+Prints the time per request as the number of booked slots grows. The state is
+not saved, so the time only covers conflict detection and cleanup.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'core', 'ActuatorAgent'))
+
+from actuator.scheduler import ScheduleManager, PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_LOW_PREEMPT  # noqa: E402
+
+SLOT = timedelta(minutes=15)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--devices', type=int, default=500)
+    parser.add_argument('--slots', type=int, default=10000)
+    parser.add_argument('--slots-per-task', type=int, default=4)
+    parser.add_argument('--report-every', type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    now = datetime(2020, 6, 1, 0, 0)
+    campaign_start = now + timedelta(hours=1)
+    devices = ['campus/building/device{}'.format(i) for i in range(args.devices)]
+    slots_per_device = args.slots // args.devices
+
+    # Every device is booked in blocks of consecutive slots, tasks are requested in random order.
+    blocks = [(device, first) for device in devices
+              for first in range(0, slots_per_device, args.slots_per_task)]
+    rng.shuffle(blocks)
+
+    manager = ScheduleManager(60, now=now)
+    print("{:>10} {:>16}".format("tasks", "ms/request"))
+    start = time.perf_counter()
+    for i, (device, first) in enumerate(blocks, 1):
+        slot_start = campaign_start + first * SLOT
+        requests = [[device, slot_start, slot_start + args.slots_per_task * SLOT]]
+        priority = PRIORITY_LOW_PREEMPT if i % 2 else PRIORITY_LOW
+        result = manager.request_slots('campaign', 'task{}'.format(i), requests, priority, now)
+        assert result.success, result
+        manager.get_next_event_time(now)
+        if i % args.report_every == 0:
+            elapsed = time.perf_counter() - start
+            print("{:>10} {:>16.3f}".format(i, elapsed / args.report_every * 1000))
+            start = time.perf_counter()
+
+    rounds = 200
+    print("{:>10} {:>16} {:>10}".format("priority", "ms/request", "accepted"))
+    for priority in (PRIORITY_LOW, PRIORITY_HIGH):
+        accepted = 0
+        start = time.perf_counter()
+        for i in range(rounds):
+            device = rng.choice(devices)
+            slot_start = campaign_start + rng.randint(0, slots_per_device - 1) * SLOT
+            result = manager.request_slots('other', '{}{}'.format(priority, i), [[device, slot_start, slot_start + SLOT]],
+                                           priority, now)
+            accepted += result.success
+        elapsed = time.perf_counter() - start
+        print("{:>10} {:>16.3f} {:>10}".format(priority, elapsed / rounds * 1000, accepted))
+
+if __name__ == '__main__':
+    main()
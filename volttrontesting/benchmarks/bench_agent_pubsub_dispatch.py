@@ -0,0 +1,80 @@
+"""
+Dispatch pushed messages to the callbacks of an agent's PubSub subsystem
+with a growing number of subscribed prefixes. Compares the previous linear
+``startswith`` scan of PubSub._process_callback with the trie backed
+subscription index it uses now. The trie's cost per message stays flat as
+the number of subscriptions grows.
+"""
+import argparse
+import random
+import timeit
+from unittest import mock
+
+from volttron.platform.vip.agent.subsystems.pubsub import PubSub
+
+
+def linear_process_callback(pubsub, sender, bus, topic, headers, message):
+    """PubSub._process_callback before the subscription index"""
+    handled = 0
+    for platform in pubsub._my_subscriptions:
+        buses = pubsub._my_subscriptions[platform]
+        if bus in buses:
+            subscriptions = buses[bus]
+            for prefix, callbacks in subscriptions.items():
+                if topic.startswith(prefix):
+                    handled += 1
+                    for callback in callbacks:
+                        callback('pubsub', sender, bus, topic, headers, message)
+    return handled
+
+
+def build_pubsub(count, rng):
+    pubsub = PubSub(mock.MagicMock(), mock.MagicMock(), mock.MagicMock(), object())
+    pubsub.synchronize = lambda: None
+
+    def callback(peer, sender, bus, topic, headers, message):
+        pass
+
+    prefixes = set()
+    while len(prefixes) < count:
+        prefixes.add('devices/campus{}/building{}/device{}'.format(rng.randint(0, 9), rng.randint(0, 49),
+                                                                   rng.randint(0, 9999)))
+    for prefix in prefixes:
+        pubsub._add_subscription(prefix, callback)
+    return pubsub
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 5000])
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    topics = ['devices/campus{}/building{}/device{}/all'.format(rng.randint(0, 9), rng.randint(0, 49),
+                                                                 rng.randint(0, 9999))
+              for _ in range(args.messages)]
+    headers = {'Date': '2020-01-01T00:00:00+00:00'}
+
+    print("{:>14} {:>16} {:>16} {:>9}".format("subscriptions", "linear us/msg", "trie us/msg", "speedup"))
+    for size in args.sizes:
+        pubsub = build_pubsub(size, rng)
+
+        def linear():
+            for topic in topics:
+                linear_process_callback(pubsub, 'sender', '', topic, headers, None)
+
+        def trie():
+            for topic in topics:
+                pubsub._process_callback('sender', '', topic, headers, None)
+
+        linear_time = min(timeit.repeat(linear, number=1, repeat=args.repeat))
+        trie_time = min(timeit.repeat(trie, number=1, repeat=args.repeat))
+        print("{:>14} {:>16.2f} {:>16.2f} {:>8.1f}x".format(size, linear_time / len(topics) * 1e6,
+                                                            trie_time / len(topics) * 1e6,
+                                                            linear_time / trie_time))
+
+
+if __name__ == '__main__':
+    main()
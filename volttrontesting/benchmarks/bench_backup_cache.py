@@ -0,0 +1,96 @@
+"""
+Push records through the historian backup cache (BackupDatabase) the way the
+process loop does while the historian is backlogged: every drained queue
+batch is cached with backup_new_data, then the cache is drained with
+get_outstanding_to_publish/remove_successfully_published. Reports the
+sustained records/sec of both phases for every journal mode.
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from pytz import UTC
+
+from volttron.platform.agent.base_historian import BACKUP_JOURNAL_MODES, BackupDatabase
+
+
+class _Owner(object):
+    """Stand in for the historian, BackupDatabase only keeps a weak reference to it."""
+
+
+def batches(records, batch_size, devices, points):
+    """Queue batches of records as _capture_device_data builds them, one headers dict per device publish."""
+    start = datetime(2020, 1, 1, tzinfo=UTC)
+    meta = {'type': 'float', 'tz': 'US/Pacific', 'units': 'degreesFahrenheit'}
+    batch = []
+    for publish in range(0, records // points):
+        timestamp = start + timedelta(seconds=publish)
+        headers = {'Date': timestamp.isoformat(), 'TimeStamp': timestamp.isoformat()}
+        device = 'devices/campus/building/device{}/'.format(publish % devices)
+        for point in range(points):
+            batch.append({'source': 'scrape',
+                          'topic': device + 'Point{}'.format(point),
+                          'readings': [(timestamp, 72.5 + point)],
+                          'headers': headers,
+                          'meta': meta})
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def run(journal_mode, storage_limit_gb, args):
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists('backup.sqlite' + suffix):
+            os.remove('backup.sqlite' + suffix)
+    owner = _Owner()
+    backupdb = BackupDatabase(owner, storage_limit_gb, 0.9, journal_mode=journal_mode)
+
+    begin = time.perf_counter()
+    for batch in batches(args.records, args.batch, args.devices, args.points):
+        backupdb.backup_new_data(batch)
+    ingest = time.perf_counter() - begin
+    cached = backupdb.get_backlog_count()
+
+    begin = time.perf_counter()
+    drained = 0
+    while True:
+        to_publish = backupdb.get_outstanding_to_publish(args.submit_size)
+        if not to_publish:
+            break
+        drained += len(to_publish)
+        backupdb.remove_successfully_published({None}, args.submit_size)
+    drain = time.perf_counter() - begin
+    backupdb.close()
+    return cached / ingest, drained / drain
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--records', type=int, default=1000000)
+    parser.add_argument('--batch', type=int, default=1000, help="records per drained queue batch")
+    parser.add_argument('--submit-size', type=int, default=1000, help="submit_size_limit of the historian")
+    parser.add_argument('--devices', type=int, default=100)
+    parser.add_argument('--points', type=int, default=50, help="points per device publish")
+    parser.add_argument('--storage-limit-gb', type=float, default=10.0)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # BackupDatabase creates backup.sqlite in the current directory
+        os.chdir(tmp)
+        try:
+            print("{:>8} {:>10} {:>14} {:>14}".format("journal", "limit GB", "ingest rec/s", "drain rec/s"))
+            for journal_mode in BACKUP_JOURNAL_MODES:
+                for limit in (None, args.storage_limit_gb):
+                    ingest, drain = run(journal_mode, limit, args)
+                    print("{:>8} {:>10} {:>14.0f} {:>14.0f}".format(journal_mode, str(limit), ingest, drain))
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == '__main__':
+    main()
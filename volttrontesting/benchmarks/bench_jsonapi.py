@@ -0,0 +1,67 @@
+"""
+Round trip platform driver "all" publishes through every available jsonapi
+backend: dumps/loads, dumpb/loadb and the VIP frame (de)serialization used on
+every message.
+"""
+import argparse
+import random
+import timeit
+
+from zmq.sugar.frame import Frame
+
+from volttron.platform import jsonapi
+from volttron.platform.agent import utils
+from volttron.utils.frame_serialization import deserialize_frames, serialize_frames
+
+
+def driver_all_publish(points, rng):
+    """Build the headers and message of a device "all" publish as DriverAgent.periodic_read does."""
+    values = {}
+    meta = {}
+    for i in range(points):
+        name = 'Point{}'.format(i)
+        kind = i % 3
+        if kind == 0:
+            values[name] = round(rng.uniform(50, 90), 2)
+            meta[name] = {'type': 'float', 'tz': 'US/Pacific', 'units': 'degreesFahrenheit'}
+        elif kind == 1:
+            values[name] = rng.randint(0, 1)
+            meta[name] = {'type': 'integer', 'tz': 'US/Pacific', 'units': 'Enum'}
+        else:
+            values[name] = rng.random()
+            meta[name] = {'type': 'float', 'tz': 'US/Pacific', 'units': 'percent'}
+    now = utils.format_timestamp(utils.get_aware_utc_now())
+    headers = {'Date': now, 'TimeStamp': now, 'SynchronizedTimeStamp': now, 'min_compatible_version': '5.0',
+               'max_compatible_version': '', 'Content-Type': 'application/json'}
+    return dict(bus='', headers=headers, message=[values, meta])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--points', type=int, nargs='+', default=[10, 100, 500])
+    parser.add_argument('--number', type=int, default=200)
+    args = parser.parse_args()
+
+    backends = [b for b in ('json', 'orjson') if jsonapi.set_backend(b) == b]
+    rng = random.Random(42)
+    print("{:>7} {:>8} {:>14} {:>14} {:>14}".format("points", "backend", "dumps+loads us",
+                                                    "dumpb+loadb us", "frames us"))
+    for points in args.points:
+        msg = driver_all_publish(points, rng)
+        frames = ['publisher', '', 'VIP1', '', '', 'pubsub', 'publish', 'devices/campus/building/device/all', msg]
+        for backend in backends:
+            jsonapi.set_backend(backend)
+            assert jsonapi.loads(jsonapi.dumps(msg)) == msg
+            text = timeit.timeit(lambda: jsonapi.loads(jsonapi.dumps(msg)), number=args.number)
+            binary = timeit.timeit(lambda: jsonapi.loadb(jsonapi.dumpb(msg)), number=args.number)
+            vip = timeit.timeit(lambda: deserialize_frames([Frame(bytes(f)) for f in serialize_frames(frames)]),
+                                number=args.number)
+            print("{:>7} {:>8} {:>14.1f} {:>14.1f} {:>14.1f}".format(points, backend,
+                                                                   text / args.number * 1e6,
+                                                                   binary / args.number * 1e6,
+                                                                   vip / args.number * 1e6))
+    jsonapi.set_backend()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Compare matching a published topic against subscription prefixes with a
+linear ``startswith`` scan (the previous PubSubService._distribute_internal
+implementation) and with the PrefixTrie index now used by the router.
+"""
+import argparse
+import random
+import timeit
+
+from volttron.utils.prefix_trie import PrefixTrie
+
+
+def build_prefixes(count, rng):
+    prefixes = set()
+    while len(prefixes) < count:
+        depth = rng.randint(1, 4)
+        parts = ['devices', 'campus{}'.format(rng.randint(0, 9)),
+                 'building{}'.format(rng.randint(0, 49)),
+                 'device{}'.format(rng.randint(0, 999))]
+        prefixes.add('/'.join(parts[:depth]))
+    return {prefix: {'agent{}'.format(i)} for i, prefix in enumerate(prefixes)}
+
+
+def linear_lookup(subscriptions, topic):
+    subscribers = set()
+    for prefix, subscription in subscriptions.items():
+        if subscription and topic.startswith(prefix):
+            subscribers |= subscription
+    return subscribers
+
+
+def trie_lookup(index, topic):
+    subscribers = set()
+    for subscription in index.matches(topic):
+        subscribers |= subscription
+    return subscribers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 10000])
+    parser.add_argument('--topics', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    topics = ['devices/campus{}/building{}/device{}/all'.format(rng.randint(0, 9), rng.randint(0, 49),
+                                                                 rng.randint(0, 999))
+              for _ in range(args.topics)]
+
+    print("{:>10} {:>16} {:>16} {:>9}".format("prefixes", "linear us/msg", "trie us/msg", "speedup"))
+    for size in args.sizes:
+        subscriptions = build_prefixes(size, rng)
+        index = PrefixTrie()
+        for prefix, subscribers in subscriptions.items():
+            index[prefix] = subscribers
+
+        for topic in topics[:50]:
+            assert linear_lookup(subscriptions, topic) == trie_lookup(index, topic)
+
+        linear = min(timeit.repeat(lambda: [linear_lookup(subscriptions, t) for t in topics],
+                                   number=1, repeat=args.repeat))
+        trie = min(timeit.repeat(lambda: [trie_lookup(index, t) for t in topics],
+                                 number=1, repeat=args.repeat))
+        print("{:>10} {:>16.2f} {:>16.2f} {:>8.1f}x".format(size, linear / len(topics) * 1e6,
+                                                            trie / len(topics) * 1e6, linear / trie))
+
+
+if __name__ == '__main__':
+    main()
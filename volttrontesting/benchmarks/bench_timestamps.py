@@ -0,0 +1,97 @@
+"""
+Format and parse a million row workload of timestamps with the strftime and
+strptime implementations utils used before, the per value functions of
+volttron.platform.agent.timestamps and its batch variants. Rows are grouped
+the way historians receive them, several points share the timestamp of their
+device scrape.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import pytz
+from dateutil.parser import parse
+from dateutil.tz import tzoffset
+
+from volttron.platform.agent import timestamps
+
+
+def legacy_format_timestamp(time_stamp):
+    """utils.format_timestamp before the timestamps module"""
+    return timestamps._format_timestamp_strftime(time_stamp)
+
+
+def legacy_parse_timestamp_string(time_stamp_str):
+    """utils.parse_timestamp_string before the timestamps module"""
+    if len(time_stamp_str) == 26:
+        try:
+            return datetime.strptime(time_stamp_str, "%Y-%m-%dT%H:%M:%S.%f")
+        except ValueError:
+            pass
+
+    elif len(time_stamp_str) == 32:
+        try:
+            base_time_stamp_str = time_stamp_str[:26]
+            time_zone_str = time_stamp_str[26:]
+            time_stamp = datetime.strptime(base_time_stamp_str, "%Y-%m-%dT%H:%M:%S.%f")
+            if time_zone_str == "+00:00":
+                return time_stamp.replace(tzinfo=pytz.UTC)
+
+            hours_offset = int(time_zone_str[1:3])
+            minutes_offset = int(time_zone_str[4:6])
+
+            seconds_offset = hours_offset * 3600 + minutes_offset * 60
+            if time_zone_str[0] == "-":
+                seconds_offset = -seconds_offset
+
+            return time_stamp.replace(tzinfo=tzoffset("", seconds_offset))
+
+        except ValueError:
+            pass
+
+    return parse(time_stamp_str)
+
+
+def build_rows(rows, points_per_timestamp):
+    start = pytz.UTC.localize(datetime(2020, 1, 1))
+    pacific = pytz.timezone("US/Pacific")
+    time_stamps = []
+    for scrape in range(rows // points_per_timestamp):
+        time_stamp = start + timedelta(seconds=scrape, microseconds=scrape % 997)
+        if scrape % 4 == 3:
+            time_stamp = time_stamp.astimezone(pacific)
+        time_stamps.extend([time_stamp] * points_per_timestamp)
+    return time_stamps
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--points-per-timestamp', type=int, nargs='+', default=[1, 10])
+    args = parser.parse_args()
+
+    print("{:>10} {:>10} {:>16} {:>16} {:>16}".format("rows/ts", "operation", "legacy s", "fast s", "batch s"))
+    for points in args.points_per_timestamp:
+        time_stamps = build_rows(args.rows, points)
+
+        legacy, legacy_strs = timed(lambda: [legacy_format_timestamp(t) for t in time_stamps])
+        fast, fast_strs = timed(lambda: [timestamps.format_timestamp(t) for t in time_stamps])
+        batch, batch_strs = timed(timestamps.format_timestamps, time_stamps)
+        assert legacy_strs == fast_strs == batch_strs
+        print("{:>10} {:>10} {:>16.3f} {:>16.3f} {:>16.3f}".format(points, "format", legacy, fast, batch))
+
+        legacy, legacy_parsed = timed(lambda: [legacy_parse_timestamp_string(s) for s in legacy_strs])
+        fast, fast_parsed = timed(lambda: [timestamps.parse_timestamp_string(s) for s in legacy_strs])
+        batch, batch_parsed = timed(timestamps.parse_timestamp_strings, legacy_strs)
+        assert legacy_parsed == fast_parsed == batch_parsed
+        print("{:>10} {:>10} {:>16.3f} {:>16.3f} {:>16.3f}".format(points, "parse", legacy, fast, batch))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Resolve tagging topic patterns against a campus of topics. Compares matching
+the prefixes of every topic the historian returns for a pattern, which is
+what BaseTaggingService.get_matching_topic_prefixes did after its
+get_topics_by_pattern call (the call itself is not counted), with the local
+TopicPrefixIndex it uses now.
+"""
+import argparse
+import random
+import re
+import timeit
+
+from volttron.platform.agent.topic_index import TopicPrefixIndex
+
+
+def scan_prefixes(topics, topic_pattern):
+    prefixes = set()
+    depth = len(topic_pattern.split('/'))
+    for topic in topics:
+        if re.search(topic_pattern, topic, re.IGNORECASE):
+            prefix = '/'.join(topic.split('/')[:depth])
+            if re.match(topic_pattern + '$', prefix):
+                prefixes.add(prefix)
+    return prefixes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--topics', type=int, default=50000)
+    parser.add_argument('--patterns', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    topics = set()
+    while len(topics) < args.topics:
+        topics.add('campus{}/building{}/vav{}/point{}'.format(rng.randint(1, 5), rng.randint(1, 40),
+                                                              rng.randint(1, 100), rng.randint(1, 30)))
+    topics = sorted(topics)
+    patterns = []
+    for _ in range(args.patterns):
+        patterns.append(rng.choice(['campus{c}/building{b}/vav*', 'campus{c}/building{b}/vav{v}',
+                                    'campus{c}/*/vav{v}', 'campus{c}/building{b}/*/point{p}'])
+                        .format(c=rng.randint(1, 5), b=rng.randint(1, 40), v=rng.randint(1, 100),
+                                p=rng.randint(1, 30)).replace('*', '.*'))
+
+    index = TopicPrefixIndex(topics)
+    for pattern in patterns:
+        assert index.match_prefixes(pattern) == scan_prefixes(topics, pattern)
+
+    scan_time = min(timeit.repeat(lambda: [scan_prefixes(topics, p) for p in patterns], number=1,
+                                  repeat=args.repeat))
+    index_time = min(timeit.repeat(lambda: [index.match_prefixes(p) for p in patterns], number=1,
+                                   repeat=args.repeat))
+    load_time = min(timeit.repeat(lambda: TopicPrefixIndex(topics), number=1, repeat=args.repeat))
+    print("{} topics, {} patterns".format(len(topics), len(patterns)))
+    print("{:>22} {:>12.3f} ms".format("scan per pattern", scan_time / len(patterns) * 1e3))
+    print("{:>22} {:>12.3f} ms".format("index per pattern", index_time / len(patterns) * 1e3))
+    print("{:>22} {:>12.3f} ms".format("index load", load_time * 1e3))
+
+
+if __name__ == '__main__':
+    main()
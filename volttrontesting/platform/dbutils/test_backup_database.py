@@ -181,6 +181,71 @@ def test_get_outstanding_to_publish_should_return_unique_records_on_multiple_tra
     assert backup_database.get_outstanding_to_publish(SIZE_LIMIT) == []
 
 
+def test_remove_successfully_published_should_only_remove_published_ids(
+    backup_database, new_publish_list_unique
+):
+    init_db(backup_database, new_publish_list_unique)
+    backup_database.get_outstanding_to_publish(SIZE_LIMIT)
+    published = {1, 2, 3, 5, 7, 8, 1000}
+
+    backup_database.remove_successfully_published(published, SIZE_LIMIT)
+
+    remaining = [int(row.split("|")[0]) for row in get_all_data("outstanding")]
+    assert remaining == [_id for _id in range(1, 1001) if _id not in published]
+    assert backup_database.get_backlog_count() == 1000 - len(published)
+
+
+def test_get_outstanding_to_publish_should_share_meta_until_it_changes(backup_database):
+    def record(value, meta):
+        return {"source": "scrape", "topic": "device/point", "meta": meta,
+                "readings": [(datetime(2020, 6, 1, 12, 31, value, tzinfo=UTC), value)], "headers": {}}
+
+    backup_database.backup_new_data([record(1, {"units": "F"}), record(2, {"units": "F"})])
+    first = backup_database.get_outstanding_to_publish(SIZE_LIMIT)
+    backup_database.remove_successfully_published({None}, SIZE_LIMIT)
+    backup_database.backup_new_data([record(3, {"units": "F"})])
+    second = backup_database.get_outstanding_to_publish(SIZE_LIMIT)
+    backup_database.remove_successfully_published({None}, SIZE_LIMIT)
+    backup_database.backup_new_data([record(4, {"units": "C", "tz": "UTC"})])
+    third = backup_database.get_outstanding_to_publish(SIZE_LIMIT)
+
+    assert first[0]["meta"] is first[1]["meta"] is second[0]["meta"]
+    assert first[0]["meta"] == {"units": "F"}
+    assert third[0]["meta"] == {"units": "C", "tz": "UTC"}
+    assert first[0]["meta"] == {"units": "F"}
+    assert get_all_data("metadata") == ["scrape|1|units|C", "scrape|1|tz|UTC"]
+
+
+def test_id_ranges():
+    assert BackupDatabase._id_ranges([]) == []
+    assert BackupDatabase._id_ranges({8, 1, 3, 2, 5, 7}) == [[1, 3], [5, 5], [7, 8]]
+    assert BackupDatabase._id_ranges([4, 4, 5]) == [[4, 5]]
+
+
+@pytest.mark.parametrize("journal_mode", ["DELETE", "WAL"])
+def test_backup_new_data_should_enforce_storage_limit(journal_mode, new_publish_list_unique):
+    remove_backup_files()
+    # 0.0002 GB is about 50 pages of 4096 bytes
+    backup_database = BackupDatabase(BaseHistorian(), 0.0002, 0.9, journal_mode=journal_mode)
+    try:
+        cache_full = [backup_database.backup_new_data(new_publish_list_unique) for _ in range(20)]
+
+        assert not cache_full[0]
+        assert cache_full[-1]
+        c = backup_database._connection.cursor()
+        c.execute("PRAGMA page_count")
+        assert c.fetchone()[0] <= backup_database.max_pages
+        c.execute("SELECT min(id), max(id), count(id) FROM outstanding")
+        min_id, max_id, count = c.fetchone()
+        # oldest records are removed first
+        assert max_id == 20 * len(new_publish_list_unique)
+        assert max_id - min_id + 1 == count
+        assert backup_database.get_backlog_count() == count
+    finally:
+        backup_database.close()
+        remove_backup_files()
+
+
 def init_db_with_dupes(backup_database, new_publish_list_dupes):
     backup_database.backup_new_data(new_publish_list_dupes)
 
@@ -243,15 +308,22 @@ def new_publish_list_dupes():
     return tuple(dupes)
 
 
-@pytest.fixture()
-def backup_database():
-    yield BackupDatabase(BaseHistorian(), None, 0.9)
+@pytest.fixture(params=["DELETE", "WAL"])
+def backup_database(request):
+    backup_database = BackupDatabase(BaseHistorian(), None, 0.9, journal_mode=request.param)
+    yield backup_database
 
     # Teardown
     # the backup database is an sqlite database with the name "backup.sqlite".
     # the db is created if it doesn't exist; see the method: BackupDatabase._setupdb(check_same_thread) for details
-    if os.path.exists("./backup.sqlite"):
-        os.remove("./backup.sqlite")
+    backup_database.close()
+    remove_backup_files()
+
+
+def remove_backup_files():
+    for name in ("./backup.sqlite", "./backup.sqlite-wal", "./backup.sqlite-shm"):
+        if os.path.exists(name):
+            os.remove(name)
 
 
 def get_all_data(table):
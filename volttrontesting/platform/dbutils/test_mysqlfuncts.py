@@ -4,6 +4,7 @@ import os
 import logging
 import pytest
 from time import time, sleep
+from unittest import mock
 
 try:
     import mysql.connector
@@ -100,6 +101,28 @@ def test_query_should_return_data(get_container_func, topic_ids, id_name_map, ex
     assert actual_values == expected_values
 
 
+def test_query_should_page_topics_with_one_statement(get_container_func):
+    container, sqlfuncts, connection_port, historian_version = get_container_func
+    query = f"""
+               CREATE TABLE IF NOT EXISTS {DATA_TABLE}
+               (ts timestamp NOT NULL,
+               topic_id INTEGER NOT NULL,
+               value_string TEXT NOT NULL,
+               UNIQUE(topic_id, ts));
+               REPLACE INTO {DATA_TABLE}
+               VALUES ('2020-06-01 12:30:57', 44, '1'), ('2020-06-01 12:30:58', 44, '2'),
+                      ('2020-06-01 12:30:59', 44, '3'), ('2020-06-01 12:30:59', 45, '4');
+            """
+    seed_database(container, query)
+
+    with mock.patch.object(sqlfuncts, "select", wraps=sqlfuncts.select) as select:
+        actual_values = sqlfuncts.query([44, 45, 46], {44: "topic44", 45: "topic45", 46: "topic46"}, skip=1, count=1,
+                                        order="LAST_TO_FIRST")
+
+    assert actual_values == {"topic44": [("2020-06-01T12:30:58.000000+00:00", 2)], "topic45": [], "topic46": []}
+    assert select.call_count == 1
+
+
 def test_insert_meta_query_should_succeed(get_container_func):
     container, sqlfuncts, connection_port, historian_version = get_container_func
 
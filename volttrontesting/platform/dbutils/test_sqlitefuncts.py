@@ -3,9 +3,12 @@ import sqlite3
 from gevent import subprocess
 import pytest
 import os
+import re
+from unittest import mock
 
 from setuptools import glob
 
+from volttron.platform.agent import utils
 from volttron.platform.dbutils.sqlitefuncts import SqlLiteFuncts
 
 
@@ -77,6 +80,96 @@ def test_query(get_sqlitefuncts, topic_ids, id_name_map, expected_values):
     assert actual_results == expected_values
 
 
+@pytest.mark.sqlitefuncts
+@pytest.mark.dbutils
+@pytest.mark.parametrize(
+    "skip, count, order, expected_values",
+    [
+        (0, None, "FIRST_TO_LAST",
+         {"topic42": [("2020-06-01T12:30:57.000000", 1), ("2020-06-01T12:30:58.000000", {"a": 2}),
+                      ("2020-06-01T12:30:59.000000", 3)],
+          "topic43": [("2020-06-01T12:30:58.000000", [4]), ("2020-06-01T12:30:59.000000", "five")],
+          "topic44": []}),
+        (1, 1, "FIRST_TO_LAST",
+         {"topic42": [("2020-06-01T12:30:58.000000", {"a": 2})],
+          "topic43": [("2020-06-01T12:30:59.000000", "five")],
+          "topic44": []}),
+        (0, 2, "LAST_TO_FIRST",
+         {"topic42": [("2020-06-01T12:30:59.000000", 3), ("2020-06-01T12:30:58.000000", {"a": 2})],
+          "topic43": [("2020-06-01T12:30:59.000000", "five"), ("2020-06-01T12:30:58.000000", [4])],
+          "topic44": []}),
+        (2, None, "FIRST_TO_LAST",
+         {"topic42": [("2020-06-01T12:30:59.000000", 3)], "topic43": [], "topic44": []}),
+    ],
+)
+def test_query_multiple_topics(get_sqlitefuncts, skip, count, order, expected_values):
+    sqlitefuncts, historain_version = get_sqlitefuncts
+    query = (
+        "INSERT OR REPLACE INTO data VALUES('2020-06-01 12:30:57',42,'1');"
+        "INSERT OR REPLACE INTO data VALUES('2020-06-01 12:30:58',42,'{\"a\": 2}');"
+        "INSERT OR REPLACE INTO data VALUES('2020-06-01 12:30:59',42,'3');"
+        "INSERT OR REPLACE INTO data VALUES('2020-06-01 12:30:58',43,'[4]');"
+        "INSERT OR REPLACE INTO data VALUES('2020-06-01 12:30:59',43,'\"five\"');"
+    )
+    query_db(query)
+    id_name_map = {42: "topic42", 43: "topic43", 44: "topic44"}
+
+    actual_results = sqlitefuncts.query([42, 43, 44], id_name_map, skip=skip, count=count, order=order)
+
+    assert actual_results == expected_values
+    assert list(actual_results) == ["topic42", "topic43", "topic44"]
+
+
+@pytest.mark.sqlitefuncts
+@pytest.mark.dbutils
+def test_query_latest_value_should_search_topics_through_index(get_sqlitefuncts):
+    sqlitefuncts, historain_version = get_sqlitefuncts
+    query_db(
+        "INSERT OR REPLACE INTO data VALUES('2020-06-01 12:30:58',42,'1');"
+        "INSERT OR REPLACE INTO data VALUES('2020-06-01 12:30:59',42,'2');"
+        "INSERT OR REPLACE INTO data VALUES('2020-06-01 12:30:59',43,'3');"
+    )
+    id_name_map = {42: "topic42", 43: "topic43"}
+
+    with mock.patch.object(sqlitefuncts, "select", wraps=sqlitefuncts.select) as select:
+        actual_results = sqlitefuncts.query([42, 43], id_name_map, count=1, order="LAST_TO_FIRST")
+    statements = [call[0][:2] for call in select.call_args_list]
+
+    assert actual_results == {"topic42": [("2020-06-01T12:30:59.000000", 2)],
+                              "topic43": [("2020-06-01T12:30:59.000000", 3)]}
+    assert len(statements) == 2
+    for statement, args in statements:
+        plan = [row[-1] for row in sqlitefuncts.select("EXPLAIN QUERY PLAN " + statement, args)]
+        # one indexed search per topic that is already ordered by ts, no scan or sort of the topic's rows
+        assert len(plan) == 1
+        assert plan[0].startswith("SEARCH") and "(topic_id=?)" in plan[0]
+
+
+@pytest.mark.sqlitefuncts
+@pytest.mark.dbutils
+@pytest.mark.parametrize("skip, count", [(0, None), (1, 1)])
+def test_query_columnar(get_sqlitefuncts, skip, count):
+    sqlitefuncts, historain_version = get_sqlitefuncts
+    query = (
+        "INSERT OR REPLACE INTO data VALUES('2020-06-01 12:30:58.000001',42,'2.5');"
+        "INSERT OR REPLACE INTO data VALUES('2020-06-01 12:30:59',42,'3');"
+        "INSERT OR REPLACE INTO data VALUES('2020-06-01 12:30:59',43,'\"four\"');"
+    )
+    query_db(query)
+    id_name_map = {42: "topic42", 43: "topic43"}
+
+    rows = sqlitefuncts.query([42, 43], id_name_map, skip=skip, count=count)
+    columns = sqlitefuncts.query([42, 43], id_name_map, skip=skip, count=count, columnar=True)
+
+    for topic, topic_rows in rows.items():
+        assert columns[topic]["values"] == [value for _, value in topic_rows]
+        assert columns[topic]["timestamps"] == [
+            utils.get_utc_microseconds_from_epoch(utils.parse_timestamp_string(ts)) for ts, _ in topic_rows
+        ]
+    if skip == 0:
+        assert columns["topic42"]["timestamps"] == [1591014658000001, 1591014659000000]
+
+
 @pytest.mark.sqlitefuncts
 @pytest.mark.dbutils
 @pytest.mark.parametrize(
@@ -400,6 +493,75 @@ def test_collect_aggregate(get_sqlitefuncts):
     assert actual_aggregate == expected_aggregate
 
 
+@pytest.mark.sqlitefuncts
+@pytest.mark.dbutils
+def test_collect_aggregates(get_sqlitefuncts):
+    sqlitefuncts, historain_version = get_sqlitefuncts
+    query = (
+        "INSERT OR REPLACE INTO data values('2020-06-01 12:30:59', 42, '2');"
+        "INSERT OR REPLACE INTO data values('2020-06-01 12:31:59', 42, '4');"
+        "INSERT OR REPLACE INTO data values('2020-06-01 12:31:59', 43, '8');"
+    )
+    query_db(query)
+
+    actual_aggregates = sqlitefuncts.collect_aggregates([42, 43, 44], "avg")
+
+    assert actual_aggregates == {42: (3.0, 2), 43: (8.0, 1)}
+
+
+@pytest.mark.sqlitefuncts
+@pytest.mark.dbutils
+def test_insert_aggregates(get_sqlitefuncts):
+    sqlitefuncts, historain_version = get_sqlitefuncts
+    sqlitefuncts.create_aggregate_store("avg", "15m")
+
+    result = sqlitefuncts.insert_aggregates("avg", "15m", '2020-06-01 12:30:00',
+                                            [(1, 2.5, [42]), (2, 8.0, [43, 44])])
+
+    assert result is True
+    assert get_all_data("avg_15m") == ["2020-06-01 12:30:00|1|2.5|[42]",
+                                       "2020-06-01 12:30:00|2|8.0|[43, 44]"]
+
+
+@pytest.mark.sqlitefuncts
+@pytest.mark.dbutils
+@pytest.mark.parametrize(
+    "regex, expected_pattern",
+    [
+        ("^AHU", "AHU%"),
+        ("^AHU$", "AHU"),
+        ("AHU", "%AHU%"),
+        ("AHU$", "%AHU"),
+        ("^AHU.*", "AHU%"),
+        ("^campus/building_1 10%", "campus/building^_1 10^%%"),
+        ("^AHU[12]", None),
+        ("AHU.1", None),
+        ("^a|b", None),
+        ("", None),
+        ("^café", None),
+    ],
+)
+def test_get_like_pattern(regex, expected_pattern):
+    assert SqlLiteFuncts._get_like_pattern(regex) == expected_pattern
+
+
+@pytest.mark.sqlitefuncts
+@pytest.mark.dbutils
+@pytest.mark.parametrize("regex", ["^ahu", "^AHU_1$", "north", "1 North$", "^AHU.*", "AHU.1", "^(AHU|VAV)"])
+def test_tagging_query_should_match_regexp(regex):
+    values = ["AHU_1 North", "AHU11 North", "ahu_2", "VAV 1", "AHU%1"]
+    connection = sqlite3.connect(":memory:")
+    connection.create_function("REGEXP", 2, SqlLiteFuncts.regexp)
+    connection.execute("CREATE TABLE topic_tags (topic_prefix TEXT, tag STRING, value STRING)")
+    connection.executemany("INSERT INTO topic_tags VALUES (?, 'dis', ?)", [(value, value) for value in values])
+
+    query = SqlLiteFuncts.get_tagging_query_from_ast("topic_tags", ("LIKE", "dis", regex), {})
+    actual = {row[0] for row in connection.execute(query)}
+
+    assert ("REGEXP" in query) == (SqlLiteFuncts._get_like_pattern(regex) is None)
+    assert actual == {value for value in values if re.search(regex, value, re.IGNORECASE)}
+
+
 def get_indexes(table):
     res = query_db(f"""PRAGMA index_list({table})""")
     return res.splitlines()
@@ -442,6 +604,7 @@ def sqlitefuncts_db_not_initialized():
     yield client
 
     # Teardown
+    client.close()
     if os.path.isdir("./data"):
         files = glob.glob("./data/*", recursive=True)
         for f in files:
@@ -0,0 +1,68 @@
+import base64
+
+import pytest
+
+from volttron.platform import jsonapi
+from volttron.platform.messaging.envelope import COMPRESSIONS, is_batch, pack_batch, publish_batch, unpack_batch
+
+
+def records(count, devices=3):
+    headers = [{'Date': '2020-01-01T00:00:{:02d}+00:00'.format(i), 'X-Forwarded': True} for i in range(2)]
+    return [{'topic': 'devices/campus/building/device{}/all'.format(i % devices),
+             'headers': headers[i % 2],
+             'message': [{'Temperature': 70.5 + i, 'Setpoint': 72}, {'Temperature': {'units': 'F'}}]}
+            for i in range(count)]
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS + (None,))
+def test_unpack_batch_should_return_packed_records(compression):
+    envelope = pack_batch(records(20), compression)
+
+    assert is_batch(envelope)
+    assert envelope['count'] == 20
+    assert jsonapi.loads(jsonapi.dumps(envelope)) == envelope
+    assert unpack_batch(envelope) == records(20)
+
+
+def test_pack_batch_should_store_topics_and_headers_once():
+    envelope = pack_batch(records(30), None)
+    body = jsonapi.loadb(base64.b64decode(envelope['data']))
+
+    assert len(body['topics']) == 3
+    assert len(body['headers']) == 2
+
+
+def test_pack_batch_should_be_smaller_than_records():
+    to_send = records(500, devices=50)
+
+    assert len(jsonapi.dumps(pack_batch(to_send))) * 5 < len(jsonapi.dumps(to_send))
+
+
+def test_unpack_batch_should_not_share_headers():
+    unpacked = unpack_batch(pack_batch(records(4)))
+
+    unpacked[0]['headers']['time_error'] = False
+
+    assert 'time_error' not in unpacked[2]['headers']
+
+
+def test_pack_batch_should_reject_unknown_compression():
+    with pytest.raises(ValueError):
+        pack_batch(records(1), 'snappy')
+
+
+def test_is_batch():
+    assert not is_batch(records(1))
+    assert not is_batch({'Temperature': 72})
+
+
+def test_publish_batch_should_publish_every_record():
+    published = []
+
+    class PubSub(object):
+        def publish(self, peer, topic, headers=None, message=None):
+            published.append((peer, topic, headers, message))
+
+    publish_batch(PubSub(), pack_batch(records(5)))
+
+    assert published == [('pubsub', r['topic'], r['headers'], r['message']) for r in records(5)]
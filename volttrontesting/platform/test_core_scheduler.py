@@ -0,0 +1,124 @@
+import gc
+import itertools
+from datetime import timedelta
+
+import gevent
+import pytest
+
+from volttron.platform.agent.utils import get_aware_utc_now
+from volttron.platform.vip.agent.core import BasicCore
+
+
+def after(seconds):
+    return get_aware_utc_now() + timedelta(seconds=seconds)
+
+
+class Owner(object):
+    pass
+
+
+@pytest.fixture
+def core():
+    core = BasicCore(Owner())
+    greenlet = gevent.spawn(core.run)
+    # let run() start the schedule loop
+    gevent.sleep(0.01)
+    yield core
+    core.stop(timeout=5)
+    greenlet.join(5)
+
+
+def test_schedule_should_fire_events_and_record_latency(core):
+    fired = []
+
+    for i in range(10):
+        core.schedule(after(0.01 * i), fired.append, i)
+    gevent.sleep(0.2)
+
+    assert fired == list(range(10))
+    stats = core.get_schedule_stats()
+    assert (stats['queue_depth'], stats['fired']) == (0, 10)
+    assert 0 <= stats['latency_avg'] <= stats['latency_max']
+
+
+def test_canceled_event_should_be_dropped_when_due(core):
+    fired = []
+
+    event = core.schedule(after(0.01), fired.append, 1)
+    event.cancel()
+    gevent.sleep(0.1)
+
+    assert fired == []
+    assert event.finished
+    stats = core.get_schedule_stats()
+    assert (stats['queue_depth'], stats['canceled'], stats['canceled_pending']) == (0, 1, 0)
+
+
+def test_canceled_events_should_be_compacted(core):
+    events = [core.schedule(after(3600), lambda: None) for _ in range(200)]
+
+    for event in events[:101]:
+        event.cancel()
+    assert core.get_schedule_stats()['queue_depth'] == 99
+    assert all(event.finished for event in events[:101])
+
+    for event in events[101:150]:
+        event.cancel()
+        # canceling twice is counted once
+        event.cancel()
+    stats = core.get_schedule_stats()
+    assert (stats['queue_depth'], stats['canceled_pending'], stats['compactions']) == (99, 49, 1)
+
+
+def test_canceled_periodic_event_should_be_compacted(core):
+    core.schedule_compaction_minimum = 1
+    fired = []
+
+    start = get_aware_utc_now()
+    deadlines = (start + timedelta(seconds=0.01 * i) for i in itertools.count(1))
+    event = core.schedule(deadlines, fired.append, 1)
+    gevent.sleep(0.05)
+    event.cancel()
+    count = len(fired)
+    gevent.sleep(0.05)
+
+    assert count > 0 and len(fired) == count
+    assert core.get_schedule_stats()['queue_depth'] == 0
+
+
+def test_canceling_running_event_should_not_count_as_pending(core):
+    event = core.schedule(after(0), gevent.sleep, 10)
+    gevent.sleep(0.05)
+    assert core.get_schedule_stats()['running'] == 1
+
+    event.cancel()
+
+    stats = core.get_schedule_stats()
+    assert (stats['queue_depth'], stats['canceled_pending']) == (0, 0)
+
+
+def test_fired_callbacks_should_not_be_kept(core):
+    for _ in range(100):
+        core.schedule(after(0), gevent.sleep, 0)
+    gevent.sleep(0.05)
+    gc.collect()
+
+    assert core.get_schedule_stats()['running'] == 0
+
+
+def test_running_callbacks_should_be_killed_on_stop(core):
+    finished = []
+
+    def long_running():
+        gevent.sleep(10)
+        finished.append(True)
+
+    core.schedule(after(0), long_running)
+    gevent.sleep(0.05)
+    assert core.get_schedule_stats()['running'] == 1
+
+    core.stop(timeout=5)
+    gevent.sleep(0.05)
+
+    assert core.get_schedule_stats()['running'] == 0
+    assert finished == []
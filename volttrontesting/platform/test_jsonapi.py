@@ -0,0 +1,67 @@
+import datetime
+import math
+
+import pytest
+
+from volttron.platform import jsonapi
+
+DRIVER_ALL = [{'ZoneTemperature': 72.5, 'SupplyFanStatus': True, 'DamperPosition': 35, 'Mode': None,
+               'Label': 'Zone °F'},
+              {'ZoneTemperature': {'type': 'float', 'tz': 'US/Pacific', 'units': 'degreesFahrenheit'},
+               'SupplyFanStatus': {'type': 'integer', 'tz': 'US/Pacific', 'units': 'Enum'},
+               'DamperPosition': {'type': 'integer', 'tz': 'US/Pacific', 'units': '%'},
+               'Mode': {'type': 'string', 'tz': 'US/Pacific', 'units': ''},
+               'Label': {'type': 'string', 'tz': 'US/Pacific', 'units': ''}}]
+
+
+@pytest.fixture(params=['json', 'orjson'])
+def backend(request):
+    if request.param == 'orjson':
+        pytest.importorskip('orjson')
+    assert jsonapi.set_backend(request.param) == request.param
+    yield request.param
+    jsonapi.set_backend()
+
+
+def test_round_trip(backend):
+    assert jsonapi.loads(jsonapi.dumps(DRIVER_ALL)) == DRIVER_ALL
+    assert jsonapi.loadb(jsonapi.dumpb(DRIVER_ALL)) == DRIVER_ALL
+    assert isinstance(jsonapi.dumps(DRIVER_ALL), str)
+    assert isinstance(jsonapi.dumpb(DRIVER_ALL), bytes)
+
+
+def test_output_is_ascii(backend):
+    assert jsonapi.dumps({'units': '°F'}) == '{"units": "\\u00b0F"}'
+    assert jsonapi.dumpb(['°F']) == b'["\\u00b0F"]'
+
+
+def test_same_semantics_as_json(backend):
+    assert jsonapi.loads(jsonapi.dumps({1: 'a', None: 'b'})) == {'1': 'a', 'null': 'b'}
+    assert jsonapi.loads('[1, 2.5, "x", true, null]') == [1, 2.5, 'x', True, None]
+    assert jsonapi.loads(b'{"a": 1}') == {'a': 1}
+    # Tokens orjson refuses are decoded by json.
+    assert jsonapi.loads('Infinity') == float('inf')
+    assert jsonapi.dumps({'b': 1, 'a': 2}, sort_keys=True).replace(' ', '') == '{"a":2,"b":1}'
+    assert jsonapi.dumps([1], indent=2) == '[\n  1\n]'
+
+    with pytest.raises(TypeError):
+        jsonapi.dumps(datetime.datetime.now())
+    assert jsonapi.loads(jsonapi.dumps(datetime.datetime(2020, 1, 1), default=str)) == '2020-01-01 00:00:00'
+    with pytest.raises(ValueError):
+        jsonapi.loads('{"bad json')
+
+
+def test_invalid_backend():
+    with pytest.raises(ValueError):
+        jsonapi.set_backend('pickle')
+
+
+def test_non_finite_floats_are_kept(backend):
+    data = {'ZoneTemperature': float('nan'), 'Setpoints': [float('inf'), -float('inf'), 72.5], 'Mode': None}
+
+    assert jsonapi.dumps(data) == '{"ZoneTemperature": NaN, "Setpoints": [Infinity, -Infinity, 72.5], "Mode": null}'
+    decoded = jsonapi.loadb(jsonapi.dumpb(data))
+    assert math.isnan(decoded['ZoneTemperature'])
+    assert decoded['Setpoints'] == [float('inf'), -float('inf'), 72.5]
+    assert decoded['Mode'] is None
+    assert jsonapi.dumps([float('nan')], default=str) == '[NaN]'
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytz
+from dateutil.parser import parse
+from dateutil.tz import tzoffset
+
+from volttron.platform.agent.timestamps import (_format_timestamp_strftime, _parse_naive_layout, format_timestamp,
+                                                format_timestamps, parse_timestamp_string, parse_timestamp_strings)
+
+NAIVE = datetime(2020, 5, 6, 7, 8, 9, 123456)
+
+
+@pytest.mark.parametrize("time_stamp", [NAIVE,
+                                        NAIVE.replace(microsecond=0),
+                                        pytz.UTC.localize(NAIVE),
+                                        pytz.timezone("US/Pacific").localize(NAIVE),
+                                        pytz.timezone("Asia/Kolkata").localize(NAIVE),
+                                        NAIVE.replace(tzinfo=timezone(timedelta(hours=-3, minutes=-30))),
+                                        NAIVE.replace(tzinfo=timezone(timedelta(hours=1, seconds=30))),
+                                        NAIVE.replace(tzinfo=timezone(timedelta(hours=-1, seconds=-30))),
+                                        NAIVE.replace(year=999)])
+def test_format_timestamp_should_match_strftime(time_stamp):
+    assert format_timestamp(time_stamp) == _format_timestamp_strftime(time_stamp)
+
+
+@pytest.mark.parametrize("time_stamp_str, expected", [
+    ("2020-05-06T07:08:09.123456", NAIVE),
+    ("2020-05-06T07:08:09.123456+00:00", pytz.UTC.localize(NAIVE)),
+    ("2020-05-06T07:08:09.123456-07:00", NAIVE.replace(tzinfo=tzoffset("", -7 * 3600))),
+    ("2020-05-06T07:08:09.123456+05:30", NAIVE.replace(tzinfo=tzoffset("", 5 * 3600 + 30 * 60))),
+    ("2020-05-06 07:08:09.123456", NAIVE),
+    ("2020-05-06T07:08:09", NAIVE.replace(microsecond=0)),
+    ("2020-05-06T07:08:09Z", pytz.UTC.localize(NAIVE.replace(microsecond=0)))])
+def test_parse_timestamp_string(time_stamp_str, expected):
+    time_stamp = parse_timestamp_string(time_stamp_str)
+
+    assert time_stamp == expected
+    assert time_stamp.utcoffset() == expected.utcoffset()
+    assert time_stamp == parse(time_stamp_str)
+
+
+def test_parse_timestamp_string_should_use_pytz_utc():
+    assert parse_timestamp_string("2020-05-06T07:08:09.123456+00:00").tzinfo is pytz.UTC
+
+
+@pytest.mark.parametrize("time_stamp_str", ["2020-05-06T07:08:09.123456", "2020-05-06T07:08:09.12345x",
+                                            "2020-05-06 07:08:09.123456", "+020-05-06T07:08:09.123456"])
+def test_parse_naive_layout_should_match_strptime(time_stamp_str):
+    try:
+        expected = datetime.strptime(time_stamp_str, "%Y-%m-%dT%H:%M:%S.%f")
+    except ValueError:
+        with pytest.raises(ValueError):
+            _parse_naive_layout(time_stamp_str)
+    else:
+        assert _parse_naive_layout(time_stamp_str) == expected
+
+
+def test_parse_timestamp_string_should_reject_garbage():
+    with pytest.raises(ValueError):
+        parse_timestamp_string("2020-05-06T07:08:09.123456+0x:00")
+
+
+def test_format_timestamps_should_keep_time_zones_apart():
+    utc = pytz.UTC.localize(NAIVE)
+    pacific = utc.astimezone(pytz.timezone("US/Pacific"))
+
+    assert format_timestamps([utc, pacific, utc, NAIVE]) == [format_timestamp(utc), format_timestamp(pacific),
+                                                              format_timestamp(utc), format_timestamp(NAIVE)]
+
+
+def test_parse_timestamp_strings():
+    strings = ["2020-05-06T07:08:09.123456+00:00", "2020-05-06T07:08:09.123456", "2020-05-06T07:08:09.123456+00:00"]
+
+    assert parse_timestamp_strings(strings) == [parse_timestamp_string(s) for s in strings]
@@ -0,0 +1,106 @@
+import random
+import re
+from unittest import mock
+
+import pytest
+
+from volttron.platform.agent.base_tagging import BaseTaggingService
+from volttron.platform.agent.topic_index import TopicPrefixIndex
+
+TOPICS = ['campus1/building1/device1/p1', 'campus1/building1/device1/p2', 'campus1/building1/device11/p1',
+          'campus1/building2/device1/p1', 'campus1/building2/device2/p3', 'campus2/building1/device1/p1',
+          'campus2/building1', 'campus2/meter.1/power']
+
+
+def historian_prefixes(topics, topic_pattern):
+    """Matching of BaseTaggingService.get_matching_topic_prefixes before the index, with get_topics_by_pattern of the
+    sqlite historian"""
+    point_topics = [topic for topic in topics if re.search(topic_pattern, topic, re.IGNORECASE)]
+    prefixes = set()
+    if len(point_topics) == 1 and point_topics[0] == topic_pattern:
+        prefixes.add(topic_pattern)
+    else:
+        for topic in point_topics:
+            prefix = '/'.join(topic.split('/')[:len(topic_pattern.split('/'))])
+            if re.match(topic_pattern + '$', prefix):
+                prefixes.add(prefix)
+    return prefixes
+
+
+@pytest.mark.parametrize('pattern, expected', [
+    ('campus1/building1/device1', {'campus1/building1/device1'}),
+    ('campus1/building1/device1.*', {'campus1/building1/device1', 'campus1/building1/device11'}),
+    ('campus1/.*/device1', {'campus1/building1/device1', 'campus1/building2/device1'}),
+    ('.*/building1/.*/p1', {'campus1/building1/device1/p1', 'campus1/building1/device11/p1',
+                            'campus2/building1/device1/p1'}),
+    ('campus2/building1', {'campus2/building1'}),
+    ('campus1/building3', set()),
+    ('campus2/meter.1/power', {'campus2/meter.1/power'}),
+    ('campus1/building[12]/device2', {'campus1/building2/device2'}),
+    ('campus1/(building1|building2/device2)', {'campus1/building2/device2'}),
+])
+def test_match_prefixes(pattern, expected):
+    index = TopicPrefixIndex(TOPICS)
+
+    assert index.match_prefixes(pattern) == expected
+    assert index.match_prefixes(pattern) == historian_prefixes(TOPICS, pattern)
+
+
+def test_match_prefixes_should_match_historian_on_random_topics():
+    rng = random.Random(7)
+    topics = {'campus{}/building{}/device{}/point{}'.format(rng.randint(1, 3), rng.randint(1, 12),
+                                                            rng.randint(1, 30), rng.randint(1, 9))
+              for _ in range(2000)}
+    index = TopicPrefixIndex(topics)
+    assert len(index) == len(topics)
+
+    for _ in range(200):
+        parts = [rng.choice(['campus{}'.format(rng.randint(1, 3)), 'campus*', '*']),
+                 rng.choice(['building{}'.format(rng.randint(1, 12)), 'building1*', '*']),
+                 rng.choice(['device{}'.format(rng.randint(1, 30)), 'device2*', '*', '*1'])]
+        pattern = '/'.join(parts[:rng.randint(1, 3)]).replace('*', '.*')
+        assert index.match_prefixes(pattern) == historian_prefixes(topics, pattern)
+
+
+@pytest.fixture
+def tagging():
+    service = BaseTaggingService()
+    service.vip.rpc = mock.Mock()
+    service.vip.rpc.call.return_value.get.return_value = TOPICS[:3]
+    return service
+
+
+def test_matching_topic_prefixes_should_load_index_once(tagging):
+    matches = tagging.get_matching_topic_prefixes_by_pattern(['campus1/building1/device1*', 'campus1/*'])
+    assert matches == {'campus1/building1/device1*': {'campus1/building1/device1', 'campus1/building1/device11'},
+                       'campus1/*': {'campus1/building1'}}
+    assert tagging.get_matching_topic_prefixes('campus1/building1/device1') == {'campus1/building1/device1'}
+
+    tagging.vip.rpc.call.assert_called_once_with('platform.historian', 'get_topic_list')
+
+
+def test_matching_topic_prefixes_should_add_device_topics_and_reload_when_unmatched(tagging):
+    tagging.get_matching_topic_prefixes('campus1/*')
+    tagging._capture_device_topics('pubsub', 'driver', '', 'devices/campus1/building2/device1/all', {},
+                                   [{'p1': 1, 'p2': 2}, {'p1': {}, 'p2': {}}])
+    assert tagging.get_matching_topic_prefixes('campus1/building2/*') == {'campus1/building2/device1'}
+    assert tagging.vip.rpc.call.call_count == 1
+
+    tagging.vip.rpc.call.return_value.get.return_value = TOPICS
+    assert tagging.get_matching_topic_prefixes('campus2/*') == {'campus2/building1', 'campus2/meter.1'}
+    assert tagging.vip.rpc.call.call_count == 2
+
+    tagging.topic_index_refresh_interval = 0
+    tagging.get_matching_topic_prefixes('campus2/*')
+    assert tagging.vip.rpc.call.call_count == 3
+
+
+@pytest.mark.parametrize('capture_device_topics, subscribed', [(False, False), (True, True)])
+def test_on_start_should_only_subscribe_to_device_topics_when_enabled(capture_device_topics, subscribed):
+    service = BaseTaggingService(capture_device_topics=capture_device_topics)
+    service.vip.pubsub = mock.Mock()
+    with mock.patch.object(service, 'setup'), mock.patch.object(service, 'load_valid_tags'), \
+            mock.patch.object(service, 'load_tag_refs'):
+        service.on_start('sender')
+
+    assert service.vip.pubsub.subscribe.called == subscribed
@@ -1,7 +1,12 @@
 import pytz
-from volttron.platform.agent.base_aggregate_historian import AggregateHistorian
+from volttron.platform.agent.base_aggregate_historian import (
+    AggregateHistorian, PartialAggregates)
 import pytest
+import threading
 from datetime import datetime, timedelta
+from unittest import mock
+
+from volttron.platform.messaging.health import STATUS_BAD, STATUS_GOOD
 
 
 @pytest.mark.aggregator
@@ -191,3 +196,262 @@ def test_compute_next_collection_time():
     assert next2 == datetime.strptime(
         '2016-04-30T01:15:23.123456',
         '%Y-%m-%dT%H:%M:%S.%f').replace(tzinfo=pytz.utc)
+
+
+def _quarter_hours(partials, topic_ids, agg_type, start, values):
+    for i, (value, count) in enumerate(values):
+        partials.add(topic_ids, agg_type, start + timedelta(minutes=15 * i),
+                     start + timedelta(minutes=15 * (i + 1)), value, count)
+
+
+@pytest.mark.aggregator
+@pytest.mark.parametrize("agg_type, expected", [
+    ('avg', (3.0, 8)), ('SUM', (20, 8)), ('count', (8, 8)),
+    ('min', (-1, 8)), ('max', (7, 8))])
+def test_partial_aggregates_derive_hour_from_quarter_hours(agg_type,
+                                                           expected):
+    start = datetime(2016, 3, 1, 1, 0, tzinfo=pytz.utc)
+    partials = PartialAggregates()
+    values = {'avg': [(1, 2), (2, 2), (None, 0), (4.5, 4)],
+              'sum': [(2, 2), (4, 2), (0, 0), (14, 4)],
+              'count': [(2, 2), (2, 2), (0, 0), (4, 4)],
+              'min': [(1, 2), (-1, 2), (None, 0), (3, 4)],
+              'max': [(1, 2), (2, 2), (None, 0), (7, 4)]}[agg_type.lower()]
+    _quarter_hours(partials, [1, 2], agg_type, start, values)
+
+    assert partials.derive([2, 1], agg_type, start,
+                           start + timedelta(hours=1)) == expected
+
+
+@pytest.mark.aggregator
+def test_partial_aggregates_derive_needs_exact_tiling():
+    start = datetime(2016, 3, 1, 1, 0, tzinfo=pytz.utc)
+    partials = PartialAggregates()
+    _quarter_hours(partials, [1], 'avg', start, [(1, 1), (2, 1), (3, 1)])
+    hour = start + timedelta(hours=1)
+
+    assert partials.derive([1], 'avg', start, hour) is None
+    assert partials.derive([2], 'avg', start, start + timedelta(minutes=30)) is None
+    assert partials.derive([1], 'max', start, start + timedelta(minutes=30)) is None
+    assert partials.derive([1], 'avg', start + timedelta(minutes=5),
+                           start + timedelta(minutes=30)) is None
+
+    partials.add([1], 'avg', start, hour, 2, 3)
+    # the aggregate of a time slice is never reused for that same time slice
+    assert partials.derive([1], 'avg', start, hour) is None
+
+    _quarter_hours(partials, [1], 'avg', start, [(1, 1), (2, 1), (3, 1), (None, 0)])
+    assert partials.derive([1], 'avg', start, hour) == (2, 3)
+    partials.prune(start + timedelta(minutes=30))
+    assert partials.derive([1], 'avg', start, hour) is None
+    assert partials.derive([1], 'avg', start + timedelta(minutes=30), hour) == (3, 1)
+
+
+class _Aggregator(AggregateHistorian):
+    """AggregateHistorian over a fake data store, created without an agent"""
+
+    def __init__(self, incremental_aggregation=False, collection_workers=1):
+        self.topics = {'device/p1': 1, 'device/p2': 2}
+        self.topic_id_map = dict(self.topics)
+        self.agg_topic_id_map = {('device/avg', 'avg', '15m'): 10,
+                                 ('device/avg', 'avg', '1h'): 11}
+        self.incremental_aggregation = incremental_aggregation
+        self._pattern_topic_ids = {}
+        self._partial_aggregates = PartialAggregates()
+        self._partial_retention = timedelta(hours=1)
+        self.collection_workers = collection_workers
+        self._collection_pool = None
+        self._collection_stats = {}
+        self.collected = []
+        self.query_threads = set()
+        self.inserted = []
+        self.core = mock.Mock()
+        self.vip = mock.Mock()
+        self.vip.rpc.call.side_effect = lambda *args, topic_pattern: mock.Mock(
+            get=lambda: {name: topic_id for name, topic_id in self.topics.items()
+                         if name.startswith(topic_pattern)})
+
+    def get_topic_map(self):
+        return dict(self.topics), {}
+
+    def get_agg_topic_map(self):
+        return self.agg_topic_id_map
+
+    def initialize_aggregate_store(self, *args):
+        pass
+
+    def update_aggregate_metadata(self, *args):
+        pass
+
+    def collect_aggregate(self, topic_ids, agg_type, start_time, end_time):
+        self.collected.append((tuple(topic_ids), agg_type, start_time, end_time))
+        self.query_threads.add(threading.current_thread().name)
+        return (end_time - start_time).total_seconds() / 60, 2
+
+    def collect_aggregates(self, topic_ids, agg_type, start_time, end_time):
+        self.collected.append((tuple(topic_ids), agg_type, start_time, end_time))
+        self.query_threads.add(threading.current_thread().name)
+        return {topic_id: (topic_id * (end_time - start_time).total_seconds() / 60, 2)
+                for topic_id in topic_ids if topic_id in self.topics.values()}
+
+    def insert_aggregate(self, agg_topic_id, agg_type, agg_time_period,
+                         end_time, value, topic_ids):
+        self.inserted.append((agg_topic_id, end_time, value))
+
+    def get_aggregation_list(self):
+        return ['AVG', 'SUM', 'STDDEV']
+
+
+def _collect(aggregator, start, end):
+    points = [{'topic_name_pattern': 'device/p', 'aggregation_type': 'avg',
+               'aggregation_topic_name': 'device/avg'}]
+    time = start
+    while time < end:
+        time += timedelta(minutes=15)
+        aggregator.collect_aggregate_data(time, '15m', False, points)
+        if (time - start) % timedelta(hours=1) == timedelta(0):
+            aggregator.collect_aggregate_data(time, '1h', False, points)
+
+
+@pytest.mark.aggregator
+@pytest.mark.parametrize("incremental", [True, False])
+def test_collect_aggregate_data_derives_longer_periods(incremental):
+    start = datetime(2016, 3, 1, 1, 0, tzinfo=pytz.utc)
+    aggregator = _Aggregator(incremental)
+
+    _collect(aggregator, start, start + timedelta(hours=2))
+
+    assert len(aggregator.collected) == (8 if incremental else 10)
+    hourly = [value for agg_id, _, value in aggregator.inserted if agg_id == 11]
+    assert hourly == ([22.5, 22.5] if incremental else [90.0, 90.0])
+
+
+@pytest.mark.aggregator
+def test_collect_aggregate_data_caches_topic_patterns():
+    start = datetime(2016, 3, 1, 1, 0, tzinfo=pytz.utc)
+    aggregator = _Aggregator(True)
+
+    _collect(aggregator, start, start + timedelta(hours=1))
+    assert aggregator.vip.rpc.call.call_count == 1
+
+    aggregator.topics['device/p3'] = 3
+    _collect(aggregator, start + timedelta(hours=1), start + timedelta(hours=2))
+    assert aggregator.vip.rpc.call.call_count == 2
+    assert len(aggregator.collected) == 8
+
+
+def _points():
+    return [{'topic_name_pattern': 'other/', 'aggregation_type': 'avg',
+             'aggregation_topic_name': 'other/avg'},
+            {'topic_ids': [1], 'topic_names': ['device/p1'],
+             'aggregation_type': 'avg', 'aggregation_topic_name': 'device/p1'},
+            {'topic_ids': [2], 'topic_names': ['device/p2'],
+             'aggregation_type': 'avg', 'aggregation_topic_name': 'device/p2'},
+            {'topic_name_pattern': 'device/p', 'aggregation_type': 'avg',
+             'aggregation_topic_name': 'device/avg'},
+            {'topic_ids': [1, 2], 'topic_names': ['device/p1', 'device/p2'],
+             'aggregation_type': 'stddev', 'aggregation_topic_name': 'device/std'},
+            {'topic_ids': [1], 'topic_names': ['device/p1'],
+             'aggregation_type': 'sum', 'aggregation_topic_name': 'device/p1',
+             'min_count': 3}]
+
+
+def _grouped_aggregator(**kwargs):
+    aggregator = _Aggregator(**kwargs)
+    aggregator.agg_topic_id_map = {('other/avg', 'avg', '15m'): 9,
+                                   ('device/avg', 'avg', '15m'): 10,
+                                   ('device/p1', 'avg', '15m'): 1,
+                                   ('device/p2', 'avg', '15m'): 2,
+                                   ('device/std', 'stddev', '15m'): 12,
+                                   ('device/p1', 'sum', '15m'): 13}
+    return aggregator
+
+
+@pytest.mark.aggregator
+def test_collect_aggregate_data_groups_points_by_aggregation_type():
+    end = datetime(2016, 3, 1, 1, 0, tzinfo=pytz.utc)
+    start = end - timedelta(minutes=15)
+    aggregator = _grouped_aggregator()
+
+    aggregator.collect_aggregate_data(end, '15m', False, _points())
+
+    assert sorted(aggregator.collected, key=str) == sorted([
+        ((1, 2), 'avg', start, end),
+        ((1,), 'sum', start, end),
+        ((1, 2), 'stddev', start, end)], key=str)
+    # the pattern matching nothing does not stop the points that follow, the
+    # sum is below its min_count
+    assert aggregator.inserted == [(1, end, 15.0), (2, end, 30.0),
+                                   (10, end, 22.5), (12, end, 15.0)]
+    aggregator.core.schedule.assert_called_once()
+    context = aggregator.vip.health.set_status.call_args[0][1]
+    stats = context['aggregation_periods']['15m']
+    assert (stats['points'], stats['queries']) == (5, 3)
+
+
+@pytest.mark.aggregator
+def test_collect_aggregate_data_reports_failed_collection():
+    end = datetime(2016, 3, 1, 1, 0, tzinfo=pytz.utc)
+    aggregator = _grouped_aggregator()
+    aggregator.agg_topic_id_map[('device/p1', 'avg', '1h')] = 14
+    points = [{'topic_ids': [1], 'topic_names': ['device/p1'],
+               'aggregation_type': 'avg', 'aggregation_topic_name': 'device/p1'}]
+
+    with mock.patch.object(aggregator, 'insert_aggregates', side_effect=RuntimeError("database is locked")):
+        with pytest.raises(RuntimeError):
+            aggregator.collect_aggregate_data(end, '1h', False, points)
+    status, context = aggregator.vip.health.set_status.call_args[0]
+    assert status == STATUS_BAD
+    assert 'database is locked' in context['aggregation_periods']['1h']['error']
+    aggregator.core.schedule.assert_called_once()
+
+    # a successful collection of another period keeps the status bad
+    aggregator.collect_aggregate_data(end, '15m', False, points)
+    assert aggregator.vip.health.set_status.call_args[0][0] == STATUS_BAD
+
+    aggregator.collect_aggregate_data(end, '1h', False, points)
+    assert aggregator.vip.health.set_status.call_args[0][0] == STATUS_GOOD
+
+
+class _ParallelAggregator(_Aggregator):
+    PARALLEL_COLLECTION_SUPPORT = True
+
+    def collection_worker_stopping(self):
+        self.stopped_threads.append(threading.current_thread().name)
+
+
+@pytest.mark.aggregator
+def test_collect_aggregate_data_runs_queries_on_worker_threads():
+    end = datetime(2016, 3, 1, 1, 0, tzinfo=pytz.utc)
+    aggregator = _grouped_aggregator()
+    aggregator.__class__ = _ParallelAggregator
+    aggregator.collection_workers = 3
+    aggregator.stopped_threads = []
+
+    aggregator.collect_aggregate_data(end, '15m', False, _points())
+
+    assert aggregator.inserted == [(1, end, 15.0), (2, end, 30.0),
+                                   (10, end, 22.5), (12, end, 15.0)]
+    assert threading.current_thread().name not in aggregator.query_threads
+    aggregator._stop_collection_pool()
+    # every worker thread is stopped once, the queries ran on some of them
+    assert len(set(aggregator.stopped_threads)) == 3
+    assert set(aggregator.stopped_threads) >= aggregator.query_threads
+
+
+@pytest.mark.aggregator
+def test_collect_aggregate_data_without_parallel_support():
+    end = datetime(2016, 3, 1, 1, 0, tzinfo=pytz.utc)
+    aggregator = _grouped_aggregator(collection_workers=3)
+
+    aggregator.collect_aggregate_data(end, '15m', False, _points())
+
+    assert aggregator.query_threads == {threading.current_thread().name}
+    assert aggregator.collection_workers == 1
+
+
+@pytest.mark.aggregator
+def test_collection_workers_validation():
+    assert AggregateHistorian._validate_collection_workers("4") == 4
+    with pytest.raises(ValueError):
+        AggregateHistorian._validate_collection_workers(0)
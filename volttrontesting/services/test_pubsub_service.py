@@ -1,4 +1,5 @@
 from volttron.platform.vip.pubsubservice import PubSubService, ProtectedPubSubTopics
+from volttron.platform.vip.tracking import Tracker
 from mock import Mock, MagicMock
 import pytest
 
@@ -53,3 +54,75 @@ def test_returns_empty_list_when_subsystem_not_specified(pubsub_service):
     frames[6] = "not_pubsub"
     result = service.handle_subsystem(frames)
     assert [] == result
+
+
+def _subscribe(service, peer, prefix, all_platforms=False):
+    frames = [peer, '', 'VIP1', '', '', 'pubsub', 'subscribe',
+              dict(prefix=prefix, bus='', all_platforms=all_platforms)]
+    assert service.handle_subsystem(frames)
+
+
+def _unsubscribe(service, peer, prefix):
+    frames = [peer, '', 'VIP1', '', '', 'pubsub', 'unsubscribe',
+              dict(internal=dict(prefix=prefix, bus=''))]
+    assert service.handle_subsystem(frames)
+
+
+def _subscribers_for(service, topic):
+    recipients = set()
+
+    def send(frames, publisher):
+        recipients.add(frames[0])
+        return []
+
+    service._send = send
+    frames = ['publisher', '', 'VIP1', '', '', 'pubsub', 'publish', topic, dict(bus='')]
+    assert service._distribute_internal(frames) == len(recipients)
+    return recipients
+
+
+def test_distribute_internal_matches_prefixes(pubsub_service):
+    parameters, service = pubsub_service
+    if parameters['has_external_routing']:
+        parameters['routing_service'].get_connected_platforms.return_value = []
+        parameters['routing_service'].my_instance_name.return_value = 'local'
+
+    _subscribe(service, 'historian', '')
+    _subscribe(service, 'agent1', 'devices/campus/building1')
+    _subscribe(service, 'agent2', ['devices/campus/building', 'devices/campus2'])
+    _subscribe(service, 'agent3', 'devices/campus/building1/all', all_platforms=True)
+
+    assert _subscribers_for(service, 'devices/campus/building1/all') == {'historian', 'agent1', 'agent2', 'agent3'}
+    assert _subscribers_for(service, 'devices/campus/building2/all') == {'historian', 'agent2'}
+    assert _subscribers_for(service, 'devices/campus2/all') == {'historian', 'agent2'}
+    assert _subscribers_for(service, 'record/foo') == {'historian'}
+
+    _unsubscribe(service, 'agent2', 'devices/campus/building')
+    assert _subscribers_for(service, 'devices/campus/building2/all') == {'historian'}
+    assert _subscribers_for(service, 'devices/campus2/all') == {'historian', 'agent2'}
+
+    service.peer_drop('historian')
+    assert _subscribers_for(service, 'record/foo') == set()
+    assert '' not in service._subscription_index[('internal', '')]
+
+
+def test_distribute_internal_serializes_payload_once():
+    tracker = Tracker()
+    tracker.enable()
+    service = PubSubService(socket=Mock(), protected_topics=MagicMock(), routing_service=None, tracker=tracker)
+    for peer in ('historian1', 'historian2', 'historian3'):
+        _subscribe(service, peer, 'devices')
+
+    sent = []
+    service._send = lambda frames, publisher: sent.append(frames) or []
+    frames = ['publisher', '', 'VIP1', '', '', 'pubsub', 'publish', 'devices/campus/all',
+              dict(bus='', headers={}, message=[{'temp': 72.0}])]
+    assert service._distribute_internal(frames) == 3
+
+    assert {f[0] for f in sent} == {'historian1', 'historian2', 'historian3'}
+    # Every recipient shares the very same serialized payload frames.
+    for payload in zip(*[f[1:] for f in sent]):
+        assert all(frame is payload[0] for frame in payload)
+
+    payload_size = sum(len(frame) for frame in sent[0][1:])
+    assert tracker.stats['fanout'] == {'messages': 1, 'deliveries': 3, 'bytes_saved': 2 * payload_size}
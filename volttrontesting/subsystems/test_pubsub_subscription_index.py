@@ -0,0 +1,60 @@
+from unittest import mock
+
+import pytest
+
+from volttron.platform.vip.agent.subsystems.pubsub import PubSub
+
+
+@pytest.fixture
+def pubsub():
+    core = mock.MagicMock()
+    pubsub = PubSub(core, mock.MagicMock(), mock.MagicMock(), object())
+    pubsub.synchronize = mock.Mock()
+    return pubsub
+
+
+def received(callbacks):
+    return {name: [call[0][3] for call in callback.call_args_list] for name, callback in callbacks.items()}
+
+
+def test_process_callback_should_call_matching_subscriptions(pubsub):
+    callbacks = {name: mock.Mock() for name in ('all', 'building', 'device', 'other', 'remote')}
+    pubsub._add_subscription('', callbacks['all'])
+    pubsub._add_subscription('devices/campus/building', callbacks['building'])
+    pubsub._add_subscription('devices/campus/building/device1', callbacks['device'])
+    pubsub._add_subscription('devices/other', callbacks['other'])
+    pubsub._add_subscription('devices/campus', callbacks['remote'], all_platforms=True)
+
+    pubsub._process_callback('sender', '', 'devices/campus/building/device1/all', {}, 'message')
+    pubsub._process_callback('sender', '', 'devices/campus/building/device2/all', {}, 'message')
+    pubsub._process_callback('sender', 'other_bus', 'devices/campus/building/device2/all', {}, 'message')
+
+    assert received(callbacks) == {
+        'all': ['devices/campus/building/device1/all', 'devices/campus/building/device2/all'],
+        'building': ['devices/campus/building/device1/all', 'devices/campus/building/device2/all'],
+        'device': ['devices/campus/building/device1/all'],
+        'other': [],
+        'remote': ['devices/campus/building/device1/all', 'devices/campus/building/device2/all']}
+    callbacks['device'].assert_called_with('pubsub', 'sender', '', 'devices/campus/building/device1/all', {},
+                                           'message')
+    pubsub.synchronize.assert_called_once()
+
+
+def test_drop_subscription_should_update_index(pubsub):
+    first, second = mock.Mock(), mock.Mock()
+    pubsub._add_subscription('devices/a', first)
+    pubsub._add_subscription('devices/a', second)
+    pubsub._add_subscription('devices/b', first)
+    pubsub._add_subscription('devices/c', second)
+
+    assert pubsub._drop_subscription('devices/a', first) == ['devices/a']
+    pubsub._process_callback('sender', '', 'devices/a/all', {}, None)
+    assert (first.call_count, second.call_count) == (0, 1)
+
+    assert sorted(pubsub._drop_subscription(None, second)) == ['devices/a', 'devices/c']
+    assert pubsub._drop_subscription('devices/b', None) == ['devices/b']
+    assert not pubsub._subscription_index
+
+    pubsub._process_callback('sender', '', 'devices/b/all', {}, None)
+    assert (first.call_count, second.call_count) == (0, 1)
+    pubsub.synchronize.assert_called_once()
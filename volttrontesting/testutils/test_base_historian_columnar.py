@@ -0,0 +1,41 @@
+import base64
+
+import pytest
+
+from volttron.platform.agent.base_historian import pack_columns, rows_to_columns, unpack_columns
+
+ROWS = [("2020-06-01T12:30:58.000001+00:00", 1), ("2020-06-01T12:30:59.000000", 2.5),
+        ("2020-06-01T14:30:59.000000+02:00", -3)]
+
+
+def test_rows_to_columns():
+    assert rows_to_columns(ROWS) == {
+        "timestamps": [1591014658000001, 1591014659000000, 1591014659000000],
+        "values": [1, 2.5, -3],
+    }
+
+
+def test_pack_columns_numeric_values():
+    columns = rows_to_columns(ROWS)
+
+    packed = pack_columns(columns)
+
+    assert len(base64.b64decode(packed["timestamps"])) == 3 * 8
+    assert len(base64.b64decode(packed["values"])) == 3 * 8
+    assert unpack_columns(packed) == {"timestamps": columns["timestamps"], "values": [1.0, 2.5, -3.0]}
+
+
+@pytest.mark.parametrize("values", [[1, "two", 3], [True, False, True], [1, None, 2], [{"a": 1}, [2], 3]])
+def test_pack_columns_keeps_other_values(values):
+    columns = {"timestamps": [1, 2, 3], "values": values}
+
+    packed = pack_columns(columns)
+
+    assert packed["values"] == values
+    assert unpack_columns(packed) == columns
+
+
+def test_pack_columns_empty():
+    columns = {"timestamps": [], "values": []}
+
+    assert unpack_columns(pack_columns(columns)) == columns
@@ -0,0 +1,148 @@
+import threading
+
+import pytest
+
+from volttron.platform.agent.base_historian import BaseHistorianAgent, PublishWorkers
+
+
+class FakeHistorian(object):
+    """Records what every publish worker thread was handed"""
+
+    report_handled = BaseHistorianAgent.report_handled
+    report_all_handled = BaseHistorianAgent.report_all_handled
+
+    def __init__(self, publish):
+        self._publish = publish
+        self._publish_worker_state = threading.local()
+        self._successful_published = set()
+        self.published = {}
+        self.setup_threads = set()
+        self.teardown_threads = set()
+        self.lock = threading.Lock()
+        self.failing_setup = None
+
+    def historian_worker_setup(self):
+        with self.lock:
+            self.setup_threads.add(threading.current_thread().name)
+            if len(self.setup_threads) == self.failing_setup:
+                raise RuntimeError("connection refused")
+
+    def historian_worker_teardown(self):
+        with self.lock:
+            self.teardown_threads.add(threading.current_thread().name)
+
+    def publish_to_historian(self, to_publish_list):
+        with self.lock:
+            self.published.setdefault(threading.current_thread().name, []).extend(to_publish_list)
+        self._publish(self, to_publish_list)
+
+
+def records(count, topics):
+    return [{'_id': i, 'topic': 'devices/Device{}/point'.format(i % topics), 'value': i} for i in range(count)]
+
+
+@pytest.fixture
+def workers():
+    started = []
+
+    def start(historian, count=3):
+        started.append(PublishWorkers(historian, count))
+        return started[-1]
+
+    yield start
+    for publish_workers in started:
+        publish_workers.stop()
+
+
+def test_publish_workers_keep_topics_of_a_batch_on_one_worker_in_order(workers):
+    historian = FakeHistorian(lambda h, to_publish: h.report_all_handled())
+    publish_workers = workers(historian)
+    to_publish = records(100, 7)
+
+    handled, failed = publish_workers.publish(to_publish)
+
+    assert handled == set(range(100))
+    assert failed == 0
+    worker_topics = {}
+    topic_ids = {}
+    for thread, published in historian.published.items():
+        for record in published:
+            assert worker_topics.setdefault(record['topic'].lower(), thread) == thread
+            topic_ids.setdefault(record['topic'], []).append(record['_id'])
+    assert all(ids == sorted(ids) for ids in topic_ids.values())
+    assert historian._successful_published == set()
+
+
+def test_publish_workers_partition_ignores_topic_case(workers):
+    publish_workers = workers(FakeHistorian(None), count=4)
+
+    partitions = publish_workers.partition([{'_id': 1, 'topic': 'Devices/A/p'}, {'_id': 2, 'topic': 'devices/a/P'}])
+
+    assert len(partitions) == 1
+
+
+def test_publish_workers_only_return_reported_records(workers):
+    def publish(historian, to_publish):
+        for record in to_publish:
+            if record['_id'] % 2:
+                historian.report_handled(record)
+        if to_publish[0]['topic'].endswith('Device0/point'):
+            raise RuntimeError("connection lost")
+
+    historian = FakeHistorian(publish)
+    publish_workers = workers(historian)
+
+    to_publish = records(20, 4)
+    # parts fail if their worker raised or none of their records were handled
+    expected_failed = sum(1 for part in publish_workers.partition(to_publish)
+                          if part[0]['topic'].endswith('Device0/point') or not any(r['_id'] % 2 for r in part))
+
+    handled, failed = publish_workers.publish(to_publish)
+
+    assert handled == {i for i in range(20) if i % 2}
+    assert failed == expected_failed
+
+
+def test_publish_workers_count_parts_without_handled_records_as_failed(workers):
+    def publish(historian, to_publish):
+        if not to_publish[0]['topic'].endswith('Device0/point'):
+            historian.report_all_handled()
+
+    publish_workers = workers(FakeHistorian(publish))
+    to_publish = records(20, 4)
+    unhandled = next(part for part in publish_workers.partition(to_publish)
+                     if part[0]['topic'].endswith('Device0/point'))
+
+    handled, failed = publish_workers.publish(to_publish)
+
+    assert handled == set(range(20)) - {record['_id'] for record in unhandled}
+    assert failed == 1
+
+
+def test_publish_workers_should_stop_all_workers_when_one_setup_fails():
+    historian = FakeHistorian(lambda h, to_publish: h.report_all_handled())
+    historian.failing_setup = 2
+
+    with pytest.raises(RuntimeError):
+        PublishWorkers(historian, 3)
+
+    assert len(historian.setup_threads) == 3
+    assert historian.teardown_threads == historian.setup_threads
+    assert not any(thread.name.startswith("publish-worker") for thread in threading.enumerate())
+
+
+def test_publish_workers_setup_and_teardown_every_thread(workers):
+    historian = FakeHistorian(lambda h, to_publish: h.report_all_handled())
+    publish_workers = PublishWorkers(historian, 3)
+
+    publish_workers.publish(records(10, 5))
+    publish_workers.stop()
+
+    assert len(historian.setup_threads) == 3
+    assert historian.teardown_threads == historian.setup_threads
+
+
+def test_publish_workers_config_validation():
+    assert BaseHistorianAgent._validate_publish_workers("4") == 4
+    with pytest.raises(ValueError):
+        BaseHistorianAgent._validate_publish_workers(0)
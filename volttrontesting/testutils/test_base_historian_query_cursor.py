@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+
+import pytest
+from pytz import UTC
+
+from volttron.platform.agent.base_historian import QueryCursor
+from volttron.platform.agent.utils import format_timestamp
+
+BASE = datetime(2020, 1, 1, tzinfo=UTC)
+
+# rows of device/a share timestamps three by three so paging has to handle ties
+DATA = {
+    "device/a": [(BASE + timedelta(seconds=i // 3), i) for i in range(25)],
+    "device/b": [(BASE + timedelta(seconds=i), 100 + i) for i in range(7)],
+}
+
+
+class FakeHistorian(object):
+    """Implements query_historian semantics on an in memory list"""
+
+    def __init__(self):
+        self.calls = []
+
+    def query_historian(self, topic, start=None, end=None, agg_type=None, agg_period=None, skip=0, count=None,
+                        order="FIRST_TO_LAST"):
+        self.calls.append((topic, start, end, skip, count))
+        rows = [r for r in DATA[topic] if (start is None or r[0] >= start) and (end is None or r[0] < end)]
+        if order == "LAST_TO_FIRST":
+            rows = list(reversed(rows))
+        rows = rows[skip:]
+        if count is not None:
+            rows = rows[:count]
+        return {'values': [(format_timestamp(ts), v) for ts, v in rows],
+                'metadata': {'units': topic}}
+
+
+def read_all(cursor):
+    values = {}
+    metadata = {}
+    chunks = 0
+    while True:
+        chunk = cursor.next_chunk()
+        chunks += 1
+        for topic, rows in chunk['values'].items():
+            values.setdefault(topic, []).extend(v for _, v in rows)
+        for topic, meta in chunk['metadata'].items():
+            assert topic not in metadata
+            metadata[topic] = meta
+        if chunk['done']:
+            return values, metadata, chunks
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 4, 100])
+@pytest.mark.parametrize("order", ["FIRST_TO_LAST", "LAST_TO_FIRST"])
+def test_query_cursor_returns_all_rows(chunk_size, order):
+    historian = FakeHistorian()
+    cursor = QueryCursor(historian.query_historian, ["device/a", "device/b"], None, None, None, None, 0, None,
+                         order, chunk_size)
+
+    values, metadata, chunks = read_all(cursor)
+
+    for topic in DATA:
+        expected = historian.query_historian(topic, order=order)['values']
+        assert values[topic] == [v for _, v in expected]
+        assert metadata[topic] == {'units': topic}
+    assert chunks >= (len(DATA["device/a"]) + len(DATA["device/b"])) // chunk_size
+    assert cursor.done
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 100])
+def test_query_cursor_skip_and_count_per_topic(chunk_size):
+    historian = FakeHistorian()
+    cursor = QueryCursor(historian.query_historian, ["device/a", "device/b"], None, None, None, None, 2, 5,
+                         "FIRST_TO_LAST", chunk_size)
+
+    values, _, _ = read_all(cursor)
+
+    assert values["device/a"] == list(range(2, 7))
+    assert values["device/b"] == list(range(102, 107))
+
+
+def test_query_cursor_bounds_chunk_size():
+    historian = FakeHistorian()
+    cursor = QueryCursor(historian.query_historian, "device/a", BASE, BASE + timedelta(seconds=12), None, None, 0,
+                         None, "FIRST_TO_LAST", 4)
+
+    chunk = cursor.next_chunk()
+
+    assert [v for _, v in chunk['values']["device/a"]] == [0, 1, 2, 3]
+    assert not chunk['done']
+    assert all(count <= 4 for _, _, _, _, count in historian.calls)
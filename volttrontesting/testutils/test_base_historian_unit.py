@@ -8,7 +8,9 @@ import pytest
 from pytz import UTC
 
 from volttrontesting.utils.utils import AgentMock
-from volttron.platform.agent.base_historian import BaseHistorianAgent, Agent
+from volttron.platform.agent.base_historian import (BaseHistorianAgent, Agent, STATUS_KEY_FAILED_PUBLISH_WORKERS,
+                                                     STATUS_KEY_PUBLISHING)
+from volttron.platform.messaging.envelope import pack_batch
 
 CACHE_NAME = "backup.sqlite"
 HISTORIAN_DB = "./data/historian.sqlite"
@@ -81,6 +83,88 @@ def test_base_historian_agent_should_filter_duplicates(base_historian_agent):
     assert base_historian_agent.last_to_publish_list == expected_to_publish_list
 
 
+def test_base_historian_agent_should_capture_batch_envelope(base_historian_agent):
+    headers = {"Date": "2020-11-17 21:24:10.189393+00:00", "TimeStamp": "2020-11-17 21:24:10.189393+00:00"}
+    records = [{"topic": "record/topic{}".format(i), "headers": headers, "message": i} for i in range(3)]
+    records.append({"topic": "unknown/topic", "headers": headers, "message": 3})
+
+    base_historian_agent._capture_batch_envelope(peer=None, sender="forwarder", bus=None, topic="forwarded/batch",
+                                                 headers={}, message=pack_batch(records))
+
+    queued = []
+    while not base_historian_agent._event_queue.empty():
+        queued.append(base_historian_agent._event_queue.get_nowait())
+    assert [(q["topic"], q["readings"][0][1]) for q in queued] == [("record/topic0", 0), ("record/topic1", 1),
+                                                                   ("record/topic2", 2)]
+
+
+def test_base_historian_agent_should_only_capture_enabled_batched_records(base_historian_agent):
+    base_historian_agent._update_subscriptions(capture_device_data=False,
+                                               capture_log_data=True,
+                                               capture_analysis_data=True,
+                                               capture_record_data=False,
+                                               custom_topics_list=[(True, "custom/topic",
+                                                                    base_historian_agent._capture_record_data)])
+    headers = {"Date": "2020-11-17 21:24:10.189393+00:00", "TimeStamp": "2020-11-17 21:24:10.189393+00:00"}
+    records = [{"topic": "devices/campus/building/device/all", "headers": headers,
+                "message": [{"Temperature": 72.5}, {"Temperature": {"units": "F"}}]},
+               {"topic": "record/topic", "headers": headers, "message": 1},
+               {"topic": "custom/topic", "headers": headers, "message": 2}]
+
+    base_historian_agent._capture_batch_envelope(peer=None, sender="forwarder", bus=None, topic="forwarded/batch",
+                                                 headers={}, message=pack_batch(records))
+
+    queued = []
+    while not base_historian_agent._event_queue.empty():
+        queued.append(base_historian_agent._event_queue.get_nowait())
+    assert [(q["topic"], q["readings"][0][1]) for q in queued] == [("custom/topic", 2)]
+
+
+def test_base_historian_agent_should_insert_batch_envelopes_like_record_lists(base_historian_agent):
+    base_historian_agent._update_subscriptions(capture_device_data=False,
+                                               capture_log_data=True,
+                                               capture_analysis_data=True,
+                                               capture_record_data=False,
+                                               custom_topics_list=[])
+    base_historian_agent.vip.rpc.context.vip_message.peer = "data.mover"
+    headers = {"Date": "2020-11-17 21:24:10.189393+00:00", "TimeStamp": "2020-11-17 21:24:10.189393+00:00"}
+    records = [{"topic": "devices/campus/building/device/all", "headers": headers,
+                "message": [{"Temperature": 72.5}, {"Temperature": {"units": "F"}}]},
+               {"topic": "record/topic", "headers": headers, "message": 1}]
+
+    inserted = []
+    for batch in (records, pack_batch(records)):
+        base_historian_agent.insert(batch)
+        queued = []
+        while not base_historian_agent._event_queue.empty():
+            queued.append(base_historian_agent._event_queue.get_nowait())
+        inserted.append([q["topic"] for q in queued])
+
+    # the capture settings only apply to what the historian subscribes to, not to inserts
+    assert inserted[0] == inserted[1] == ["campus/building/device/Temperature", "record/topic"]
+
+
+def test_base_historian_agent_should_report_failed_publish_workers(parallel_historian_agent):
+    headers = {"Date": "2020-11-17 21:24:10.189393+00:00", "TimeStamp": "2020-11-17 21:24:10.189393+00:00"}
+    # one topic for each of the two workers
+    topics = ["record/topic{}".format(i) for i in range(100)]
+    failing_topic = topics[0]
+    working_topic = next(topic for topic in topics if hash(topic) % 2 != hash(failing_topic) % 2)
+    parallel_historian_agent.failing_topic = failing_topic
+    for topic in (failing_topic, working_topic):
+        parallel_historian_agent._capture_record_data(peer=None, sender=None, bus=None, topic=topic,
+                                                      headers=headers, message=1)
+
+    parallel_historian_agent.start_process_thread()
+    sleep(3)
+    parallel_historian_agent.stop_process_thread()
+
+    assert parallel_historian_agent.last_to_publish_list[0]["topic"] == working_topic
+    context = parallel_historian_agent._current_status_context
+    assert context[STATUS_KEY_FAILED_PUBLISH_WORKERS] == 1
+    assert not context[STATUS_KEY_PUBLISHING]
+
+
 BaseHistorianAgent.__bases__ = (AgentMock.imitate(Agent, Agent()),)
 
 
@@ -94,9 +178,27 @@ class BaseHistorianAgentTestWrapper(BaseHistorianAgent):
         self.last_to_publish_list = to_publish_list
 
 
+class ParallelHistorianAgentTestWrapper(BaseHistorianAgentTestWrapper):
+    PARALLEL_PUBLISH_SUPPORT = True
+    failing_topic = None
+
+    def publish_to_historian(self, to_publish_list):
+        if any(record["topic"] == self.failing_topic for record in to_publish_list):
+            raise RuntimeError("connection lost")
+        super(ParallelHistorianAgentTestWrapper, self).publish_to_historian(to_publish_list)
+
+
+@pytest.fixture()
+def parallel_historian_agent():
+    yield from create_base_historian_agent(ParallelHistorianAgentTestWrapper(publish_workers=2))
+
+
 @pytest.fixture()
 def base_historian_agent():
-    base_historian = BaseHistorianAgentTestWrapper()
+    yield from create_base_historian_agent(BaseHistorianAgentTestWrapper())
+
+
+def create_base_historian_agent(base_historian):
     # default is 300 seconds or 5 minutes; setting to 1 second so tests don't take so long
     base_historian._retry_period = 1.0
     # When SQLHistorian is normally started on the platform, this attribute is set.
@@ -0,0 +1,47 @@
+import pytest
+
+from volttron.utils.prefix_trie import PrefixTrie
+
+
+def test_matches_same_as_startswith():
+    prefixes = ['', 'devices', 'devices/', 'devices/campus', 'devices/campus/building1',
+                'devices/campus2', 'analysis', 'devices/campus/building1/all']
+    trie = PrefixTrie()
+    for prefix in prefixes:
+        trie[prefix] = prefix
+
+    for topic in ['devices/campus/building1/all', 'devices/campus2/all', 'devices',
+                  'analysis/x', 'record/foo', '']:
+        expected = [p for p in sorted(prefixes, key=len) if topic.startswith(p)]
+        assert trie.matches(topic) == expected
+        assert [v for _, v in trie.iter_matches(topic)] == expected
+        assert [p for p, _ in trie.iter_matches(topic)] == expected
+
+
+def test_mapping_operations():
+    trie = PrefixTrie()
+    trie['devices/a'] = 1
+    trie['devices/ab'] = 2
+    assert len(trie) == 2
+    assert 'devices/a' in trie
+    assert 'devices/' not in trie
+    assert trie['devices/ab'] == 2
+    assert trie.get('devices') is None
+
+    trie['devices/a'] = 3
+    assert len(trie) == 2
+    assert trie.matches('devices/abc') == [3, 2]
+
+    del trie['devices/ab']
+    assert len(trie) == 1
+    assert trie.matches('devices/abc') == [3]
+    with pytest.raises(KeyError):
+        del trie['devices/ab']
+    with pytest.raises(KeyError):
+        trie['devices']
+
+    assert trie.pop('devices/a') == 3
+    assert trie.pop('devices/a', None) is None
+    assert len(trie) == 0
+    assert not trie
+    assert trie.matches('devices/abc') == []